@@ -0,0 +1,24 @@
+"""
+Identifiers shared by the dataset generator and the load test.
+
+Kept free of Django setup so the load test can run on a machine that
+only talks HTTP to the API.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'django_app'))
+
+from apps.common.national_id import from_base as national_id  # noqa: E402
+BENCH_PASSWORD = 'bench12345'
+BENCH_EMAIL_DOMAIN = 'bench.local'
+BENCH_CODE = 'BENCH'
+
+# Bench national IDs are 9-digit bases from these offsets plus a check digit
+USER_ID_OFFSET = 900_000_000
+PERSON_ID_OFFSET = 100_000_000
+
+
+def bench_user_national_id(index: int) -> str:
+    """National ID of the ``index``-th bench user."""
+    return national_id(USER_ID_OFFSET + index)
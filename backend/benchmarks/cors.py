@@ -0,0 +1,144 @@
+"""
+Throughput benchmark: CORS handling before and after the pure ASGI layer.
+
+"before" rebuilds the previous stack (Starlette's CORSMiddleware plus the
+``@app.middleware("http")`` header hook); "after" uses core.cors. Both
+wrap the same trivial route and are driven in-process through ASGI, so
+the numbers isolate middleware overhead.
+
+Usage:
+    python benchmarks/cors.py [requests]
+"""
+import asyncio
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'fastapi_app'))
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware as StarletteCORSMiddleware
+from fastapi.responses import JSONResponse
+
+from core.config import settings
+from core.cors import CORSMiddleware
+
+METHODS = ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"]
+
+
+def build_before() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(
+        StarletteCORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=METHODS,
+        allow_headers=["*"],
+        expose_headers=["*"],
+        max_age=3600,
+    )
+
+    @app.middleware("http")
+    async def add_cors_headers(request: Request, call_next):
+        if request.method == "OPTIONS":
+            return JSONResponse(
+                content={},
+                headers={
+                    "Access-Control-Allow-Origin": "*",
+                    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS, PATCH",
+                    "Access-Control-Allow-Headers": "*",
+                    "Access-Control-Allow-Credentials": "true",
+                    "Access-Control-Max-Age": "3600",
+                }
+            )
+        response = await call_next(request)
+        response.headers["Access-Control-Allow-Origin"] = "*"
+        response.headers["Access-Control-Allow-Credentials"] = "true"
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS, PATCH"
+        response.headers["Access-Control-Allow-Headers"] = "*"
+        return response
+
+    add_route(app)
+    return app
+
+
+def build_after() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=METHODS,
+        allow_headers=["*"],
+        expose_headers=["*"],
+        max_age=3600,
+    )
+    add_route(app)
+    return app
+
+
+def add_route(app: FastAPI) -> None:
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+
+def make_scope(method: str) -> dict:
+    headers = [(b'host', b'testserver'), (b'origin', b'http://localhost:3000')]
+    if method == 'OPTIONS':
+        headers += [
+            (b'access-control-request-method', b'GET'),
+            (b'access-control-request-headers', b'authorization, content-type'),
+        ]
+    return {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': '/ping', 'raw_path': b'/ping',
+        'root_path': '', 'query_string': b'', 'headers': headers,
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 1234),
+    }
+
+
+async def call(app, scope: dict) -> None:
+    request_sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            assert message['status'] == 200, message
+
+    await app(dict(scope), receive, send)
+
+
+async def drive(app, method: str, count: int) -> float:
+    scope = make_scope(method)
+    for _ in range(50):
+        await call(app, scope)
+
+    start = time.perf_counter()
+    for _ in range(count):
+        await call(app, scope)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    before, after = build_before(), build_after()
+
+    print(f"{'request':<10}{'before req/s':>15}{'after req/s':>15}{'speedup':>10}")
+    for method in ('GET', 'OPTIONS'):
+        rate_before = asyncio.run(drive(before, method, count))
+        rate_after = asyncio.run(drive(after, method, count))
+        print(f"{method:<10}{rate_before:>15.0f}{rate_after:>15.0f}{rate_after / rate_before:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+"""
+Scalable benchmark dataset generator.
+
+Builds a large, deterministic dataset on top of the base seed data
+(``seed_data.py`` must have run: states and insurance plans):
+
+- ``--schools`` schools spread over bench districts in every state
+- ``--users`` users, all sharing the password ``BENCH_PASSWORD``
+- ``--persons`` dependents spread over those users
+- ``--registrations`` registrations (at most one per user)
+
+Bench rows are recognisable (emails ``@bench.local``, location and school
+codes starting with ``BENCH``) so ``--reset`` can remove them again.
+National IDs are derived from the row index, which lets the load test
+log in as any bench user without reading the database.
+
+Usage:
+    python benchmarks/dataset.py --users 100000 --persons 300000 \\
+        --registrations 100000 --schools 10000
+    python benchmarks/dataset.py --reset
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'django_app'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django
+django.setup()
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from apps.common import cache
+from apps.common.national_id import from_bases
+from apps.common.seeding import batched, bulk_insert
+from apps.insurance.models import InsurancePlan, InsuranceRegistration
+from apps.locations.models import State, City, County, Region, District, School
+from apps.users.models import User, Person
+from common import (
+    BENCH_CODE, BENCH_EMAIL_DOMAIN, BENCH_PASSWORD, PERSON_ID_OFFSET, USER_ID_OFFSET,
+)
+
+SCHOOLS_PER_DISTRICT = 50
+
+FIRST_NAMES = ['علی', 'محمد', 'حسین', 'رضا', 'فاطمه', 'زهرا', 'مریم', 'سارا', 'مهدی', 'نرگس']
+LAST_NAMES = ['احمدی', 'محمدی', 'حسینی', 'رضایی', 'موسوی', 'کریمی', 'جعفری', 'صادقی', 'رحیمی', 'کاظمی']
+RELATIONS = ['spouse', 'child', 'parent', 'sibling', 'other']
+STATUSES = ['pending', 'approved', 'rejected', 'active', 'expired']
+SCHOOL_TYPES = ['elementary', 'middle', 'high', 'combined']
+
+
+def create_schools(count: int, rng: random.Random) -> list:
+    states = list(State.objects.all())
+    if not states:
+        raise SystemExit("No states found. Run seed_data.py first.")
+
+    district_count = max(1, -(-count // SCHOOLS_PER_DISTRICT))
+    districts = []
+    for state_index, state in enumerate(states):
+        city, _ = City.objects.get_or_create(state=state, code=BENCH_CODE, defaults={'name_fa': f'شهر آزمایشی {state.code}'})
+        county, _ = County.objects.get_or_create(city=city, code=BENCH_CODE, defaults={'name_fa': 'شهرستان آزمایشی'})
+        region, _ = Region.objects.get_or_create(county=county, code=BENCH_CODE, defaults={'name_fa': 'منطقه آزمایشی'})
+        share = range(state_index, district_count, len(states))
+        districts.extend(
+            District.objects.get_or_create(region=region, code=f"B{i:05d}", defaults={'name_fa': f'ناحیه آزمایشی {i}'})[0]
+            for i in share
+        )
+
+    existing = set(School.objects.filter(code__startswith=BENCH_CODE).values_list('code', flat=True))
+    schools = [
+        School(
+            district=districts[i % len(districts)],
+            code=f"{BENCH_CODE}{i:07d}",
+            name_fa=f'مدرسه آزمایشی {i}',
+            school_type=rng.choice(SCHOOL_TYPES),
+        )
+        for i in range(count)
+        if f"{BENCH_CODE}{i:07d}" not in existing
+    ]
+    bulk_insert(School, schools)
+    return list(School.objects.filter(code__startswith=BENCH_CODE).values_list('id', flat=True))
+
+
+def create_users(count: int, rng: random.Random) -> list:
+    password = make_password(BENCH_PASSWORD)
+    national_ids = from_bases(range(USER_ID_OFFSET, USER_ID_OFFSET + count))
+    # Skip IDs already taken, by earlier bench runs or by other seeded users
+    existing = set()
+    for batch in batched(national_ids, 5000):
+        existing.update(User.objects.filter(national_id__in=batch).values_list('national_id', flat=True))
+    now = timezone.now()
+    users = [
+        User(
+            national_id=national_ids[i],
+            email=f"user{i}@{BENCH_EMAIL_DOMAIN}",
+            password=password,
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            phone=f"0912{i % 10_000_000:07d}",
+            created_at=now - timedelta(days=rng.randint(0, 365)),
+        )
+        for i in range(count)
+        if national_ids[i] not in existing
+    ]
+    bulk_insert(User, users)
+    return list(
+        User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}').order_by('national_id').values_list('id', flat=True)
+    )
+
+
+def create_persons(count: int, user_ids: list, rng: random.Random) -> int:
+    existing = Person.objects.filter(user__email__endswith=f'@{BENCH_EMAIL_DOMAIN}').count()
+    today = date.today()
+    codes = from_bases(range(PERSON_ID_OFFSET + existing, PERSON_ID_OFFSET + count))
+    persons = [
+        Person(
+            user_id=user_ids[i % len(user_ids)],
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            national_code=codes[i - existing],
+            birth_date=today - timedelta(days=rng.randint(365, 365 * 80)),
+            relation=rng.choice(RELATIONS),
+        )
+        for i in range(existing, count)
+    ]
+    bulk_insert(Person, persons)
+    return len(persons)
+
+
+def create_registrations(count: int, user_ids: list, school_ids: list, rng: random.Random) -> int:
+    plan_ids = list(InsurancePlan.objects.filter(is_active=True).values_list('id', flat=True))
+    if not plan_ids:
+        raise SystemExit("No insurance plans found. Run seed_data.py first.")
+
+    bench_registrations = InsuranceRegistration.objects.filter(user__email__endswith=f'@{BENCH_EMAIL_DOMAIN}')
+    registered = set(bench_registrations.values_list('user_id', flat=True))
+    candidates = [user_id for user_id in user_ids if user_id not in registered][:max(0, count - len(registered))]
+    now = timezone.now()
+    registrations = []
+    for user_id in candidates:
+        status = rng.choice(STATUSES)
+        registration_date = now - timedelta(days=rng.randint(1, 730))
+        start_date = (registration_date + timedelta(days=rng.randint(1, 30))).date()
+        registrations.append(InsuranceRegistration(
+            user_id=user_id,
+            plan_id=rng.choice(plan_ids),
+            school_id=rng.choice(school_ids),
+            status=status,
+            registration_date=registration_date,
+            start_date=start_date,
+            end_date=start_date + timedelta(days=365) if status in ('active', 'expired') else None,
+        ))
+    bulk_insert(InsuranceRegistration, registrations)
+
+    # Cover every dependent of the registered users
+    Through = InsuranceRegistration.persons.through
+    new_users = set(candidates)
+    registration_by_user = {
+        user_id: registration_id
+        for user_id, registration_id in bench_registrations.values_list('user_id', 'id').iterator()
+        if user_id in new_users
+    }
+    bench_persons = Person.objects.filter(user__email__endswith=f'@{BENCH_EMAIL_DOMAIN}')
+    links = [
+        Through(insuranceregistration_id=registration_by_user[user_id], person_id=person_id)
+        for person_id, user_id in bench_persons.values_list('id', 'user_id').iterator()
+        if user_id in registration_by_user
+    ]
+    bulk_insert(Through, links)
+    return len(registrations)
+
+
+def reset() -> None:
+    """Delete every bench row."""
+    with transaction.atomic():
+        User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}').delete()
+        School.objects.filter(code__startswith=BENCH_CODE).delete()
+        City.objects.filter(code=BENCH_CODE).delete()
+    cache.invalidate('locations')
+    cache.invalidate('stats')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--persons', type=int, default=30_000)
+    parser.add_argument('--registrations', type=int, default=10_000)
+    parser.add_argument('--schools', type=int, default=1_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help='delete bench rows and exit')
+    args = parser.parse_args()
+
+    if args.reset:
+        reset()
+        print("Bench dataset removed")
+        return
+
+    rng = random.Random(args.seed)
+    ids = {}
+    steps = [
+        ('schools', lambda: create_schools(args.schools, rng)),
+        ('users', lambda: create_users(args.users, rng)),
+        ('persons', lambda: create_persons(args.persons, ids['users'], rng)),
+        ('registrations', lambda: create_registrations(args.registrations, ids['users'], ids['schools'], rng)),
+    ]
+    for name, step in steps:
+        started = time.perf_counter()
+        with transaction.atomic():
+            result = step()
+        if isinstance(result, list):
+            ids[name] = result
+            result = len(result)
+        print(f"{name:>14}: {result:>9,} rows in {time.perf_counter() - started:6.1f}s")
+
+    cache.invalidate('locations')
+    cache.invalidate('stats')
+
+
+if __name__ == '__main__':
+    main()
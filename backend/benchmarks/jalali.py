@@ -0,0 +1,77 @@
+"""
+Microbenchmark: Jalali <-> Gregorian conversion.
+
+Compares the reference arithmetic converter (walks the ``BREAKS`` table
+on every call) with the precomputed month-start table in
+``apps.common.jalali``: single calls (bisect / index lookup) and the
+sequence converters, on sorted dates (report rows) and on shuffled ones.
+Every fast path is checked against the arithmetic first. No database or
+Django settings are needed.
+
+Usage:
+    python benchmarks/jalali.py [dates] [repeats]
+"""
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'django_app'))
+
+from apps.common import jalali  # noqa: E402
+
+
+def timeit(func, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.process_time()
+        func()
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    rng = random.Random(1403)
+    first = date(1990, 1, 1)
+    ordered = sorted(first + timedelta(days=rng.randrange(365 * 50)) for _ in range(count))
+    shuffled = ordered[:]
+    rng.shuffle(shuffled)
+
+    for days in (ordered, shuffled):
+        expected = [jalali.arithmetic_to_jalali(day) for day in days]
+        assert [jalali.to_jalali(day) for day in days] == expected
+        assert jalali.to_jalali_many(days) == expected
+        assert jalali.to_gregorian_many(expected) == days
+
+    print(f"{'case':<32}{'dates':>9}{'arithmetic ms':>15}{'table ms':>11}{'speedup':>10}")
+    for label, days in (('sorted', ordered), ('shuffled', shuffled)):
+        triples = jalali.to_jalali_many(days)
+        cases = (
+            (f'to_jalali ({label})',
+             lambda: [jalali.arithmetic_to_jalali(day) for day in days],
+             lambda: [jalali.to_jalali(day) for day in days]),
+            (f'to_jalali_many ({label})',
+             lambda: [jalali.arithmetic_to_jalali(day) for day in days],
+             lambda: jalali.to_jalali_many(days)),
+            (f'to_gregorian_many ({label})',
+             lambda: [jalali.arithmetic_to_gregorian(*triple) for triple in triples],
+             lambda: jalali.to_gregorian_many(triples)),
+        )
+        for name, slow, fast in cases:
+            slow_time = timeit(slow, repeats)
+            fast_time = timeit(fast, repeats)
+            print(f"{name:<32}{len(days):>9}{slow_time * 1000:>15.1f}{fast_time * 1000:>11.1f}"
+                  f"{slow_time / fast_time:>9.1f}x")
+
+    build = timeit(jalali._build_table, repeats)
+    print(f"table build: {build * 1000:.1f} ms, {len(jalali.MONTH_STARTS):,} entries, "
+          f"{len(jalali.MONTH_STARTS) * jalali.MONTH_STARTS.itemsize / 1024:.1f} KiB "
+          f"({jalali.TABLE_FIRST_DAY} .. {jalali.TABLE_LAST_DAY})")
+
+
+if __name__ == '__main__':
+    main()
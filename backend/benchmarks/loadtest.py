@@ -0,0 +1,310 @@
+"""
+HTTP load test for the main user and admin flows.
+
+Runs scripted scenarios against a running API (start it against a local
+PostgreSQL loaded with ``benchmarks/dataset.py``), then reports per
+endpoint p50/p95/p99 latency, error count and throughput. Results are
+saved as JSON tagged with the current git commit so two runs can be
+compared.
+
+Scenarios:
+    login         POST /auth/login as a random bench user
+    plans         plan list, then one plan's details
+    locations     cascading state -> city -> county -> region -> district -> school lookup
+    registration  register a new user, then register them for insurance
+    documents     upload a small PDF as a bench user
+    dashboard     admin dashboard and admin stats
+
+Usage:
+    uvicorn main:app --workers 4          # in fastapi_app/
+    python benchmarks/loadtest.py --concurrency 32 --duration 30
+    python benchmarks/loadtest.py --scenarios plans locations --compare benchmarks/results/<old>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import httpx
+
+from common import BENCH_PASSWORD, bench_user_national_id, national_id
+
+API = '/api/v1'
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+PDF_BYTES = b'%PDF-1.4\n1 0 obj<<>>endobj\ntrailer<<>>\n%%EOF\n'
+
+# National ID bases for users created by the registration scenario
+REGISTRATION_ID_OFFSET = 800_000_000
+
+
+class Recorder:
+    """Collects latencies (seconds) and errors per endpoint label."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[label] += 1
+            raise
+        self.latencies[label].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[label] += 1
+        return response
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class Context:
+    """Shared state for scenarios: bench user range, tokens and lookup ids."""
+
+    def __init__(self, args):
+        self.args = args
+        self.registration_counter = int(time.time()) % 1_000_000 * 100
+        self.tokens = {}
+        self.plan_ids = []
+        self.school_ids = []
+        self.admin_headers = {}
+
+    def random_user(self) -> str:
+        return bench_user_national_id(random.randrange(self.args.users))
+
+    def next_registration_national_id(self) -> str:
+        self.registration_counter += 1
+        return national_id(REGISTRATION_ID_OFFSET + self.registration_counter % 100_000_000)
+
+    async def headers_for(self, client: httpx.AsyncClient, national_id_: str) -> dict:
+        """Log in once per user (unmeasured) and reuse the token."""
+        token = self.tokens.get(national_id_)
+        if token is None:
+            response = await client.post(
+                f'{API}/auth/login', json={'national_id': national_id_, 'password': BENCH_PASSWORD}
+            )
+            token = self.tokens[national_id_] = response.json()['access_token']
+        return {'Authorization': f'Bearer {token}'}
+
+
+async def scenario_login(client, ctx, recorder):
+    await recorder.request(
+        client, 'POST /auth/login', 'POST', f'{API}/auth/login',
+        json={'national_id': ctx.random_user(), 'password': BENCH_PASSWORD},
+    )
+
+
+async def scenario_plans(client, ctx, recorder):
+    response = await recorder.request(client, 'GET /insurance/plans', 'GET', f'{API}/insurance/plans')
+    plans = response.json()
+    if plans:
+        plan_id = random.choice(plans)['id']
+        await recorder.request(client, 'GET /insurance/plans/{id}', 'GET', f'{API}/insurance/plans/{plan_id}')
+
+
+async def scenario_locations(client, ctx, recorder):
+    levels = [
+        ('states', None),
+        ('cities', 'state_id'),
+        ('counties', 'city_id'),
+        ('regions', 'county_id'),
+        ('districts', 'region_id'),
+        ('schools', 'district_id'),
+    ]
+    parent_id = None
+    for endpoint, param in levels:
+        params = {param: parent_id} if param else None
+        response = await recorder.request(
+            client, f'GET /locations/{endpoint}', 'GET', f'{API}/locations/{endpoint}', params=params
+        )
+        items = response.json()
+        if not items:
+            return
+        parent_id = random.choice(items)['id']
+
+
+async def scenario_registration(client, ctx, recorder):
+    if not ctx.plan_ids:
+        ctx.plan_ids = [plan['id'] for plan in (await client.get(f'{API}/insurance/plans')).json()]
+        ctx.school_ids = await _school_ids(client)
+
+    national_id_ = ctx.next_registration_national_id()
+    response = await recorder.request(
+        client, 'POST /auth/register', 'POST', f'{API}/auth/register',
+        json={
+            'national_id': national_id_,
+            'first_name': 'کاربر',
+            'last_name': 'آزمایشی',
+            'password': BENCH_PASSWORD,
+        },
+    )
+    if response.status_code != 201:
+        return
+    headers = {'Authorization': f"Bearer {response.json()['access_token']}"}
+    await recorder.request(
+        client, 'POST /insurance/register', 'POST', f'{API}/insurance/register', headers=headers,
+        json={'plan_id': random.choice(ctx.plan_ids), 'school_id': random.choice(ctx.school_ids)},
+    )
+
+
+async def _school_ids(client) -> list:
+    """Walk the location tree once per state to find schools to register at."""
+    ids = []
+    for state in (await client.get(f'{API}/locations/states')).json():
+        parent = state['id']
+        for endpoint, param in [('cities', 'state_id'), ('counties', 'city_id'), ('regions', 'county_id'),
+                                ('districts', 'region_id'), ('schools', 'district_id')]:
+            items = (await client.get(f'{API}/locations/{endpoint}', params={param: parent})).json()
+            if not items:
+                break
+            parent = items[-1]['id']
+        else:
+            ids.append(parent)
+    return ids
+
+
+async def scenario_documents(client, ctx, recorder):
+    headers = await ctx.headers_for(client, ctx.random_user())
+    await recorder.request(
+        client, 'POST /documents/upload', 'POST', f'{API}/documents/upload', headers=headers,
+        data={'document_type': 'other', 'title': 'مدرک آزمایشی'},
+        files={'file': ('bench.pdf', PDF_BYTES, 'application/pdf')},
+    )
+
+
+async def scenario_dashboard(client, ctx, recorder):
+    if not ctx.admin_headers:
+        response = await client.post(
+            f'{API}/auth/login',
+            json={'national_id': ctx.args.admin_national_id, 'password': ctx.args.admin_password},
+        )
+        ctx.admin_headers = {'Authorization': f"Bearer {response.json()['access_token']}"}
+    await recorder.request(
+        client, 'GET /statistics/admin/dashboard', 'GET', f'{API}/statistics/admin/dashboard', headers=ctx.admin_headers
+    )
+    await recorder.request(client, 'GET /admin/stats', 'GET', f'{API}/admin/stats', headers=ctx.admin_headers)
+
+
+SCENARIOS = {
+    'login': scenario_login,
+    'plans': scenario_plans,
+    'locations': scenario_locations,
+    'registration': scenario_registration,
+    'documents': scenario_documents,
+    'dashboard': scenario_dashboard,
+}
+
+
+async def run_scenario(name: str, ctx: Context) -> dict:
+    recorder = Recorder()
+    scenario = SCENARIOS[name]
+    limits = httpx.Limits(max_connections=ctx.args.concurrency)
+    async with httpx.AsyncClient(base_url=ctx.args.base_url, limits=limits, timeout=30) as client:
+        # Warm-up pass fills caches and token state outside the measured window
+        await scenario(client, ctx, Recorder())
+
+        deadline = time.perf_counter() + ctx.args.duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                try:
+                    await scenario(client, ctx, recorder)
+                except (httpx.HTTPError, KeyError, ValueError):
+                    pass
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(ctx.args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for label, values in sorted(recorder.latencies.items()):
+        values.sort()
+        endpoints[label] = {
+            'requests': len(values),
+            'errors': recorder.errors[label],
+            'throughput': round(len(values) / elapsed, 1),
+            'p50_ms': round(percentile(values, 50) * 1000, 2),
+            'p95_ms': round(percentile(values, 95) * 1000, 2),
+            'p99_ms': round(percentile(values, 99) * 1000, 2),
+            'mean_ms': round(sum(values) / len(values) * 1000, 2),
+        }
+    return endpoints
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_report(results: dict, baseline: dict = None) -> None:
+    header = f"{'scenario':<13} {'endpoint':<34} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5}"
+    print(header)
+    print('-' * len(header))
+    for scenario, endpoints in results['scenarios'].items():
+        for label, row in endpoints.items():
+            line = (f"{scenario:<13} {label:<34} {row['throughput']:>8} {row['p50_ms']:>8} "
+                    f"{row['p95_ms']:>8} {row['p99_ms']:>8} {row['errors']:>5}")
+            old = (baseline or {}).get('scenarios', {}).get(scenario, {}).get(label)
+            if old and old['p95_ms']:
+                change = (row['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100
+                line += f"   p95 {change:+.1f}% vs {baseline['commit']}"
+            print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20, help='seconds per scenario')
+    parser.add_argument('--users', type=int, default=10_000, help='bench users created by dataset.py')
+    parser.add_argument('--admin-national-id', default='0000000000')
+    parser.add_argument('--admin-password', default='admin123')
+    parser.add_argument('--output', help='result file (default: benchmarks/results/<timestamp>-<commit>.json)')
+    parser.add_argument('--compare', help='earlier result file to compare p95 latency against')
+    args = parser.parse_args()
+
+    ctx = Context(args)
+    results = {
+        'commit': git_commit(),
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'config': {key: getattr(args, key) for key in ('base_url', 'concurrency', 'duration', 'users')},
+        'scenarios': {},
+    }
+    for name in args.scenarios:
+        print(f"Running {name} for {args.duration:g}s at concurrency {args.concurrency}...")
+        results['scenarios'][name] = asyncio.run(run_scenario(name, ctx))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+    print()
+    print_report(results, baseline)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{results['commit']}.json")
+    with open(output, 'w') as fh:
+        json.dump(results, fh, indent=2, ensure_ascii=False)
+    print(f"\nSaved results to {output}")
+
+
+if __name__ == '__main__':
+    main()
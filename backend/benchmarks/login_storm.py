@@ -0,0 +1,103 @@
+"""
+Login storm benchmark: does non-auth latency stay flat while logins pile up?
+
+Measures a probe endpoint (a cheap sync endpoint by default) twice against
+a running API: once on its own, then while ``--storm`` concurrent clients
+log in as bench users in a loop. Password hashing runs on the password
+pool (``core.passwords``), so the probe's p95/p99 should barely move; with
+hashing on the shared threadpool, probe requests queue behind logins.
+Logins rejected by the pool's admission limit (503) are counted separately.
+
+Needs bench users from ``benchmarks/dataset.py`` and the real password
+hasher (PBKDF2), so run the API with the normal settings but without the
+login rate limits:
+
+    RATE_LIMIT_ENABLED=False uvicorn main:app          # in fastapi_app/
+    python benchmarks/login_storm.py --storm 64 --duration 15
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from common import BENCH_PASSWORD
+from loadtest import API, Context, Recorder, percentile
+
+
+def summarize(recorder: Recorder, label: str, elapsed: float) -> dict:
+    values = sorted(recorder.latencies[label])
+    if not values:
+        return {'requests': 0, 'errors': recorder.errors[label]}
+    return {
+        'requests': len(values),
+        'errors': recorder.errors[label],
+        'throughput': round(len(values) / elapsed, 1),
+        'p50_ms': round(percentile(values, 50) * 1000, 2),
+        'p95_ms': round(percentile(values, 95) * 1000, 2),
+        'p99_ms': round(percentile(values, 99) * 1000, 2),
+    }
+
+
+async def run_phase(args, ctx: Context, storm: int) -> dict:
+    recorder = Recorder()
+    rejected = 0
+    limits = httpx.Limits(max_connections=args.probes + storm)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + args.duration
+
+        async def probe():
+            while time.perf_counter() < deadline:
+                await recorder.request(client, 'probe', 'GET', args.probe)
+
+        async def login():
+            nonlocal rejected
+            while time.perf_counter() < deadline:
+                response = await recorder.request(
+                    client, 'login', 'POST', f'{API}/auth/login',
+                    json={'national_id': ctx.random_user(), 'password': BENCH_PASSWORD},
+                )
+                if response.status_code == 503:
+                    rejected += 1
+                    await asyncio.sleep(float(response.headers.get('Retry-After', '1')))
+
+        started = time.perf_counter()
+        await asyncio.gather(*[probe() for _ in range(args.probes)], *[login() for _ in range(storm)])
+        elapsed = time.perf_counter() - started
+
+    result = {'probe': summarize(recorder, 'probe', elapsed)}
+    if storm:
+        result['login'] = summarize(recorder, 'login', elapsed)
+        result['login']['rejected'] = rejected
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--probe', default=f'{API}/locations/states', help='non-auth endpoint to watch')
+    parser.add_argument('--probes', type=int, default=4, help='concurrent probe clients')
+    parser.add_argument('--storm', type=int, default=64, help='concurrent login clients')
+    parser.add_argument('--duration', type=float, default=15, help='seconds per phase')
+    parser.add_argument('--users', type=int, default=10_000, help='bench users created by dataset.py')
+    args = parser.parse_args()
+
+    ctx = Context(args)
+    print(f"Probe {args.probe} alone for {args.duration:g}s...")
+    quiet = asyncio.run(run_phase(args, ctx, storm=0))
+    print(f"Probe {args.probe} during a {args.storm}-client login storm for {args.duration:g}s...")
+    storm = asyncio.run(run_phase(args, ctx, storm=args.storm))
+
+    print()
+    print(f"{'phase':<8} {'endpoint':<8} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5} {'503':>5}")
+    for phase, result in (('quiet', quiet), ('storm', storm)):
+        for label, row in result.items():
+            print(f"{phase:<8} {label:<8} {row.get('throughput', 0):>8} {row.get('p50_ms', 0):>8} "
+                  f"{row.get('p95_ms', 0):>8} {row.get('p99_ms', 0):>8} {row['errors']:>5} {row.get('rejected', ''):>5}")
+    if quiet['probe'].get('p95_ms') and storm['probe'].get('p95_ms'):
+        change = (storm['probe']['p95_ms'] - quiet['probe']['p95_ms']) / quiet['probe']['p95_ms'] * 100
+        print(f"\nProbe p95 during the storm: {change:+.1f}% vs quiet")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Microbenchmark: response serialization for the largest list endpoints.
+
+Compares the previous path (build Pydantic models, let FastAPI
+revalidate them against ``response_model``, encode with the stdlib
+``json``) with the trusted path (build dicts, encode with orjson).
+No database is needed; rows are unsaved model instances.
+
+Usage:
+    python benchmarks/serialization.py [rows] [repeats]
+"""
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import List
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'fastapi_app'))
+sys.path.insert(0, os.path.join(BASE_DIR, 'django_app'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django
+django.setup()
+
+from django.utils import timezone
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from apps.insurance.models import InsurancePlan, PlanCoverage, InsuranceRegistration
+from apps.users.models import Person
+from api.v1 import insurance, persons
+from core.responses import trusted_response
+
+
+def make_persons(n):
+    now = timezone.now()
+    return [
+        Person(
+            id=uuid.uuid4(),
+            user_id=uuid.uuid4(),
+            first_name='فاطمه',
+            last_name='احمدی',
+            national_code=f"{i:010d}",
+            birth_date=date(1980, 1, 1) + timedelta(days=i % 15000),
+            relation=('spouse', 'child', 'parent', 'sibling', 'other')[i % 5],
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(n)
+    ]
+
+
+def make_registrations(n):
+    now = timezone.now()
+    return [
+        InsuranceRegistration(
+            id=uuid.uuid4(),
+            user_id=uuid.uuid4(),
+            plan_id=uuid.uuid4(),
+            school_id=uuid.uuid4(),
+            status='active',
+            registration_date=now,
+            start_date=now.date(),
+            end_date=now.date() + timedelta(days=365),
+        )
+        for _ in range(n)
+    ]
+
+
+def make_plans(n):
+    plans = []
+    for i in range(n):
+        plan = InsurancePlan(
+            id=uuid.uuid4(),
+            name_fa=f"طرح {i}",
+            plan_type='standard',
+            description_fa='بیمه تکمیلی استاندارد برای کارکنان آموزش و پرورش' * 3,
+            monthly_premium=Decimal('1500000'),
+        )
+        plan.active_coverages = [
+            PlanCoverage(
+                id=uuid.uuid4(),
+                plan_id=plan.id,
+                coverage_type=coverage_type,
+                title_fa='پوشش',
+                description_fa='توضیحات پوشش بیمه',
+                coverage_amount=Decimal('50000000'),
+                coverage_percentage=70,
+                max_usage_count=12,
+            )
+            for coverage_type, _ in PlanCoverage.COVERAGE_TYPE_CHOICES
+        ]
+        plans.append(plan)
+    return plans
+
+
+def legacy_person(p):
+    return persons.PersonResponse(**persons._serialize_person(p))
+
+
+def legacy_registration(r):
+    return insurance.RegistrationResponse(**insurance._serialize_registration(r))
+
+
+def legacy_plan(p):
+    data = insurance._serialize_plan(p)
+    data['coverages'] = [insurance.CoverageResponse(**c) for c in data['coverages']]
+    return insurance.PlanResponse(**data)
+
+
+def legacy_body(rows, build, model):
+    """Old path: Pydantic objects -> response_model validation -> json.dumps."""
+    field = create_response_field(name='response', type_=List[model])
+    content = asyncio.run(serialize_response(field=field, response_content=[build(r) for r in rows]))
+    return JSONResponse(content).body
+
+
+def trusted_body(rows, serialize):
+    """New path: dicts -> orjson."""
+    return trusted_response([serialize(r) for r in rows]).body
+
+
+def timeit(func, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.process_time()
+        func()
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    cases = [
+        ('persons', make_persons(rows), legacy_person, persons.PersonResponse, persons._serialize_person),
+        ('registrations', make_registrations(rows), legacy_registration,
+         insurance.RegistrationResponse, insurance._serialize_registration),
+        ('plans', make_plans(max(rows // 100, 1)), legacy_plan, insurance.PlanResponse, insurance._serialize_plan),
+    ]
+
+    print(f"{'endpoint':<15}{'rows':>8}{'legacy ms':>12}{'orjson ms':>12}{'speedup':>10}")
+    for name, data, build, model, serialize in cases:
+        assert len(legacy_body(data, build, model)) > 0
+        legacy = timeit(lambda: legacy_body(data, build, model), repeats)
+        fast = timeit(lambda: trusted_body(data, serialize), repeats)
+        print(f"{name:<15}{len(data):>8}{legacy * 1000:>12.1f}{fast * 1000:>12.1f}{legacy / fast:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
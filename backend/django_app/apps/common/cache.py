@@ -0,0 +1,202 @@
+"""
+Shared cache layer for the Django apps and the FastAPI routers.
+
+All reads and writes go through Django's configured ``default`` cache
+(locmem in development and tests, Redis when ``CACHE_BACKEND=redis``).
+On top of it this module adds:
+
+- namespaced keys: ``<namespace>:v<version>:<key>``
+- versioned invalidation: bumping a namespace version makes every key
+  in it unreachable at once, without scanning or deleting keys
+- single-flight recompute: concurrent misses on the same key wait for
+  one computation instead of stampeding the database
+- hit/miss metrics per namespace
+"""
+import functools
+import threading
+import time
+import zlib
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Default time-to-live (seconds) for each namespace
+NAMESPACE_TIMEOUTS = {
+    'plans': 600,
+    'locations': 3600,
+    'stats': 60,
+}
+DEFAULT_TIMEOUT = 300
+
+# How long a recompute lock is held before another worker may take over
+LOCK_TIMEOUT = 30
+LOCK_POLL_INTERVAL = 0.05
+
+_MISSING = object()
+
+# Striped in-process locks; one stripe per key hash keeps memory bounded
+_LOCK_STRIPES = 64
+_local_locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+
+
+class CacheMetrics:
+    """Thread-safe hit/miss counters grouped by namespace."""
+
+    FIELDS = ('hits', 'misses', 'computes', 'coalesced', 'invalidations')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: dict.fromkeys(self.FIELDS, 0))
+
+    def incr(self, namespace, field):
+        with self._lock:
+            self._counters[namespace][field] += 1
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for namespace, counters in self._counters.items():
+                lookups = counters['hits'] + counters['misses']
+                result[namespace] = {
+                    **counters,
+                    'hit_ratio': round(counters['hits'] / lookups, 4) if lookups else 0.0,
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+
+metrics = CacheMetrics()
+
+
+def _timeout_for(namespace, timeout=None):
+    if timeout is not None:
+        return timeout
+    overrides = getattr(settings, 'CACHE_NAMESPACE_TIMEOUTS', {})
+    return overrides.get(namespace, NAMESPACE_TIMEOUTS.get(namespace, DEFAULT_TIMEOUT))
+
+
+def _version_key(namespace):
+    return f"{namespace}:__version__"
+
+
+def get_version(namespace):
+    """Return the current version number of a namespace."""
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        # Seed from the clock so an evicted version never revives old entries
+        cache.add(_version_key(namespace), int(time.time()), None)
+        version = cache.get(_version_key(namespace))
+    return version
+
+
+def make_key(namespace, key):
+    """Build the fully qualified cache key for ``key`` in ``namespace``."""
+    return f"{namespace}:v{get_version(namespace)}:{key}"
+
+
+def invalidate(namespace):
+    """Invalidate every key in a namespace by bumping its version."""
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        # Version key missing or evicted; start a fresh generation
+        cache.set(_version_key(namespace), int(time.time()), None)
+    metrics.incr(namespace, 'invalidations')
+
+
+def get(namespace, key, default=None):
+    """Read a value from the cache."""
+    value = cache.get(make_key(namespace, key), _MISSING)
+    if value is _MISSING:
+        metrics.incr(namespace, 'misses')
+        return default
+    metrics.incr(namespace, 'hits')
+    return value
+
+
+def set(namespace, key, value, timeout=None):
+    """Write a value to the cache."""
+    cache.set(make_key(namespace, key), value, _timeout_for(namespace, timeout))
+
+
+def delete(namespace, key):
+    """Remove a single key from the cache."""
+    cache.delete(make_key(namespace, key))
+
+
+def get_or_set(namespace, key, compute, timeout=None):
+    """
+    Return the cached value for ``key`` or compute and store it.
+
+    Only one caller per key runs ``compute`` at a time: threads in this
+    process serialise on a striped lock, and other processes wait on a
+    short-lived lock key stored in the shared cache.
+    """
+    full_key = make_key(namespace, key)
+    value = cache.get(full_key, _MISSING)
+    if value is not _MISSING:
+        metrics.incr(namespace, 'hits')
+        return value
+
+    metrics.incr(namespace, 'misses')
+    stripe = _local_locks[zlib.crc32(full_key.encode()) % _LOCK_STRIPES]
+    with stripe:
+        # Another thread may have filled the key while we waited
+        value = cache.get(full_key, _MISSING)
+        if value is not _MISSING:
+            metrics.incr(namespace, 'coalesced')
+            return value
+
+        lock_key = f"{full_key}:lock"
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            # Another process is computing; wait for its result
+            time.sleep(LOCK_POLL_INTERVAL)
+            value = cache.get(full_key, _MISSING)
+            if value is not _MISSING:
+                metrics.incr(namespace, 'coalesced')
+                return value
+            if time.monotonic() >= deadline:
+                break
+
+        try:
+            value = compute()
+            cache.set(full_key, value, _timeout_for(namespace, timeout))
+            metrics.incr(namespace, 'computes')
+        finally:
+            cache.delete(lock_key)
+    return value
+
+
+def cached(namespace, key_func=None, timeout=None):
+    """
+    Decorator that caches a function's return value in ``namespace``.
+
+    ``key_func`` receives the call arguments and returns the cache key;
+    by default the key is built from the function name and arguments.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if key_func is not None:
+                key = key_func(*args, **kwargs)
+            else:
+                parts = [func.__name__, *map(str, args)]
+                parts += [f"{k}={v}" for k, v in sorted(kwargs.items())]
+                key = ':'.join(parts)
+            return get_or_set(namespace, key, lambda: func(*args, **kwargs), timeout)
+        return wrapper
+    return decorator
+
+
+def stats():
+    """Return cache metrics and backend information."""
+    backend = settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]
+    return {
+        'backend': backend,
+        'namespaces': metrics.snapshot(),
+    }
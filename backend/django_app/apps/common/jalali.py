@@ -0,0 +1,263 @@
+"""
+Solar Hijri (Jalali) calendar conversions.
+
+The first six months have 31 days, the next five 30, and Esfand has 29
+days, or 30 in a leap year. Leap years follow the 33-year cycles of
+the Iranian calendar. ``BREAKS`` lists the years where the cycle
+pattern shifts, which keeps conversions exact from 1 AP up to 3177 AP
+(the table from Borkowski's algorithm, as used by jalaali-js).
+
+The arithmetic has to walk ``BREAKS`` for every date. So at import time
+the start of every month from ``TABLE_FIRST_YEAR`` to ``TABLE_LAST_YEAR``
+is precomputed as a day ordinal (``date.toordinal()``) into
+``MONTH_STARTS``, a compact ``array`` of about 7,200 ints:
+
+- Jalali -> Gregorian is one index lookup.
+- Gregorian -> Jalali is a ``bisect`` over the table.
+- ``to_jalali_many`` and ``to_gregorian_many`` convert whole sequences.
+  They skip the bisect while consecutive dates stay in the same month,
+  which is the common case for sorted report rows.
+
+Dates outside the table fall back to the arithmetic (``arithmetic_*``),
+which is also the reference the table is built from and benchmarked
+against (``benchmarks/jalali.py``).
+
+This module has no Django imports so scripts and reports can use it
+without configuring settings.
+"""
+from array import array
+from bisect import bisect_right
+from datetime import date, timedelta
+
+MONTH_NAMES = (
+    'فروردین', 'اردیبهشت', 'خرداد', 'تیر', 'مرداد', 'شهریور',
+    'مهر', 'آبان', 'آذر', 'دی', 'بهمن', 'اسفند',
+)
+
+BREAKS = (
+    -61, 9, 38, 199, 426, 686, 756, 818, 1111, 1181, 1210,
+    1635, 2060, 2097, 2192, 2262, 2324, 2394, 2456, 3178,
+)
+MIN_YEAR, MAX_YEAR = 1, BREAKS[-1] - 1
+
+# Days before each month, from 1 Farvardin
+MONTH_OFFSETS = tuple(31 * m if m <= 6 else 186 + 30 * (m - 6) for m in range(12))
+
+# Years held in the lookup table (1721-2321 CE)
+TABLE_FIRST_YEAR, TABLE_LAST_YEAR = 1100, 1699
+
+
+def _div(a: int, b: int) -> int:
+    """Integer division truncated toward zero, as in the reference algorithm."""
+    return int(a / b)
+
+
+def _mod(a: int, b: int) -> int:
+    return a - _div(a, b) * b
+
+
+def _year_info(jy: int) -> tuple:
+    """``(leap, day of March of 1 Farvardin)``; ``leap`` is 0 in a leap year."""
+    if not MIN_YEAR <= jy <= MAX_YEAR:
+        raise ValueError(f"Jalali year {jy} is outside {MIN_YEAR}..{MAX_YEAR}")
+    gy = jy + 621
+    leap_j = -14
+    jp = BREAKS[0]
+    jump = 0
+    for jm in BREAKS[1:]:
+        jump = jm - jp
+        if jy < jm:
+            break
+        leap_j += _div(jump, 33) * 8 + _div(_mod(jump, 33), 4)
+        jp = jm
+    n = jy - jp
+    leap_j += _div(n, 33) * 8 + _div(_mod(n, 33) + 3, 4)
+    if _mod(jump, 33) == 4 and jump - n == 4:
+        leap_j += 1
+    leap_g = _div(gy, 4) - _div((_div(gy, 100) + 1) * 3, 4) - 150
+    march = 20 + leap_j - leap_g
+    if jump - n < 6:
+        n = n - jump + _div(jump + 4, 33) * 33
+    leap = _mod(_mod(n + 1, 33) - 1, 4)
+    return (4 if leap == -1 else leap), march
+
+
+def _arithmetic_nowruz(jy: int) -> date:
+    return date(jy + 621, 3, _year_info(jy)[1])
+
+
+def _arithmetic_month_length(jy: int, jm: int) -> int:
+    if jm <= 6:
+        return 31
+    if jm <= 11:
+        return 30
+    return 30 if _year_info(jy)[0] == 0 else 29
+
+
+def arithmetic_to_gregorian(jy: int, jm: int, jd: int) -> date:
+    """Reference Jalali -> Gregorian conversion, computed from ``BREAKS`` on every call."""
+    if not 1 <= jm <= 12 or not 1 <= jd <= _arithmetic_month_length(jy, jm):
+        raise ValueError(f"Invalid Jalali date {jy}/{jm}/{jd}")
+    return _arithmetic_nowruz(jy) + timedelta(days=MONTH_OFFSETS[jm - 1] + jd - 1)
+
+
+def arithmetic_to_jalali(day: date) -> tuple:
+    """Reference Gregorian -> Jalali conversion, computed from ``BREAKS`` on every call."""
+    jy = min(day.year - 621, MAX_YEAR)
+    start = _arithmetic_nowruz(jy)
+    if day < start:
+        jy -= 1
+        start = _arithmetic_nowruz(jy)
+    days = (day - start).days
+    if jy == MAX_YEAR and days >= 336 + _arithmetic_month_length(jy, 12):
+        raise ValueError(f"{day} is after the last supported Jalali year {MAX_YEAR}")
+    if days < 186:
+        return jy, days // 31 + 1, days % 31 + 1
+    days -= 186
+    return jy, days // 30 + 7, days % 30 + 1
+
+
+def _build_table() -> array:
+    starts = array('i')
+    for jy in range(TABLE_FIRST_YEAR, TABLE_LAST_YEAR + 1):
+        first = _arithmetic_nowruz(jy).toordinal()
+        starts.extend(first + offset for offset in MONTH_OFFSETS)
+    # Closing entry: 1 Farvardin of the year after the table
+    starts.append(_arithmetic_nowruz(TABLE_LAST_YEAR + 1).toordinal())
+    return starts
+
+
+# MONTH_STARTS[(jy - TABLE_FIRST_YEAR) * 12 + jm - 1] is the ordinal of jy/jm/1
+MONTH_STARTS = _build_table()
+TABLE_FIRST_DAY = date.fromordinal(MONTH_STARTS[0])
+TABLE_LAST_DAY = date.fromordinal(MONTH_STARTS[-1] - 1)
+
+
+def _month_index(jy: int, jm: int):
+    """Table index of ``jy/jm``, or None outside the table."""
+    if TABLE_FIRST_YEAR <= jy <= TABLE_LAST_YEAR and 1 <= jm <= 12:
+        return (jy - TABLE_FIRST_YEAR) * 12 + jm - 1
+    return None
+
+
+def month_length(jy: int, jm: int) -> int:
+    index = _month_index(jy, jm)
+    if index is None:
+        return _arithmetic_month_length(jy, jm)
+    return MONTH_STARTS[index + 1] - MONTH_STARTS[index]
+
+
+def is_leap(jy: int) -> bool:
+    return month_length(jy, 12) == 30
+
+
+def nowruz(jy: int) -> date:
+    """Gregorian date of 1 Farvardin ``jy``."""
+    index = _month_index(jy, 1)
+    if index is None:
+        return _arithmetic_nowruz(jy)
+    return date.fromordinal(MONTH_STARTS[index])
+
+
+def to_gregorian(jy: int, jm: int, jd: int) -> date:
+    index = _month_index(jy, jm)
+    if index is None:
+        return arithmetic_to_gregorian(jy, jm, jd)
+    start = MONTH_STARTS[index]
+    if not 1 <= jd <= MONTH_STARTS[index + 1] - start:
+        raise ValueError(f"Invalid Jalali date {jy}/{jm}/{jd}")
+    return date.fromordinal(start + jd - 1)
+
+
+def to_jalali(day: date) -> tuple:
+    """``(year, month, day)`` in the Jalali calendar for a Gregorian date."""
+    ordinal = day.toordinal()
+    if not MONTH_STARTS[0] <= ordinal < MONTH_STARTS[-1]:
+        return arithmetic_to_jalali(day)
+    index = bisect_right(MONTH_STARTS, ordinal) - 1
+    return TABLE_FIRST_YEAR + index // 12, index % 12 + 1, ordinal - MONTH_STARTS[index] + 1
+
+
+def to_jalali_many(days) -> list:
+    """
+    ``to_jalali`` for a sequence of dates, in order.
+
+    The current month's bounds are kept between items, so runs of dates
+    in one month (sorted or grouped input) cost one comparison each
+    instead of a bisect.
+    """
+    starts = MONTH_STARTS
+    low, high = starts[0], starts[-1]
+    result = []
+    append = result.append
+    index, start, end = -1, 0, 0
+    for day in days:
+        ordinal = day.toordinal()
+        if not start <= ordinal < end:
+            if not low <= ordinal < high:
+                append(arithmetic_to_jalali(day))
+                continue
+            index = bisect_right(starts, ordinal) - 1
+            start, end = starts[index], starts[index + 1]
+        append((TABLE_FIRST_YEAR + index // 12, index % 12 + 1, ordinal - start + 1))
+    return result
+
+
+def to_gregorian_many(dates) -> list:
+    """``to_gregorian`` for a sequence of ``(year, month, day)`` tuples, in order."""
+    starts = MONTH_STARTS
+    fromordinal = date.fromordinal
+    result = []
+    append = result.append
+    for jy, jm, jd in dates:
+        index = _month_index(jy, jm)
+        if index is None:
+            append(arithmetic_to_gregorian(jy, jm, jd))
+            continue
+        start = starts[index]
+        if not 1 <= jd <= starts[index + 1] - start:
+            raise ValueError(f"Invalid Jalali date {jy}/{jm}/{jd}")
+        append(fromordinal(start + jd - 1))
+    return result
+
+
+def month_starts(start: date, end: date) -> list:
+    """Gregorian first days of the Jalali months covering ``start``..``end``, plus that of the next month."""
+    first, last = start.toordinal(), end.toordinal()
+    if MONTH_STARTS[0] <= first <= last < MONTH_STARTS[-1]:
+        low = bisect_right(MONTH_STARTS, first) - 1
+        high = bisect_right(MONTH_STARTS, last)
+        return [date.fromordinal(ordinal) for ordinal in MONTH_STARTS[low:high + 1]]
+    jy, jm, jd = to_jalali(start)
+    result = [start - timedelta(days=jd - 1)]
+    while result[-1] <= end:
+        result.append(result[-1] + timedelta(days=month_length(jy, jm)))
+        jy, jm = add_months(jy, jm, 1)
+    return result
+
+
+def month_start(day: date) -> date:
+    """Gregorian date of the first day of the Jalali month containing ``day``."""
+    jd = to_jalali(day)[2]
+    return day - timedelta(days=jd - 1)
+
+
+def year_start(day: date) -> date:
+    """Gregorian date of 1 Farvardin of the Jalali year containing ``day``."""
+    return nowruz(to_jalali(day)[0])
+
+
+def add_months(jy: int, jm: int, months: int) -> tuple:
+    """The Jalali ``(year, month)`` ``months`` after (or before) ``jy/jm``."""
+    index = jy * 12 + jm - 1 + months
+    return index // 12, index % 12 + 1
+
+
+def format_date(day: date) -> str:
+    """``1403/01/05`` for a Gregorian date."""
+    return '%04d/%02d/%02d' % to_jalali(day)
+
+
+def month_name(jy: int, jm: int) -> str:
+    """``فروردین 1403``."""
+    return f"{MONTH_NAMES[jm - 1]} {jy}"
@@ -0,0 +1,222 @@
+"""
+Database-backed background jobs.
+
+Side effects that need not hold up a request (notifications, audit
+logging) are queued with ``enqueue()`` and run by a separate worker
+process (``manage.py run_jobs``). The job row is inserted in the caller's
+transaction, so a job exists exactly when the change that caused it was
+committed.
+
+Workers claim ready jobs in small batches and run the function
+registered for the job's name with ``@handler``. A failing job is
+retried with exponential backoff and jitter until ``max_attempts``, then
+kept as ``failed`` for inspection. A job whose worker died mid-run is
+claimed again once its lock is older than ``JOB_LOCK_TIMEOUT`` seconds.
+Finished jobs are purged after ``JOB_RETENTION_DAYS``.
+"""
+import logging
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, F, Min, Q, Sum
+from django.utils import timezone
+
+logger = logging.getLogger('health_insurance.jobs')
+
+# Job name -> function called with the job's payload as keyword arguments
+HANDLERS = {}
+
+
+def handler(name: str):
+    """Register the decorated function as the handler for jobs named ``name``."""
+    def register(func):
+        HANDLERS[name] = func
+        return func
+    return register
+
+
+class Job(models.Model):
+    """One queued unit of background work."""
+    
+    STATUS_CHOICES = [
+        ('queued', 'در صف'),
+        ('running', 'در حال اجرا'),
+        ('done', 'انجام شده'),
+        ('failed', 'ناموفق'),
+    ]
+    
+    name = models.CharField(max_length=100, verbose_name='نوع کار')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='داده‌ها')
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='queued',
+        verbose_name='وضعیت'
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name='تعداد تلاش')
+    max_attempts = models.PositiveIntegerField(default=5, verbose_name='حداکثر تلاش')
+    run_at = models.DateTimeField(default=timezone.now, verbose_name='زمان اجرا')
+    locked_by = models.CharField(max_length=100, blank=True, null=True, verbose_name='پردازشگر')
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name='زمان شروع')
+    last_error = models.TextField(blank=True, default='', verbose_name='آخرین خطا')
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='تاریخ ایجاد')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='تاریخ پایان')
+    
+    class Meta:
+        db_table = 'background_jobs'
+        verbose_name = 'کار پس‌زمینه'
+        verbose_name_plural = 'کارهای پس‌زمینه'
+        indexes = [
+            # Claim query: ready queued jobs and expired locks, oldest first
+            models.Index(fields=['status', 'run_at'], name='jobs_status_run_at_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.get_status_display()})"
+
+
+def enqueue(name: str, payload: dict = None, delay: float = 0, max_attempts: int = None) -> Job:
+    """Queue a job for ``name``'s handler; call inside the transaction that makes it necessary."""
+    if name not in HANDLERS:
+        raise ValueError(f"No job handler registered for {name!r}")
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def enqueue_many(name: str, payloads, max_attempts: int = None, batch_size: int = 1000) -> int:
+    """Queue one job per payload with batched INSERTs; returns the number queued."""
+    if name not in HANDLERS:
+        raise ValueError(f"No job handler registered for {name!r}")
+    now = timezone.now()
+    created = Job.objects.bulk_create(
+        (
+            Job(name=name, payload=payload, run_at=now, created_at=now,
+                max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS)
+            for payload in payloads
+        ),
+        batch_size=batch_size,
+    )
+    return len(created)
+
+
+def _claimable(now):
+    expired = now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    return Q(status='queued', run_at__lte=now) | Q(status='running', locked_at__lt=expired)
+
+
+def claim(worker_id: str, limit: int) -> list:
+    """
+    Lock up to ``limit`` ready jobs for ``worker_id`` and return them.
+
+    The conditional UPDATE makes concurrent workers claim disjoint jobs
+    even where ``SKIP LOCKED`` is unavailable (SQLite); on PostgreSQL
+    they also skip each other's candidate rows instead of waiting.
+    """
+    now = timezone.now()
+    token = f"{worker_id}:{uuid.uuid4().hex[:8]}"
+    with transaction.atomic():
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(_claimable(now))
+            .order_by('run_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        Job.objects.filter(_claimable(now), id__in=ids).update(
+            status='running', locked_by=token, locked_at=now, attempts=F('attempts') + 1
+        )
+    return list(Job.objects.filter(id__in=ids, locked_by=token).order_by('run_at'))
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before attempt ``attempts + 1``: exponential, capped, with jitter."""
+    delay = min(settings.JOB_RETRY_MAX_SECONDS, settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1)
+
+
+def _finish(job: Job, **fields) -> bool:
+    # Only the worker still holding the lock may record the outcome
+    return bool(Job.objects.filter(id=job.id, locked_by=job.locked_by).update(
+        locked_by=None, locked_at=None, **fields
+    ))
+
+
+def run_job(job: Job) -> str:
+    """Run a claimed job and record its outcome: ``done``, ``retried`` or ``failed``."""
+    func = HANDLERS.get(job.name)
+    if func is None:
+        error = f"No job handler registered for {job.name!r}"
+    elif job.attempts > job.max_attempts:
+        error = "Lock expired on the last attempt"
+    else:
+        started = time.perf_counter()
+        try:
+            func(**job.payload)
+        except Exception as exc:
+            logger.exception("Job %s #%s failed (attempt %d/%d)", job.name, job.id, job.attempts, job.max_attempts)
+            error = f"{type(exc).__name__}: {exc}"
+        else:
+            _finish(job, status='done', last_error='', finished_at=timezone.now())
+            logger.debug("Job %s #%s done in %.1f ms", job.name, job.id, (time.perf_counter() - started) * 1000)
+            return 'done'
+
+    if func is not None and job.attempts < job.max_attempts:
+        run_at = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+        _finish(job, status='queued', last_error=error, run_at=run_at)
+        return 'retried'
+    _finish(job, status='failed', last_error=error, finished_at=timezone.now())
+    logger.error("Job %s #%s gave up after %d attempts: %s", job.name, job.id, job.attempts, error)
+    return 'failed'
+
+
+def requeue(job_id: int) -> bool:
+    """Give a failed job a fresh set of attempts."""
+    return bool(Job.objects.filter(id=job_id, status='failed').update(
+        status='queued', attempts=0, run_at=timezone.now(), finished_at=None
+    ))
+
+
+def purge_finished(retention_days: int = None, batch_size: int = 10_000) -> int:
+    """Delete done jobs finished more than ``retention_days`` ago, in batches."""
+    days = settings.JOB_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = timezone.now() - timedelta(days=days)
+    purged = 0
+    while True:
+        batch = list(
+            Job.objects.filter(status='done', finished_at__lt=cutoff).values_list('id', flat=True)[:batch_size]
+        )
+        if not batch:
+            return purged
+        deleted, _ = Job.objects.filter(id__in=batch).delete()
+        purged += deleted
+
+
+def queue_stats() -> dict:
+    """
+    Job counts and attempts by name and status, plus queue lag.
+
+    ``lag_seconds`` is how long the oldest ready job has been waiting;
+    a growing lag means the workers are not keeping up.
+    """
+    now = timezone.now()
+    rows = (
+        Job.objects.order_by().values_list('name', 'status')
+        .annotate(jobs=Count('pk'), attempts=Sum('attempts'))
+    )
+    oldest = Job.objects.filter(status='queued', run_at__lte=now).aggregate(oldest=Min('run_at'))['oldest']
+    return {
+        'jobs': [
+            {'name': name, 'status': status, 'jobs': jobs, 'attempts': attempts or 0}
+            for name, status, jobs, attempts in rows
+        ],
+        'lag_seconds': (now - oldest).total_seconds() if oldest else 0.0,
+    }
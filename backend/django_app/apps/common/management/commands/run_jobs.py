@@ -0,0 +1,43 @@
+"""
+Run the background job worker pool.
+
+Usage:
+    python manage.py run_jobs
+    python manage.py run_jobs --workers 8 --batch-size 20
+    python manage.py run_jobs --once    # run ready jobs and exit (cron, tests)
+"""
+import logging
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.common.worker import JobWorker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (notifications, audit logging) until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.JOB_WORKERS, help='worker threads')
+        parser.add_argument('--batch-size', type=int, default=settings.JOB_BATCH_SIZE, help='jobs claimed at a time')
+        parser.add_argument('--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL,
+                            help='seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='run the jobs that are ready now, then exit')
+
+    def handle(self, *args, **options):
+        if not logging.getLogger().handlers:
+            logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+        worker = JobWorker(options['workers'], options['batch_size'], options['poll_interval'])
+
+        if options['once']:
+            outcomes = worker.drain()
+            self.stdout.write(self.style.SUCCESS(
+                f"Ran {sum(outcomes.values())} jobs ({outcomes['done']} done, "
+                f"{outcomes['retried']} retried, {outcomes['failed']} failed)"
+            ))
+            return
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: worker.stop())
+        worker.run()
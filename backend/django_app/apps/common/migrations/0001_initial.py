@@ -0,0 +1,38 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='نوع کار')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='داده\u200cها')),
+                ('status', models.CharField(choices=[('queued', 'در صف'), ('running', 'در حال اجرا'), ('done', 'انجام شده'), ('failed', 'ناموفق')], default='queued', max_length=20, verbose_name='وضعیت')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='تعداد تلاش')),
+                ('max_attempts', models.PositiveIntegerField(default=5, verbose_name='حداکثر تلاش')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='زمان اجرا')),
+                ('locked_by', models.CharField(blank=True, max_length=100, null=True, verbose_name='پردازشگر')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='زمان شروع')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='آخرین خطا')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='تاریخ ایجاد')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='تاریخ پایان')),
+            ],
+            options={
+                'verbose_name': 'کار پس\u200cزمینه',
+                'verbose_name_plural': 'کارهای پس\u200cزمینه',
+                'db_table': 'background_jobs',
+                'indexes': [models.Index(fields=['status', 'run_at'], name='jobs_status_run_at_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,4 @@
+"""
+Shared models.
+"""
+from .jobs import Job  # noqa: F401
\ No newline at end of file
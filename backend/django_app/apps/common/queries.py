@@ -0,0 +1,19 @@
+"""
+Query helpers shared by the API routers.
+"""
+from django.db.models import Count
+
+
+def count_by(queryset, field, keys=()):
+    """
+    Count rows of ``queryset`` grouped by ``field`` in one GROUP BY query.
+
+    With ``keys`` the result holds exactly those values, 0 when no row has
+    them, so callers can replace a loop of ``filter(...).count()``.
+    """
+    counts = dict.fromkeys(keys, 0)
+    rows = queryset.order_by().values_list(field).annotate(n=Count('pk'))
+    for value, n in rows:
+        if not keys or value in counts:
+            counts[value] = n
+    return counts
@@ -0,0 +1,122 @@
+"""
+Worker pool for the background job queue (see ``apps.common.jobs``).
+
+Run as its own process with ``manage.py run_jobs``. Each worker thread
+claims a batch of ready jobs, runs them one by one and polls again after
+``poll_interval`` seconds when the queue is empty. Handlers mostly wait
+on I/O (mail, the database), so threads share one process. The main
+thread logs throughput every ``report_interval`` seconds and purges old
+finished jobs.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from collections import Counter
+
+from django.db import close_old_connections, connection
+
+from .jobs import claim, purge_finished, run_job
+
+logger = logging.getLogger('health_insurance.jobs')
+
+
+class JobWorker:
+    """A pool of threads running queued jobs until ``stop()``."""
+
+    def __init__(self, workers: int, batch_size: int, poll_interval: float, report_interval: float = 60):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.report_interval = report_interval
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._outcomes = Counter()
+        self._run_seconds = 0.0
+
+    def stop(self) -> None:
+        """Finish the jobs in hand, then exit."""
+        self._stopping.set()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {'outcomes': dict(self._outcomes), 'run_seconds': self._run_seconds}
+
+    def drain(self) -> Counter:
+        """Run ready jobs in the calling thread until none are left; return outcome counts."""
+        outcomes = Counter()
+        while not self._stopping.is_set():
+            jobs = claim(f"{self.name}:drain", self.batch_size)
+            if not jobs:
+                break
+            for job in jobs:
+                outcomes[run_job(job)] += 1
+        return outcomes
+
+    def run(self) -> None:
+        """Start the worker threads and block until ``stop()``."""
+        threads = [
+            threading.Thread(target=self._work, args=(index,), name=f"job-worker-{index}", daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        logger.info("Job worker %s started with %d threads", self.name, self.workers)
+
+        reported = self.snapshot()
+        while not self._stopping.wait(self.report_interval):
+            reported = self._report(reported)
+            try:
+                purged = purge_finished()
+                if purged:
+                    logger.info("Purged %d finished jobs", purged)
+            except Exception:
+                logger.exception("Job purge failed")
+            finally:
+                close_old_connections()
+
+        for thread in threads:
+            thread.join()
+        self._report(reported)
+        connection.close()
+        logger.info("Job worker %s stopped", self.name)
+
+    def _work(self, index: int) -> None:
+        worker_id = f"{self.name}:{index}"
+        while not self._stopping.is_set():
+            try:
+                jobs = claim(worker_id, self.batch_size)
+            except Exception:
+                logger.exception("Claiming jobs failed")
+                jobs = []
+            for job in jobs:
+                started = time.perf_counter()
+                try:
+                    outcome = run_job(job)
+                except Exception:
+                    # Recording the outcome failed (usually the database); the lock
+                    # expires after JOB_LOCK_TIMEOUT and another worker reclaims the job
+                    logger.exception("Running job %s #%s failed", job.name, job.id)
+                    outcome = 'error'
+                with self._lock:
+                    self._outcomes[outcome] += 1
+                    self._run_seconds += time.perf_counter() - started
+            close_old_connections()
+            if not jobs:
+                self._stopping.wait(self.poll_interval)
+        connection.close()
+
+    def _report(self, previous: dict) -> dict:
+        current = self.snapshot()
+        outcomes = Counter(current['outcomes'])
+        outcomes.subtract(previous['outcomes'])
+        ran = sum(outcomes.values())
+        if ran:
+            logger.info(
+                "Ran %d jobs (%d done, %d retried, %d failed, %d errors), %.1f ms per job",
+                ran, outcomes['done'], outcomes['retried'], outcomes['failed'], outcomes['error'],
+                (current['run_seconds'] - previous['run_seconds']) / ran * 1000,
+            )
+        return current
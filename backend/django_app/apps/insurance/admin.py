@@ -2,7 +2,7 @@
 Admin configuration for Insurance models.
 """
 from django.contrib import admin
-from .models import InsurancePlan, PlanCoverage, InsuranceRegistration
+from .models import InsurancePlan, PlanCoverage, InsuranceRegistration, Claim, CoverageUsage
 
 
 class PlanCoverageInline(admin.TabularInline):
@@ -114,4 +114,41 @@ class InsuranceRegistrationAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         """Optimize queryset with select_related."""
         qs = super().get_queryset(request)
-        return qs.select_related('user', 'plan', 'school')
\ No newline at end of file
+        return qs.select_related('user', 'plan', 'school')
+
+
+@admin.register(Claim)
+class ClaimAdmin(admin.ModelAdmin):
+    """Read-only admin for the append-only claims ledger."""
+    
+    list_display = ['registration', 'coverage_type', 'service_date', 'claimed_amount', 'reimbursed_amount', 'status', 'rejection_reason']
+    list_filter = ['status', 'coverage_type', 'rejection_reason', 'service_date']
+    search_fields = ['external_ref', 'registration__user__national_id', 'person__national_code']
+    ordering = ['-service_date']
+    date_hierarchy = 'service_date'
+    list_select_related = ['registration__user', 'registration__plan']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CoverageUsage)
+class CoverageUsageAdmin(admin.ModelAdmin):
+    """Read-only admin for the usage counters (rebuild them with rebuild_claim_counters)."""
+    
+    list_display = ['registration', 'member_id', 'coverage_type', 'year', 'usage_count', 'reimbursed_amount', 'updated_at']
+    list_filter = ['coverage_type', 'year']
+    search_fields = ['registration__user__national_id']
+    list_select_related = ['registration__user', 'registration__plan']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,185 @@
+"""
+Registration time series in the Jalali calendar.
+
+``registration_timeseries`` counts registrations per day, week (Saturday
+to Friday), Jalali month or Jalali year over any date range. It can split
+the counts by plan, school or state. The database does one GROUP BY over
+the local registration day (and the group), limited to the range
+through the ``registration_date`` index. The per-day rows are then
+placed into calendar buckets in Python. Month and year boundaries come
+from ``apps.common.jalali``'s precomputed month-start table, so a bucket
+is exactly one Farvardin, one Esfand and so on, leap years included. The
+bucket boundaries of a range are a slice of that table, and the bucket
+labels are converted in one ``to_jalali_many`` pass.
+"""
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.common import jalali
+from .models import InsuranceRegistration
+
+GRANULARITIES = ('day', 'week', 'month', 'year')
+# group_by -> (id field, name field)
+GROUPS = {
+    'plan': ('plan_id', 'plan__name_fa'),
+    'school': ('school_id', 'school__name_fa'),
+    'state': ('school__district__region__county__city__state_id', 'school__district__region__county__city__state__name_fa'),
+}
+# Buckets covered when no start date is given
+DEFAULT_PERIODS = {'day': 30, 'week': 12, 'month': 12, 'year': 5}
+MAX_BUCKETS = 1000
+OTHER_LABEL = 'سایر'
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    """First day of the bucket containing ``day``; Jalali weeks start on Saturday."""
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=(day.weekday() + 2) % 7)
+    if granularity == 'month':
+        return jalali.month_start(day)
+    return jalali.year_start(day)
+
+
+def next_bucket(start: date, granularity: str) -> date:
+    """First day of the bucket after the one starting on ``start``."""
+    if granularity == 'day':
+        return start + timedelta(days=1)
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    jy, jm, _ = jalali.to_jalali(start)
+    if granularity == 'month':
+        return start + timedelta(days=jalali.month_length(jy, jm))
+    return jalali.nowruz(jy + 1)
+
+
+def bucket_label(jalali_date: tuple, granularity: str) -> tuple:
+    """``(key, label)`` of the bucket starting on ``jalali_date``, e.g. ``('1403-01', 'فروردین 1403')``."""
+    jy, jm, jd = jalali_date
+    if granularity == 'year':
+        return str(jy), str(jy)
+    if granularity == 'month':
+        return f'{jy:04d}-{jm:02d}', jalali.month_name(jy, jm)
+    return f'{jy:04d}-{jm:02d}-{jd:02d}', f'{jy:04d}/{jm:02d}/{jd:02d}'
+
+
+def default_range(granularity: str, end: date = None, periods: int = None) -> tuple:
+    """The last ``periods`` buckets (``DEFAULT_PERIODS``) up to ``end`` (default: today)."""
+    end = end or timezone.localdate()
+    start = bucket_start(end, granularity)
+    for _ in range((periods or DEFAULT_PERIODS[granularity]) - 1):
+        start = bucket_start(start - timedelta(days=1), granularity)
+    return start, end
+
+
+def bucket_starts(start: date, end: date, granularity: str) -> list:
+    """Starts of the buckets covering ``start``..``end``, plus the end of the last one."""
+    if granularity == 'month':
+        starts = jalali.month_starts(start, end)
+        if len(starts) > MAX_BUCKETS + 1:
+            raise ValueError(f"The range spans more than {MAX_BUCKETS} {granularity} buckets")
+        return starts
+    starts = [bucket_start(start, granularity)]
+    while starts[-1] <= end:
+        if len(starts) > MAX_BUCKETS:
+            raise ValueError(f"The range spans more than {MAX_BUCKETS} {granularity} buckets")
+        starts.append(next_bucket(starts[-1], granularity))
+    return starts
+
+
+def _local_midnight(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def registration_timeseries(start: date = None, end: date = None, granularity: str = 'month',
+                            group_by: str = None, status: str = None, limit: int = 20) -> dict:
+    """
+    Registration counts per calendar bucket from ``start`` to ``end`` (inclusive, local dates).
+
+    The range is widened to whole buckets. With ``group_by`` the result
+    also has one series per plan, school or state. The ``limit`` largest
+    series are kept, and the rest are summed into one series with a null
+    id. Raises ``ValueError`` for an unknown granularity or group, or a
+    range too large, reversed or outside the Jalali month table.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity {granularity!r}")
+    if group_by is not None and group_by not in GROUPS:
+        raise ValueError(f"Unknown group {group_by!r}")
+    end = end or timezone.localdate()
+    # Near date.min and date.max bucket bounds and their UTC times overflow
+    for day in (start, end):
+        if day is not None and not jalali.TABLE_FIRST_DAY <= day <= jalali.TABLE_LAST_DAY:
+            raise ValueError(f"Dates must lie between {jalali.TABLE_FIRST_DAY} and {jalali.TABLE_LAST_DAY}")
+    if start is None:
+        start, end = default_range(granularity, end)
+    if end < start:
+        raise ValueError("The range ends before it starts")
+
+    starts = bucket_starts(start, end, granularity)
+    fields = GROUPS[group_by] if group_by else ()
+    queryset = InsuranceRegistration.objects.filter(
+        registration_date__gte=_local_midnight(starts[0]),
+        registration_date__lt=_local_midnight(starts[-1]),
+    )
+    if status:
+        queryset = queryset.filter(status=status)
+    rows = (
+        queryset.annotate(day=TruncDate('registration_date'))
+        .values('day', *fields)
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+
+    counts = [0] * (len(starts) - 1)
+    series = {}
+    for row in rows:
+        index = bisect_right(starts, row['day']) - 1
+        counts[index] += row['count']
+        if group_by:
+            group_id, name = row[fields[0]], row[fields[1]]
+            entry = series.get(group_id)
+            if entry is None:
+                entry = series[group_id] = {
+                    'id': str(group_id) if group_id is not None else None,
+                    'name': name,
+                    'counts': [0] * len(counts),
+                    'total': 0,
+                }
+            entry['counts'][index] += row['count']
+            entry['total'] += row['count']
+
+    ranked = sorted(series.values(), key=lambda entry: (-entry['total'], entry['name'] or ''))
+    if len(ranked) > limit:
+        rest = ranked[limit:]
+        ranked = ranked[:limit] + [{
+            'id': None,
+            'name': OTHER_LABEL,
+            'counts': [sum(values) for values in zip(*(entry['counts'] for entry in rest))],
+            'total': sum(entry['total'] for entry in rest),
+        }]
+
+    buckets = []
+    for index, (count, jalali_date) in enumerate(zip(counts, jalali.to_jalali_many(starts[:-1]))):
+        key, label = bucket_label(jalali_date, granularity)
+        buckets.append({
+            'key': key,
+            'label': label,
+            'start': starts[index].isoformat(),
+            'end': (starts[index + 1] - timedelta(days=1)).isoformat(),
+            'count': count,
+        })
+    return {
+        'granularity': granularity,
+        'group_by': group_by,
+        'start': starts[0].isoformat(),
+        'end': (starts[-1] - timedelta(days=1)).isoformat(),
+        'total': sum(counts),
+        'buckets': buckets,
+        'series': ranked,
+    }
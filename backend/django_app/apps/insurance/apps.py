@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class InsuranceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.insurance'
-    verbose_name = 'بیمه'
\ No newline at end of file
+    verbose_name = 'بیمه'
+
+    def ready(self):
+        from . import signals, tasks  # noqa: F401
@@ -0,0 +1,155 @@
+"""
+Claims ledger and per-coverage usage counters.
+
+``Claim`` rows are append-only: every submitted claim is stored once with
+its outcome, accepted (with the reimbursed amount) or rejected (with the
+reason), and never updated. ``CoverageUsage`` holds one counter row per
+(registration, member, coverage type, year). It stores the accepted
+claims' count and amounts and is maintained in the same transaction that
+appends the claims. An eligibility check therefore reads one row instead
+of summing the history. The counters can always be rebuilt from the
+ledger (see ``apps.insurance.ledger``).
+
+The member is the covered person's id, or the policy holder's user id
+for the holder's own claims. Limits apply per member, as in the plan
+quotes. The year is the coverage year of the registration's term that
+the service date falls in: 1 for the twelve months from ``start_date``,
+2 for the next twelve, and so on.
+"""
+import uuid
+from django.db import models
+from django.utils import timezone
+
+from .models import InsuranceRegistration, PlanCoverage
+
+
+class Claim(models.Model):
+    """One claim in the append-only ledger."""
+
+    STATUS_CHOICES = [
+        ('accepted', 'پذیرفته شده'),
+        ('rejected', 'رد شده'),
+    ]
+
+    REJECTION_REASON_CHOICES = [
+        ('inactive', 'ثبت‌نام فعال نیست'),
+        ('out_of_term', 'تاریخ خدمت خارج از دوره پوشش است'),
+        ('not_covered', 'این نوع پوشش در طرح وجود ندارد'),
+        ('not_member', 'فرد تحت پوشش این ثبت‌نام نیست'),
+        ('usage_limit', 'سقف تعداد استفاده سالانه تکمیل شده است'),
+        ('amount_limit', 'سقف مبلغ سالانه تکمیل شده است'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    registration = models.ForeignKey(
+        InsuranceRegistration,
+        on_delete=models.PROTECT,
+        related_name='claims',
+        verbose_name='ثبت‌نام بیمه'
+    )
+    person = models.ForeignKey(
+        'users.Person',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='claims',
+        verbose_name='فرد تحت پوشش'
+    )
+    member_id = models.UUIDField(
+        verbose_name='شناسه بیمه‌شده',
+        help_text='شناسه فرد تحت پوشش یا کاربر بیمه‌گذار'
+    )
+    coverage_type = models.CharField(
+        max_length=20,
+        choices=PlanCoverage.COVERAGE_TYPE_CHOICES,
+        verbose_name='نوع پوشش'
+    )
+    service_date = models.DateField(verbose_name='تاریخ خدمت')
+    claimed_amount = models.DecimalField(
+        max_digits=12,
+        decimal_places=0,
+        verbose_name='مبلغ درخواستی (ریال)'
+    )
+    reimbursed_amount = models.DecimalField(
+        max_digits=12,
+        decimal_places=0,
+        default=0,
+        verbose_name='مبلغ پرداختی (ریال)'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        verbose_name='وضعیت'
+    )
+    rejection_reason = models.CharField(
+        max_length=20,
+        choices=REJECTION_REASON_CHOICES,
+        blank=True,
+        default='',
+        verbose_name='دلیل رد'
+    )
+    external_ref = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name='شناسه خارجی',
+        help_text='شناسه یکتای ادعا در سامانه مبدأ؛ از ثبت تکراری جلوگیری می‌کند'
+    )
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='تاریخ ثبت')
+
+    class Meta:
+        db_table = 'insurance_claims'
+        verbose_name = 'ادعای خسارت'
+        verbose_name_plural = 'ادعاهای خسارت'
+        ordering = ['-service_date']
+        indexes = [
+            models.Index(fields=['registration', 'service_date'], name='claims_registration_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.registration_id} - {self.get_coverage_type_display()} ({self.get_status_display()})"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Claims are append-only; record a new claim instead of editing one")
+        super().save(*args, **kwargs)
+
+
+class CoverageUsage(models.Model):
+    """Usage of one coverage type by one member in one coverage year (accepted claims only)."""
+
+    registration = models.ForeignKey(
+        InsuranceRegistration,
+        on_delete=models.CASCADE,
+        related_name='coverage_usage',
+        verbose_name='ثبت‌نام بیمه'
+    )
+    member_id = models.UUIDField(verbose_name='شناسه بیمه‌شده')
+    coverage_type = models.CharField(
+        max_length=20,
+        choices=PlanCoverage.COVERAGE_TYPE_CHOICES,
+        verbose_name='نوع پوشش'
+    )
+    year = models.PositiveSmallIntegerField(
+        verbose_name='سال پوشش',
+        help_text='سال دوره پوشش از تاریخ شروع ثبت‌نام؛ ۱ برای دوازده ماه اول'
+    )
+    usage_count = models.PositiveIntegerField(default=0, verbose_name='تعداد استفاده')
+    claimed_amount = models.DecimalField(max_digits=14, decimal_places=0, default=0, verbose_name='مجموع درخواستی')
+    reimbursed_amount = models.DecimalField(max_digits=14, decimal_places=0, default=0, verbose_name='مجموع پرداختی')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='تاریخ بروزرسانی')
+
+    class Meta:
+        db_table = 'insurance_coverage_usage'
+        verbose_name = 'مصرف پوشش'
+        verbose_name_plural = 'مصرف پوشش‌ها'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['registration', 'member_id', 'coverage_type', 'year'],
+                name='unique_coverage_usage'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.registration_id} - {self.coverage_type} {self.year}: {self.usage_count}"
@@ -0,0 +1,211 @@
+"""
+Batch claim import.
+
+Each CSV row is one claim:
+
+    registration_id,person_national_code,coverage_type,service_date,amount,external_ref
+
+``person_national_code`` is the covered person's national code, looked
+up among the policy holder's persons; leave it empty for the policy
+holder's own claims. ``amount`` is the claimed amount in Rial.
+``service_date`` is either Gregorian ``YYYY-MM-DD`` or Jalali
+``YYYY/MM/DD`` (as printed on Iranian invoices). ``external_ref`` is the claim's id in
+the sending system. It is optional, but with it a file can be re-sent
+safely, because claims already recorded are reported as ``duplicate``
+rather than stored twice.
+
+Rows are read as a stream and processed in batches. Each row is validated
+on its own, and national codes are resolved with one query per batch.
+The batch is then handed to ``ledger.record_claims``, which stores and
+evaluates it in one transaction. The report lists the outcome of every
+row: ``accepted``, ``rejected`` (stored, with the reason), ``duplicate``
+or ``failed`` (not stored).
+"""
+import csv
+import uuid
+from datetime import date
+
+from django.db import DatabaseError
+
+from apps.common import jalali
+from apps.common.seeding import batched
+from apps.users.models import Person
+from .claims import Claim
+from .ledger import REJECTION_REASONS, record_claims
+from .models import InsuranceRegistration, PlanCoverage
+
+BATCH_SIZE = 1000
+
+COLUMNS = ('registration_id', 'person_national_code', 'coverage_type', 'service_date', 'amount', 'external_ref')
+REQUIRED_COLUMNS = ('registration_id', 'coverage_type', 'service_date', 'amount')
+
+COVERAGE_TYPES = {value for value, _ in PlanCoverage.COVERAGE_TYPE_CHOICES}
+MAX_AMOUNT = 10 ** Claim._meta.get_field('claimed_amount').max_digits - 1
+REF_LENGTH = Claim._meta.get_field('external_ref').max_length
+
+
+class ClaimImportError(ValueError):
+    """The file as a whole cannot be imported (bad header or encoding)."""
+
+
+def parse_service_date(value: str) -> date:
+    """``YYYY-MM-DD`` (Gregorian) or ``YYYY/MM/DD`` (Jalali); raises ``ValueError``."""
+    if '/' in value:
+        parts = value.split('/')
+        if len(parts) != 3 or not all(part.isdigit() for part in parts):
+            raise ValueError(value)
+        return jalali.to_gregorian(*map(int, parts))
+    return date.fromisoformat(value)
+
+
+def clean_row(raw: dict) -> tuple:
+    """Normalise one CSV row; return ``(row, errors)``."""
+    row = {column: (raw.get(column) or '').strip() for column in COLUMNS}
+    errors = []
+    try:
+        row['registration_id'] = str(uuid.UUID(row['registration_id']))
+    except ValueError:
+        errors.append("شناسه ثبت‌نام نامعتبر است")
+    code = row['person_national_code']
+    if code and (len(code) != 10 or not code.isdigit()):
+        errors.append("کد ملی فرد باید 10 رقم باشد")
+    if row['coverage_type'] not in COVERAGE_TYPES:
+        errors.append(f"نوع پوشش نامعتبر است: {row['coverage_type']}")
+    try:
+        row['service_date'] = parse_service_date(row['service_date'])
+        if row['service_date'] > date.today():
+            errors.append("تاریخ خدمت نمی‌تواند در آینده باشد")
+    except ValueError:
+        errors.append("تاریخ خدمت نامعتبر است (YYYY-MM-DD یا شمسی YYYY/MM/DD)")
+    amount = row['amount'].replace(',', '')
+    if not amount.isdigit() or not 0 < int(amount) <= MAX_AMOUNT:
+        errors.append("مبلغ باید عدد صحیح مثبت (ریال) باشد")
+    else:
+        row['amount'] = int(amount)
+    if len(row['external_ref']) > REF_LENGTH:
+        errors.append(f"شناسه خارجی حداکثر {REF_LENGTH} کاراکتر است")
+    return row, errors
+
+
+class ClaimImporter:
+    """Validates rows, resolves covered persons and records claims batch by batch."""
+
+    def __init__(self, batch_size: int = BATCH_SIZE):
+        self.batch_size = batch_size
+        self.report = {
+            'rows': 0,
+            'accepted': 0,
+            'rejected': 0,
+            'duplicate': 0,
+            'failed': 0,
+            'reimbursed_amount': 0,
+            'results': [],
+        }
+
+    def run(self, stream) -> dict:
+        reader = csv.DictReader(stream)
+        try:
+            missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+            if missing:
+                raise ClaimImportError(f"ستون‌های الزامی در فایل نیست: {', '.join(missing)}")
+
+            rows = ((reader.line_num, raw) for raw in reader)
+            for batch in batched(rows, self.batch_size):
+                self._import_batch(batch)
+        except UnicodeDecodeError:
+            raise ClaimImportError("فایل باید با کدگذاری UTF-8 ذخیره شده باشد")
+        except csv.Error as exc:
+            raise ClaimImportError(f"فایل CSV نامعتبر است (سطر {reader.line_num}): {exc}")
+        self.report['results'].sort(key=lambda result: result['row'])
+        return self.report
+
+    def _result(self, line: int, row: dict, status: str, reason: str = None,
+                reimbursed: int = 0, errors: list = None) -> None:
+        self.report['rows'] += 1
+        self.report[status] += 1
+        self.report['reimbursed_amount'] += reimbursed
+        self.report['results'].append({
+            'row': line,
+            'external_ref': row['external_ref'],
+            'status': status,
+            'reimbursed_amount': reimbursed,
+            'reason': reason,
+            'reason_display': REJECTION_REASONS.get(reason),
+            'errors': errors or [],
+        })
+
+    def _resolve_persons(self, valid: list) -> dict:
+        """``{(registration_id, national_code): person_id}`` for the batch's rows, in two queries."""
+        wanted = {
+            (row['registration_id'], row['person_national_code'])
+            for _, row in valid if row['person_national_code']
+        }
+        if not wanted:
+            return {}
+        holders = {
+            str(registration_id): user_id
+            for registration_id, user_id in InsuranceRegistration.objects.filter(
+                id__in={registration_id for registration_id, _ in wanted}
+            ).values_list('id', 'user_id')
+        }
+        persons = {
+            (user_id, national_code): person_id
+            for person_id, user_id, national_code in Person.objects.filter(
+                user_id__in=set(holders.values()), national_code__in={code for _, code in wanted}
+            ).values_list('id', 'user_id', 'national_code')
+        }
+        return {
+            (registration_id, code): persons.get((holders.get(registration_id), code))
+            for registration_id, code in wanted
+        }
+
+    def _import_batch(self, batch: list) -> None:
+        valid = []
+        for line, raw in batch:
+            row, errors = clean_row(raw)
+            if errors:
+                self._result(line, row, 'failed', errors=errors)
+            else:
+                valid.append((line, row))
+        if not valid:
+            return
+
+        persons = self._resolve_persons(valid)
+        claims = []
+        for line, row in valid:
+            person_id = None
+            if row['person_national_code']:
+                person_id = persons.get((row['registration_id'], row['person_national_code']))
+                if person_id is None:
+                    self._result(line, row, 'failed', errors=["فرد با این کد ملی برای بیمه‌گذار یافت نشد"])
+                    continue
+            claims.append((line, row, {
+                'registration_id': row['registration_id'],
+                'person_id': person_id,
+                'coverage_type': row['coverage_type'],
+                'service_date': row['service_date'],
+                'amount': row['amount'],
+                'external_ref': row['external_ref'] or None,
+            }))
+        if not claims:
+            return
+
+        try:
+            outcomes = record_claims(item for _, _, item in claims)
+        except DatabaseError as exc:
+            for line, row, _ in claims:
+                self._result(line, row, 'failed', errors=[f"خطای پایگاه داده: {exc}"])
+            return
+
+        for (line, row, _), outcome in zip(claims, outcomes):
+            self._result(
+                line, row, outcome['status'],
+                reason=outcome.get('reason'),
+                reimbursed=outcome.get('reimbursed_amount', 0),
+                errors=outcome.get('errors'),
+            )
+
+
+def import_claims(stream, batch_size: int = BATCH_SIZE) -> dict:
+    """Import a CSV text stream of claims; see the module docstring for the format."""
+    return ClaimImporter(batch_size).run(stream)
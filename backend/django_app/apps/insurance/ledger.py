@@ -0,0 +1,399 @@
+"""
+Claim processing against the plan's coverage rules.
+
+A claim is checked against the registration (status and term), the
+plan's coverage for its type (``coverage_percentage``,
+``coverage_amount`` as the yearly cap and ``max_usage_count`` as the
+yearly number of uses, both per member), and the member's
+``CoverageUsage`` counter for the coverage year. Coverage years are
+counted from the registration's ``start_date`` (see ``coverage_year``),
+so the caps renew on the term's anniversary, whatever month it starts
+in. It is accepted with
+``min(amount x percentage, cap - reimbursed so far)``, or rejected with
+a reason from ``Claim.REJECTION_REASON_CHOICES``.
+
+- ``check_eligibility`` answers "can this member still use this
+  coverage?" from one counter row plus the cached coverage rules, no
+  matter how many claims the member has.
+- ``record_claims`` appends a batch of claims. It uses a fixed number of
+  queries per batch: registrations (row-locked, which serialises
+  writers per registration), persons, listed members, known external
+  references and counters. Then come one INSERT for the claims and one
+  INSERT/UPDATE each for new and changed counters, all in one
+  transaction. Within a batch, claims are applied in service date order.
+- ``rebuild_usage_counters`` recomputes the counters from the accepted
+  claims with one GROUP BY per chunk of registrations, and writes only
+  the rows that differ.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from apps.common import cache
+from apps.common.seeding import batched
+from apps.users.models import Person
+from .claims import Claim, CoverageUsage
+from .models import InsuranceRegistration, PlanCoverage
+
+# Claims can arrive after a registration has expired, for services within its term
+CLAIMABLE_STATUSES = ('active', 'expired')
+REJECTION_REASONS = dict(Claim.REJECTION_REASON_CHOICES)
+# Registrations per transaction when rebuilding counters
+REBUILD_BATCH_SIZE = 500
+
+COUNTER_FIELDS = ('usage_count', 'claimed_amount', 'reimbursed_amount', 'updated_at')
+
+
+def coverage_year(start_date: Optional[date], day: date) -> int:
+    """
+    The coverage year of the term starting ``start_date`` that ``day`` falls in; 1 is the first.
+
+    Each year runs to the day before the anniversary of ``start_date``
+    (a term starting on 29 February renews on 1 March). Days before the
+    start, or a registration without one, count as the first year.
+    """
+    if start_date is None or day < start_date:
+        return 1
+    years = day.year - start_date.year
+    if (day.month, day.day) < (start_date.month, start_date.day):
+        years -= 1
+    return years + 1
+
+
+def _anniversary(start_date: date, years: int) -> date:
+    try:
+        return start_date.replace(year=start_date.year + years)
+    except ValueError:
+        return date(start_date.year + years, 3, 1)
+
+
+def coverage_year_bounds(start_date: Optional[date], year: int) -> tuple:
+    """First and last day of coverage year ``year``; ``(None, None)`` without a start date."""
+    if start_date is None:
+        return None, None
+    return _anniversary(start_date, year - 1), _anniversary(start_date, year) - timedelta(days=1)
+
+
+def _load_coverage_rules(plan_id: str) -> dict:
+    rows = PlanCoverage.objects.filter(plan_id=plan_id, is_active=True).values_list(
+        'coverage_type', 'coverage_percentage', 'coverage_amount', 'max_usage_count'
+    )
+    return {
+        coverage_type: (percentage, int(amount), max_uses)
+        for coverage_type, percentage, amount, max_uses in rows
+    }
+
+
+def coverage_rules(plan_id) -> dict:
+    """
+    ``{coverage_type: (percentage, yearly cap, yearly uses or None)}`` for a plan.
+
+    Deactivated plans keep their rules, since their registrations can
+    still claim. The rules are cached in the ``plans`` namespace until a
+    plan or coverage changes.
+    """
+    return cache.get_or_set('plans', f'coverage-rules:{plan_id}', lambda: _load_coverage_rules(str(plan_id)))
+
+
+def evaluate(registration: dict, rule: Optional[tuple], usage: tuple, service_date: date,
+             amount: int = 0, is_member: bool = True):
+    """
+    Check one claim; returns ``(rejection reason or None, reimbursement)``.
+
+    ``registration`` needs ``status``, ``start_date`` and ``end_date``;
+    ``usage`` is the member's ``(uses, reimbursed)`` so far in the
+    coverage year of ``service_date``.
+    """
+    if registration['status'] not in CLAIMABLE_STATUSES:
+        return 'inactive', 0
+    start, end = registration['start_date'], registration['end_date']
+    if start is None or service_date < start or (end is not None and service_date > end):
+        return 'out_of_term', 0
+    if not is_member:
+        return 'not_member', 0
+    if rule is None:
+        return 'not_covered', 0
+    percentage, cap, max_uses = rule
+    uses, reimbursed = usage
+    if max_uses is not None and uses >= max_uses:
+        return 'usage_limit', 0
+    remaining = cap - reimbursed
+    if remaining <= 0:
+        return 'amount_limit', 0
+    return None, min(amount * percentage // 100, remaining)
+
+
+def check_eligibility(registration: InsuranceRegistration, coverage_type: str, person_id=None,
+                      service_date: date = None, amount: int = None) -> dict:
+    """
+    Whether the registration's member can use ``coverage_type`` on ``service_date``.
+
+    ``person_id`` is the covered person (None for the policy holder); the
+    caller has already checked that the person belongs to the holder.
+    The counter is read by its unique key, so the cost does not depend on
+    the member's claim history.
+    """
+    service_date = service_date or timezone.localdate()
+    member_id = str(person_id or registration.user_id)
+    is_member = True
+    if person_id is not None:
+        listed = {str(pk) for pk in registration.persons.values_list('id', flat=True)}
+        is_member = not listed or member_id in listed
+
+    rule = coverage_rules(registration.plan_id).get(coverage_type)
+    year = coverage_year(registration.start_date, service_date)
+    counter = CoverageUsage.objects.filter(
+        registration_id=registration.id, member_id=member_id,
+        coverage_type=coverage_type, year=year,
+    ).values_list('usage_count', 'reimbursed_amount').first()
+    uses, reimbursed = (counter[0], int(counter[1])) if counter else (0, 0)
+
+    state = {
+        'status': registration.status,
+        'start_date': registration.start_date,
+        'end_date': registration.end_date,
+    }
+    reason, reimbursement = evaluate(state, rule, (uses, reimbursed), service_date, amount or 0, is_member)
+    percentage, cap, max_uses = rule or (0, 0, None)
+    year_start, year_end = coverage_year_bounds(registration.start_date, year)
+    return {
+        'eligible': reason is None,
+        'reason': reason,
+        'reason_display': REJECTION_REASONS.get(reason),
+        'member_id': member_id,
+        'coverage_type': coverage_type,
+        'year': year,
+        'year_start': year_start,
+        'year_end': year_end,
+        'coverage_percentage': percentage,
+        'annual_cap': cap,
+        'max_usage_count': max_uses,
+        'usage_count': uses,
+        'remaining_uses': None if max_uses is None else max(max_uses - uses, 0),
+        'reimbursed_amount': reimbursed,
+        'remaining_amount': max(cap - reimbursed, 0),
+        'estimated_reimbursement': reimbursement if amount is not None else None,
+    }
+
+
+def usage_summary(registration: InsuranceRegistration, year: int) -> List[dict]:
+    """The registration's counters for coverage year ``year`` with the plan's limits and what remains of them."""
+    rules = coverage_rules(registration.plan_id)
+    holder = str(registration.user_id)
+    counters = CoverageUsage.objects.filter(registration_id=registration.id, year=year).order_by(
+        'member_id', 'coverage_type'
+    )
+    summary = []
+    for counter in counters:
+        percentage, cap, max_uses = rules.get(counter.coverage_type) or (0, 0, None)
+        member_id = str(counter.member_id)
+        reimbursed = int(counter.reimbursed_amount)
+        summary.append({
+            'member_id': member_id,
+            'person_id': None if member_id == holder else member_id,
+            'coverage_type': counter.coverage_type,
+            'title_fa': counter.get_coverage_type_display(),
+            'usage_count': counter.usage_count,
+            'max_usage_count': max_uses,
+            'remaining_uses': None if max_uses is None else max(max_uses - counter.usage_count, 0),
+            'claimed_amount': int(counter.claimed_amount),
+            'reimbursed_amount': reimbursed,
+            'annual_cap': cap,
+            'remaining_amount': max(cap - reimbursed, 0),
+        })
+    return summary
+
+
+def record_claims(items: Iterable[dict]) -> List[dict]:
+    """
+    Append claims to the ledger and update the usage counters, in one transaction.
+
+    Each item has ``registration_id``, ``person_id`` (None for the policy
+    holder), ``coverage_type``, ``service_date``, ``amount`` and an
+    optional ``external_ref``. Returns one result per item, in order:
+    ``status`` is ``accepted``, ``rejected`` (stored with its
+    ``reason``), ``duplicate`` (the external reference is already
+    recorded, nothing stored) or ``failed`` (unknown registration or
+    person, nothing stored; see ``errors``).
+    """
+    items = list(items)
+    results = [None] * len(items)
+    registration_ids = {str(item['registration_id']) for item in items}
+    person_ids = {str(item['person_id']) for item in items if item.get('person_id')}
+    refs = {item['external_ref'] for item in items if item.get('external_ref')}
+    now = timezone.now()
+
+    with transaction.atomic():
+        registrations = {
+            str(row['id']): row
+            for row in InsuranceRegistration.objects.select_for_update().filter(id__in=registration_ids)
+            .values('id', 'user_id', 'plan_id', 'status', 'start_date', 'end_date')
+        }
+        owners = {
+            str(person_id): str(user_id)
+            for person_id, user_id in Person.objects.filter(id__in=person_ids).values_list('id', 'user_id')
+        }
+        listed = defaultdict(set)
+        for registration_id, person_id in InsuranceRegistration.persons.through.objects.filter(
+            insuranceregistration_id__in=list(registrations)
+        ).values_list('insuranceregistration_id', 'person_id'):
+            listed[str(registration_id)].add(str(person_id))
+        seen_refs = set(Claim.objects.filter(external_ref__in=refs).values_list('external_ref', flat=True))
+        years = {
+            coverage_year(registrations[str(item['registration_id'])]['start_date'], item['service_date'])
+            for item in items if str(item['registration_id']) in registrations
+        }
+        counters = {
+            (str(counter.registration_id), str(counter.member_id), counter.coverage_type, counter.year): counter
+            for counter in CoverageUsage.objects.filter(registration_id__in=list(registrations), year__in=years)
+        }
+
+        claims, created, changed, rules = [], [], {}, {}
+        for index in sorted(range(len(items)), key=lambda n: items[n]['service_date']):
+            item = items[index]
+            registration_id = str(item['registration_id'])
+            person_id = str(item['person_id']) if item.get('person_id') else None
+            ref = item.get('external_ref') or None
+
+            registration = registrations.get(registration_id)
+            if registration is None:
+                results[index] = {'status': 'failed', 'errors': ["ثبت‌نام یافت نشد"]}
+                continue
+            if person_id is not None and owners.get(person_id) != str(registration['user_id']):
+                results[index] = {'status': 'failed', 'errors': ["فرد متعلق به بیمه‌گذار این ثبت‌نام نیست"]}
+                continue
+            if ref is not None and ref in seen_refs:
+                results[index] = {'status': 'duplicate'}
+                continue
+
+            member_id = person_id or str(registration['user_id'])
+            members = listed.get(registration_id)
+            is_member = person_id is None or not members or person_id in members
+            service_date, amount = item['service_date'], int(item['amount'])
+            year = coverage_year(registration['start_date'], service_date)
+            key = (registration_id, member_id, item['coverage_type'], year)
+            counter = counters.get(key)
+            usage = (counter.usage_count, int(counter.reimbursed_amount)) if counter else (0, 0)
+            plan_id = registration['plan_id']
+            if plan_id not in rules:
+                rules[plan_id] = coverage_rules(plan_id)
+            rule = rules[plan_id].get(item['coverage_type'])
+            reason, reimbursement = evaluate(registration, rule, usage, service_date, amount, is_member)
+
+            claim = Claim(
+                registration_id=registration_id,
+                person_id=person_id,
+                member_id=member_id,
+                coverage_type=item['coverage_type'],
+                service_date=service_date,
+                claimed_amount=amount,
+                reimbursed_amount=reimbursement,
+                status='rejected' if reason else 'accepted',
+                rejection_reason=reason or '',
+                external_ref=ref,
+                created_at=now,
+            )
+            claims.append(claim)
+            if ref is not None:
+                seen_refs.add(ref)
+            results[index] = {
+                'status': claim.status,
+                'claim_id': str(claim.id),
+                'reason': reason,
+                'reimbursed_amount': reimbursement,
+            }
+            if reason:
+                continue
+
+            if counter is None:
+                counter = CoverageUsage(
+                    registration_id=registration_id, member_id=member_id,
+                    coverage_type=item['coverage_type'], year=year,
+                )
+                counters[key] = counter
+                created.append(counter)
+            elif counter.pk is not None:
+                changed[counter.pk] = counter
+            counter.usage_count += 1
+            counter.claimed_amount += amount
+            counter.reimbursed_amount += reimbursement
+            counter.updated_at = now
+
+        Claim.objects.bulk_create(claims)
+        CoverageUsage.objects.bulk_create(created)
+        CoverageUsage.objects.bulk_update(list(changed.values()), COUNTER_FIELDS)
+    return results
+
+
+def _expected_counters(registration_ids: list) -> dict:
+    """Counter values implied by the accepted claims of ``registration_ids``."""
+    # Totals per service date; the coverage year depends on the registration's start date
+    rows = (
+        Claim.objects.filter(status='accepted', registration_id__in=registration_ids)
+        .values('registration_id', 'registration__start_date', 'member_id', 'coverage_type', 'service_date')
+        .annotate(uses=Count('id'), claimed=Sum('claimed_amount'), reimbursed=Sum('reimbursed_amount'))
+        .order_by()
+    )
+    expected = defaultdict(lambda: (0, 0, 0))
+    for row in rows:
+        year = coverage_year(row['registration__start_date'], row['service_date'])
+        key = (str(row['registration_id']), str(row['member_id']), row['coverage_type'], year)
+        uses, claimed, reimbursed = expected[key]
+        expected[key] = (uses + row['uses'], claimed + int(row['claimed']), reimbursed + int(row['reimbursed']))
+    return dict(expected)
+
+
+def rebuild_usage_counters(registration_ids: Iterable = None, batch_size: int = REBUILD_BATCH_SIZE) -> dict:
+    """
+    Recompute ``CoverageUsage`` from the ledger for ``registration_ids`` (default: all).
+
+    Each chunk of registrations is locked and reconciled in its own
+    transaction. Returns how many registrations were checked, how many
+    counters they have, and how many were created, updated or deleted.
+    """
+    if registration_ids is None:
+        ids = set(Claim.objects.values_list('registration_id', flat=True).distinct())
+        ids |= set(CoverageUsage.objects.values_list('registration_id', flat=True).distinct())
+    else:
+        ids = set(registration_ids)
+    ids = sorted(str(registration_id) for registration_id in ids)
+
+    report = {'registrations': len(ids), 'counters': 0, 'created': 0, 'updated': 0, 'deleted': 0}
+    for chunk in batched(ids, batch_size):
+        with transaction.atomic():
+            # Same lock as record_claims, so no claim lands between the two reads
+            list(InsuranceRegistration.objects.select_for_update().filter(id__in=chunk).values_list('id', flat=True))
+            expected = _expected_counters(chunk)
+            now = timezone.now()
+            stale, changed, kept = [], [], 0
+            for counter in CoverageUsage.objects.filter(registration_id__in=chunk):
+                key = (str(counter.registration_id), str(counter.member_id), counter.coverage_type, counter.year)
+                values = expected.pop(key, None)
+                if values is None:
+                    stale.append(counter.pk)
+                elif values != (counter.usage_count, int(counter.claimed_amount), int(counter.reimbursed_amount)):
+                    counter.usage_count, counter.claimed_amount, counter.reimbursed_amount = values
+                    counter.updated_at = now
+                    changed.append(counter)
+                if values is not None:
+                    kept += 1
+            missing = [
+                CoverageUsage(
+                    registration_id=registration_id, member_id=member_id, coverage_type=coverage_type, year=year,
+                    usage_count=uses, claimed_amount=claimed, reimbursed_amount=reimbursed,
+                )
+                for (registration_id, member_id, coverage_type, year), (uses, claimed, reimbursed) in expected.items()
+            ]
+            if stale:
+                CoverageUsage.objects.filter(pk__in=stale).delete()
+            CoverageUsage.objects.bulk_update(changed, COUNTER_FIELDS)
+            CoverageUsage.objects.bulk_create(missing)
+        report['counters'] += kept + len(missing)
+        report['created'] += len(missing)
+        report['updated'] += len(changed)
+        report['deleted'] += len(stale)
+    return report
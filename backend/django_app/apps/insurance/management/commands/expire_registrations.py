@@ -0,0 +1,46 @@
+"""
+Expire active registrations whose end date has passed.
+
+Usage:
+    python manage.py expire_registrations
+    python manage.py expire_registrations --batch-size 200 --date 2025-03-21
+    python manage.py expire_registrations --dry-run
+
+Schedule it daily (cron, systemd timer), or let the API run the same sweep
+every REGISTRATION_EXPIRY_SWEEP_SECONDS.
+"""
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.insurance.models import InsuranceRegistration
+from apps.insurance.transitions import EXPIRY_BATCH_SIZE, expire_registrations
+
+
+class Command(BaseCommand):
+    help = 'Move active registrations past their end date to expired, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=EXPIRY_BATCH_SIZE, help='registrations per transaction')
+        parser.add_argument('--date', help='expire registrations ending before this ISO date (default: today)')
+        parser.add_argument('--limit', type=int, help='stop after this many registrations')
+        parser.add_argument('--dry-run', action='store_true', help='only count what would be expired')
+
+    def handle(self, *args, **options):
+        try:
+            today = date.fromisoformat(options['date']) if options['date'] else timezone.localdate()
+        except ValueError:
+            raise CommandError(f"Invalid date {options['date']!r}; expected YYYY-MM-DD")
+
+        if options['dry_run']:
+            due = InsuranceRegistration.objects.filter(status='active', end_date__lt=today).count()
+            self.stdout.write(f"{due:,} active registrations ended before {today}")
+            return
+
+        started = time.perf_counter()
+        expired = expire_registrations(today, batch_size=options['batch_size'], limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Expired {expired:,} registrations ended before {today} in {time.perf_counter() - started:.1f}s"
+        ))
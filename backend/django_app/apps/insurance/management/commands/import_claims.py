@@ -0,0 +1,49 @@
+"""
+Record claims from a CSV file and update the usage counters.
+
+Usage:
+    python manage.py import_claims claims.csv
+    python manage.py import_claims claims.csv --batch-size 5000 --report results.json
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.insurance.importer import BATCH_SIZE, ClaimImportError, import_claims
+
+
+class Command(BaseCommand):
+    help = 'Append claims from a CSV file to the claims ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='UTF-8 CSV file')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='claims per transaction')
+        parser.add_argument('--report', help='write the full JSON report (every row) to this file')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as fh:
+                report = import_claims(fh, batch_size=options['batch_size'])
+        except OSError as exc:
+            raise CommandError(f"Cannot read {options['path']}: {exc}")
+        except ClaimImportError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+
+        if options['report']:
+            with open(options['report'], 'w') as fh:
+                json.dump(report, fh, indent=2, ensure_ascii=False)
+
+        failed = [result for result in report['results'] if result['status'] == 'failed']
+        for result in failed[:20]:
+            self.stderr.write(f"row {result['row']}: {'; '.join(result['errors'])}")
+        if len(failed) > 20:
+            self.stderr.write(f"... {len(failed) - 20} more row errors")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {report['rows']:,} rows in {elapsed:.1f}s: {report['accepted']:,} accepted, "
+            f"{report['rejected']:,} rejected, {report['duplicate']:,} duplicate, {report['failed']:,} failed "
+            f"({report['reimbursed_amount']:,} Rial reimbursed)"
+        ))
@@ -0,0 +1,42 @@
+"""
+Recompute the claim usage counters from the claims ledger.
+
+Usage:
+    python manage.py rebuild_claim_counters
+    python manage.py rebuild_claim_counters --registration <id> --registration <id>
+    python manage.py rebuild_claim_counters --queue
+
+Counters are maintained as claims are recorded; a rebuild is only needed
+after claims were changed outside the ledger or to verify the counters.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.insurance.ledger import REBUILD_BATCH_SIZE, rebuild_usage_counters
+from apps.insurance.tasks import rebuild_counters_later
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-member coverage usage counters from the accepted claims'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--registration', action='append', dest='registrations',
+                            help='only this registration (repeatable; default: all)')
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE,
+                            help='registrations per transaction')
+        parser.add_argument('--queue', action='store_true', help='queue the rebuild for the job worker instead')
+
+    def handle(self, *args, **options):
+        if options['queue']:
+            job = rebuild_counters_later(options['registrations'])
+            self.stdout.write(self.style.SUCCESS(f"Queued job {job.id}"))
+            return
+
+        started = time.perf_counter()
+        report = rebuild_usage_counters(options['registrations'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {report['registrations']:,} registrations ({report['counters']:,} counters) "
+            f"in {time.perf_counter() - started:.1f}s: {report['created']:,} created, "
+            f"{report['updated']:,} updated, {report['deleted']:,} deleted"
+        ))
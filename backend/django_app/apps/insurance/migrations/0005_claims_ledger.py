@@ -0,0 +1,64 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:50
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance', '0004_registration_status_end_date_index'),
+        ('users', '0007_refreshtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoverageUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('member_id', models.UUIDField(verbose_name='شناسه بیمه\u200cشده')),
+                ('coverage_type', models.CharField(choices=[('outpatient', 'درمان سرپایی'), ('hospitalization', 'بستری'), ('medication', 'دارو'), ('laboratory', 'آزمایش'), ('imaging', 'تصویربرداری'), ('dental', 'دندانپزشکی'), ('ophthalmology', 'چشم\u200cپزشکی'), ('physiotherapy', 'فیزیوتراپی')], max_length=20, verbose_name='نوع پوشش')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='سال')),
+                ('usage_count', models.PositiveIntegerField(default=0, verbose_name='تعداد استفاده')),
+                ('claimed_amount', models.DecimalField(decimal_places=0, default=0, max_digits=14, verbose_name='مجموع درخواستی')),
+                ('reimbursed_amount', models.DecimalField(decimal_places=0, default=0, max_digits=14, verbose_name='مجموع پرداختی')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاریخ بروزرسانی')),
+                ('registration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coverage_usage', to='insurance.insuranceregistration', verbose_name='ثبت\u200cنام بیمه')),
+            ],
+            options={
+                'verbose_name': 'مصرف پوشش',
+                'verbose_name_plural': 'مصرف پوشش\u200cها',
+                'db_table': 'insurance_coverage_usage',
+            },
+        ),
+        migrations.CreateModel(
+            name='Claim',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('member_id', models.UUIDField(help_text='شناسه فرد تحت پوشش یا کاربر بیمه\u200cگذار', verbose_name='شناسه بیمه\u200cشده')),
+                ('coverage_type', models.CharField(choices=[('outpatient', 'درمان سرپایی'), ('hospitalization', 'بستری'), ('medication', 'دارو'), ('laboratory', 'آزمایش'), ('imaging', 'تصویربرداری'), ('dental', 'دندانپزشکی'), ('ophthalmology', 'چشم\u200cپزشکی'), ('physiotherapy', 'فیزیوتراپی')], max_length=20, verbose_name='نوع پوشش')),
+                ('service_date', models.DateField(verbose_name='تاریخ خدمت')),
+                ('claimed_amount', models.DecimalField(decimal_places=0, max_digits=12, verbose_name='مبلغ درخواستی (ریال)')),
+                ('reimbursed_amount', models.DecimalField(decimal_places=0, default=0, max_digits=12, verbose_name='مبلغ پرداختی (ریال)')),
+                ('status', models.CharField(choices=[('accepted', 'پذیرفته شده'), ('rejected', 'رد شده')], max_length=20, verbose_name='وضعیت')),
+                ('rejection_reason', models.CharField(blank=True, choices=[('inactive', 'ثبت\u200cنام فعال نیست'), ('out_of_term', 'تاریخ خدمت خارج از دوره پوشش است'), ('not_covered', 'این نوع پوشش در طرح وجود ندارد'), ('not_member', 'فرد تحت پوشش این ثبت\u200cنام نیست'), ('usage_limit', 'سقف تعداد استفاده سالانه تکمیل شده است'), ('amount_limit', 'سقف مبلغ سالانه تکمیل شده است')], default='', max_length=20, verbose_name='دلیل رد')),
+                ('external_ref', models.CharField(blank=True, help_text='شناسه یکتای ادعا در سامانه مبدأ؛ از ثبت تکراری جلوگیری می\u200cکند', max_length=64, null=True, unique=True, verbose_name='شناسه خارجی')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='تاریخ ثبت')),
+                ('person', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claims', to='users.person', verbose_name='فرد تحت پوشش')),
+                ('registration', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='claims', to='insurance.insuranceregistration', verbose_name='ثبت\u200cنام بیمه')),
+            ],
+            options={
+                'verbose_name': 'ادعای خسارت',
+                'verbose_name_plural': 'ادعاهای خسارت',
+                'db_table': 'insurance_claims',
+                'ordering': ['-service_date'],
+                'indexes': [models.Index(fields=['registration', 'service_date'], name='claims_registration_date_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='coverageusage',
+            constraint=models.UniqueConstraint(fields=('registration', 'member_id', 'coverage_type', 'year'), name='unique_coverage_usage'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance', '0005_claims_ledger'),
+        ('locations', '0002_remove_city_unique_city_per_state_and_more'),
+        ('users', '0007_refreshtoken'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='insuranceregistration',
+            index=models.Index(fields=['registration_date'], name='registrations_date_idx'),
+        ),
+    ]
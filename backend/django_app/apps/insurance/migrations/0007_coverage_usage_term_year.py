@@ -0,0 +1,65 @@
+# Generated by Django 5.0.1 on 2026-10-19 07:16
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def term_year(start_date, day):
+    # Frozen copy of ledger.coverage_year
+    if start_date is None or day < start_date:
+        return 1
+    years = day.year - start_date.year
+    if (day.month, day.day) < (start_date.month, start_date.day):
+        years -= 1
+    return years + 1
+
+
+def calendar_year(start_date, day):
+    return day.year
+
+
+def rekey_counters(key_year):
+    """Rebuild every usage counter from the accepted claims, keyed by ``key_year(start_date, service_date)``."""
+    def rekey(apps, schema_editor):
+        Claim = apps.get_model('insurance', 'Claim')
+        CoverageUsage = apps.get_model('insurance', 'CoverageUsage')
+        rows = (
+            Claim.objects.filter(status='accepted')
+            .values('registration_id', 'registration__start_date', 'member_id', 'coverage_type', 'service_date')
+            .annotate(uses=Count('id'), claimed=Sum('claimed_amount'), reimbursed=Sum('reimbursed_amount'))
+            .order_by()
+        )
+        totals = defaultdict(lambda: [0, 0, 0])
+        for row in rows.iterator():
+            year = key_year(row['registration__start_date'], row['service_date'])
+            total = totals[(row['registration_id'], row['member_id'], row['coverage_type'], year)]
+            total[0] += row['uses']
+            total[1] += row['claimed']
+            total[2] += row['reimbursed']
+        CoverageUsage.objects.all().delete()
+        CoverageUsage.objects.bulk_create((
+            CoverageUsage(
+                registration_id=registration_id, member_id=member_id, coverage_type=coverage_type, year=year,
+                usage_count=uses, claimed_amount=claimed, reimbursed_amount=reimbursed,
+            )
+            for (registration_id, member_id, coverage_type, year), (uses, claimed, reimbursed) in totals.items()
+        ), batch_size=1000)
+    return rekey
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance', '0006_registration_date_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='coverageusage',
+            name='year',
+            field=models.PositiveSmallIntegerField(help_text='سال دوره پوشش از تاریخ شروع ثبت\u200cنام؛ ۱ برای دوازده ماه اول', verbose_name='سال پوشش'),
+        ),
+        migrations.RunPython(rekey_counters(term_year), rekey_counters(calendar_year)),
+    ]
@@ -114,6 +114,16 @@ class InsuranceRegistration(models.Model):
         ('cancelled', 'لغو شده'),
     ]
     
+    # Allowed status changes: current status -> statuses it may move to
+    TRANSITIONS = {
+        'pending': ('approved', 'rejected', 'cancelled'),
+        'approved': ('active', 'rejected', 'cancelled'),
+        'active': ('expired', 'cancelled'),
+        'rejected': ('pending',),
+        'expired': (),
+        'cancelled': (),
+    }
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -172,6 +182,16 @@ class InsuranceRegistration(models.Model):
         verbose_name = 'ثبت‌نام بیمه'
         verbose_name_plural = 'ثبت‌نام‌های بیمه'
         ordering = ['-registration_date']
+        indexes = [
+            # Registration analytics: date range scans
+            models.Index(fields=['registration_date'], name='registrations_date_idx'),
+            # Expiry sweep: active registrations past their end date
+            models.Index(fields=['status', 'end_date'], name='registrations_status_end_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.user.get_full_name()} - {self.plan.name_fa} ({self.get_status_display()})"
\ No newline at end of file
+        return f"{self.user.get_full_name()} - {self.plan.name_fa} ({self.get_status_display()})"
+
+
+# Import claims ledger models
+from .claims import Claim, CoverageUsage
\ No newline at end of file
@@ -0,0 +1,194 @@
+"""
+Premium and coverage quotes for a household.
+
+A household is the insured members' ages, reduced to a head count per age
+band. For every plan the quote gives the annual premium and, for each
+coverage type, the expected yearly medical cost and the part of it the
+plan would reimburse:
+
+- premium: ``monthly_premium`` x 12 per insured member
+- per member and coverage type, each use costs ``cost`` and is
+  reimbursed at ``coverage_percentage``. At most ``max_usage_count`` uses
+  a year are reimbursed (no limit when empty), and the total is capped
+  at ``coverage_amount``.
+
+Expected uses and costs come from ``DEFAULT_USAGE`` per age band, which
+the caller can override per coverage type.
+
+Plan rule tables are built once from the active plans and their
+coverages, then cached in the ``plans`` namespace, so they are rebuilt
+only when a plan or coverage changes. A quote takes no queries beyond
+that. Expected cost and benefit per member are computed once per plan,
+coverage type and age band, and each household is then a weighted sum
+of that matrix by its head counts. The work therefore does not grow with
+household size, and ``compare_plans_batch`` evaluates many households
+against the same matrices.
+"""
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from apps.common import cache
+from .models import InsurancePlan, PlanCoverage
+from .serializers import active_coverages_prefetch
+
+COVERAGE_TYPES = tuple(coverage_type for coverage_type, _ in PlanCoverage.COVERAGE_TYPE_CHOICES)
+COVERAGE_LABELS = dict(PlanCoverage.COVERAGE_TYPE_CHOICES)
+
+# (band, oldest age in the band); the last band has no upper bound
+AGE_BANDS = (('child', 17), ('adult', 59), ('senior', None))
+BAND_NAMES = tuple(band for band, _ in AGE_BANDS)
+# Used for members whose age is unknown (the policy holder has no birth date on file)
+DEFAULT_BAND = 'adult'
+
+# Planning assumptions per member and year: (uses, average cost per use in Rial) by age band
+DEFAULT_USAGE = {
+    'outpatient': {'child': (4, 1_500_000), 'adult': (3, 2_000_000), 'senior': (6, 2_500_000)},
+    'hospitalization': {'child': (0.05, 60_000_000), 'adult': (0.08, 80_000_000), 'senior': (0.2, 120_000_000)},
+    'medication': {'child': (4, 500_000), 'adult': (5, 800_000), 'senior': (12, 1_200_000)},
+    'laboratory': {'child': (1, 800_000), 'adult': (2, 1_200_000), 'senior': (4, 1_500_000)},
+    'imaging': {'child': (0.2, 3_000_000), 'adult': (0.5, 4_000_000), 'senior': (1, 6_000_000)},
+    'dental': {'child': (1, 2_000_000), 'adult': (1.5, 4_000_000), 'senior': (1, 5_000_000)},
+    'ophthalmology': {'child': (0.5, 1_500_000), 'adult': (0.5, 2_000_000), 'senior': (1, 3_000_000)},
+    'physiotherapy': {'child': (0.1, 1_500_000), 'adult': (1, 1_500_000), 'senior': (3, 1_500_000)},
+}
+
+# Coverage rule: (reimbursed fraction, annual cap, reimbursed uses per year or None)
+Rule = Tuple[float, float, Optional[int]]
+
+
+def age_band(age: Optional[int]) -> str:
+    if age is None:
+        return DEFAULT_BAND
+    for band, oldest in AGE_BANDS:
+        if oldest is None or age <= oldest:
+            return band
+
+
+def household_profile(ages: Iterable[Optional[int]]) -> Dict[str, int]:
+    """Head count per age band for the members' ages (None = unknown)."""
+    counts = Counter(age_band(age) for age in ages)
+    return {band: counts[band] for band in BAND_NAMES}
+
+
+def _load_plan_rules() -> List[dict]:
+    plans = InsurancePlan.objects.filter(is_active=True).prefetch_related(active_coverages_prefetch())
+    tables = []
+    for plan in plans:
+        rules = {
+            cov.coverage_type: (cov.coverage_percentage / 100, float(cov.coverage_amount), cov.max_usage_count)
+            for cov in plan.active_coverages
+        }
+        tables.append({
+            'plan_id': str(plan.id),
+            'name_fa': plan.name_fa,
+            'plan_type': plan.plan_type,
+            'monthly_premium': float(plan.monthly_premium),
+            # One slot per coverage type, None where the plan does not cover it
+            'rules': tuple(rules.get(coverage_type) for coverage_type in COVERAGE_TYPES),
+        })
+    return tables
+
+
+def plan_rules() -> List[dict]:
+    """Rule tables of the active plans (cached until a plan or coverage changes)."""
+    return cache.get_or_set('plans', 'quote-rules', _load_plan_rules)
+
+
+def usage_table(overrides: Dict[str, Tuple[float, float]] = None) -> tuple:
+    """
+    ``(uses, cost)`` per coverage type and age band, aligned with
+    ``COVERAGE_TYPES`` and ``BAND_NAMES``; ``overrides`` maps a coverage
+    type to ``(uses, cost)`` for every band.
+    """
+    overrides = overrides or {}
+    return tuple(
+        tuple(overrides.get(coverage_type) or DEFAULT_USAGE[coverage_type][band] for band in BAND_NAMES)
+        for coverage_type in COVERAGE_TYPES
+    )
+
+
+def _benefit(rule: Optional[Rule], uses: float, cost: float) -> float:
+    """Expected reimbursement for one member in one year."""
+    if rule is None:
+        return 0.0
+    fraction, cap, max_uses = rule
+    if max_uses is not None:
+        uses = min(uses, max_uses)
+    return min(uses * cost * fraction, cap)
+
+
+def _plan_matrix(table: dict, usage: tuple) -> tuple:
+    """Per-member ``(expected cost, expected benefit)`` per coverage type and age band for one plan."""
+    return tuple(
+        tuple((uses * cost, _benefit(rule, uses, cost)) for uses, cost in cells)
+        for rule, cells in zip(table['rules'], usage)
+    )
+
+
+def _quote(table: dict, matrix: tuple, counts: tuple) -> dict:
+    members = sum(counts)
+    coverages, total_cost, total_benefit = [], 0.0, 0.0
+    for coverage_type, rule, cells in zip(COVERAGE_TYPES, table['rules'], matrix):
+        cost = sum(count * cell[0] for count, cell in zip(counts, cells))
+        benefit = sum(count * cell[1] for count, cell in zip(counts, cells))
+        total_cost += cost
+        total_benefit += benefit
+        coverages.append({
+            'coverage_type': coverage_type,
+            'title_fa': COVERAGE_LABELS[coverage_type],
+            'covered': rule is not None,
+            'coverage_percentage': round(rule[0] * 100) if rule else 0,
+            'annual_cap': round(rule[1] * members) if rule else 0,
+            'max_usage_count': rule[2] if rule else None,
+            'expected_cost': round(cost),
+            'expected_benefit': round(benefit),
+        })
+    annual_premium = table['monthly_premium'] * 12 * members
+    return {
+        'plan_id': table['plan_id'],
+        'name_fa': table['name_fa'],
+        'plan_type': table['plan_type'],
+        'monthly_premium': table['monthly_premium'],
+        'members': members,
+        'annual_premium': round(annual_premium),
+        'expected_cost': round(total_cost),
+        'expected_benefit': round(total_benefit),
+        'expected_out_of_pocket': round(total_cost - total_benefit),
+        # What the household expects to spend in a year on premium plus uncovered care
+        'net_annual_cost': round(annual_premium + total_cost - total_benefit),
+        'coverages': coverages,
+    }
+
+
+def compare_plans_batch(profiles: List[Dict[str, int]], plan_ids: Iterable[str] = None,
+                        usage: Dict[str, Tuple[float, float]] = None) -> List[List[dict]]:
+    """
+    Quote every plan (or ``plan_ids``) for each household profile.
+
+    Each household's quotes are sorted by ``net_annual_cost``, cheapest
+    first.
+    """
+    tables = plan_rules()
+    if plan_ids is not None:
+        wanted = {str(plan_id) for plan_id in plan_ids}
+        tables = [table for table in tables if table['plan_id'] in wanted]
+    # Everything that does not depend on the household is computed once per call
+    cells = usage_table(usage)
+    matrices = [(table, _plan_matrix(table, cells)) for table in tables]
+    # Households with the same head counts get the same quotes (shared, not copied)
+    quoted = {}
+    results = []
+    for profile in profiles:
+        counts = tuple(profile.get(band, 0) for band in BAND_NAMES)
+        if counts not in quoted:
+            quotes = [_quote(table, matrix, counts) for table, matrix in matrices]
+            quotes.sort(key=lambda quote: quote['net_annual_cost'])
+            quoted[counts] = quotes
+        results.append(quoted[counts])
+    return results
+
+
+def compare_plans(profile: Dict[str, int], plan_ids: Iterable[str] = None,
+                  usage: Dict[str, Tuple[float, float]] = None) -> List[dict]:
+    """Quote every plan (or ``plan_ids``) for one household, cheapest overall first."""
+    return compare_plans_batch([profile], plan_ids, usage)[0]
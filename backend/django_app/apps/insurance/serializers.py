@@ -0,0 +1,126 @@
+"""
+Plan and registration serialization shared by the API routers.
+
+``registration_details()`` loads a registration with everything its
+detail view shows in four queries, however many persons or documents it
+has: the registration joined with its user, plan and the school's whole
+location chain, then one query each for the plan's active coverages, the
+covered persons and the linked documents.
+"""
+from datetime import date
+
+from django.db.models import Prefetch
+
+from apps.users.models import Document, Person
+from apps.users.serializers import serialize_person
+from .models import InsuranceRegistration, PlanCoverage
+
+LOCATION_LEVELS = ('state', 'city', 'county', 'region', 'district')
+
+
+def active_coverages_prefetch(lookup: str = 'coverages') -> Prefetch:
+    """Prefetch a plan's active coverages into ``active_coverages``."""
+    return Prefetch(lookup, queryset=PlanCoverage.objects.filter(is_active=True), to_attr='active_coverages')
+
+
+def serialize_plan(plan) -> dict:
+    """Serialize a plan whose active coverages are prefetched as ``active_coverages``."""
+    return {
+        'id': str(plan.id),
+        'name_fa': plan.name_fa,
+        'plan_type': plan.plan_type,
+        'description_fa': plan.description_fa,
+        'monthly_premium': float(plan.monthly_premium),
+        'is_active': plan.is_active,
+        'coverages': [
+            {
+                'id': str(cov.id),
+                'coverage_type': cov.coverage_type,
+                'title_fa': cov.title_fa,
+                'description_fa': cov.description_fa,
+                'coverage_amount': float(cov.coverage_amount),
+                'coverage_percentage': cov.coverage_percentage,
+                'max_usage_count': cov.max_usage_count,
+            }
+            for cov in plan.active_coverages
+        ],
+    }
+
+
+def serialize_school(school) -> dict:
+    """Serialize a school loaded with ``School.objects.with_location()`` (or the same joins)."""
+    district = school.district
+    levels = {
+        'district': district,
+        'region': district.region,
+        'county': district.region.county,
+        'city': district.region.county.city,
+        'state': district.region.county.city.state,
+    }
+    return {
+        'id': str(school.id),
+        'name_fa': school.name_fa,
+        'code': school.code,
+        'school_type': school.school_type,
+        'address': school.address,
+        'phone': school.phone,
+        'location': {
+            level: {'id': str(levels[level].id), 'name_fa': levels[level].name_fa}
+            for level in LOCATION_LEVELS
+        },
+        'full_location': school.get_full_location(),
+    }
+
+
+def serialize_document(document) -> dict:
+    return {
+        'id': str(document.id),
+        'document_type': document.document_type,
+        'title': document.title,
+        'description': document.description,
+        'file_name': document.file_name,
+        'file_size': document.file_size,
+        'file_size_mb': document.get_file_size_mb(),
+        'mime_type': document.mime_type,
+        'is_verified': document.is_verified,
+        'person_id': str(document.person_id) if document.person_id else None,
+        'created_at': document.created_at.isoformat(),
+    }
+
+
+def registration_details():
+    """Registrations with everything ``serialize_registration_details`` reads, in four queries."""
+    return InsuranceRegistration.objects.select_related(
+        'user', 'plan', 'school__district__region__county__city__state'
+    ).prefetch_related(
+        active_coverages_prefetch('plan__coverages'),
+        Prefetch('persons', queryset=Person.objects.all()),
+        Prefetch('documents', queryset=Document.objects.all()),
+    )
+
+
+def serialize_registration_details(reg, with_user: bool = False) -> dict:
+    """Serialize a registration loaded through ``registration_details()``."""
+    today = date.today()
+    details = {
+        'id': str(reg.id),
+        'user_id': str(reg.user_id),
+        'status': reg.status,
+        'status_display': reg.get_status_display(),
+        'registration_date': reg.registration_date.isoformat(),
+        'start_date': reg.start_date.isoformat() if reg.start_date else None,
+        'end_date': reg.end_date.isoformat() if reg.end_date else None,
+        'plan': serialize_plan(reg.plan),
+        'school': serialize_school(reg.school),
+        'persons': [serialize_person(person, today) for person in reg.persons.all()],
+        'documents': [serialize_document(document) for document in reg.documents.all()],
+    }
+    if with_user:
+        details['user'] = {
+            'id': str(reg.user.id),
+            'name': reg.user.get_full_name(),
+            'email': reg.user.email,
+            'national_id': reg.user.national_id,
+            'phone': reg.user.phone,
+        }
+    return details
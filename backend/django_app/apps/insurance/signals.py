@@ -0,0 +1,15 @@
+"""
+Signal handlers for insurance models.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.common import cache
+from .models import InsurancePlan, PlanCoverage
+
+
+@receiver([post_save, post_delete], sender=InsurancePlan)
+@receiver([post_save, post_delete], sender=PlanCoverage)
+def invalidate_plan_catalog(sender, **kwargs):
+    """Drop the cached plan catalog whenever a plan or coverage changes."""
+    cache.invalidate('plans')
@@ -0,0 +1,92 @@
+"""
+Background jobs for the registration lifecycle.
+
+Status changes are committed by the API together with a
+``registration.status_changed`` job; the audit entry and the email to the
+registrant are produced by the job worker, off the request path.
+``claims.rebuild_counters`` recomputes the claim usage counters from the
+ledger.
+"""
+import logging
+
+from django.core.mail import send_mail
+
+from apps.common.jobs import enqueue, enqueue_many, handler
+from .ledger import rebuild_usage_counters
+from .models import InsuranceRegistration
+
+audit_logger = logging.getLogger('health_insurance.audit')
+
+STATUS_CHANGED = 'registration.status_changed'
+REBUILD_COUNTERS = 'claims.rebuild_counters'
+
+
+def status_changed(registration_id, old_status: str, new_status: str, changed_by=None):
+    """Queue the follow-up work for a registration status change (call inside its transaction)."""
+    return enqueue(STATUS_CHANGED, {
+        'registration_id': str(registration_id),
+        'old_status': old_status,
+        'new_status': new_status,
+        'changed_by': str(changed_by) if changed_by else None,
+    })
+
+
+def statuses_changed(changes, new_status: str, changed_by=None) -> int:
+    """Queue follow-up work for many status changes; ``changes`` yields ``(registration_id, old_status)``."""
+    return enqueue_many(STATUS_CHANGED, (
+        {
+            'registration_id': str(registration_id),
+            'old_status': old_status,
+            'new_status': new_status,
+            'changed_by': str(changed_by) if changed_by else None,
+        }
+        for registration_id, old_status in changes
+    ))
+
+
+@handler(STATUS_CHANGED)
+def notify_status_changed(registration_id: str, old_status: str, new_status: str, changed_by: str = None):
+    """Write the audit entry and email the registrant."""
+    registration = (
+        InsuranceRegistration.objects.select_related('user', 'plan')
+        .filter(id=registration_id).first()
+    )
+    if registration is None:
+        return
+    
+    audit_logger.info(
+        "Registration %s status %s -> %s by %s",
+        registration_id, old_status, new_status, changed_by or 'system',
+    )
+    
+    email = registration.user.email
+    if email:
+        labels = dict(InsuranceRegistration.STATUS_CHOICES)
+        send_mail(
+            subject=f"تغییر وضعیت ثبت‌نام بیمه: {labels.get(new_status, new_status)}",
+            message=(
+                f"{registration.user.get_full_name()} گرامی،\n"
+                f"وضعیت ثبت‌نام شما در طرح «{registration.plan.name_fa}» از "
+                f"«{labels.get(old_status, old_status)}» به «{labels.get(new_status, new_status)}» تغییر کرد."
+            ),
+            from_email=None,
+            recipient_list=[email],
+        )
+
+
+def rebuild_counters_later(registration_ids=None):
+    """Queue a usage counter rebuild for ``registration_ids`` (None = every registration with claims)."""
+    return enqueue(REBUILD_COUNTERS, {
+        'registration_ids': [str(registration_id) for registration_id in registration_ids]
+        if registration_ids is not None else None,
+    })
+
+
+@handler(REBUILD_COUNTERS)
+def rebuild_counters(registration_ids: list = None):
+    """Recompute ``CoverageUsage`` from the accepted claims and log what was corrected."""
+    report = rebuild_usage_counters(registration_ids)
+    audit_logger.info(
+        "Claim usage counters rebuilt for %s registrations: %s created, %s updated, %s deleted",
+        report['registrations'], report['created'], report['updated'], report['deleted'],
+    )
@@ -0,0 +1,138 @@
+"""
+Bulk registration status transitions.
+
+``bulk_transition`` applies ``InsuranceRegistration.TRANSITIONS`` to many
+registrations at once. Per chunk of ids it reads ``(id, status)`` under a
+row lock, then writes every eligible row with a single UPDATE, guarded on
+the statuses it read. Rows already in the target status are left alone,
+so repeating a request changes nothing. Rows whose status may not move to
+the target are reported rather than updated.
+
+``expire_registrations`` is the scheduled sweep built on it: active
+registrations whose ``end_date`` has passed are expired in batches, each
+in its own short transaction.
+"""
+from datetime import date
+
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.common import cache
+from . import tasks
+from .models import InsuranceRegistration
+
+# Ids per SELECT/UPDATE; keeps the IN list under SQLite's parameter limit
+CHUNK_SIZE = 900
+# Registrations expired per transaction by the sweep
+EXPIRY_BATCH_SIZE = 500
+# Default coverage term when a registration is activated without an end date
+TERM_YEARS = 1
+
+
+def sources_for(status: str) -> tuple:
+    """Statuses that may move to ``status``."""
+    return tuple(source for source, targets in InsuranceRegistration.TRANSITIONS.items() if status in targets)
+
+
+def years_after(day: date, years: int) -> date:
+    """The same calendar day ``years`` later (28 February for 29 February)."""
+    try:
+        return day.replace(year=day.year + years)
+    except ValueError:
+        return day.replace(year=day.year + years, day=28)
+
+
+def _date_updates(status: str, start_date: date = None, end_date: date = None) -> dict:
+    """Column updates for the dates; activation fills in missing dates instead of overwriting them."""
+    updates = {}
+    if status == 'active':
+        today = timezone.localdate()
+        updates['start_date'] = start_date or Coalesce(F('start_date'), Value(today, output_field=models.DateField()))
+        default_end = years_after(start_date or today, TERM_YEARS)
+        updates['end_date'] = end_date or Coalesce(F('end_date'), Value(default_end, output_field=models.DateField()))
+        return updates
+    if start_date:
+        updates['start_date'] = start_date
+    if end_date:
+        updates['end_date'] = end_date
+    return updates
+
+
+def bulk_transition(ids, status: str, start_date: date = None, end_date: date = None, changed_by=None) -> dict:
+    """
+    Move the registrations ``ids`` to ``status`` where the state machine allows it.
+
+    Returns ``updated`` and ``unchanged`` counts, ``skipped`` rows (id and
+    current status) whose transition is not allowed, and ``not_found`` ids.
+    Each updated row gets a ``registration.status_changed`` job.
+    """
+    if status not in InsuranceRegistration.TRANSITIONS:
+        raise ValueError(f"Unknown registration status {status!r}")
+    ids = list(dict.fromkeys(str(registration_id) for registration_id in ids))
+    sources = sources_for(status)
+    updates = dict(_date_updates(status, start_date, end_date), status=status)
+    report = {'updated': 0, 'unchanged': 0, 'skipped': [], 'not_found': []}
+
+    with transaction.atomic():
+        for offset in range(0, len(ids), CHUNK_SIZE):
+            chunk = ids[offset:offset + CHUNK_SIZE]
+            current = {
+                str(registration_id): current_status
+                for registration_id, current_status in InsuranceRegistration.objects.select_for_update()
+                .filter(id__in=chunk).values_list('id', 'status')
+            }
+            eligible = []
+            for registration_id in chunk:
+                current_status = current.get(registration_id)
+                if current_status is None:
+                    report['not_found'].append(registration_id)
+                elif current_status == status:
+                    report['unchanged'] += 1
+                elif current_status in sources:
+                    eligible.append(registration_id)
+                else:
+                    report['skipped'].append({'id': registration_id, 'status': current_status})
+            if not eligible:
+                continue
+
+            updated = InsuranceRegistration.objects.filter(id__in=eligible, status__in=sources).update(
+                updated_at=timezone.now(), **updates
+            )
+            report['updated'] += updated
+            tasks.statuses_changed(
+                ((registration_id, current[registration_id]) for registration_id in eligible),
+                status, changed_by=changed_by,
+            )
+    return report
+
+
+def expire_registrations(today: date = None, batch_size: int = EXPIRY_BATCH_SIZE, limit: int = None) -> int:
+    """
+    Expire active registrations whose ``end_date`` is before ``today``.
+
+    Each batch is found through the ``(status, end_date)`` index and
+    expired by ``bulk_transition`` in its own transaction, so row locks
+    are held for one batch at a time. The stats cache is invalidated
+    once at the end, after every batch is committed. Returns the number
+    of registrations expired; ``limit`` caps it.
+    """
+    today = today or timezone.localdate()
+    expired = 0
+    while limit is None or expired < limit:
+        size = batch_size if limit is None else min(batch_size, limit - expired)
+        batch = list(
+            InsuranceRegistration.objects.filter(status='active', end_date__lt=today)
+            .order_by('end_date').values_list('id', flat=True)[:size]
+        )
+        if not batch:
+            break
+        updated = bulk_transition(batch, 'expired')['updated']
+        if not updated:
+            # Every candidate changed status under us; the next query starts fresh
+            continue
+        expired += updated
+    if expired:
+        cache.invalidate('stats')
+    return expired
@@ -20,6 +20,7 @@ class CityAdmin(admin.ModelAdmin):
     """Admin interface for City model."""
     
     list_display = ['name_fa', 'state', 'code', 'created_at']
+    list_select_related = ['state']
     list_filter = ['state']
     search_fields = ['name_fa', 'code']
     ordering = ['state__name_fa', 'name_fa']
@@ -31,6 +32,7 @@ class CountyAdmin(admin.ModelAdmin):
     """Admin interface for County model."""
     
     list_display = ['name_fa', 'city', 'code', 'created_at']
+    list_select_related = ['city__state']
     list_filter = ['city__state']
     search_fields = ['name_fa', 'code', 'city__name_fa']
     ordering = ['city__name_fa', 'name_fa']
@@ -42,6 +44,7 @@ class RegionAdmin(admin.ModelAdmin):
     """Admin interface for Region model."""
     
     list_display = ['name_fa', 'county', 'code', 'created_at']
+    list_select_related = ['county__city']
     list_filter = ['county__city__state']
     search_fields = ['name_fa', 'code', 'county__name_fa']
     ordering = ['county__name_fa', 'name_fa']
@@ -53,6 +56,7 @@ class DistrictAdmin(admin.ModelAdmin):
     """Admin interface for District model."""
     
     list_display = ['name_fa', 'region', 'code', 'created_at']
+    list_select_related = ['region__county']
     list_filter = ['region__county__city__state']
     search_fields = ['name_fa', 'code', 'region__name_fa']
     ordering = ['region__name_fa', 'name_fa']
@@ -64,6 +68,7 @@ class SchoolAdmin(admin.ModelAdmin):
     """Admin interface for School model."""
     
     list_display = ['name_fa', 'code', 'school_type', 'district', 'phone', 'created_at']
+    list_select_related = ['district__region']
     list_filter = ['school_type', 'district__region__county__city__state']
     search_fields = ['name_fa', 'code', 'address', 'phone']
     ordering = ['name_fa']
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class LocationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.locations'
-    verbose_name = 'مکان‌ها'
\ No newline at end of file
+    verbose_name = 'مکان‌ها'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,271 @@
+"""
+Bulk CSV import of the location hierarchy.
+
+Each CSV row describes one school together with its full path:
+
+    state_code,state_name,city_code,city_name,county_code,county_name,
+    region_code,region_name,district_code,district_name,
+    school_code,school_name,school_type,address,phone
+
+Rows are read as a stream and processed in batches. Every batch is
+validated, then each level is upserted with one
+``bulk_create(update_conflicts=True)`` keyed on its code (state and school
+codes are global, the other levels are unique within their parent).
+A batch is written in its own transaction; rows that fail validation or
+belong to a batch the database rejected are listed in the report and
+the rest of the file still loads.
+
+Bulk writes skip ``post_save``, so the ``locations`` cache is
+invalidated once at the end.
+"""
+import csv
+
+from django.db import DatabaseError, transaction
+
+from apps.common import cache
+from apps.common.seeding import BATCH_SIZE, batched
+from .models import State, City, County, Region, District, School
+
+# (model, CSV column prefix, parent foreign key)
+LEVELS = (
+    (State, 'state', None),
+    (City, 'city', 'state'),
+    (County, 'county', 'city'),
+    (Region, 'region', 'county'),
+    (District, 'district', 'region'),
+)
+
+COLUMNS = tuple(
+    f'{prefix}_{suffix}' for _, prefix, _ in LEVELS for suffix in ('code', 'name')
+) + ('school_code', 'school_name', 'school_type', 'address', 'phone')
+
+OPTIONAL_COLUMNS = {'school_type', 'address', 'phone'}
+
+SCHOOL_TYPES = {value for value, _ in School.SCHOOL_TYPE_CHOICES}
+
+LEVEL_LABELS = {
+    'state': 'استان',
+    'city': 'شهر',
+    'county': 'شهرستان',
+    'region': 'منطقه',
+    'district': 'ناحیه',
+    'school': 'مدرسه',
+}
+
+
+class LocationImportError(ValueError):
+    """The file as a whole cannot be imported (bad header or encoding)."""
+
+
+def _field_limits(model):
+    return model._meta.get_field('code').max_length, model._meta.get_field('name_fa').max_length
+
+
+LIMITS = {prefix: _field_limits(model) for model, prefix, _ in LEVELS}
+LIMITS['school'] = _field_limits(School)
+
+
+def _clean_row(raw: dict) -> dict:
+    return {column: (raw.get(column) or '').strip() for column in COLUMNS}
+
+
+def validate_row(row: dict) -> list:
+    """Return the list of problems with one cleaned row (empty when valid)."""
+    errors = []
+    for prefix, (code_length, name_length) in LIMITS.items():
+        label = LEVEL_LABELS[prefix]
+        code, name = row[f'{prefix}_code'], row[f'{prefix}_name']
+        if not code:
+            errors.append(f"کد {label} الزامی است")
+        elif len(code) > code_length:
+            errors.append(f"کد {label} حداکثر {code_length} کاراکتر است")
+        if not name:
+            errors.append(f"نام {label} الزامی است")
+        elif len(name) > name_length:
+            errors.append(f"نام {label} حداکثر {name_length} کاراکتر است")
+
+    if row['school_type'] and row['school_type'] not in SCHOOL_TYPES:
+        errors.append(f"نوع مدرسه نامعتبر است: {row['school_type']}")
+    phone = row['phone']
+    if phone and (len(phone) != 11 or not phone.isdigit()):
+        errors.append("شماره تلفن باید ۱۱ رقم باشد")
+    return errors
+
+
+def _paths(row: dict) -> list:
+    """Code paths of the row's ancestors, from state down to district."""
+    codes = [row[f'{prefix}_code'] for _, prefix, _ in LEVELS]
+    return [tuple(codes[:depth]) for depth in range(1, len(codes) + 1)]
+
+
+class LocationImporter:
+    """
+    Streams rows into the database and builds the import report.
+
+    ``known`` maps each level to ``{code path: (id, name)}`` for rows
+    already written, so later batches only upsert ancestors that are new
+    or renamed; in a typical file every district repeats for dozens of
+    schools.
+    """
+
+    def __init__(self, batch_size: int = BATCH_SIZE):
+        self.batch_size = batch_size
+        self.known = {prefix: {} for _, prefix, _ in LEVELS}
+        # State names and school codes of stored rows and committed batches
+        self.state_names = dict(State.objects.values_list('name_fa', 'code'))
+        self.school_codes = set()
+        self.report = {
+            'rows': 0,
+            'imported': 0,
+            'failed': 0,
+            'upserted': {prefix: 0 for prefix in LIMITS},
+            'errors': [],
+        }
+
+    def run(self, stream) -> dict:
+        reader = csv.DictReader(stream)
+        try:
+            missing = [column for column in COLUMNS if column not in OPTIONAL_COLUMNS
+                       and column not in (reader.fieldnames or ())]
+            if missing:
+                raise LocationImportError(f"ستون‌های الزامی در فایل نیست: {', '.join(missing)}")
+
+            rows = ((reader.line_num, _clean_row(raw)) for raw in reader)
+            for batch in batched(rows, self.batch_size):
+                self._import_batch(batch)
+        except UnicodeDecodeError:
+            raise LocationImportError("فایل باید با کدگذاری UTF-8 ذخیره شده باشد")
+        except csv.Error as exc:
+            raise LocationImportError(f"فایل CSV نامعتبر است (سطر {reader.line_num}): {exc}")
+        finally:
+            if self.report['imported']:
+                cache.invalidate('locations')
+        return self.report
+
+    def _reject(self, line: int, row: dict, errors: list) -> None:
+        self.report['failed'] += 1
+        self.report['errors'].append({'row': line, 'school_code': row['school_code'], 'errors': errors})
+
+    def _validate(self, batch: list) -> tuple:
+        """Return the batch's valid rows and the state names and school codes they claim."""
+        state_names, school_codes = {}, set()
+        valid = []
+        for line, row in batch:
+            self.report['rows'] += 1
+            errors = validate_row(row)
+            if not errors:
+                owner = state_names.get(row['state_name'], self.state_names.get(row['state_name']))
+                if owner is not None and owner != row['state_code']:
+                    errors.append(f"نام استان قبلاً با کد {owner} ثبت شده است")
+                if row['school_code'] in self.school_codes or row['school_code'] in school_codes:
+                    errors.append("کد مدرسه در فایل تکراری است")
+            if errors:
+                self._reject(line, row, errors)
+                continue
+            state_names[row['state_name']] = row['state_code']
+            school_codes.add(row['school_code'])
+            valid.append((line, row))
+        return valid, state_names, school_codes
+
+    def _import_batch(self, batch: list) -> None:
+        valid, state_names, school_codes = self._validate(batch)
+        if not valid:
+            return
+
+        written = {}
+        try:
+            with transaction.atomic():
+                for depth, (model, prefix, parent) in enumerate(LEVELS):
+                    names = {}
+                    for _, row in valid:
+                        path = _paths(row)[depth]
+                        names[path] = row[f'{prefix}_name']
+                    parent_ids = written[LEVELS[depth - 1][1]] if parent else None
+                    written[prefix] = self._upsert_level(model, prefix, parent, names, parent_ids)
+                self._upsert_schools(valid, written['district'])
+        except DatabaseError as exc:
+            for line, row in valid:
+                self._reject(line, row, [f"خطای پایگاه داده: {exc}"])
+            return
+
+        # Only rows that are stored block later duplicates
+        self.state_names.update(state_names)
+        self.school_codes |= school_codes
+        for prefix, ids in written.items():
+            self.known[prefix].update(ids)
+        self.report['imported'] += len(valid)
+
+    def _upsert_level(self, model, prefix, parent, names: dict, parent_ids) -> dict:
+        """Upsert new or renamed rows of one level; return ``{path: (id, name)}`` for ``names``."""
+        known = self.known[prefix]
+        result = {path: known[path] for path, name in names.items() if known.get(path, (None, None))[1] == name}
+        pending = {path: name for path, name in names.items() if path not in result}
+        if not pending:
+            return result
+
+        objs = []
+        for path, name in pending.items():
+            obj = model(code=path[-1], name_fa=name)
+            if parent:
+                setattr(obj, f'{parent}_id', parent_ids[path[:-1]][0])
+            objs.append(obj)
+        model.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=[parent, 'code'] if parent else ['code'],
+            update_fields=['name_fa'],
+        )
+        self.report['upserted'][prefix] += len(objs)
+
+        # Conflicting rows keep their existing primary key, so read ids back
+        # by natural key instead of trusting the unsaved instances.
+        if parent:
+            path_by_key = {(parent_ids[path[:-1]][0], path[-1]): path for path in pending}
+            rows = model.objects.filter(**{
+                f'{parent}_id__in': {key[0] for key in path_by_key},
+                'code__in': {key[1] for key in path_by_key},
+            }).values_list(f'{parent}_id', 'code', 'id')
+            for parent_id, code, pk in rows:
+                path = path_by_key.get((parent_id, code))
+                if path is not None:
+                    result[path] = (pk, pending[path])
+        else:
+            rows = model.objects.filter(code__in=[path[0] for path in pending]).values_list('code', 'id')
+            for code, pk in rows:
+                result[(code,)] = (pk, pending[(code,)])
+        return result
+
+    def _upsert_schools(self, valid: list, districts: dict) -> None:
+        """Upsert the batch's schools, skipping rows identical to what is stored."""
+        fields = ('district_id', 'name_fa', 'school_type', 'address', 'phone')
+        values = {
+            row['school_code']: (
+                districts[_paths(row)[-1]][0],
+                row['school_name'],
+                row['school_type'] or 'elementary',
+                row['address'] or None,
+                row['phone'] or None,
+            )
+            for _, row in valid
+        }
+        stored = School.objects.filter(code__in=list(values)).values_list('code', *fields)
+        for code, *current in stored:
+            if tuple(current) == values[code]:
+                del values[code]
+        if not values:
+            return
+
+        schools = [School(code=code, **dict(zip(fields, row))) for code, row in values.items()]
+        School.objects.bulk_create(
+            schools,
+            batch_size=self.batch_size,
+            update_conflicts=True,
+            unique_fields=['code'],
+            update_fields=['district', 'name_fa', 'school_type', 'address', 'phone'],
+        )
+        self.report['upserted']['school'] += len(schools)
+
+
+def import_locations(stream, batch_size: int = BATCH_SIZE) -> dict:
+    """Import a CSV text stream; see the module docstring for the format."""
+    return LocationImporter(batch_size).run(stream)
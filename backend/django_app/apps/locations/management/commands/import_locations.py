@@ -0,0 +1,49 @@
+"""
+Import schools and their location hierarchy from a CSV file.
+
+Usage:
+    python manage.py import_locations schools.csv
+    python manage.py import_locations schools.csv --batch-size 10000 --report errors.json
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.seeding import BATCH_SIZE
+from apps.locations.importer import LocationImportError, import_locations
+
+
+class Command(BaseCommand):
+    help = 'Upsert State → City → County → Region → District → School rows from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='UTF-8 CSV file')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--report', help='write the full JSON report (including row errors) to this file')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as fh:
+                report = import_locations(fh, batch_size=options['batch_size'])
+        except OSError as exc:
+            raise CommandError(f"Cannot read {options['path']}: {exc}")
+        except LocationImportError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+
+        if options['report']:
+            with open(options['report'], 'w') as fh:
+                json.dump(report, fh, indent=2, ensure_ascii=False)
+
+        for error in report['errors'][:20]:
+            self.stderr.write(f"row {error['row']}: {'; '.join(error['errors'])}")
+        if len(report['errors']) > 20:
+            self.stderr.write(f"... {len(report['errors']) - 20} more row errors")
+
+        upserted = ', '.join(f"{count} {level}" for level, count in report['upserted'].items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['imported']:,} of {report['rows']:,} rows in {elapsed:.1f}s "
+            f"({report['failed']:,} failed; upserted {upserted})"
+        ))
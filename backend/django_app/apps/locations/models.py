@@ -126,6 +126,14 @@ class District(models.Model):
         return f"{self.name_fa} - {self.region.name_fa}"
 
 
+class SchoolQuerySet(models.QuerySet):
+    """QuerySet helpers for School."""
+    
+    def with_location(self):
+        """Join the full location hierarchy used by get_full_location()."""
+        return self.select_related('district__region__county__city__state')
+
+
 class School(models.Model):
     """School model - مدرسه"""
     
@@ -155,6 +163,8 @@ class School(models.Model):
     phone = models.CharField(max_length=11, blank=True, null=True, verbose_name='تلفن')
     created_at = models.DateTimeField(default=timezone.now, verbose_name='تاریخ ایجاد')
     
+    objects = SchoolQuerySet.as_manager()
+    
     class Meta:
         db_table = 'schools'
         verbose_name = 'مدرسه'
@@ -165,7 +175,12 @@ class School(models.Model):
         return f"{self.name_fa} ({self.get_school_type_display()})"
     
     def get_full_location(self):
-        """Return full location hierarchy."""
+        """
+        Return full location hierarchy.
+        
+        Load schools with ``School.objects.with_location()`` before calling
+        this in a loop; otherwise every call walks five foreign keys.
+        """
         return (
             f"{self.name_fa} - {self.district.name_fa} - "
             f"{self.district.region.name_fa} - {self.district.region.county.name_fa} - "
@@ -0,0 +1,19 @@
+"""
+Signal handlers for location models.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.common import cache
+from .models import State, City, County, Region, District, School
+
+
+@receiver([post_save, post_delete], sender=State)
+@receiver([post_save, post_delete], sender=City)
+@receiver([post_save, post_delete], sender=County)
+@receiver([post_save, post_delete], sender=Region)
+@receiver([post_save, post_delete], sender=District)
+@receiver([post_save, post_delete], sender=School)
+def invalidate_location_tree(sender, **kwargs):
+    """Drop cached location lookups whenever any level of the hierarchy changes."""
+    cache.invalidate('locations')
@@ -0,0 +1,64 @@
+"""
+Password hashers with a configurable cost.
+
+``PASSWORD_HASH_ALGORITHM`` picks the hasher used for new hashes and
+``PASSWORD_HASH_COST`` its cost (see ``config/settings.py``). The other
+hashers stay in ``PASSWORD_HASHERS`` so existing hashes still verify;
+``must_update`` reports them for re-hashing after the next successful
+login.
+
+The cost is stored on the instance rather than read from settings on
+each call, so hashers can be pickled to the password pool's worker
+processes, which have no Django settings.
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+# Name of the cost attribute for each supported algorithm
+COST_ATTRIBUTES = {
+    'pbkdf2_sha256': 'iterations',
+    'argon2': 'time_cost',
+    'bcrypt_sha256': 'rounds',
+    'scrypt': 'work_factor',
+}
+
+
+class ConfigurableCostMixin:
+    """Take the cost from ``PASSWORD_HASH_COST`` when this is the preferred algorithm."""
+
+    def __init__(self, cost: int = None):
+        if cost is None and settings.PASSWORD_HASH_ALGORITHM == self.algorithm:
+            cost = settings.PASSWORD_HASH_COST or None
+        if cost is not None:
+            setattr(self, COST_ATTRIBUTES[self.algorithm], cost)
+
+    @property
+    def cost(self) -> int:
+        return getattr(self, COST_ATTRIBUTES[self.algorithm])
+
+
+class PBKDF2PasswordHasher(ConfigurableCostMixin, hashers.PBKDF2PasswordHasher):
+    pass
+
+
+class Argon2PasswordHasher(ConfigurableCostMixin, hashers.Argon2PasswordHasher):
+    pass
+
+
+class BCryptSHA256PasswordHasher(ConfigurableCostMixin, hashers.BCryptSHA256PasswordHasher):
+    pass
+
+
+class ScryptPasswordHasher(ConfigurableCostMixin, hashers.ScryptPasswordHasher):
+    pass
+
+
+HASHER_CLASSES = {
+    hasher.algorithm: hasher
+    for hasher in (PBKDF2PasswordHasher, Argon2PasswordHasher, BCryptSHA256PasswordHasher, ScryptPasswordHasher)
+}
+
+
+def make_hasher(algorithm: str, cost: int = None):
+    """Return a hasher for ``algorithm``, with ``cost`` instead of the configured one."""
+    return HASHER_CLASSES[algorithm](cost)
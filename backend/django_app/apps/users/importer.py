@@ -0,0 +1,281 @@
+"""
+Batch enrolment import: users together with their dependents.
+
+Accepts two stream formats and turns both into one record per user with
+a ``persons`` list:
+
+- CSV with the columns ``national_id,first_name,last_name,email,phone,
+  password,person_first_name,person_last_name,person_national_code,
+  person_birth_date,person_relation``. Consecutive rows with the same
+  ``national_id`` belong to one user, one dependent per row; the person
+  columns are empty for a user without dependents.
+- NDJSON, one user object per line with an optional ``persons`` array.
+
+Records are processed in batches: each record is validated on its own,
+duplicates are found with one ``national_id__in`` / ``email__in`` query
+per batch instead of per record, passwords are hashed in the shared
+process pool (``passwords.shared_pool``) and users and persons are written with ``bulk_create``. A record is
+imported or rejected as a whole; the report lists the outcome of every
+record.
+"""
+import csv
+import json
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DatabaseError, transaction
+
+from apps.common import cache
+from apps.common.national_id import is_valid as is_valid_national_id
+from apps.common.seeding import batched
+from .models import User, Person
+from .passwords import hash_passwords, hashing_pool
+
+BATCH_SIZE = 1000
+
+USER_COLUMNS = ('national_id', 'first_name', 'last_name', 'email', 'phone', 'password')
+PERSON_COLUMNS = ('first_name', 'last_name', 'national_code', 'birth_date', 'relation')
+CSV_COLUMNS = USER_COLUMNS + tuple(f'person_{column}' for column in PERSON_COLUMNS)
+REQUIRED_COLUMNS = ('national_id', 'first_name', 'last_name')
+
+RELATIONS = {value for value, _ in Person.RELATION_CHOICES}
+MIN_PASSWORD_LENGTH = 8
+
+
+class EnrollmentImportError(ValueError):
+    """The file as a whole cannot be imported (bad header or encoding)."""
+
+
+def read_csv(stream):
+    """Yield ``(line, record)`` pairs, grouping consecutive rows of one user."""
+    reader = csv.DictReader(stream)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+    if missing:
+        raise EnrollmentImportError(f"ستون‌های الزامی در فایل نیست: {', '.join(missing)}")
+
+    line, record = None, None
+    for raw in reader:
+        row = {column: (raw.get(column) or '').strip() for column in CSV_COLUMNS}
+        if record is None or not row['national_id'] or row['national_id'] != record['national_id']:
+            if record is not None:
+                yield line, record
+            line = reader.line_num
+            record = {column: row[column] for column in USER_COLUMNS}
+            record['persons'] = []
+        person = {column: row[f'person_{column}'] for column in PERSON_COLUMNS}
+        if any(person.values()):
+            record['persons'].append(person)
+    if record is not None:
+        yield line, record
+
+
+def read_ndjson(stream):
+    """Yield ``(line, record)`` pairs; a line that is not a JSON object yields ``None``."""
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            record = json.loads(text)
+        except ValueError:
+            record = None
+        yield line, record if isinstance(record, dict) else None
+
+
+def _text(value) -> str:
+    return '' if value is None else str(value).strip()
+
+
+def _check_name(errors: list, value: str, label: str) -> None:
+    if not 2 <= len(value) <= 100:
+        errors.append(f"{label} باید بین 2 تا 100 کاراکتر باشد")
+
+
+def clean_record(record) -> tuple:
+    """Normalise one raw record; return ``(record, errors)``."""
+    if record is None:
+        return None, ["سطر JSON نامعتبر است"]
+
+    errors = []
+    user = {column: _text(record.get(column)) for column in USER_COLUMNS}
+    if not is_valid_national_id(user['national_id']):
+        errors.append("کد ملی نامعتبر است")
+    _check_name(errors, user['first_name'], "نام")
+    _check_name(errors, user['last_name'], "نام خانوادگی")
+    if user['email']:
+        user['email'] = User.objects.normalize_email(user['email'])
+        try:
+            validate_email(user['email'])
+        except ValidationError:
+            errors.append("ایمیل نامعتبر است")
+    if user['phone'] and (len(user['phone']) != 11 or not user['phone'].isdigit()):
+        errors.append("تلفن همراه باید 11 رقم باشد")
+    if user['password'] and len(user['password']) < MIN_PASSWORD_LENGTH:
+        errors.append(f"رمز عبور باید حداقل {MIN_PASSWORD_LENGTH} کاراکتر باشد")
+
+    persons = record.get('persons') or []
+    if not isinstance(persons, list):
+        return user, errors + ["فهرست افراد تحت تکفل نامعتبر است"]
+    user['persons'] = []
+    codes = set()
+    for index, raw in enumerate(persons, start=1):
+        raw = raw if isinstance(raw, dict) else {}
+        person = {column: _text(raw.get(column)) for column in PERSON_COLUMNS}
+        person_errors = []
+        _check_name(person_errors, person['first_name'], "نام")
+        _check_name(person_errors, person['last_name'], "نام خانوادگی")
+        code = person['national_code']
+        if not is_valid_national_id(code):
+            person_errors.append("کد ملی نامعتبر است")
+        elif code in codes:
+            person_errors.append("کد ملی تکراری است")
+        codes.add(code)
+        try:
+            person['birth_date'] = date.fromisoformat(person['birth_date'])
+            if person['birth_date'] > date.today():
+                person_errors.append("تاریخ تولد نمی‌تواند در آینده باشد")
+        except ValueError:
+            person_errors.append("تاریخ تولد نامعتبر است (YYYY-MM-DD)")
+        if person['relation'] not in RELATIONS:
+            person_errors.append("نسبت نامعتبر است")
+        errors.extend(f"فرد {index}: {error}" for error in person_errors)
+        user['persons'].append(person)
+    return user, errors
+
+
+class EnrollmentImporter:
+    """Validates, de-duplicates and writes records batch by batch."""
+
+    def __init__(self, default_password: str, batch_size: int = BATCH_SIZE, workers: int = None):
+        self.default_password = default_password
+        self.batch_size = batch_size
+        self.workers = workers
+        self.pool = None
+        # National IDs and emails of committed batches
+        self.national_ids = set()
+        self.emails = set()
+        self.report = {
+            'records': 0,
+            'users_created': 0,
+            'persons_created': 0,
+            'failed': 0,
+            'results': [],
+        }
+
+    def run(self, records) -> dict:
+        try:
+            with hashing_pool(self.workers) as self.pool:
+                for batch in batched(records, self.batch_size):
+                    self._import_batch(batch)
+        except UnicodeDecodeError:
+            raise EnrollmentImportError("فایل باید با کدگذاری UTF-8 ذخیره شده باشد")
+        except csv.Error as exc:
+            raise EnrollmentImportError(f"فایل CSV نامعتبر است: {exc}")
+        finally:
+            if self.report['users_created']:
+                cache.invalidate('stats')
+        self.report['results'].sort(key=lambda result: result['row'])
+        return self.report
+
+    def _result(self, line: int, record, errors: list) -> None:
+        self.report['records'] += 1
+        if errors:
+            self.report['failed'] += 1
+        self.report['results'].append({
+            'row': line,
+            'national_id': (record or {}).get('national_id', ''),
+            'status': 'failed' if errors else 'created',
+            'persons': 0 if errors else len(record['persons']),
+            'errors': errors,
+        })
+
+    def _validate(self, batch: list) -> tuple:
+        """Return the batch's valid records and the national IDs and emails they claim."""
+        cleaned = [(line, *clean_record(record)) for line, record in batch]
+
+        # One query per unique field for the whole batch
+        ids = {record['national_id'] for _, record, errors in cleaned if not errors}
+        emails = {record['email'] for _, record, errors in cleaned if not errors and record['email']}
+        taken_ids = set(User.objects.filter(national_id__in=ids).values_list('national_id', flat=True))
+        taken_emails = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+
+        # Claimed by this batch; added to self.national_ids / self.emails only once it commits
+        taken_ids |= self.national_ids
+        taken_emails |= self.emails
+        batch_ids, batch_emails = set(), set()
+
+        valid = []
+        for line, record, errors in cleaned:
+            if not errors:
+                if not record['password'] and not self.default_password:
+                    errors.append("رمز عبور الزامی است")
+                if record['national_id'] in taken_ids:
+                    errors.append("کاربر با این کد ملی قبلاً ثبت‌نام کرده است")
+                elif record['national_id'] in batch_ids:
+                    errors.append("کد ملی در فایل تکراری است")
+                email = record['email']
+                if email and (email in taken_emails or email in batch_emails):
+                    errors.append("کاربر با این ایمیل قبلاً ثبت‌نام کرده است")
+            if errors:
+                self._result(line, record, errors)
+                continue
+            batch_ids.add(record['national_id'])
+            if email:
+                batch_emails.add(email)
+            valid.append((line, record))
+        return valid, batch_ids, batch_emails
+
+    def _import_batch(self, batch: list) -> None:
+        valid, national_ids, emails = self._validate(batch)
+        if not valid:
+            return
+
+        hashes = hash_passwords(
+            [record['password'] or self.default_password for _, record in valid],
+            workers=self.workers, pool=self.pool,
+        )
+        users = [
+            User(
+                national_id=record['national_id'],
+                email=record['email'] or None,
+                password=password,
+                first_name=record['first_name'],
+                last_name=record['last_name'],
+                phone=record['phone'] or None,
+            )
+            for (_, record), password in zip(valid, hashes)
+        ]
+        persons = [
+            Person(user_id=user.id, **person)
+            for user, (_, record) in zip(users, valid)
+            for person in record['persons']
+        ]
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                Person.objects.bulk_create(persons)
+        except DatabaseError as exc:
+            for line, record in valid:
+                self._result(line, record, [f"خطای پایگاه داده: {exc}"])
+            return
+
+        self.national_ids |= national_ids
+        self.emails |= emails
+        for line, record in valid:
+            self._result(line, record, [])
+        self.report['users_created'] += len(users)
+        self.report['persons_created'] += len(persons)
+
+
+def import_enrollments(stream, file_format: str = 'csv', default_password: str = None,
+                       batch_size: int = BATCH_SIZE, workers: int = None) -> dict:
+    """
+    Import a CSV or NDJSON text stream; see the module docstring for the formats.
+
+    Users without a ``password`` get ``default_password``; a record without
+    either is rejected.
+    """
+    if file_format not in ('csv', 'ndjson'):
+        raise EnrollmentImportError(f"قالب فایل پشتیبانی نمی‌شود: {file_format}")
+    records = read_csv(stream) if file_format == 'csv' else read_ndjson(stream)
+    return EnrollmentImporter(default_password, batch_size, workers).run(records)
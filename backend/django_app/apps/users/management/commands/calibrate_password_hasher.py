@@ -0,0 +1,96 @@
+"""
+Pick the password hasher cost that meets a target verify time on this machine.
+
+Usage:
+    python manage.py calibrate_password_hasher --target-ms 250
+    python manage.py calibrate_password_hasher --algorithm bcrypt_sha256 --target-ms 100
+"""
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.users.hashers import COST_ATTRIBUTES, HASHER_CLASSES, make_hasher
+
+# Costs tried for algorithms whose cost is not linear in time
+CANDIDATES = {
+    'bcrypt_sha256': range(4, 17),
+    'scrypt': [2 ** power for power in range(10, 21)],
+    'argon2': range(1, 17),
+}
+PBKDF2_PROBE = 100_000
+PBKDF2_STEP = 10_000
+
+
+class Command(BaseCommand):
+    help = 'Measure password verify time and recommend PASSWORD_HASH_COST for a target latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--algorithm', choices=sorted(COST_ATTRIBUTES), help='default: PASSWORD_HASH_ALGORITHM')
+        parser.add_argument('--target-ms', type=float, default=250, help='verify time to aim for (default 250)')
+        parser.add_argument('--samples', type=int, default=5, help='verifications timed per cost (median is used)')
+
+    def handle(self, *args, **options):
+        algorithm = options['algorithm'] or settings.PASSWORD_HASH_ALGORITHM
+        target = options['target_ms'] / 1000
+        self.samples = options['samples']
+        try:
+            default_cost = make_hasher(algorithm).cost
+            self.measure(algorithm, default_cost)
+        except (ValueError, ImportError) as exc:
+            raise CommandError(f"{algorithm} is not usable here: {exc}")
+
+        self.stdout.write(f"Calibrating {algorithm} ({COST_ATTRIBUTES[algorithm]}) for {options['target_ms']:g}ms verify time")
+        if algorithm == 'pbkdf2_sha256':
+            cost = self.calibrate_linear(algorithm, target)
+        else:
+            cost = self.calibrate_steps(algorithm, target)
+
+        seconds = self.measure(algorithm, cost)
+        # The class attribute is Django's default; the configured cost is set per instance
+        django_default = getattr(HASHER_CLASSES[algorithm], COST_ATTRIBUTES[algorithm])
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"PASSWORD_HASH_ALGORITHM={algorithm}\nPASSWORD_HASH_COST={cost}"
+        ))
+        self.stdout.write(
+            f"Verify takes {seconds * 1000:.0f}ms, so each password pool worker handles "
+            f"about {1 / seconds:.1f} logins/s."
+        )
+        if cost < django_default:
+            self.stdout.write(self.style.WARNING(
+                f"This is below Django's default cost for {algorithm}; prefer more workers over a weaker hash."
+            ))
+
+    def measure(self, algorithm: str, cost: int) -> float:
+        """Median seconds to verify one password at ``cost``."""
+        hasher = make_hasher(algorithm, cost)
+        encoded = hasher.encode('calibration-password', hasher.salt())
+        timings = []
+        for _ in range(self.samples):
+            start = time.perf_counter()
+            hasher.verify('calibration-password', encoded)
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
+
+    def report(self, cost: int, seconds: float) -> None:
+        self.stdout.write(f"  cost {cost:>9}: {seconds * 1000:8.1f}ms")
+
+    def calibrate_linear(self, algorithm: str, target: float) -> int:
+        """PBKDF2 time is proportional to iterations: measure once and scale."""
+        seconds = self.measure(algorithm, PBKDF2_PROBE)
+        self.report(PBKDF2_PROBE, seconds)
+        cost = int(PBKDF2_PROBE * target / seconds) // PBKDF2_STEP * PBKDF2_STEP
+        return max(PBKDF2_STEP, cost)
+
+    def calibrate_steps(self, algorithm: str, target: float) -> int:
+        """Walk up the candidate costs and keep the last one within the target."""
+        chosen = None
+        for cost in CANDIDATES[algorithm]:
+            seconds = self.measure(algorithm, cost)
+            self.report(cost, seconds)
+            if seconds > target:
+                break
+            chosen = cost
+        return chosen if chosen is not None else CANDIDATES[algorithm][0]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0005_make_email_optional'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, help_text='توکن‌های صادرشده با نسخه قدیمی‌تر پذیرفته نمی‌شوند', verbose_name='نسخه توکن'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['updated_at'], name='users_updated_at_idx'),
+        ),
+    ]
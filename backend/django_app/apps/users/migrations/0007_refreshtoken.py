@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_user_token_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RefreshToken',
+            fields=[
+                ('jti_hash', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='شناسه توکن (هش)')),
+                ('family', models.UUIDField(db_index=True, verbose_name='خانواده توکن')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='تاریخ انقضا')),
+                ('used_at', models.DateTimeField(blank=True, null=True, verbose_name='تاریخ استفاده')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='تاریخ صدور')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='refresh_tokens', to=settings.AUTH_USER_MODEL, verbose_name='کاربر')),
+            ],
+            options={
+                'verbose_name': 'توکن بازیابی',
+                'verbose_name_plural': 'توکن\u200cهای بازیابی',
+                'db_table': 'user_refresh_tokens',
+            },
+        ),
+    ]
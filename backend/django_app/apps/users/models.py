@@ -10,15 +10,23 @@ from django.utils import timezone
 class UserManager(BaseUserManager):
     """Custom user manager for User model."""
     
-    def create_user(self, national_id, email=None, password=None, **extra_fields):
-        """Create and save a regular user."""
+    def create_user(self, national_id, email=None, password=None, password_hash=None, **extra_fields):
+        """
+        Create and save a regular user.
+        
+        Pass ``password_hash`` instead of ``password`` when the password was
+        already hashed elsewhere (e.g. on the API's password pool).
+        """
         if not national_id:
             raise ValueError('کد ملی الزامی است')
         
         if email:
             email = self.normalize_email(email)
         user = self.model(national_id=national_id, email=email, **extra_fields)
-        user.set_password(password)
+        if password_hash:
+            user.password = password_hash
+        else:
+            user.set_password(password)
         user.save(using=self._db)
         return user
     
@@ -55,6 +63,12 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_staff = models.BooleanField(default=False, verbose_name='کارمند')
     is_admin = models.BooleanField(default=False, verbose_name='مدیر')
     
+    token_version = models.PositiveIntegerField(
+        default=0,
+        verbose_name='نسخه توکن',
+        help_text='توکن‌های صادرشده با نسخه قدیمی‌تر پذیرفته نمی‌شوند'
+    )
+    
     created_at = models.DateTimeField(default=timezone.now, verbose_name='تاریخ ایجاد')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='تاریخ بروزرسانی')
     
@@ -63,15 +77,49 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'national_id'
     REQUIRED_FIELDS = ['first_name', 'last_name']
     
+    # Copied into access token claims; changing one revokes issued tokens
+    TOKEN_FIELDS = ('password', 'is_active', 'is_admin')
+    
     class Meta:
         db_table = 'users'
         verbose_name = 'کاربر'
         verbose_name_plural = 'کاربران'
         ordering = ['-created_at']
+        indexes = [
+            # The API polls recently changed users for token revocations
+            models.Index(fields=['updated_at'], name='users_updated_at_idx'),
+        ]
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.national_id})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        user._token_state = user._get_token_state()
+        return user
+    
+    def _get_token_state(self):
+        return tuple(self.__dict__.get(field) for field in self.TOKEN_FIELDS)
+    
+    def save(self, *args, **kwargs):
+        """Save, bumping ``token_version`` when a field in ``TOKEN_FIELDS`` changed."""
+        loaded = getattr(self, '_token_state', None)
+        if loaded is not None and loaded != self._get_token_state():
+            self.token_version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'token_version', 'updated_at'}
+        super().save(*args, **kwargs)
+        self._token_state = self._get_token_state()
+    
+    def revoke_tokens(self):
+        """Invalidate every access token issued to this user so far."""
+        User.objects.filter(pk=self.pk).update(
+            token_version=models.F('token_version') + 1,
+            updated_at=timezone.now(),
+        )
+        self.refresh_from_db(fields=['token_version', 'updated_at'])
+    
     def get_full_name(self):
         """Return the user's full name."""
         return f"{self.first_name} {self.last_name}"
@@ -94,6 +142,7 @@ class Person(models.Model):
         ('sibling', 'خواهر/برادر'),
         ('other', 'سایر'),
     ]
+    RELATION_LABELS = dict(RELATION_CHOICES)
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(
@@ -133,10 +182,10 @@ class Person(models.Model):
         """Return the person's full name."""
         return f"{self.first_name} {self.last_name}"
     
-    def get_age(self):
-        """Calculate and return the person's age."""
+    def get_age(self, today=None):
+        """Calculate and return the person's age (on ``today``, default today)."""
         from datetime import date
-        today = date.today()
+        today = today or date.today()
         age = today.year - self.birth_date.year
         if today.month < self.birth_date.month or (today.month == self.birth_date.month and today.day < self.birth_date.day):
             age -= 1
@@ -144,9 +193,11 @@ class Person(models.Model):
     
     def get_relation_display_fa(self):
         """Return the Persian display name for the relation."""
-        relation_dict = dict(self.RELATION_CHOICES)
-        return relation_dict.get(self.relation, self.relation)
+        return self.RELATION_LABELS.get(self.relation, self.relation)
 
 
 # Import Document model
-from .documents import Document
\ No newline at end of file
+from .documents import Document
+
+# Import RefreshToken model
+from .tokens import RefreshToken
\ No newline at end of file
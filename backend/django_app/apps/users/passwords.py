@@ -0,0 +1,120 @@
+"""
+Password hashing helpers that can run in worker processes.
+
+Hashing with the default PBKDF2 hasher costs a few hundred milliseconds of
+CPU per password. ``encode`` and ``verify`` take the hasher object as an
+argument; it is pickled to the worker, so worker processes need no Django
+settings of their own. ``hash_passwords`` uses them to spread a batch
+import over a process pool. By default that is one process-wide pool of
+``IMPORT_HASH_WORKERS`` processes, so concurrent imports share (and
+queue on) the same workers instead of starting a pool each and starving
+the API's login pool (``core.passwords``).
+"""
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+
+# Below this many passwords the pool start-up costs more than it saves
+PARALLEL_THRESHOLD = 8
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+def encode(hasher, password: str) -> str:
+    """Hash ``password`` with a fresh salt."""
+    return hasher.encode(password, hasher.salt())
+
+
+def verify(hasher, password: str, encoded: str) -> bool:
+    """Check ``password`` against a hash produced by ``hasher``."""
+    return hasher.verify(password, encoded)
+
+
+def timed(fn, *args):
+    """Run ``fn`` and return ``(result, seconds)``; the pool uses it to measure time in the worker."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def _new_pool(workers: int) -> ProcessPoolExecutor:
+    # spawn rather than fork: the API process runs threads that may hold locks
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def shared_pool(broken: ProcessPoolExecutor = None) -> ProcessPoolExecutor:
+    """
+    The process-wide import pool of ``IMPORT_HASH_WORKERS`` processes, started on first use.
+
+    Pass the pool that raised ``BrokenProcessPool`` as ``broken`` to
+    replace it.
+    """
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None or _shared_pool is broken:
+            if broken is not None:
+                broken.shutdown(wait=False, cancel_futures=True)
+            _shared_pool = _new_pool(settings.IMPORT_HASH_WORKERS)
+        return _shared_pool
+
+
+def shutdown_shared_pool() -> None:
+    global _shared_pool
+    with _shared_lock:
+        pool, _shared_pool = _shared_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+@contextmanager
+def hashing_pool(workers: int = None):
+    """
+    A process pool to pass to several ``hash_passwords`` calls, or None for the shared pool.
+
+    Only an explicit ``workers`` count above one (the ``import_users``
+    command's ``--workers``) starts a pool of its own, closed on exit.
+    Worker processes start on first use, so an import that never hashes
+    enough passwords at once to need them costs nothing.
+    """
+    if not workers or workers == 1:
+        yield None
+        return
+    with _new_pool(workers) as pool:
+        yield pool
+
+
+def hash_passwords(passwords, workers: int = None, pool: ProcessPoolExecutor = None) -> list:
+    """
+    Return Django password hashes for ``passwords``, in the same order.
+
+    ``pool`` comes from ``hashing_pool``; without one, ``workers`` above
+    one starts a pool for this call alone and the default uses the
+    shared pool.
+    """
+    passwords = list(passwords)
+    hasher = get_hasher('default')
+    shared = pool is None and workers is None
+    workers = settings.IMPORT_HASH_WORKERS if shared else workers or 1
+    if workers <= 1 or len(passwords) < PARALLEL_THRESHOLD:
+        return [encode(hasher, password) for password in passwords]
+
+    chunksize = max(1, len(passwords) // (workers * 4))
+    hashers = [hasher] * len(passwords)
+    if not shared:
+        if pool is not None:
+            return list(pool.map(encode, hashers, passwords, chunksize=chunksize))
+        with hashing_pool(workers) as pool:
+            return list(pool.map(encode, hashers, passwords, chunksize=chunksize))
+    pool = shared_pool()
+    try:
+        return list(pool.map(encode, hashers, passwords, chunksize=chunksize))
+    except BrokenProcessPool:
+        # A worker died and took the pool down; start a new one and retry once
+        return list(shared_pool(broken=pool).map(encode, hashers, passwords, chunksize=chunksize))
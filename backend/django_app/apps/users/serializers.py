@@ -0,0 +1,100 @@
+"""
+Person serialization shared by the API routers.
+
+Listings read rows with ``values_list`` instead of building model
+instances, look relation labels up in ``Person.RELATION_LABELS`` and
+compute ages against one ``today`` per call. Age statistics are counted
+in SQL with ``count_by_age``.
+"""
+from datetime import date
+
+from django.db.models import Count, Q
+
+from .models import Person
+
+PERSON_FIELDS = (
+    'id', 'first_name', 'last_name', 'national_code', 'birth_date',
+    'relation', 'created_at', 'updated_at',
+)
+OWNER_FIELDS = ('user_id', 'user__first_name', 'user__last_name', 'user__national_id')
+
+
+def age_on(birth_date: date, today: date) -> int:
+    """Age in whole years on ``today``; matches ``Person.get_age``."""
+    return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+
+
+def years_before(today: date, years: int) -> date:
+    """The same calendar day ``years`` earlier (28 February for a 29 February ``today``)."""
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        return today.replace(year=today.year - years, day=28)
+
+
+def _person_dict(person_id, first_name, last_name, national_code, birth_date, relation,
+                 created_at, updated_at, today: date) -> dict:
+    return {
+        'id': str(person_id),
+        'first_name': first_name,
+        'last_name': last_name,
+        'national_code': national_code,
+        'birth_date': birth_date.isoformat(),
+        'relation': relation,
+        'relation_display': Person.RELATION_LABELS.get(relation, relation),
+        'age': age_on(birth_date, today),
+        'created_at': created_at.isoformat(),
+        'updated_at': updated_at.isoformat(),
+    }
+
+
+def serialize_person(person: Person, today: date = None) -> dict:
+    """Serialize one loaded ``Person``."""
+    return _person_dict(
+        person.id, person.first_name, person.last_name, person.national_code, person.birth_date,
+        person.relation, person.created_at, person.updated_at, today or date.today(),
+    )
+
+
+def serialize_persons(queryset, with_owner: bool = False, today: date = None) -> list:
+    """
+    Serialize a ``Person`` queryset without instantiating models.
+
+    ``with_owner`` adds ``user_id``, ``user_name`` and ``user_national_id``
+    from a join on the owning user, as the admin listings need.
+    """
+    today = today or date.today()
+    if not with_owner:
+        return [_person_dict(*row, today) for row in queryset.values_list(*PERSON_FIELDS)]
+
+    persons = []
+    for row in queryset.values_list(*PERSON_FIELDS, *OWNER_FIELDS):
+        person = _person_dict(*row[:len(PERSON_FIELDS)], today)
+        user_id, first_name, last_name, national_id = row[len(PERSON_FIELDS):]
+        person['user_id'] = str(user_id)
+        person['user_name'] = f"{first_name} {last_name}"
+        person['user_national_id'] = national_id
+        persons.append(person)
+    return persons
+
+
+def count_by_age(queryset, buckets, today: date = None) -> dict:
+    """
+    Count persons per age bucket in one aggregate query.
+
+    ``buckets`` is a sequence of ``(label, max_age)`` in ascending order;
+    the last ``max_age`` may be None for "and older".
+    """
+    today = today or date.today()
+    aggregates, lower = {}, None
+    for index, (_, max_age) in enumerate(buckets):
+        condition = Q()
+        if max_age is not None:
+            # age <= max_age  <=>  born after the day max_age + 1 years ago
+            condition &= Q(birth_date__gt=years_before(today, max_age + 1))
+        if lower is not None:
+            condition &= Q(birth_date__lte=years_before(today, lower + 1))
+        aggregates[f'bucket_{index}'] = Count('pk', filter=condition)
+        lower = max_age
+    counts = queryset.order_by().aggregate(**aggregates)
+    return {label: counts[f'bucket_{index}'] for index, (label, _) in enumerate(buckets)}
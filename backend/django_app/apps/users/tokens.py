@@ -0,0 +1,60 @@
+"""
+Refresh token store.
+
+Only a SHA-256 hash of each refresh token's ``jti`` is stored, as the
+primary key, so a lookup is a single index probe. Every login starts a
+token family; each refresh marks the presented token used and issues a
+new token in the same family. Presenting a used token again means the
+token was copied, so the whole family is deleted. Rows are kept until
+they expire so reuse can be detected, then purged.
+"""
+import hashlib
+from django.db import models
+from django.utils import timezone
+from django.conf import settings
+
+
+def hash_jti(jti: str) -> str:
+    """Return the stored form of a refresh token's ``jti`` claim."""
+    return hashlib.sha256(jti.encode()).hexdigest()
+
+
+class RefreshToken(models.Model):
+    """One issued refresh token."""
+    
+    jti_hash = models.CharField(
+        max_length=64,
+        primary_key=True,
+        verbose_name='شناسه توکن (هش)'
+    )
+    family = models.UUIDField(
+        db_index=True,
+        verbose_name='خانواده توکن'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='refresh_tokens',
+        verbose_name='کاربر'
+    )
+    expires_at = models.DateTimeField(
+        db_index=True,
+        verbose_name='تاریخ انقضا'
+    )
+    used_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='تاریخ استفاده'
+    )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='تاریخ صدور'
+    )
+    
+    class Meta:
+        db_table = 'user_refresh_tokens'
+        verbose_name = 'توکن بازیابی'
+        verbose_name_plural = 'توکن‌های بازیابی'
+    
+    def __str__(self):
+        return f"{self.family} - {self.user_id}"
@@ -31,6 +31,7 @@ INSTALLED_APPS = [
     'corsheaders',
     
     # Local apps
+    'apps.common',
     'apps.users',
     'apps.insurance',
     'apps.locations',
@@ -79,9 +80,78 @@ DATABASES = {
     }
 }
 
+# Cache
+# locmem keeps everything in-process (development and tests); set
+# CACHE_BACKEND=redis to share the cache between workers.
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://{host}:{port}/{db}'.format(
+                host=config('REDIS_HOST', default='redis'),
+                port=config('REDIS_PORT', default='6379'),
+                db=config('REDIS_DB', default='0'),
+            ),
+            'KEY_PREFIX': 'health_insurance',
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'health-insurance',
+            'TIMEOUT': 300,
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
 
+# Password hashing
+# New hashes use PASSWORD_HASH_ALGORITHM at PASSWORD_HASH_COST (0 keeps the
+# library default; see `manage.py calibrate_password_hasher`). The other
+# hashers stay listed so older hashes verify and are upgraded on login.
+PASSWORD_HASH_ALGORITHM = config('PASSWORD_HASH_ALGORITHM', default='pbkdf2_sha256')
+PASSWORD_HASH_COST = config('PASSWORD_HASH_COST', default=0, cast=int)
+
+_PASSWORD_HASHERS = {
+    'pbkdf2_sha256': 'apps.users.hashers.PBKDF2PasswordHasher',
+    'argon2': 'apps.users.hashers.Argon2PasswordHasher',
+    'bcrypt_sha256': 'apps.users.hashers.BCryptSHA256PasswordHasher',
+    'scrypt': 'apps.users.hashers.ScryptPasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASH_ALGORITHM]] + [
+    path for algorithm, path in _PASSWORD_HASHERS.items() if algorithm != PASSWORD_HASH_ALGORITHM
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+# Processes shared by every user import in a process (API or import_users
+# without --workers); kept small so imports leave the login pool its CPUs
+IMPORT_HASH_WORKERS = config('IMPORT_HASH_WORKERS', default=max(1, (os.cpu_count() or 4) // 4), cast=int)
+
+# Background jobs (`manage.py run_jobs`)
+JOB_WORKERS = config('JOB_WORKERS', default=4, cast=int)
+JOB_BATCH_SIZE = config('JOB_BATCH_SIZE', default=10, cast=int)
+JOB_POLL_INTERVAL = config('JOB_POLL_INTERVAL', default=1.0, cast=float)
+JOB_MAX_ATTEMPTS = config('JOB_MAX_ATTEMPTS', default=5, cast=int)
+JOB_RETRY_BASE_SECONDS = config('JOB_RETRY_BASE_SECONDS', default=10, cast=float)
+JOB_RETRY_MAX_SECONDS = config('JOB_RETRY_MAX_SECONDS', default=3600, cast=float)
+# A running job whose lock is older than this is assumed orphaned and claimed again
+JOB_LOCK_TIMEOUT = config('JOB_LOCK_TIMEOUT', default=300, cast=int)
+JOB_RETENTION_DAYS = config('JOB_RETENTION_DAYS', default=7, cast=int)
+
+# Email (registration notifications are sent by the job worker)
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='no-reply@health-insurance.local')
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -18,9 +18,7 @@ from seed_data import (
 
 from seed_sample_data import (
     create_admin_users,
-    create_sample_users,
-    create_persons_for_users,
-    create_insurance_registrations,
+    seed_sample_population,
     print_summary
 )
 
@@ -41,9 +39,7 @@ def main():
     print("\n📦 STEP 2: Seeding sample data...")
     print("-" * 70)
     create_admin_users(3)
-    users = create_sample_users(50)
-    create_persons_for_users(users)
-    create_insurance_registrations(users)
+    seed_sample_population(50)
     
     # Step 3: Print summary
     print_summary()
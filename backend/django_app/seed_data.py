@@ -10,6 +10,7 @@ django.setup()
 from apps.users.models import User
 from apps.locations.models import State, City, County, Region, District, School
 from apps.insurance.models import InsurancePlan, PlanCoverage
+from apps.common import cache
 
 
 def seed_admin_user():
@@ -40,11 +41,11 @@ def seed_states():
         ('آذربایجان غربی', '10', 10),
     ]
     
-    for name, code, order in states_data:
-        State.objects.get_or_create(
-            code=code,
-            defaults={'name_fa': name, 'order_index': order}
-        )
+    State.objects.bulk_create(
+        [State(name_fa=name, code=code, order_index=order) for name, code, order in states_data],
+        ignore_conflicts=True
+    )
+    cache.invalidate('locations')
     print(f"✅ {len(states_data)} States seeded")
 
 
@@ -70,7 +71,8 @@ def seed_sample_locations():
         ('شهرستان شمیرانات', '010103'),
     ]
     
-    total_schools = 0
+    # Schools are collected and inserted in one bulk_create at the end
+    schools = []
     
     for county_name, county_code in counties_data:
         county, _ = County.objects.get_or_create(
@@ -104,18 +106,17 @@ def seed_sample_locations():
                     (f'مدرسه راهنمایی امام خمینی {region_num}-{district_num}', f'SCH{county_code[-2:]}{region_num}{district_num}05', 'middle', 'میدان تجریش، پلاک 654'),
                 ]
                 
-                for name, code, school_type, address in schools_data:
-                    School.objects.get_or_create(
+                schools.extend(
+                    School(
+                        district=district,
+                        name_fa=name,
                         code=code,
-                        defaults={
-                            'district': district,
-                            'name_fa': name,
-                            'school_type': school_type,
-                            'address': address,
-                            'phone': '02112345678'
-                        }
+                        school_type=school_type,
+                        address=address,
+                        phone='02112345678'
                     )
-                    total_schools += 1
+                    for name, code, school_type, address in schools_data
+                )
     
     # Isfahan Province
     isfahan_state, _ = State.objects.get_or_create(
@@ -154,20 +155,23 @@ def seed_sample_locations():
         ('مدرسه راهنمایی سعدی', 'SCH0203', 'middle', 'خیابان سی و سه پل، اصفهان'),
     ]
     
-    for name, code, school_type, address in isfahan_schools:
-        School.objects.get_or_create(
+    schools.extend(
+        School(
+            district=isfahan_district,
+            name_fa=name,
             code=code,
-            defaults={
-                'district': isfahan_district,
-                'name_fa': name,
-                'school_type': school_type,
-                'address': address,
-                'phone': '03132345678'
-            }
+            school_type=school_type,
+            address=address,
+            phone='03132345678'
         )
-        total_schools += 1
+        for name, code, school_type, address in isfahan_schools
+    )
+    
+    # Existing codes are skipped, so re-running the seed is safe
+    School.objects.bulk_create(schools, ignore_conflicts=True)
+    cache.invalidate('locations')
     
-    print(f"✅ Comprehensive location hierarchy created with {total_schools} schools across multiple cities")
+    print(f"✅ Comprehensive location hierarchy created with {len(schools)} schools across multiple cities")
 
 
 def seed_insurance_plans():
@@ -225,8 +229,8 @@ def seed_insurance_plans():
         )
         
         if created:
-            for cov_type, title, desc, amount, percentage, max_usage in coverages_data:
-                PlanCoverage.objects.create(
+            PlanCoverage.objects.bulk_create([
+                PlanCoverage(
                     plan=plan,
                     coverage_type=cov_type,
                     title_fa=title,
@@ -235,6 +239,9 @@ def seed_insurance_plans():
                     coverage_percentage=percentage,
                     max_usage_count=max_usage
                 )
+                for cov_type, title, desc, amount, percentage, max_usage in coverages_data
+            ])
+            cache.invalidate('plans')
             print(f"✅ Created plan: {plan.name_fa} with {len(coverages_data)} coverages")
         else:
             print(f"ℹ️  Plan already exists: {plan.name_fa}")
@@ -2,14 +2,23 @@
 Enhanced data seeding script for sample users, persons, and insurance registrations.
 Run this after seed_data.py to populate the system with realistic sample data.
 """
+import argparse
 import os
 import django
-from datetime import datetime, timedelta
+from collections import defaultdict
+from datetime import date, timedelta
 from random import choice, randint, sample
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from apps.common import cache, national_id
+from apps.common.queries import count_by
+from apps.common.seeding import batched, bulk_insert
 from apps.users.models import User, Person
 from apps.insurance.models import InsurancePlan, InsuranceRegistration
 from apps.locations.models import School
@@ -31,163 +40,198 @@ LAST_NAMES = [
     'فاطمی', 'زارعی', 'حسنی', 'طاهری', 'عباسی', 'قاسمی', 'سلیمانی', 'خانی', 'شریفی', 'امینی'
 ]
 
+SAMPLE_PASSWORD = 'user123'
+RELATIONS = ['spouse', 'child', 'parent', 'sibling', 'other']
+STATUSES = ['pending', 'approved', 'rejected', 'active', 'expired']
+
 
 def generate_national_id():
-    """Generate a random 10-digit national ID."""
-    return ''.join([str(randint(0, 9)) for _ in range(10)])
+    """Generate a random national ID with a valid check digit."""
+    return national_id.generate(1)[0]
+
+
+def generate_unique_national_ids(count):
+    """Generate ``count`` valid national IDs that no user has yet."""
+    ids = []
+    while len(ids) < count:
+        candidates = set(national_id.generate(count - len(ids)))
+        candidates.difference_update(ids)
+        for batch in batched(candidates, 5000):
+            candidates.difference_update(User.objects.filter(national_id__in=batch).values_list('national_id', flat=True))
+        ids.extend(candidates)
+    return ids
 
 
-def create_sample_users(count=50):
-    """Create sample users with realistic data."""
+def create_sample_users(count=50, password_hash=None):
+    """
+    Create sample users with realistic data.
+    
+    All sample users share one password, so it is hashed once and the
+    hash is reused instead of running the password hasher per user.
+    """
     print(f"\n📝 Creating {count} sample users...")
     
-    created_users = []
-    for i in range(count):
+    password_hash = password_hash or make_password(SAMPLE_PASSWORD)
+    now = timezone.now()
+    users = []
+    for i, nid in enumerate(generate_unique_national_ids(count)):
         # Alternate between male and female names
         is_male = i % 2 == 0
-        first_name = choice(FIRST_NAMES_MALE if is_male else FIRST_NAMES_FEMALE)
-        last_name = choice(LAST_NAMES)
-        
-        national_id = generate_national_id()
-        
-        # Check if user already exists
-        while User.objects.filter(national_id=national_id).exists():
-            national_id = generate_national_id()
-        
-        user = User.objects.create_user(
-            national_id=national_id,
-            email=f"{first_name.lower()}.{last_name.lower()}{i}@example.com",
-            password='user123',  # Simple password for testing
-            first_name=first_name,
-            last_name=last_name,
-            phone=f"0912{randint(1000000, 9999999)}"
-        )
-        created_users.append(user)
-        
-        if (i + 1) % 10 == 0:
-            print(f"   ✅ Created {i + 1} users...")
+        users.append(User(
+            national_id=nid,
+            email=f"user{nid}@example.com",
+            password=password_hash,
+            first_name=choice(FIRST_NAMES_MALE if is_male else FIRST_NAMES_FEMALE),
+            last_name=choice(LAST_NAMES),
+            phone=f"0912{randint(1000000, 9999999)}",
+            created_at=now,
+        ))
+    
+    bulk_insert(User, users)
+    print(f"✅ Successfully created {len(users)} users")
+    return users
+
+
+def build_person(user):
+    """Build an unsaved family member for ``user``."""
+    relation = choice(RELATIONS)
     
-    print(f"✅ Successfully created {len(created_users)} users")
-    return created_users
+    # Generate appropriate names based on relation
+    if relation == 'spouse':
+        # Spouse has opposite gender
+        first_name = choice(FIRST_NAMES_FEMALE if user.first_name in FIRST_NAMES_MALE else FIRST_NAMES_MALE)
+        # Spouse might have same last name
+        last_name = user.last_name if randint(0, 1) else choice(LAST_NAMES)
+        birth_year = randint(1970, 1990)
+    elif relation == 'child':
+        # Child can be any gender
+        first_name = choice(FIRST_NAMES_MALE + FIRST_NAMES_FEMALE)
+        last_name = user.last_name
+        birth_year = randint(2005, 2018)
+    elif relation == 'parent':
+        # Parent is older
+        first_name = choice(FIRST_NAMES_MALE + FIRST_NAMES_FEMALE)
+        last_name = user.last_name if randint(0, 1) else choice(LAST_NAMES)
+        birth_year = randint(1950, 1970)
+    else:  # sibling or other
+        first_name = choice(FIRST_NAMES_MALE + FIRST_NAMES_FEMALE)
+        last_name = user.last_name if relation == 'sibling' else choice(LAST_NAMES)
+        birth_year = randint(1975, 2000)
+    
+    return Person(
+        user_id=user.id,
+        first_name=first_name,
+        last_name=last_name,
+        birth_date=date(birth_year, randint(1, 12), randint(1, 28)),
+        relation=relation
+    )
 
 
 def create_persons_for_users(users):
     """Create persons (family members) for users."""
     print(f"\n👨‍👩‍👧‍👦 Creating persons for users...")
     
-    relations = ['spouse', 'child', 'parent', 'sibling', 'other']
-    total_persons = 0
+    # Each user gets 1-4 family members
+    persons = [build_person(user) for user in users for _ in range(randint(1, 4))]
+    for person, code in zip(persons, national_id.generate(len(persons))):
+        person.national_code = code
     
-    for user in users:
-        # Each user gets 1-4 family members
-        num_persons = randint(1, 4)
-        
-        for _ in range(num_persons):
-            relation = choice(relations)
-            
-            # Generate appropriate names based on relation
-            if relation == 'spouse':
-                # Spouse has opposite gender
-                first_name = choice(FIRST_NAMES_FEMALE if user.first_name in FIRST_NAMES_MALE else FIRST_NAMES_MALE)
-                # Spouse might have same last name
-                last_name = user.last_name if randint(0, 1) else choice(LAST_NAMES)
-                birth_year = randint(1970, 1990)
-            elif relation == 'child':
-                # Child can be any gender
-                first_name = choice(FIRST_NAMES_MALE + FIRST_NAMES_FEMALE)
-                last_name = user.last_name
-                birth_year = randint(2005, 2018)
-            elif relation == 'parent':
-                # Parent is older
-                first_name = choice(FIRST_NAMES_MALE + FIRST_NAMES_FEMALE)
-                last_name = user.last_name if randint(0, 1) else choice(LAST_NAMES)
-                birth_year = randint(1950, 1970)
-            else:  # sibling or other
-                first_name = choice(FIRST_NAMES_MALE + FIRST_NAMES_FEMALE)
-                last_name = user.last_name if relation == 'sibling' else choice(LAST_NAMES)
-                birth_year = randint(1975, 2000)
-            
-            national_code = generate_national_id()
-            birth_date = datetime(birth_year, randint(1, 12), randint(1, 28)).date()
-            
-            Person.objects.create(
-                user=user,
-                first_name=first_name,
-                last_name=last_name,
-                national_code=national_code,
-                birth_date=birth_date,
-                relation=relation
-            )
-            total_persons += 1
-    
-    print(f"✅ Successfully created {total_persons} persons")
+    bulk_insert(Person, persons)
+    print(f"✅ Successfully created {len(persons)} persons")
+    return persons
 
 
-def create_insurance_registrations(users):
+def create_insurance_registrations(users, persons=None):
     """Create insurance registrations for users."""
     print(f"\n📋 Creating insurance registrations...")
     
-    plans = list(InsurancePlan.objects.filter(is_active=True))
-    schools = list(School.objects.all())
+    plan_ids = list(InsurancePlan.objects.filter(is_active=True).values_list('id', flat=True))
+    school_ids = list(School.objects.values_list('id', flat=True))
     
-    if not plans:
+    if not plan_ids:
         print("❌ No insurance plans found. Please run seed_data.py first.")
         return
     
-    if not schools:
+    if not school_ids:
         print("❌ No schools found. Please run seed_data.py first.")
         return
     
-    statuses = ['pending', 'approved', 'rejected', 'active', 'expired']
-    total_registrations = 0
+    if persons is None:
+        persons = Person.objects.filter(user__in=users).only('id', 'user_id')
+    persons_by_user = defaultdict(list)
+    for person in persons:
+        persons_by_user[person.user_id].append(person.id)
     
+    now = timezone.now()
+    registrations = []
+    covered = []
     for user in users:
         # Each user gets 0-2 registrations
-        num_registrations = randint(0, 2)
-        
-        for _ in range(num_registrations):
-            plan = choice(plans)
-            school = choice(schools)
-            status = choice(statuses)
+        for _ in range(randint(0, 2)):
+            status = choice(STATUSES)
             
             # Registration date in the past 6 months
-            days_ago = randint(1, 180)
-            registration_date = datetime.now() - timedelta(days=days_ago)
+            registration_date = now - timedelta(days=randint(1, 180))
             
             # Start date is usually after registration
-            start_date = registration_date + timedelta(days=randint(1, 30))
+            start_date = (registration_date + timedelta(days=randint(1, 30))).date()
             
             # End date is 1 year after start
             end_date = start_date + timedelta(days=365) if status in ['active', 'expired'] else None
             
-            registration = InsuranceRegistration.objects.create(
-                user=user,
-                plan=plan,
-                school=school,
+            registration = InsuranceRegistration(
+                user_id=user.id,
+                plan_id=choice(plan_ids),
+                school_id=choice(school_ids),
                 status=status,
                 registration_date=registration_date,
                 start_date=start_date,
                 end_date=end_date
             )
+            registrations.append(registration)
             
             # Add some persons to the registration (0-3 persons)
-            user_persons = list(Person.objects.filter(user=user))
-            if user_persons:
-                num_persons = min(randint(0, 3), len(user_persons))
-                selected_persons = sample(user_persons, num_persons)
-                registration.persons.set(selected_persons)
-            
-            total_registrations += 1
+            user_persons = persons_by_user.get(user.id, [])
+            num_persons = min(randint(0, 3), len(user_persons))
+            covered.extend((registration.id, person_id) for person_id in sample(user_persons, num_persons))
+    
+    Through = InsuranceRegistration.persons.through
+    bulk_insert(InsuranceRegistration, registrations)
+    bulk_insert(Through, (
+        Through(insuranceregistration_id=registration_id, person_id=person_id)
+        for registration_id, person_id in covered
+    ))
     
-    print(f"✅ Successfully created {total_registrations} insurance registrations")
+    print(f"✅ Successfully created {len(registrations)} insurance registrations")
     
     # Print statistics
     print("\n📊 Registration Statistics:")
-    for status in statuses:
-        count = InsuranceRegistration.objects.filter(status=status).count()
+    for status, count in count_by(InsuranceRegistration.objects.all(), 'status', STATUSES).items():
         print(f"   {status}: {count}")
 
 
+def seed_sample_population(count, chunk_size=20000):
+    """
+    Create ``count`` users with persons and registrations in chunks.
+    
+    Chunking keeps memory flat for million-row perf environments; large
+    chunks are loaded with COPY on PostgreSQL.
+    """
+    password_hash = make_password(SAMPLE_PASSWORD)
+    created = 0
+    while created < count:
+        size = min(chunk_size, count - created)
+        with transaction.atomic():
+            users = create_sample_users(size, password_hash)
+            persons = create_persons_for_users(users)
+            create_insurance_registrations(users, persons)
+        created += size
+        print(f"   ⏱️  {created}/{count} users seeded")
+    
+    # Bulk inserts bypass the signals that keep cached stats fresh
+    cache.invalidate('stats')
+
+
 def create_admin_users(count=3):
     """Create additional admin users for testing."""
     print(f"\n👑 Creating {count} admin users...")
@@ -232,17 +276,13 @@ def print_summary():
     total_persons = Person.objects.count()
     print(f"\n👨‍👩‍👧‍👦 Persons: {total_persons}")
     
-    relations = Person.objects.values_list('relation', flat=True).distinct()
-    for relation in relations:
-        count = Person.objects.filter(relation=relation).count()
+    for relation, count in count_by(Person.objects.all(), 'relation').items():
         print(f"   {relation}: {count}")
     
     total_registrations = InsuranceRegistration.objects.count()
     print(f"\n📋 Insurance Registrations: {total_registrations}")
     
-    statuses = InsuranceRegistration.objects.values_list('status', flat=True).distinct()
-    for status in statuses:
-        count = InsuranceRegistration.objects.filter(status=status).count()
+    for status, count in count_by(InsuranceRegistration.objects.all(), 'status').items():
         print(f"   {status}: {count}")
     
     total_plans = InsurancePlan.objects.count()
@@ -261,20 +301,19 @@ def print_summary():
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Seed sample users, persons and registrations.')
+    parser.add_argument('--users', type=int, default=50, help='number of sample users')
+    parser.add_argument('--chunk-size', type=int, default=20000, help='users inserted per transaction')
+    args = parser.parse_args()
+    
     print("🌱 Starting enhanced data seeding...")
     print("=" * 60)
     
     # Create admin users
     create_admin_users(3)
     
-    # Create regular users
-    users = create_sample_users(50)
-    
-    # Create persons for users
-    create_persons_for_users(users)
-    
-    # Create insurance registrations
-    create_insurance_registrations(users)
+    # Create regular users with their persons and registrations
+    seed_sample_population(args.users, args.chunk_size)
     
     # Print summary
     print_summary()
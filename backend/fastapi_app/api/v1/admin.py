@@ -1,14 +1,31 @@
 """
 Admin API endpoints for managing insurance plans, coverages, and locations.
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+import io
+from typing import Dict, List
+from asgiref.sync import sync_to_async
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
 from pydantic import BaseModel, UUID4, Field
 from apps.insurance.models import InsurancePlan, PlanCoverage, InsuranceRegistration
+from apps.insurance import tasks as registration_tasks
+from apps.insurance.importer import ClaimImportError, import_claims
+from apps.insurance.serializers import registration_details, serialize_registration_details
+from apps.insurance.transitions import bulk_transition
+from apps.locations.importer import LocationImportError, import_locations
 from apps.locations.models import State, City, County, Region, District, School
+from apps.users.importer import EnrollmentImportError, import_enrollments
 from apps.users.models import User, Person
-from core.dependencies import get_current_admin_user
-from datetime import date
+from apps.users.serializers import serialize_person, serialize_persons
+from apps.common import cache, jobs
+from apps.common.queries import count_by
+from core.dependencies import TokenUser, get_current_admin_user
+from core.passwords import hash_password
+from core.responses import trusted_response
+from api.v1.insurance import RegistrationFullResponse
+from datetime import date, datetime
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
 
 router = APIRouter()
 
@@ -79,7 +96,7 @@ class CoverageResponse(BaseModel):
 @router.post("/plans", response_model=PlanResponse, status_code=status.HTTP_201_CREATED)
 def create_plan(
     data: CreatePlanRequest,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Create a new insurance plan (Admin only)."""
     if InsurancePlan.objects.filter(name_fa=data.name_fa).exists():
@@ -107,29 +124,29 @@ def create_plan(
 
 
 @router.get("/plans", response_model=List[PlanResponse])
-def get_all_plans(current_user: User = Depends(get_current_admin_user)):
+def get_all_plans(current_user: TokenUser = Depends(get_current_admin_user)):
     """Get all insurance plans (Admin only)."""
     plans = InsurancePlan.objects.all()
     
-    return [
-        PlanResponse(
-            id=str(plan.id),
-            name_fa=plan.name_fa,
-            plan_type=plan.plan_type,
-            description_fa=plan.description_fa,
-            monthly_premium=float(plan.monthly_premium),
-            is_active=plan.is_active,
-            created_at=plan.created_at.isoformat()
-        )
+    return trusted_response([
+        {
+            'id': str(plan.id),
+            'name_fa': plan.name_fa,
+            'plan_type': plan.plan_type,
+            'description_fa': plan.description_fa,
+            'monthly_premium': float(plan.monthly_premium),
+            'is_active': plan.is_active,
+            'created_at': plan.created_at.isoformat(),
+        }
         for plan in plans
-    ]
+    ])
 
 
 @router.put("/plans/{plan_id}", response_model=PlanResponse)
 def update_plan(
     plan_id: UUID4,
     data: UpdatePlanRequest,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Update an insurance plan (Admin only)."""
     try:
@@ -167,7 +184,7 @@ def update_plan(
 @router.delete("/plans/{plan_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_plan(
     plan_id: UUID4,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Deactivate an insurance plan (Admin only)."""
     try:
@@ -185,7 +202,7 @@ def delete_plan(
 @router.post("/coverages", response_model=CoverageResponse, status_code=status.HTTP_201_CREATED)
 def create_coverage(
     data: CreateCoverageRequest,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Create a new plan coverage (Admin only)."""
     try:
@@ -226,31 +243,31 @@ def create_coverage(
 
 
 @router.get("/coverages", response_model=List[CoverageResponse])
-def get_all_coverages(current_user: User = Depends(get_current_admin_user)):
+def get_all_coverages(current_user: TokenUser = Depends(get_current_admin_user)):
     """Get all plan coverages (Admin only)."""
     coverages = PlanCoverage.objects.all().select_related('plan')
     
-    return [
-        CoverageResponse(
-            id=str(cov.id),
-            plan_id=str(cov.plan_id),
-            coverage_type=cov.coverage_type,
-            title_fa=cov.title_fa,
-            description_fa=cov.description_fa,
-            coverage_amount=float(cov.coverage_amount),
-            coverage_percentage=cov.coverage_percentage,
-            max_usage_count=cov.max_usage_count,
-            is_active=cov.is_active
-        )
+    return trusted_response([
+        {
+            'id': str(cov.id),
+            'plan_id': str(cov.plan_id),
+            'coverage_type': cov.coverage_type,
+            'title_fa': cov.title_fa,
+            'description_fa': cov.description_fa,
+            'coverage_amount': float(cov.coverage_amount),
+            'coverage_percentage': cov.coverage_percentage,
+            'max_usage_count': cov.max_usage_count,
+            'is_active': cov.is_active,
+        }
         for cov in coverages
-    ]
+    ])
 
 
 @router.put("/coverages/{coverage_id}", response_model=CoverageResponse)
 def update_coverage(
     coverage_id: UUID4,
     data: UpdateCoverageRequest,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Update a plan coverage (Admin only)."""
     try:
@@ -292,7 +309,7 @@ def update_coverage(
 @router.delete("/coverages/{coverage_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_coverage(
     coverage_id: UUID4,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Delete a plan coverage (Admin only)."""
     try:
@@ -341,7 +358,7 @@ class SchoolResponse(BaseModel):
 @router.post("/schools", response_model=SchoolResponse, status_code=status.HTTP_201_CREATED)
 def create_school(
     data: CreateSchoolRequest,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Create a new school (Admin only)."""
     try:
@@ -381,31 +398,31 @@ def create_school(
 
 
 @router.get("/schools", response_model=List[SchoolResponse])
-def get_all_schools(current_user: User = Depends(get_current_admin_user)):
+def get_all_schools(current_user: TokenUser = Depends(get_current_admin_user)):
     """Get all schools (Admin only)."""
     schools = School.objects.select_related('district').all()
     
-    return [
-        SchoolResponse(
-            id=str(school.id),
-            district_id=str(school.district_id),
-            district_name=school.district.name_fa,
-            name_fa=school.name_fa,
-            code=school.code,
-            school_type=school.school_type,
-            address=school.address,
-            phone=school.phone,
-            created_at=school.created_at.isoformat()
-        )
+    return trusted_response([
+        {
+            'id': str(school.id),
+            'district_id': str(school.district_id),
+            'district_name': school.district.name_fa,
+            'name_fa': school.name_fa,
+            'code': school.code,
+            'school_type': school.school_type,
+            'address': school.address,
+            'phone': school.phone,
+            'created_at': school.created_at.isoformat(),
+        }
         for school in schools
-    ]
+    ])
 
 
 @router.put("/schools/{school_id}", response_model=SchoolResponse)
 def update_school(
     school_id: UUID4,
     data: UpdateSchoolRequest,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Update a school (Admin only)."""
     try:
@@ -451,7 +468,7 @@ def update_school(
 @router.delete("/schools/{school_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_school(
     school_id: UUID4,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Delete a school (Admin only)."""
     try:
@@ -488,7 +505,7 @@ class StateResponse(BaseModel):
 @router.post("/states", response_model=StateResponse, status_code=status.HTTP_201_CREATED)
 def create_state(
     data: CreateStateRequest,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Create a new state (Admin only)."""
     if State.objects.filter(code=data.code).exists():
@@ -514,7 +531,7 @@ def create_state(
 def update_state(
     state_id: UUID4,
     data: UpdateStateRequest,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Update a state (Admin only)."""
     try:
@@ -546,7 +563,7 @@ def update_state(
 
 
 @router.get("/states", response_model=List[StateResponse])
-def get_all_states_admin(current_user: User = Depends(get_current_admin_user)):
+def get_all_states_admin(current_user: TokenUser = Depends(get_current_admin_user)):
     """Get all states (Admin only)."""
     states = State.objects.all().order_by('name_fa')
     
@@ -564,7 +581,7 @@ def get_all_states_admin(current_user: User = Depends(get_current_admin_user)):
 @router.delete("/states/{state_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_state(
     state_id: UUID4,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Delete a state (Admin only)."""
     try:
@@ -604,7 +621,7 @@ class CityResponse(BaseModel):
 @router.post("/cities", response_model=CityResponse, status_code=status.HTTP_201_CREATED)
 def create_city(
     data: CreateCityRequest,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Create a new city (Admin only)."""
     try:
@@ -641,7 +658,7 @@ def create_city(
 def update_city(
     city_id: UUID4,
     data: UpdateCityRequest,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Update a city (Admin only)."""
     try:
@@ -675,7 +692,7 @@ def update_city(
 
 
 @router.get("/cities", response_model=List[CityResponse])
-def get_all_cities_admin(current_user: User = Depends(get_current_admin_user)):
+def get_all_cities_admin(current_user: TokenUser = Depends(get_current_admin_user)):
     """Get all cities (Admin only)."""
     cities = City.objects.select_related('state').all().order_by('name_fa')
     
@@ -695,7 +712,7 @@ def get_all_cities_admin(current_user: User = Depends(get_current_admin_user)):
 @router.delete("/cities/{city_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_city(
     city_id: UUID4,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Delete a city (Admin only)."""
     try:
@@ -735,7 +752,7 @@ class CountyResponse(BaseModel):
 @router.post("/counties", response_model=CountyResponse, status_code=status.HTTP_201_CREATED)
 def create_county(
     data: CreateCountyRequest,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Create a new county (Admin only)."""
     try:
@@ -772,7 +789,7 @@ def create_county(
 def update_county(
     county_id: UUID4,
     data: UpdateCountyRequest,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Update a county (Admin only)."""
     try:
@@ -806,7 +823,7 @@ def update_county(
 
 
 @router.get("/counties", response_model=List[CountyResponse])
-def get_all_counties_admin(current_user: User = Depends(get_current_admin_user)):
+def get_all_counties_admin(current_user: TokenUser = Depends(get_current_admin_user)):
     """Get all counties (Admin only)."""
     counties = County.objects.select_related('city').all().order_by('name_fa')
     
@@ -826,7 +843,7 @@ def get_all_counties_admin(current_user: User = Depends(get_current_admin_user))
 @router.delete("/counties/{county_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_county(
     county_id: UUID4,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Delete a county (Admin only)."""
     try:
@@ -866,7 +883,7 @@ class RegionResponse(BaseModel):
 @router.post("/regions", response_model=RegionResponse, status_code=status.HTTP_201_CREATED)
 def create_region(
     data: CreateRegionRequest,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Create a new region (Admin only)."""
     try:
@@ -903,7 +920,7 @@ def create_region(
 def update_region(
     region_id: UUID4,
     data: UpdateRegionRequest,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Update a region (Admin only)."""
     try:
@@ -937,7 +954,7 @@ def update_region(
 
 
 @router.get("/regions", response_model=List[RegionResponse])
-def get_all_regions_admin(current_user: User = Depends(get_current_admin_user)):
+def get_all_regions_admin(current_user: TokenUser = Depends(get_current_admin_user)):
     """Get all regions (Admin only)."""
     regions = Region.objects.select_related('county').all().order_by('name_fa')
     
@@ -957,7 +974,7 @@ def get_all_regions_admin(current_user: User = Depends(get_current_admin_user)):
 @router.delete("/regions/{region_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_region(
     region_id: UUID4,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Delete a region (Admin only)."""
     try:
@@ -997,7 +1014,7 @@ class DistrictResponse(BaseModel):
 @router.post("/districts", response_model=DistrictResponse, status_code=status.HTTP_201_CREATED)
 def create_district(
     data: CreateDistrictRequest,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Create a new district (Admin only)."""
     try:
@@ -1034,7 +1051,7 @@ def create_district(
 def update_district(
     district_id: UUID4,
     data: UpdateDistrictRequest,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Update a district (Admin only)."""
     try:
@@ -1068,7 +1085,7 @@ def update_district(
 
 
 @router.get("/districts", response_model=List[DistrictResponse])
-def get_all_districts_admin(current_user: User = Depends(get_current_admin_user)):
+def get_all_districts_admin(current_user: TokenUser = Depends(get_current_admin_user)):
     """Get all districts (Admin only)."""
     districts = District.objects.select_related('region').all().order_by('name_fa')
     
@@ -1088,7 +1105,7 @@ def get_all_districts_admin(current_user: User = Depends(get_current_admin_user)
 @router.delete("/districts/{district_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_district(
     district_id: UUID4,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Delete a district (Admin only)."""
     try:
@@ -1101,6 +1118,41 @@ def delete_district(
         )
 
 
+# Location Import
+class LocationImportRowError(BaseModel):
+    row: int
+    school_code: str
+    errors: List[str]
+
+
+class LocationImportReport(BaseModel):
+    rows: int
+    imported: int
+    failed: int
+    upserted: Dict[str, int]
+    errors: List[LocationImportRowError]
+
+
+@router.post("/locations/import", response_model=LocationImportReport)
+def import_locations_csv(
+    file: UploadFile = File(...),
+    current_user: TokenUser = Depends(get_current_admin_user)
+):
+    """Bulk upsert schools and their location hierarchy from a CSV file (Admin only)."""
+    stream = io.TextIOWrapper(file.file, encoding='utf-8-sig', newline='')
+    try:
+        report = import_locations(stream)
+    except LocationImportError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+    finally:
+        stream.detach()
+    
+    return trusted_response(report)
+
+
 # Admin Statistics
 class AdminStatsResponse(BaseModel):
     total_users: int
@@ -1121,7 +1173,7 @@ class AdminStatsResponse(BaseModel):
 
 
 @router.get("/stats", response_model=AdminStatsResponse)
-def get_admin_statistics(current_user: User = Depends(get_current_admin_user)):
+def get_admin_statistics(current_user: TokenUser = Depends(get_current_admin_user)):
     """Get admin dashboard statistics (Admin only)."""
     
     # Basic counts
@@ -1132,10 +1184,11 @@ def get_admin_statistics(current_user: User = Depends(get_current_admin_user)):
     total_registrations = InsuranceRegistration.objects.count()
     
     # Registration status counts
-    pending_registrations = InsuranceRegistration.objects.filter(status='pending').count()
-    approved_registrations = InsuranceRegistration.objects.filter(status='approved').count()
-    active_registrations = InsuranceRegistration.objects.filter(status='active').count()
-    rejected_registrations = InsuranceRegistration.objects.filter(status='rejected').count()
+    status_counts = count_by(InsuranceRegistration.objects.all(), 'status')
+    pending_registrations = status_counts.get('pending', 0)
+    approved_registrations = status_counts.get('approved', 0)
+    active_registrations = status_counts.get('active', 0)
+    rejected_registrations = status_counts.get('rejected', 0)
     
     # Location counts
     total_schools = School.objects.count()
@@ -1144,12 +1197,11 @@ def get_admin_statistics(current_user: User = Depends(get_current_admin_user)):
     
     # Registrations by plan
     registrations_by_plan = []
-    for plan in InsurancePlan.objects.all():
-        count = InsuranceRegistration.objects.filter(plan=plan).count()
+    for plan in InsurancePlan.objects.annotate(registration_count=Count('registrations')).order_by('plan_type', 'name_fa'):
         registrations_by_plan.append({
             'plan_name': plan.name_fa,
             'plan_type': plan.plan_type,
-            'count': count
+            'count': plan.registration_count
         })
     
     # Registrations by status
@@ -1193,6 +1245,69 @@ def get_admin_statistics(current_user: User = Depends(get_current_admin_user)):
     )
 
 
+# Cache Management
+CACHE_NAMESPACES = ['plans', 'locations', 'stats']
+
+
+@router.get("/cache", response_model=dict)
+def get_cache_stats(current_user: TokenUser = Depends(get_current_admin_user)):
+    """Get cache hit/miss statistics (Admin only)."""
+    return cache.stats()
+
+
+@router.post("/cache/{namespace}/invalidate", response_model=dict)
+def invalidate_cache(
+    namespace: str,
+    current_user: TokenUser = Depends(get_current_admin_user)
+):
+    """Invalidate every cached entry in a namespace (Admin only)."""
+    if namespace not in CACHE_NAMESPACES:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"فضای نام کش نامعتبر است. مقادیر معتبر: {', '.join(CACHE_NAMESPACES)}"
+        )
+    
+    cache.invalidate(namespace)
+    
+    return {
+        "message": "کش با موفقیت پاک شد",
+        "namespace": namespace
+    }
+
+
+# Background Jobs
+@router.get("/jobs", response_model=dict)
+def get_job_stats(current_user: TokenUser = Depends(get_current_admin_user)):
+    """Get background job queue statistics and recent failures (Admin only)."""
+    stats = jobs.queue_stats()
+    stats['recent_failures'] = [
+        {
+            'id': job.id,
+            'name': job.name,
+            'attempts': job.attempts,
+            'last_error': job.last_error,
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        }
+        for job in jobs.Job.objects.filter(status='failed').order_by('-finished_at')[:20]
+    ]
+    return trusted_response(stats)
+
+
+@router.post("/jobs/{job_id}/retry", response_model=dict)
+def retry_job(
+    job_id: int,
+    current_user: TokenUser = Depends(get_current_admin_user)
+):
+    """Queue a failed background job again (Admin only)."""
+    if not jobs.requeue(job_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="کار ناموفقی با این شناسه یافت نشد"
+        )
+    
+    return {"message": "کار دوباره در صف قرار گرفت", "id": job_id}
+
+
 # Registration Management
 class RegistrationDetailResponse(BaseModel):
     id: str
@@ -1213,18 +1328,53 @@ class RegistrationDetailResponse(BaseModel):
     end_date: str | None
 
 
+class RegistrationUserResponse(BaseModel):
+    id: str
+    name: str
+    email: str | None
+    national_id: str
+    phone: str | None
+
+
+class AdminRegistrationFullResponse(RegistrationFullResponse):
+    user: RegistrationUserResponse
+
+
 class UpdateRegistrationStatusRequest(BaseModel):
     status: str = Field(..., description="pending, approved, active, rejected, cancelled")
     start_date: str | None = None
     end_date: str | None = None
 
 
+BULK_STATUS_LIMIT = 5000
+
+
+class BulkRegistrationStatusRequest(BaseModel):
+    ids: List[UUID4] = Field(..., min_length=1, max_length=BULK_STATUS_LIMIT)
+    status: str = Field(..., description="approved, active, rejected, cancelled, expired, pending")
+    start_date: date | None = Field(None, description="active: defaults to today where unset")
+    end_date: date | None = Field(None, description="active: defaults to one year after the start where unset")
+
+
+class SkippedRegistration(BaseModel):
+    id: str
+    status: str
+
+
+class BulkRegistrationStatusResponse(BaseModel):
+    status: str
+    updated: int
+    unchanged: int
+    skipped: List[SkippedRegistration]
+    not_found: List[str]
+
+
 @router.get("/registrations", response_model=List[dict])
-def get_all_registrations(current_user: User = Depends(get_current_admin_user)):
+def get_all_registrations(current_user: TokenUser = Depends(get_current_admin_user)):
     """Get all registrations (Admin only)."""
     registrations = InsuranceRegistration.objects.select_related('user', 'plan', 'school').order_by('-registration_date')
     
-    return [
+    return trusted_response([
         {
             'id': str(reg.id),
             'user_name': f"{reg.user.first_name} {reg.user.last_name}",
@@ -1234,13 +1384,13 @@ def get_all_registrations(current_user: User = Depends(get_current_admin_user)):
             'registration_date': reg.registration_date.isoformat()
         }
         for reg in registrations
-    ]
+    ])
 
 
 @router.get("/registrations/{registration_id}", response_model=RegistrationDetailResponse)
 def get_registration_detail(
     registration_id: UUID4,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Get registration details (Admin only)."""
     try:
@@ -1253,7 +1403,7 @@ def get_registration_detail(
     
     return RegistrationDetailResponse(
         id=str(reg.id),
-        user_id=str(reg.user.id),
+        user_id=str(reg.user_id),
         user_name=f"{reg.user.first_name} {reg.user.last_name}",
         user_email=reg.user.email,
         user_national_id=reg.user.national_id,
@@ -1271,48 +1421,184 @@ def get_registration_detail(
     )
 
 
-@router.put("/registrations/{registration_id}/status")
-def update_registration_status(
+@router.get("/registrations/{registration_id}/full", response_model=AdminRegistrationFullResponse)
+def get_registration_full_detail(
     registration_id: UUID4,
-    data: UpdateRegistrationStatusRequest,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
-    """Update registration status (Admin only)."""
-    try:
-        reg = InsuranceRegistration.objects.get(id=registration_id)
-    except InsuranceRegistration.DoesNotExist:
+    """Get a registration with its user, plan, school location, covered persons and documents (Admin only)."""
+    reg = registration_details().filter(id=registration_id).first()
+    if reg is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="ثبت‌نام یافت نشد"
         )
     
-    # Validate status
-    valid_statuses = ['pending', 'approved', 'active', 'rejected', 'cancelled', 'expired']
-    if data.status not in valid_statuses:
+    return trusted_response(serialize_registration_details(reg, with_user=True))
+
+
+@router.put("/registrations/{registration_id}/status")
+def update_registration_status(
+    registration_id: UUID4,
+    data: UpdateRegistrationStatusRequest,
+    current_user: TokenUser = Depends(get_current_admin_user)
+):
+    """
+    Update registration status (Admin only).
+    
+    Goes through the same state machine as the bulk endpoint: a status
+    the registration may not move to is refused with 409. Sending the
+    current status only updates the given dates. The audit entry and the
+    notification to the registrant are queued for the job worker.
+    """
+    if data.status not in InsuranceRegistration.TRANSITIONS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"وضعیت نامعتبر است. وضعیت‌های معتبر: {', '.join(valid_statuses)}"
+            detail=f"وضعیت نامعتبر است. وضعیت‌های معتبر: {', '.join(InsuranceRegistration.TRANSITIONS)}"
         )
     
-    reg.status = data.status
+    try:
+        start_date = datetime.fromisoformat(data.start_date.replace('Z', '+00:00')).date() if data.start_date else None
+        end_date = datetime.fromisoformat(data.end_date.replace('Z', '+00:00')).date() if data.end_date else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="فرمت تاریخ نامعتبر است"
+        )
+    if start_date and end_date and end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="تاریخ پایان نمی‌تواند قبل از تاریخ شروع باشد"
+        )
     
-    # Update dates if provided
-    if data.start_date:
-        from datetime import datetime
-        reg.start_date = datetime.fromisoformat(data.start_date.replace('Z', '+00:00'))
+    with transaction.atomic():
+        report = bulk_transition(
+            [registration_id], data.status,
+            start_date=start_date, end_date=end_date, changed_by=current_user.id,
+        )
+        # Same status: only the dates change
+        dates = {field: value for field, value in (('start_date', start_date), ('end_date', end_date)) if value}
+        if report['unchanged'] and dates:
+            InsuranceRegistration.objects.filter(id=registration_id).update(updated_at=timezone.now(), **dates)
     
-    if data.end_date:
-        from datetime import datetime
-        reg.end_date = datetime.fromisoformat(data.end_date.replace('Z', '+00:00'))
+    if report['not_found']:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="ثبت‌نام یافت نشد"
+        )
+    if report['skipped']:
+        labels = dict(InsuranceRegistration.STATUS_CHOICES)
+        current_status = report['skipped'][0]['status']
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"تغییر وضعیت از «{labels[current_status]}» به «{labels[data.status]}» مجاز نیست"
+        )
     
-    reg.save()
+    if report['updated'] or (report['unchanged'] and dates):
+        cache.invalidate('stats')
     
     return {
         "message": "وضعیت ثبت‌نام با موفقیت به‌روزرسانی شد",
-        "status": reg.status
+        "status": data.status
     }
 
 
+@router.post("/registrations/status", response_model=BulkRegistrationStatusResponse)
+def bulk_update_registration_status(
+    data: BulkRegistrationStatusRequest,
+    current_user: TokenUser = Depends(get_current_admin_user)
+):
+    """
+    Move many registrations to one status (Admin only).
+    
+    Follows the status state machine (pending → approved → active →
+    expired, with rejection and cancellation along the way). Rows already
+    in the target status are counted as unchanged, so retrying a request
+    is safe; rows that may not move to it are returned in ``skipped``.
+    """
+    if data.status not in InsuranceRegistration.TRANSITIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"وضعیت نامعتبر است. وضعیت‌های معتبر: {', '.join(InsuranceRegistration.TRANSITIONS)}"
+        )
+    if data.start_date and data.end_date and data.end_date < data.start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="تاریخ پایان نمی‌تواند قبل از تاریخ شروع باشد"
+        )
+    
+    report = bulk_transition(
+        data.ids, data.status,
+        start_date=data.start_date, end_date=data.end_date, changed_by=current_user.id,
+    )
+    
+    if report['updated']:
+        cache.invalidate('stats')
+    
+    return trusted_response(dict(report, status=data.status))
+
+
+# Claims Ledger
+class ClaimImportRowResult(BaseModel):
+    row: int
+    external_ref: str
+    status: str
+    reimbursed_amount: int
+    reason: str | None = None
+    reason_display: str | None = None
+    errors: List[str]
+
+
+class ClaimImportReport(BaseModel):
+    rows: int
+    accepted: int
+    rejected: int
+    duplicate: int
+    failed: int
+    reimbursed_amount: int
+    results: List[ClaimImportRowResult]
+
+
+class RebuildCountersRequest(BaseModel):
+    registration_ids: List[UUID4] | None = Field(None, max_length=5000, description="default: all registrations")
+
+
+@router.post("/claims/import", response_model=ClaimImportReport)
+def import_claims_csv(
+    file: UploadFile = File(...),
+    current_user: TokenUser = Depends(get_current_admin_user)
+):
+    """
+    Record claims from a CSV file and update the usage counters (Admin only).
+    
+    Each claim is accepted or rejected against its plan's coverage limits;
+    rows whose ``external_ref`` is already recorded are reported as
+    duplicates, so a file can be re-sent safely.
+    """
+    stream = io.TextIOWrapper(file.file, encoding='utf-8-sig', newline='')
+    try:
+        report = import_claims(stream)
+    except ClaimImportError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+    finally:
+        stream.detach()
+    
+    return trusted_response(report)
+
+
+@router.post("/claims/rebuild-counters", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+def rebuild_claim_counters(
+    data: RebuildCountersRequest,
+    current_user: TokenUser = Depends(get_current_admin_user)
+):
+    """Queue a rebuild of the coverage usage counters from the claims ledger (Admin only)."""
+    job = registration_tasks.rebuild_counters_later(data.registration_ids)
+    return {"message": "بازسازی شمارنده‌های مصرف در صف قرار گرفت", "job_id": job.id}
+
+
 # Person Management Endpoints
 class PersonAdminResponse(BaseModel):
     id: str
@@ -1337,35 +1623,18 @@ class PersonAdminResponse(BaseModel):
 def get_all_persons_admin(
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Get all persons (Admin only)."""
-    persons = Person.objects.select_related('user').all().order_by('-created_at')[skip:skip + limit]
+    persons = Person.objects.order_by('-created_at')[skip:skip + limit]
     
-    return [
-        PersonAdminResponse(
-            id=str(person.id),
-            user_id=str(person.user.id),
-            user_name=f"{person.user.first_name} {person.user.last_name}",
-            user_national_id=person.user.national_id,
-            first_name=person.first_name,
-            last_name=person.last_name,
-            national_code=person.national_code,
-            birth_date=person.birth_date.isoformat(),
-            relation=person.relation,
-            relation_display=person.get_relation_display_fa(),
-            age=person.get_age(),
-            created_at=person.created_at.isoformat(),
-            updated_at=person.updated_at.isoformat()
-        )
-        for person in persons
-    ]
+    return trusted_response(serialize_persons(persons, with_owner=True))
 
 
 @router.get("/persons/{person_id}", response_model=PersonAdminResponse)
 def get_person_admin(
     person_id: UUID4,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Get a specific person by ID (Admin only)."""
     try:
@@ -1377,26 +1646,17 @@ def get_person_admin(
         )
     
     return PersonAdminResponse(
-        id=str(person.id),
-        user_id=str(person.user.id),
+        **serialize_person(person),
+        user_id=str(person.user_id),
         user_name=f"{person.user.first_name} {person.user.last_name}",
         user_national_id=person.user.national_id,
-        first_name=person.first_name,
-        last_name=person.last_name,
-        national_code=person.national_code,
-        birth_date=person.birth_date.isoformat(),
-        relation=person.relation,
-        relation_display=person.get_relation_display_fa(),
-        age=person.get_age(),
-        created_at=person.created_at.isoformat(),
-        updated_at=person.updated_at.isoformat()
     )
 
 
 @router.delete("/persons/{person_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_person_admin(
     person_id: UUID4,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Delete a person (Admin only)."""
     try:
@@ -1412,7 +1672,7 @@ def delete_person_admin(
 @router.get("/users/{user_id}/persons", response_model=List[PersonAdminResponse])
 def get_user_persons_admin(
     user_id: UUID4,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Get all persons for a specific user (Admin only)."""
     try:
@@ -1425,24 +1685,7 @@ def get_user_persons_admin(
     
     persons = Person.objects.filter(user=user).order_by('-created_at')
     
-    return [
-        PersonAdminResponse(
-            id=str(person.id),
-            user_id=str(person.user.id),
-            user_name=f"{person.user.first_name} {person.user.last_name}",
-            user_national_id=person.user.national_id,
-            first_name=person.first_name,
-            last_name=person.last_name,
-            national_code=person.national_code,
-            birth_date=person.birth_date.isoformat(),
-            relation=person.relation,
-            relation_display=person.get_relation_display_fa(),
-            age=person.get_age(),
-            created_at=person.created_at.isoformat(),
-            updated_at=person.updated_at.isoformat()
-        )
-        for person in persons
-    ]
+    return trusted_response(serialize_persons(persons, with_owner=True))
 
 
 # User Password Management Models
@@ -1462,24 +1705,32 @@ class UserPasswordResponse(BaseModel):
 
 
 # User Password Management Endpoints
-@router.put("/users/{user_id}/password", response_model=UserPasswordResponse)
-def update_user_password(
-    user_id: UUID4,
-    data: UpdateUserPasswordRequest,
-    current_user: User = Depends(get_current_admin_user)
-):
-    """Update a user's password (Admin only)."""
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+async def _set_user_password(user_id, password: str) -> User:
+    """
+    Store a new password for the user, hashed on the bounded password pool.
+    
+    The save bumps ``token_version``, so tokens issued before are revoked.
+    A full pool raises ``PasswordPoolBusy`` (503 with ``Retry-After``).
+    """
+    user = await sync_to_async(User.objects.filter(id=user_id).first)()
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="کاربر یافت نشد"
         )
-    
-    # Set new password
-    user.set_password(data.new_password)
-    user.save()
+    user.password = await hash_password(password)
+    await sync_to_async(user.save)(update_fields=['password', 'updated_at'])
+    return user
+
+
+@router.put("/users/{user_id}/password", response_model=UserPasswordResponse)
+async def update_user_password(
+    user_id: UUID4,
+    data: UpdateUserPasswordRequest,
+    current_user: TokenUser = Depends(get_current_admin_user)
+):
+    """Update a user's password (Admin only); hashed on the password pool like register."""
+    user = await _set_user_password(user_id, data.new_password)
     
     return UserPasswordResponse(
         user_id=str(user.id),
@@ -1490,23 +1741,13 @@ def update_user_password(
 
 
 @router.post("/users/{user_id}/reset-password", response_model=UserPasswordResponse)
-def reset_user_password(
+async def reset_user_password(
     user_id: UUID4,
     data: ResetUserPasswordRequest = ResetUserPasswordRequest(),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Reset a user's password to default (Admin only)."""
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="کاربر یافت نشد"
-        )
-    
-    # Reset to default password
-    user.set_password(data.default_password)
-    user.save()
+    user = await _set_user_password(user_id, data.default_password)
     
     return UserPasswordResponse(
         user_id=str(user.id),
@@ -1518,14 +1759,14 @@ def reset_user_password(
 
 @router.get("/users", response_model=List[dict])
 def get_all_users(
-    current_user: User = Depends(get_current_admin_user),
+    current_user: TokenUser = Depends(get_current_admin_user),
     skip: int = 0,
     limit: int = 100
 ):
     """Get all users (Admin only)."""
     users = User.objects.all().order_by('-created_at')[skip:skip + limit]
     
-    return [
+    return trusted_response([
         {
             'id': str(user.id),
             'national_id': user.national_id,
@@ -1538,13 +1779,13 @@ def get_all_users(
             'created_at': user.created_at.isoformat(),
         }
         for user in users
-    ]
+    ])
 
 
 @router.get("/users/{user_id}", response_model=dict)
 def get_user_by_id(
     user_id: UUID4,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Get a specific user by ID (Admin only)."""
     try:
@@ -1582,7 +1823,7 @@ class UpdateUserRequest(BaseModel):
 def update_user(
     user_id: UUID4,
     data: UpdateUserRequest,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Update user information (Admin only)."""
     try:
@@ -1627,4 +1868,48 @@ def update_user(
         'created_at': user.created_at.isoformat(),
         'updated_at': user.updated_at.isoformat(),
         'message': 'اطلاعات کاربر با موفقیت به‌روزرسانی شد'
-    }
\ No newline at end of file
+    }
+
+
+# Batch Enrolment Import
+class EnrollmentImportResult(BaseModel):
+    row: int
+    national_id: str
+    status: str
+    persons: int
+    errors: List[str]
+
+
+class EnrollmentImportReport(BaseModel):
+    records: int
+    users_created: int
+    persons_created: int
+    failed: int
+    results: List[EnrollmentImportResult]
+
+
+@router.post("/users/import", response_model=EnrollmentImportReport)
+def import_users(
+    file: UploadFile = File(...),
+    default_password: str | None = Form(None, min_length=8, max_length=100),
+    current_user: TokenUser = Depends(get_current_admin_user)
+):
+    """Bulk-create users and their dependents from a CSV or NDJSON file (Admin only)."""
+    name = (file.filename or '').lower()
+    is_ndjson = name.endswith(('.ndjson', '.jsonl')) or file.content_type == 'application/x-ndjson'
+    stream = io.TextIOWrapper(file.file, encoding='utf-8-sig', newline='')
+    try:
+        report = import_enrollments(
+            stream,
+            file_format='ndjson' if is_ndjson else 'csv',
+            default_password=default_password
+        )
+    except EnrollmentImportError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+    finally:
+        stream.detach()
+    
+    return trusted_response(report)
@@ -1,11 +1,14 @@
 """
 Authentication API endpoints.
 """
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, status, Depends
 from pydantic import BaseModel, EmailStr, Field
-from django.contrib.auth.hashers import check_password
+from asgiref.sync import sync_to_async
 from apps.users.models import User
-from core.security import create_access_token, create_refresh_token, decode_token
+from core.passwords import hash_password, needs_rehash, rehash_password, verify_password
+from core.ratelimit import client_ip, limiter
+from core.refresh_tokens import issue_refresh_token, revoke_refresh_family, rotate_refresh_token
+from core.security import create_access_token, decode_token, user_claims
 from core.dependencies import get_current_active_user
 
 router = APIRouter()
@@ -45,31 +48,36 @@ class UserResponse(BaseModel):
 
 
 @router.post("/register", response_model=TokenResponse, status_code=status.HTTP_201_CREATED)
-def register(data: RegisterRequest):
+async def register(data: RegisterRequest, request: Request):
     """Register a new user."""
-    if User.objects.filter(national_id=data.national_id).exists():
+    limiter.check("register", ip=client_ip(request), national_id=data.national_id)
+    
+    if await sync_to_async(User.objects.filter(national_id=data.national_id).exists)():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="کاربر با این کد ملی قبلاً ثبت‌نام کرده است"
         )
     
-    if data.email and User.objects.filter(email=data.email).exists():
+    if data.email and await sync_to_async(User.objects.filter(email=data.email).exists)():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="کاربر با این ایمیل قبلاً ثبت‌نام کرده است"
         )
     
-    user = User.objects.create_user(
+    # Hash on the password pool, then save without hashing again in create_user
+    password_hash = await hash_password(data.password)
+    
+    user = await sync_to_async(User.objects.create_user)(
         national_id=data.national_id,
         email=data.email,
-        password=data.password,
         first_name=data.first_name,
         last_name=data.last_name,
-        phone=data.phone
+        phone=data.phone,
+        password_hash=password_hash
     )
     
-    access_token = create_access_token(data={"sub": user.national_id})
-    refresh_token = create_refresh_token(data={"sub": user.national_id})
+    access_token = create_access_token(data=user_claims(user))
+    refresh_token = await sync_to_async(issue_refresh_token)(user)
     
     return TokenResponse(
         access_token=access_token,
@@ -78,17 +86,20 @@ def register(data: RegisterRequest):
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(data: LoginRequest):
+async def login(data: LoginRequest, request: Request, background_tasks: BackgroundTasks):
     """Login user."""
+    # Before the user lookup and password check, so throttled requests cost no hashing
+    limiter.check("login", ip=client_ip(request), national_id=data.national_id)
+    
     try:
-        user = User.objects.get(national_id=data.national_id)
+        user = await sync_to_async(User.objects.get)(national_id=data.national_id)
     except User.DoesNotExist:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="کد ملی یا رمز عبور اشتباه است"
         )
     
-    if not check_password(data.password, user.password):
+    if not await verify_password(data.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="کد ملی یا رمز عبور اشتباه است"
@@ -100,8 +111,12 @@ def login(data: LoginRequest):
             detail="حساب کاربری غیرفعال است"
         )
     
-    access_token = create_access_token(data={"sub": user.national_id})
-    refresh_token = create_refresh_token(data={"sub": user.national_id})
+    # Upgrade outdated hashes (old algorithm or cost) after responding
+    if needs_rehash(user.password):
+        background_tasks.add_task(rehash_password, user.id, data.password, user.password)
+    
+    access_token = create_access_token(data=user_claims(user))
+    refresh_token = await sync_to_async(issue_refresh_token)(user)
     
     return TokenResponse(
         access_token=access_token,
@@ -111,7 +126,7 @@ def login(data: LoginRequest):
 
 @router.post("/refresh", response_model=TokenResponse)
 def refresh_token(refresh_token: str):
-    """Refresh access token."""
+    """Rotate a refresh token: the presented token is consumed and replaced."""
     payload = decode_token(refresh_token)
     
     if payload is None or payload.get("type") != "refresh":
@@ -120,15 +135,15 @@ def refresh_token(refresh_token: str):
             detail="توکن نامعتبر است"
         )
     
-    national_id = payload.get("sub")
-    if not national_id:
+    rotated = rotate_refresh_token(payload)
+    if rotated is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="توکن نامعتبر است"
+            detail="توکن نامعتبر است، لطفاً دوباره وارد شوید"
         )
     
-    access_token = create_access_token(data={"sub": national_id})
-    new_refresh_token = create_refresh_token(data={"sub": national_id})
+    user, new_refresh_token = rotated
+    access_token = create_access_token(data=user_claims(user))
     
     return TokenResponse(
         access_token=access_token,
@@ -136,6 +151,14 @@ def refresh_token(refresh_token: str):
     )
 
 
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(refresh_token: str):
+    """Revoke the refresh token and every token rotated from the same login."""
+    payload = decode_token(refresh_token)
+    if payload is not None and payload.get("type") == "refresh":
+        revoke_refresh_family(payload)
+
+
 @router.get("/me", response_model=UserResponse)
 def get_current_user_info(current_user: User = Depends(get_current_active_user)):
     """Get current user information."""
@@ -231,8 +231,8 @@ async def get_user_documents(
                 mime_type=doc.mime_type,
                 is_verified=doc.is_verified,
                 created_at=doc.created_at,
-                registration_id=str(doc.registration.id) if doc.registration else None,
-                person_id=str(doc.person.id) if doc.person else None
+                registration_id=str(doc.registration_id) if doc.registration_id else None,
+                person_id=str(doc.person_id) if doc.person_id else None
             )
             for doc in documents
         ]
@@ -275,8 +275,8 @@ async def get_document(
         mime_type=document.mime_type,
         is_verified=document.is_verified,
         created_at=document.created_at,
-        registration_id=str(document.registration.id) if document.registration else None,
-        person_id=str(document.person.id) if document.person else None
+        registration_id=str(document.registration_id) if document.registration_id else None,
+        person_id=str(document.person_id) if document.person_id else None
     )
 
 
@@ -377,9 +377,9 @@ async def get_all_documents_admin(
                 mime_type=doc.mime_type,
                 is_verified=doc.is_verified,
                 created_at=doc.created_at,
-                registration_id=str(doc.registration.id) if doc.registration else None,
-                person_id=str(doc.person.id) if doc.person else None,
-                user_id=str(doc.user.id),
+                registration_id=str(doc.registration_id) if doc.registration_id else None,
+                person_id=str(doc.person_id) if doc.person_id else None,
+                user_id=str(doc.user_id),
                 user_name=doc.user.get_full_name(),
                 user_email=doc.user.email
             )
@@ -436,8 +436,8 @@ async def verify_document(
         mime_type=document.mime_type,
         is_verified=document.is_verified,
         created_at=document.created_at,
-        registration_id=str(document.registration.id) if document.registration else None,
-        person_id=str(document.person.id) if document.person else None
+        registration_id=str(document.registration_id) if document.registration_id else None,
+        person_id=str(document.person_id) if document.person_id else None
     )
 
 
@@ -482,8 +482,8 @@ async def unverify_document(
         mime_type=document.mime_type,
         is_verified=document.is_verified,
         created_at=document.created_at,
-        registration_id=str(document.registration.id) if document.registration else None,
-        person_id=str(document.person.id) if document.person else None
+        registration_id=str(document.registration_id) if document.registration_id else None,
+        person_id=str(document.person_id) if document.person_id else None
     )
 
 
@@ -1,13 +1,22 @@
 """
 Insurance API endpoints.
 """
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel, UUID4
-from apps.insurance.models import InsurancePlan, PlanCoverage, InsuranceRegistration
+from datetime import date
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic import BaseModel, Field, UUID4
+from apps.common import cache
+from apps.insurance.models import InsurancePlan, InsuranceRegistration
+from apps.insurance.serializers import (
+    active_coverages_prefetch, registration_details, serialize_plan, serialize_registration_details,
+)
+from apps.insurance.ledger import check_eligibility, coverage_year, coverage_year_bounds, usage_summary
+from apps.insurance.quotes import COVERAGE_TYPES, compare_plans, household_profile
 from apps.locations.models import School
 from apps.users.models import User
+from apps.users.serializers import age_on
 from core.dependencies import get_current_active_user
+from core.responses import cached_json_response, trusted_response
 
 router = APIRouter()
 
@@ -57,72 +66,259 @@ class RegistrationResponse(BaseModel):
         from_attributes = True
 
 
+class LocationLevelResponse(BaseModel):
+    id: str
+    name_fa: str
+
+
+class SchoolLocationResponse(BaseModel):
+    state: LocationLevelResponse
+    city: LocationLevelResponse
+    county: LocationLevelResponse
+    region: LocationLevelResponse
+    district: LocationLevelResponse
+
+
+class RegistrationSchoolResponse(BaseModel):
+    id: str
+    name_fa: str
+    code: str
+    school_type: str
+    address: Optional[str] = None
+    phone: Optional[str] = None
+    location: SchoolLocationResponse
+    full_location: str
+
+
+class CoveredPersonResponse(BaseModel):
+    id: str
+    first_name: str
+    last_name: str
+    national_code: str
+    birth_date: str
+    relation: str
+    relation_display: str
+    age: int
+    created_at: str
+    updated_at: str
+
+
+class RegistrationDocumentResponse(BaseModel):
+    id: str
+    document_type: str
+    title: str
+    description: Optional[str] = None
+    file_name: str
+    file_size: int
+    file_size_mb: float
+    mime_type: str
+    is_verified: bool
+    person_id: Optional[str] = None
+    created_at: str
+
+
+class RegistrationFullResponse(BaseModel):
+    id: str
+    user_id: str
+    status: str
+    status_display: str
+    registration_date: str
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    plan: PlanResponse
+    school: RegistrationSchoolResponse
+    persons: List[CoveredPersonResponse] = []
+    documents: List[RegistrationDocumentResponse] = []
+
+
+class UsageAssumption(BaseModel):
+    uses: float = Field(..., ge=0, le=365, description="expected uses per member per year")
+    cost: float = Field(..., ge=0, description="average cost per use (Rial)")
+
+
+class QuoteRequest(BaseModel):
+    plan_ids: Optional[List[UUID4]] = Field(None, description="default: all active plans")
+    person_ids: Optional[List[UUID4]] = Field(None, description="default: all of the user's persons")
+    include_self: bool = True
+    self_age: Optional[int] = Field(None, ge=0, le=120)
+    usage: Dict[str, UsageAssumption] = Field(default_factory=dict, description="overrides per coverage type")
+
+
+class CoverageQuoteResponse(BaseModel):
+    coverage_type: str
+    title_fa: str
+    covered: bool
+    coverage_percentage: int
+    annual_cap: int
+    max_usage_count: Optional[int] = None
+    expected_cost: int
+    expected_benefit: int
+
+
+class PlanQuoteResponse(BaseModel):
+    plan_id: str
+    name_fa: str
+    plan_type: str
+    monthly_premium: float
+    members: int
+    annual_premium: int
+    expected_cost: int
+    expected_benefit: int
+    expected_out_of_pocket: int
+    net_annual_cost: int
+    coverages: List[CoverageQuoteResponse]
+
+
+class QuoteResponse(BaseModel):
+    household: Dict[str, int]
+    members: int
+    recommended_plan_id: Optional[str] = None
+    quotes: List[PlanQuoteResponse]
+
+
+
+class CoverageUsageResponse(BaseModel):
+    member_id: str
+    person_id: Optional[str] = None
+    coverage_type: str
+    title_fa: str
+    usage_count: int
+    max_usage_count: Optional[int] = None
+    remaining_uses: Optional[int] = None
+    claimed_amount: int
+    reimbursed_amount: int
+    annual_cap: int
+    remaining_amount: int
+
+
+class RegistrationUsageResponse(BaseModel):
+    registration_id: str
+    year: int
+    year_start: Optional[date] = None
+    year_end: Optional[date] = None
+    coverages: List[CoverageUsageResponse]
+
+
+class EligibilityResponse(BaseModel):
+    eligible: bool
+    reason: Optional[str] = None
+    reason_display: Optional[str] = None
+    member_id: str
+    coverage_type: str
+    year: int
+    year_start: Optional[date] = None
+    year_end: Optional[date] = None
+    coverage_percentage: int
+    annual_cap: int
+    max_usage_count: Optional[int] = None
+    usage_count: int
+    remaining_uses: Optional[int] = None
+    reimbursed_amount: int
+    remaining_amount: int
+    estimated_reimbursement: Optional[int] = None
+
+def _serialize_registration(reg: InsuranceRegistration) -> dict:
+    """Serialize a registration using foreign key ids only (no related lookups)."""
+    return {
+        'id': str(reg.id),
+        'user_id': str(reg.user_id),
+        'plan_id': str(reg.plan_id),
+        'school_id': str(reg.school_id),
+        'status': reg.status,
+        'registration_date': reg.registration_date.isoformat(),
+        'start_date': reg.start_date.isoformat() if reg.start_date else None,
+        'end_date': reg.end_date.isoformat() if reg.end_date else None,
+    }
+
+
+def _active_plans_queryset():
+    return InsurancePlan.objects.filter(is_active=True).prefetch_related(active_coverages_prefetch())
+
+
+def _load_active_plans() -> List[dict]:
+    return [serialize_plan(plan) for plan in _active_plans_queryset()]
+
+
+def _load_plan(plan_id: str) -> Optional[dict]:
+    plan = _active_plans_queryset().filter(id=plan_id).first()
+    return serialize_plan(plan) if plan else None
+
+
 @router.get("/plans", response_model=List[PlanResponse])
-def get_insurance_plans():
+def get_insurance_plans(request: Request):
     """Get all active insurance plans."""
-    plans = InsurancePlan.objects.filter(is_active=True).prefetch_related('coverages')
-    
-    result = []
-    for plan in plans:
-        coverages = [
-            CoverageResponse(
-                id=str(cov.id),
-                coverage_type=cov.coverage_type,
-                title_fa=cov.title_fa,
-                description_fa=cov.description_fa,
-                coverage_amount=float(cov.coverage_amount),
-                coverage_percentage=cov.coverage_percentage,
-                max_usage_count=cov.max_usage_count
-            )
-            for cov in plan.coverages.filter(is_active=True)
-        ]
-        
-        result.append(PlanResponse(
-            id=str(plan.id),
-            name_fa=plan.name_fa,
-            plan_type=plan.plan_type,
-            description_fa=plan.description_fa,
-            monthly_premium=float(plan.monthly_premium),
-            is_active=plan.is_active,
-            coverages=coverages
-        ))
-    
-    return result
+    return cached_json_response(request, 'plans', 'active', _load_active_plans)
 
 
 @router.get("/plans/{plan_id}", response_model=PlanResponse)
 def get_insurance_plan(plan_id: UUID4):
     """Get insurance plan details."""
-    try:
-        plan = InsurancePlan.objects.prefetch_related('coverages').get(id=plan_id, is_active=True)
-    except InsurancePlan.DoesNotExist:
+    plan = cache.get_or_set('plans', f'plan:{plan_id}', lambda: _load_plan(str(plan_id)))
+    if plan is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="طرح بیمه یافت نشد"
         )
     
-    coverages = [
-        CoverageResponse(
-            id=str(cov.id),
-            coverage_type=cov.coverage_type,
-            title_fa=cov.title_fa,
-            description_fa=cov.description_fa,
-            coverage_amount=float(cov.coverage_amount),
-            coverage_percentage=cov.coverage_percentage,
-            max_usage_count=cov.max_usage_count
+    return trusted_response(plan)
+
+
+@router.post("/quote", response_model=QuoteResponse)
+def quote_plans(
+    data: QuoteRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Compare plans for the user's household.
+    
+    Returns each plan's annual premium and the expected yearly cost and
+    reimbursement per coverage type, cheapest ``net_annual_cost`` first.
+    """
+    unknown = sorted(set(data.usage) - set(COVERAGE_TYPES))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"نوع پوشش نامعتبر است: {', '.join(unknown)}"
+        )
+    
+    persons = current_user.persons.all()
+    if data.person_ids is not None:
+        persons = persons.filter(id__in=data.person_ids)
+    birth_dates = list(persons.values_list('birth_date', flat=True))
+    if data.person_ids is not None and len(birth_dates) != len(set(data.person_ids)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="فرد یافت نشد"
+        )
+    
+    today = date.today()
+    ages = [age_on(birth_date, today) for birth_date in birth_dates]
+    if data.include_self:
+        ages.append(data.self_age)
+    if not ages:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="حداقل یک نفر باید تحت پوشش باشد"
         )
-        for cov in plan.coverages.filter(is_active=True)
-    ]
-    
-    return PlanResponse(
-        id=str(plan.id),
-        name_fa=plan.name_fa,
-        plan_type=plan.plan_type,
-        description_fa=plan.description_fa,
-        monthly_premium=float(plan.monthly_premium),
-        is_active=plan.is_active,
-        coverages=coverages
+    
+    household = household_profile(ages)
+    quotes = compare_plans(
+        household,
+        plan_ids=data.plan_ids,
+        usage={coverage_type: (item.uses, item.cost) for coverage_type, item in data.usage.items()},
     )
+    if data.plan_ids is not None and len(quotes) != len(set(data.plan_ids)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="طرح بیمه یافت نشد"
+        )
+    
+    return trusted_response({
+        'household': household,
+        'members': len(ages),
+        'recommended_plan_id': quotes[0]['plan_id'] if quotes else None,
+        'quotes': quotes,
+    })
 
 
 @router.post("/register", response_model=RegistrationResponse, status_code=status.HTTP_201_CREATED)
@@ -167,7 +363,7 @@ def register_insurance(
     
     return RegistrationResponse(
         id=str(registration.id),
-        user_id=str(registration.user.id),
+        user_id=str(registration.user_id),
         plan_id=str(registration.plan.id),
         school_id=str(registration.school.id),
         status=registration.status,
@@ -180,21 +376,9 @@ def register_insurance(
 @router.get("/registrations", response_model=List[RegistrationResponse])
 def get_user_registrations(current_user: User = Depends(get_current_active_user)):
     """Get user's insurance registrations."""
-    registrations = InsuranceRegistration.objects.filter(user=current_user).select_related('plan', 'school')
-    
-    return [
-        RegistrationResponse(
-            id=str(reg.id),
-            user_id=str(reg.user.id),
-            plan_id=str(reg.plan.id),
-            school_id=str(reg.school.id),
-            status=reg.status,
-            registration_date=reg.registration_date.isoformat(),
-            start_date=reg.start_date.isoformat() if reg.start_date else None,
-            end_date=reg.end_date.isoformat() if reg.end_date else None
-        )
-        for reg in registrations
-    ]
+    registrations = InsuranceRegistration.objects.filter(user=current_user)
+    
+    return trusted_response([_serialize_registration(reg) for reg in registrations])
 
 
 @router.get("/registrations/{registration_id}", response_model=RegistrationResponse)
@@ -216,11 +400,103 @@ def get_registration_detail(
     
     return RegistrationResponse(
         id=str(registration.id),
-        user_id=str(registration.user.id),
+        user_id=str(registration.user_id),
         plan_id=str(registration.plan.id),
         school_id=str(registration.school.id),
         status=registration.status,
         registration_date=registration.registration_date.isoformat(),
         start_date=registration.start_date.isoformat() if registration.start_date else None,
         end_date=registration.end_date.isoformat() if registration.end_date else None
-    )
\ No newline at end of file
+    )
+
+
+@router.get("/registrations/{registration_id}/full", response_model=RegistrationFullResponse)
+def get_registration_full_detail(
+    registration_id: UUID4,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get a registration with its plan, school location, covered persons and documents."""
+    registration = registration_details().filter(id=registration_id, user=current_user).first()
+    if registration is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="ثبت‌نام یافت نشد"
+        )
+    
+    return trusted_response(serialize_registration_details(registration))
+
+
+def _claim_registration(registration_id, user: User) -> InsuranceRegistration:
+    """The user's registration with just the fields the claims ledger reads."""
+    registration = InsuranceRegistration.objects.only(
+        'id', 'user_id', 'plan_id', 'status', 'start_date', 'end_date'
+    ).filter(id=registration_id, user=user).first()
+    if registration is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="ثبت‌نام یافت نشد"
+        )
+    return registration
+
+
+@router.get("/registrations/{registration_id}/usage", response_model=RegistrationUsageResponse)
+def get_registration_usage(
+    registration_id: UUID4,
+    year: Optional[int] = Query(
+        None, ge=1, le=100,
+        description="coverage year of the term, 1 = the first year from start_date; default: the one containing today",
+    ),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get a coverage year's usage per member, with the plan's limits and what remains.
+    
+    Caps and use counts renew on the anniversary of the registration's
+    ``start_date``; ``year_start`` and ``year_end`` give the year's days.
+    """
+    registration = _claim_registration(registration_id, current_user)
+    year = year or coverage_year(registration.start_date, date.today())
+    year_start, year_end = coverage_year_bounds(registration.start_date, year)
+    
+    return trusted_response({
+        'registration_id': str(registration.id),
+        'year': year,
+        'year_start': year_start,
+        'year_end': year_end,
+        'coverages': usage_summary(registration, year),
+    })
+
+
+@router.get("/registrations/{registration_id}/eligibility", response_model=EligibilityResponse)
+def check_coverage_eligibility(
+    registration_id: UUID4,
+    coverage_type: str,
+    person_id: Optional[UUID4] = Query(None, description="covered person; default: the policy holder"),
+    service_date: Optional[date] = Query(None, description="default: today"),
+    amount: Optional[int] = Query(None, gt=0, description="claim amount (Rial) to estimate the reimbursement for"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Check whether a member can still use a coverage.
+    
+    Reads the member's usage counter for the coverage year of the service
+    date instead of the claim history, and returns the remaining uses and
+    amount.
+    """
+    if coverage_type not in COVERAGE_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"نوع پوشش نامعتبر است: {coverage_type}"
+        )
+    
+    registration = _claim_registration(registration_id, current_user)
+    if person_id is not None and not current_user.persons.filter(id=person_id).exists():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="فرد یافت نشد"
+        )
+    
+    return trusted_response(check_eligibility(
+        registration, coverage_type,
+        person_id=person_id, service_date=service_date, amount=amount,
+    ))
@@ -2,9 +2,10 @@
 Locations API endpoints.
 """
 from typing import List, Optional
-from fastapi import APIRouter, Query, HTTPException, status
+from fastapi import APIRouter, Query, HTTPException, Request, status
 from pydantic import BaseModel, UUID4
 from apps.locations.models import State, City, County, Region, District, School
+from core.responses import cached_json_response
 
 router = APIRouter()
 
@@ -58,6 +59,13 @@ class DistrictResponse(BaseModel):
         from_attributes = True
 
 
+class LocationTreeNode(BaseModel):
+    id: str
+    name_fa: str
+    code: str
+    children: List['LocationTreeNode'] = []
+
+
 class SchoolResponse(BaseModel):
     id: str
     district_id: str
@@ -72,92 +80,142 @@ class SchoolResponse(BaseModel):
 
 
 @router.get("/states", response_model=List[StateResponse])
-def get_states():
+def get_states(request: Request):
     """Get all states."""
-    states = State.objects.all()
-    return [
-        StateResponse(
-            id=str(state.id),
-            name_fa=state.name_fa,
-            code=state.code
-        )
-        for state in states
-    ]
+    def load():
+        return [
+            StateResponse(
+                id=str(state.id),
+                name_fa=state.name_fa,
+                code=state.code
+            ).model_dump()
+            for state in State.objects.all()
+        ]
+    
+    return cached_json_response(request, 'locations', 'states', load)
 
 
 @router.get("/cities", response_model=List[CityResponse])
-def get_cities(state_id: UUID4 = Query(..., description="State ID")):
+def get_cities(request: Request, state_id: UUID4 = Query(..., description="State ID")):
     """Get cities by state."""
-    cities = City.objects.filter(state_id=state_id)
-    return [
-        CityResponse(
-            id=str(city.id),
-            state_id=str(city.state_id),
-            name_fa=city.name_fa,
-            code=city.code
-        )
-        for city in cities
-    ]
+    def load():
+        return [
+            CityResponse(
+                id=str(city.id),
+                state_id=str(city.state_id),
+                name_fa=city.name_fa,
+                code=city.code
+            ).model_dump()
+            for city in City.objects.filter(state_id=state_id)
+        ]
+    
+    return cached_json_response(request, 'locations', f'cities:{state_id}', load)
 
 
 @router.get("/counties", response_model=List[CountyResponse])
-def get_counties(city_id: UUID4 = Query(..., description="City ID")):
+def get_counties(request: Request, city_id: UUID4 = Query(..., description="City ID")):
     """Get counties by city."""
-    counties = County.objects.filter(city_id=city_id)
-    return [
-        CountyResponse(
-            id=str(county.id),
-            city_id=str(county.city_id),
-            name_fa=county.name_fa,
-            code=county.code
-        )
-        for county in counties
-    ]
+    def load():
+        return [
+            CountyResponse(
+                id=str(county.id),
+                city_id=str(county.city_id),
+                name_fa=county.name_fa,
+                code=county.code
+            ).model_dump()
+            for county in County.objects.filter(city_id=city_id)
+        ]
+    
+    return cached_json_response(request, 'locations', f'counties:{city_id}', load)
 
 
 @router.get("/regions", response_model=List[RegionResponse])
-def get_regions(county_id: UUID4 = Query(..., description="County ID")):
+def get_regions(request: Request, county_id: UUID4 = Query(..., description="County ID")):
     """Get regions by county."""
-    regions = Region.objects.filter(county_id=county_id)
-    return [
-        RegionResponse(
-            id=str(region.id),
-            county_id=str(region.county_id),
-            name_fa=region.name_fa,
-            code=region.code
-        )
-        for region in regions
-    ]
+    def load():
+        return [
+            RegionResponse(
+                id=str(region.id),
+                county_id=str(region.county_id),
+                name_fa=region.name_fa,
+                code=region.code
+            ).model_dump()
+            for region in Region.objects.filter(county_id=county_id)
+        ]
+    
+    return cached_json_response(request, 'locations', f'regions:{county_id}', load)
 
 
 @router.get("/districts", response_model=List[DistrictResponse])
-def get_districts(region_id: UUID4 = Query(..., description="Region ID")):
+def get_districts(request: Request, region_id: UUID4 = Query(..., description="Region ID")):
     """Get districts by region."""
-    districts = District.objects.filter(region_id=region_id)
-    return [
-        DistrictResponse(
-            id=str(district.id),
-            region_id=str(district.region_id),
-            name_fa=district.name_fa,
-            code=district.code
-        )
-        for district in districts
-    ]
+    def load():
+        return [
+            DistrictResponse(
+                id=str(district.id),
+                region_id=str(district.region_id),
+                name_fa=district.name_fa,
+                code=district.code
+            ).model_dump()
+            for district in District.objects.filter(region_id=region_id)
+        ]
+    
+    return cached_json_response(request, 'locations', f'districts:{region_id}', load)
 
 
 @router.get("/schools", response_model=List[SchoolResponse])
-def get_schools(district_id: UUID4 = Query(..., description="District ID")):
+def get_schools(request: Request, district_id: UUID4 = Query(..., description="District ID")):
     """Get schools by district."""
-    schools = School.objects.filter(district_id=district_id)
-    return [
-        SchoolResponse(
-            id=str(school.id),
-            district_id=str(school.district_id),
-            name_fa=school.name_fa,
-            code=school.code,
-            school_type=school.school_type,
-            address=school.address,
-            phone=school.phone
-        )
-        for school in schools
-    ]
\ No newline at end of file
+    def load():
+        return [
+            SchoolResponse(
+                id=str(school.id),
+                district_id=str(school.district_id),
+                name_fa=school.name_fa,
+                code=school.code,
+                school_type=school.school_type,
+                address=school.address,
+                phone=school.phone
+            ).model_dump()
+            for school in School.objects.filter(district_id=district_id)
+        ]
+    
+    return cached_json_response(request, 'locations', f'schools:{district_id}', load)
+
+
+def _build_location_tree() -> List[dict]:
+    """Build the State → District hierarchy with one query per level."""
+    levels = [
+        (State.objects.all(), None),
+        (City.objects.all(), 'state_id'),
+        (County.objects.all(), 'city_id'),
+        (Region.objects.all(), 'county_id'),
+        (District.objects.all(), 'region_id'),
+    ]
+    
+    roots = []
+    parents = {}
+    for queryset, parent_field in levels:
+        nodes = {}
+        fields = ['id', 'name_fa', 'code'] + ([parent_field] if parent_field else [])
+        for row in queryset.values(*fields):
+            node = {
+                'id': str(row['id']),
+                'name_fa': row['name_fa'],
+                'code': row['code'],
+                'children': [],
+            }
+            nodes[row['id']] = node
+            if parent_field is None:
+                roots.append(node)
+            elif row[parent_field] in parents:
+                parents[row[parent_field]]['children'].append(node)
+        parents = nodes
+    
+    return roots
+
+
+@router.get("/tree", response_model=List[LocationTreeNode])
+def get_location_tree(request: Request):
+    """Get the full location hierarchy from states down to districts."""
+    return cached_json_response(request, 'locations', 'tree', _build_location_tree)
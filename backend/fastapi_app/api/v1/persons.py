@@ -3,12 +3,16 @@ API endpoints for Person management.
 """
 from typing import List
 from datetime import date
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, Field
 from pydantic.types import UUID4
 
 from apps.users.models import User, Person
+from apps.users.serializers import serialize_person, serialize_persons
 from core.dependencies import get_current_user
+from core.responses import trusted_response
 
 router = APIRouter()
 
@@ -30,6 +34,22 @@ class UpdatePersonRequest(BaseModel):
     relation: str | None = Field(None, pattern=r'^(spouse|child|parent|sibling|other)$')
 
 
+# Upper bound on each list in a batch request; a family form has a handful of rows
+BATCH_LIMIT = 50
+
+UPDATABLE_FIELDS = ('first_name', 'last_name', 'national_code', 'birth_date', 'relation')
+
+
+class BatchUpdatePersonItem(UpdatePersonRequest):
+    id: UUID4
+
+
+class BatchPersonRequest(BaseModel):
+    create: List[CreatePersonRequest] = Field(default_factory=list, max_length=BATCH_LIMIT)
+    update: List[BatchUpdatePersonItem] = Field(default_factory=list, max_length=BATCH_LIMIT)
+    delete: List[UUID4] = Field(default_factory=list, max_length=BATCH_LIMIT)
+
+
 class PersonResponse(BaseModel):
     id: str
     first_name: str
@@ -46,27 +66,41 @@ class PersonResponse(BaseModel):
         from_attributes = True
 
 
+class BatchPersonResult(BaseModel):
+    operation: str
+    index: int
+    id: str | None = None
+    success: bool
+    error: str | None = None
+    person: PersonResponse | None = None
+
+
+class BatchPersonResponse(BaseModel):
+    created: int
+    updated: int
+    deleted: int
+    failed: int
+    results: List[BatchPersonResult]
+
+
+def _batch_result(operation: str, index: int, person_id=None, error: str = None, person: dict = None) -> dict:
+    return {
+        'operation': operation,
+        'index': index,
+        'id': str(person_id) if person_id else None,
+        'success': error is None,
+        'error': error,
+        'person': person,
+    }
+
+
 # Endpoints
 @router.get("/", response_model=List[PersonResponse])
 def get_user_persons(current_user: User = Depends(get_current_user)):
     """Get all persons for the current user."""
     persons = Person.objects.filter(user=current_user).order_by('-created_at')
     
-    return [
-        PersonResponse(
-            id=str(person.id),
-            first_name=person.first_name,
-            last_name=person.last_name,
-            national_code=person.national_code,
-            birth_date=person.birth_date.isoformat(),
-            relation=person.relation,
-            relation_display=person.get_relation_display_fa(),
-            age=person.get_age(),
-            created_at=person.created_at.isoformat(),
-            updated_at=person.updated_at.isoformat()
-        )
-        for person in persons
-    ]
+    return trusted_response(serialize_persons(persons))
 
 
 @router.post("/", response_model=PersonResponse, status_code=status.HTTP_201_CREATED)
@@ -91,18 +125,159 @@ def create_person(
         relation=data.relation
     )
     
-    return PersonResponse(
-        id=str(person.id),
-        first_name=person.first_name,
-        last_name=person.last_name,
-        national_code=person.national_code,
-        birth_date=person.birth_date.isoformat(),
-        relation=person.relation,
-        relation_display=person.get_relation_display_fa(),
-        age=person.get_age(),
-        created_at=person.created_at.isoformat(),
-        updated_at=person.updated_at.isoformat()
-    )
+    return PersonResponse(**serialize_person(person))
+
+
+@router.post("/batch", response_model=BatchPersonResponse)
+def batch_persons(
+    data: BatchPersonRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Create, update and delete the current user's persons in one request.
+    
+    Every item gets a result. Items that fail validation are skipped; the
+    rest are written in one transaction with bulk queries.
+    """
+    failures = []
+    
+    # One query for every person referenced by id
+    referenced = {item.id for item in data.update} | set(data.delete)
+    existing = {
+        person.id: person
+        for person in Person.objects.filter(user=current_user, id__in=referenced)
+    } if referenced else {}
+    
+    to_delete = {}
+    for index, person_id in enumerate(data.delete):
+        if person_id not in existing:
+            failures.append(_batch_result('delete', index, person_id, error="شخص یافت نشد"))
+        elif person_id in to_delete.values():
+            failures.append(_batch_result('delete', index, person_id, error="این شخص بیش از یک بار در درخواست آمده است"))
+        else:
+            to_delete[index] = person_id
+    deleted_ids = set(to_delete.values())
+    # Persons whose current national code this batch may free up; an update
+    # that then fails validation frees nothing, which is re-checked below
+    releasing = deleted_ids | {
+        item.id for item in data.update
+        if item.id in existing and item.national_code and item.national_code != existing[item.id].national_code
+    }
+    
+    # One query for every national code the batch would write
+    codes = {item.national_code for item in data.create}
+    codes |= {item.national_code for item in data.update if item.national_code}
+    holders = dict(
+        Person.objects.filter(user=current_user, national_code__in=codes).values_list('national_code', 'id')
+    ) if codes else {}
+    claimed = set()
+    # (operation, index) -> the person whose update or deletion frees the item's code
+    relies_on = {}
+    
+    def code_taken(code: str, key: tuple, person_id=None) -> bool:
+        """True if another person keeps ``code`` after this batch; otherwise claim it."""
+        holder = holders.get(code)
+        if code in claimed or (holder is not None and holder != person_id and holder not in releasing):
+            return True
+        claimed.add(code)
+        if holder is not None and holder != person_id:
+            relies_on[key] = holder
+        return False
+    
+    to_update, update_fields, recoded = {}, set(), set()
+    for index, item in enumerate(data.update):
+        person = existing.get(item.id)
+        if person is None:
+            error = "شخص یافت نشد"
+        elif item.id in deleted_ids:
+            error = "این شخص در همین درخواست حذف می‌شود"
+        elif any(other.id == item.id for other in to_update.values()):
+            error = "این شخص بیش از یک بار در درخواست آمده است"
+        elif item.national_code and item.national_code != person.national_code and code_taken(
+            item.national_code, ('update', index), person.id
+        ):
+            error = "شخص با این کد ملی قبلاً ثبت شده است"
+        else:
+            error = None
+        if error:
+            failures.append(_batch_result('update', index, item.id, error=error))
+            continue
+        if item.national_code and item.national_code != person.national_code:
+            recoded.add(index)
+        changes = item.model_dump(include=set(UPDATABLE_FIELDS), exclude_none=True)
+        for field, value in changes.items():
+            setattr(person, field, value)
+        update_fields.update(changes)
+        to_update[index] = person
+    
+    to_create = {}
+    for index, item in enumerate(data.create):
+        if code_taken(item.national_code, ('create', index)):
+            failures.append(_batch_result('create', index, error="شخص با این کد ملی قبلاً ثبت شده است"))
+            continue
+        to_create[index] = Person(user=current_user, **item.model_dump())
+    
+    # Fail items whose code is still held because the update releasing it
+    # failed; each such failure can keep another code held in turn
+    while True:
+        released = deleted_ids | {to_update[index].id for index in recoded if index in to_update}
+        broken = [key for key, holder in relies_on.items() if holder not in released]
+        if not broken:
+            break
+        for operation, index in broken:
+            del relies_on[(operation, index)]
+            person = (to_update if operation == 'update' else to_create).pop(index)
+            failures.append(_batch_result(
+                operation, index, person.id if operation == 'update' else None,
+                error="شخص با این کد ملی قبلاً ثبت شده است"
+            ))
+    
+    # bulk_update does not apply auto_now
+    now = timezone.now()
+    for person in to_update.values():
+        person.updated_at = now
+    
+    try:
+        with transaction.atomic():
+            if to_delete:
+                Person.objects.filter(user=current_user, id__in=deleted_ids).delete()
+            if to_update:
+                # Unique (user, national_code) is checked row by row, so a code
+                # passed between updates (a swap or a chain) has to be released
+                # first: move the changing codes to placeholders, then write
+                moving = [to_update[index] for index in recoded if index in to_update]
+                if moving:
+                    Person.objects.bulk_update(
+                        [Person(id=person.id, national_code=f'~{person.id.hex[:9]}') for person in moving],
+                        ['national_code'],
+                    )
+                Person.objects.bulk_update(to_update.values(), [*update_fields, 'updated_at'])
+            if to_create:
+                Person.objects.bulk_create(to_create.values())
+    except IntegrityError:
+        # A concurrent request took one of the national codes
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="شخص با این کد ملی قبلاً ثبت شده است"
+        )
+    
+    results = failures + [_batch_result('delete', index, person_id) for index, person_id in to_delete.items()]
+    today = date.today()
+    for operation, written in (('update', to_update), ('create', to_create)):
+        results.extend(
+            _batch_result(operation, index, person.id, person=serialize_person(person, today))
+            for index, person in written.items()
+        )
+    order = {'delete': 0, 'update': 1, 'create': 2}
+    results.sort(key=lambda result: (order[result['operation']], result['index']))
+    
+    return trusted_response({
+        'created': len(to_create),
+        'updated': len(to_update),
+        'deleted': len(to_delete),
+        'failed': len(failures),
+        'results': results,
+    })
 
 
 @router.get("/{person_id}", response_model=PersonResponse)
@@ -119,18 +294,7 @@ def get_person(
             detail="شخص یافت نشد"
         )
     
-    return PersonResponse(
-        id=str(person.id),
-        first_name=person.first_name,
-        last_name=person.last_name,
-        national_code=person.national_code,
-        birth_date=person.birth_date.isoformat(),
-        relation=person.relation,
-        relation_display=person.get_relation_display_fa(),
-        age=person.get_age(),
-        created_at=person.created_at.isoformat(),
-        updated_at=person.updated_at.isoformat()
-    )
+    return PersonResponse(**serialize_person(person))
 
 
 @router.put("/{person_id}", response_model=PersonResponse)
@@ -170,18 +334,7 @@ def update_person(
     
     person.save()
     
-    return PersonResponse(
-        id=str(person.id),
-        first_name=person.first_name,
-        last_name=person.last_name,
-        national_code=person.national_code,
-        birth_date=person.birth_date.isoformat(),
-        relation=person.relation,
-        relation_display=person.get_relation_display_fa(),
-        age=person.get_age(),
-        created_at=person.created_at.isoformat(),
-        updated_at=person.updated_at.isoformat()
-    )
+    return PersonResponse(**serialize_person(person))
 
 
 @router.delete("/{person_id}", status_code=status.HTTP_204_NO_CONTENT)
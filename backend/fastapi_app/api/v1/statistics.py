@@ -1,39 +1,37 @@
 """
 Statistics API endpoints for dashboard analytics.
 """
-from typing import Dict, List, Any
-from fastapi import APIRouter, Depends
+from typing import Dict, List, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from django.db.models import Count, Q, Avg
 from apps.users.models import User, Person
+from apps.users.serializers import count_by_age
+from apps.insurance.analytics import GRANULARITIES, GROUPS, default_range, registration_timeseries
 from apps.insurance.models import InsurancePlan, InsuranceRegistration
 from apps.locations.models import School, State
-from core.dependencies import get_current_user, get_current_admin_user
+from apps.common import cache, jalali
+from apps.common.queries import count_by
+from core.dependencies import TokenUser, get_current_user, get_current_admin_user
+from core.responses import trusted_response
 
 router = APIRouter()
 
+REGISTRATION_STATUSES = ['pending', 'approved', 'rejected', 'active', 'expired']
+PERSON_RELATIONS = ['spouse', 'child', 'parent', 'sibling', 'other']
+# (label, max age) buckets for the person age distributions
+ADMIN_AGE_BUCKETS = [('0-10', 10), ('11-20', 20), ('21-30', 30), ('31-40', 40), ('41-50', 50), ('51+', None)]
+USER_AGE_BUCKETS = [('children', 18), ('adults', 60), ('seniors', None)]
+
 
 # Helper function to convert Gregorian to Jalali month name
-def get_jalali_month_name(gregorian_date: datetime) -> str:
-    """Convert Gregorian date to Jalali month name."""
-    months = [
-        'فروردین', 'اردیبهشت', 'خرداد', 'تیر', 'مرداد', 'شهریور',
-        'مهر', 'آبان', 'آذر', 'دی', 'بهمن', 'اسفند'
-    ]
-    
-    # Simple Gregorian to Jalali conversion (approximate)
-    year = gregorian_date.year
-    month = gregorian_date.month
-    
-    jalali_year = year - 621
-    jalali_month = month - 3
-    
-    if jalali_month <= 0:
-        jalali_month += 12
-        jalali_year -= 1
-    
-    return f"{months[jalali_month - 1]} {jalali_year}"
+def get_jalali_month_name(gregorian_date: date) -> str:
+    """Jalali month and year of a Gregorian date, e.g. ``فروردین 1403``."""
+    if isinstance(gregorian_date, datetime):
+        gregorian_date = gregorian_date.date()
+    jalali_year, jalali_month, _ = jalali.to_jalali(gregorian_date)
+    return jalali.month_name(jalali_year, jalali_month)
 
 
 # Response Models
@@ -61,6 +59,31 @@ class RegistrationStats(BaseModel):
     recent_registrations: int  # Last 30 days
 
 
+class TimeSeriesBucket(BaseModel):
+    key: str
+    label: str
+    start: str
+    end: str
+    count: int
+
+
+class TimeSeries(BaseModel):
+    id: Optional[str] = None
+    name: Optional[str] = None
+    counts: List[int]
+    total: int
+
+
+class RegistrationTimeSeries(BaseModel):
+    granularity: str
+    group_by: Optional[str] = None
+    start: str
+    end: str
+    total: int
+    buckets: List[TimeSeriesBucket]
+    series: List[TimeSeries]
+
+
 class PersonStats(BaseModel):
     total: int
     by_relation: Dict[str, int]
@@ -104,7 +127,7 @@ class DashboardStats(BaseModel):
 
 # Admin Statistics Endpoints
 @router.get("/admin/overview", response_model=OverviewStats)
-def get_admin_overview_stats(current_user: User = Depends(get_current_admin_user)):
+def get_admin_overview_stats(current_user: TokenUser = Depends(get_current_admin_user)):
     """Get overview statistics for admin dashboard."""
     total_users = User.objects.count()
     total_admins = User.objects.filter(is_admin=True).count()
@@ -123,49 +146,34 @@ def get_admin_overview_stats(current_user: User = Depends(get_current_admin_user
 
 
 @router.get("/admin/registrations", response_model=RegistrationStats)
-def get_admin_registration_stats(current_user: User = Depends(get_current_admin_user)):
+def get_admin_registration_stats(current_user: TokenUser = Depends(get_current_admin_user)):
     """Get detailed registration statistics."""
     total = InsuranceRegistration.objects.count()
     
     # Count by status
-    status_counts = {
-        'pending': InsuranceRegistration.objects.filter(status='pending').count(),
-        'approved': InsuranceRegistration.objects.filter(status='approved').count(),
-        'rejected': InsuranceRegistration.objects.filter(status='rejected').count(),
-        'active': InsuranceRegistration.objects.filter(status='active').count(),
-        'expired': InsuranceRegistration.objects.filter(status='expired').count(),
-    }
+    status_counts = count_by(InsuranceRegistration.objects.all(), 'status', REGISTRATION_STATUSES)
     
     # Registrations by plan
     by_plan = []
-    plans = InsurancePlan.objects.all()
+    plans = InsurancePlan.objects.annotate(registration_count=Count('registrations')).order_by('plan_type', 'name_fa')
     for plan in plans:
-        count = InsuranceRegistration.objects.filter(plan=plan).count()
         by_plan.append({
             'plan_id': str(plan.id),
             'plan_name': plan.name_fa,
-            'count': count
+            'count': plan.registration_count
         })
     
-    # Registrations by month (last 6 months)
-    by_month = []
-    today = datetime.now()
-    for i in range(6):
-        month_start = (today - timedelta(days=30 * i)).replace(day=1)
-        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        
-        count = InsuranceRegistration.objects.filter(
-            registration_date__gte=month_start,
-            registration_date__lte=month_end
-        ).count()
-        
-        by_month.append({
-            'month': month_start.strftime('%Y-%m'),
-            'month_name': get_jalali_month_name(month_start),
-            'count': count
-        })
-    
-    by_month.reverse()  # Oldest to newest
+    # Registrations per Jalali month (last 6 months), counted in one query
+    start, end = default_range('month', periods=6)
+    timeline = registration_timeseries(start, end, granularity='month')
+    by_month = [
+        {
+            'month': bucket['key'],
+            'month_name': bucket['label'],
+            'count': bucket['count']
+        }
+        for bucket in timeline['buckets']
+    ]
     
     # Recent registrations (last 30 days)
     thirty_days_ago = datetime.now() - timedelta(days=30)
@@ -184,47 +192,67 @@ def get_admin_registration_stats(current_user: User = Depends(get_current_admin_
     )
 
 
+@router.get("/admin/registrations/timeseries", response_model=RegistrationTimeSeries)
+def get_admin_registration_timeseries(
+    start: Optional[date] = Query(None, description="default: the last few buckets up to end"),
+    end: Optional[date] = Query(None, description="default: today"),
+    granularity: str = Query('month', description="day, week, month or year (Jalali)"),
+    group_by: Optional[str] = Query(None, description="plan, school or state"),
+    registration_status: Optional[str] = Query(None, alias='status'),
+    limit: int = Query(20, ge=1, le=200, description="series kept; the rest are summed as «سایر»"),
+    current_user: TokenUser = Depends(get_current_admin_user)
+):
+    """
+    Registration counts over time, bucketed by Jalali day, week, month or year.
+    
+    Buckets follow exact Jalali month and year boundaries (weeks start on
+    Saturday) and the range is widened to whole buckets. With
+    ``group_by`` each plan, school or state gets its own series.
+    """
+    if granularity not in GRANULARITIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"بازه زمانی نامعتبر است. مقادیر معتبر: {', '.join(GRANULARITIES)}"
+        )
+    if group_by is not None and group_by not in GROUPS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"گروه‌بندی نامعتبر است. مقادیر معتبر: {', '.join(GROUPS)}"
+        )
+    if registration_status is not None and registration_status not in InsuranceRegistration.TRANSITIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="وضعیت نامعتبر است"
+        )
+    
+    key = f'timeseries:{start}:{end}:{granularity}:{group_by}:{registration_status}:{limit}'
+    try:
+        result = cache.get_or_set('stats', key, lambda: registration_timeseries(
+            start, end, granularity=granularity, group_by=group_by, status=registration_status, limit=limit
+        ))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="بازه تاریخ نامعتبر یا بیش از حد بزرگ است"
+        )
+    
+    return trusted_response(result)
+
+
 @router.get("/admin/persons", response_model=PersonStats)
-def get_admin_person_stats(current_user: User = Depends(get_current_admin_user)):
+def get_admin_person_stats(current_user: TokenUser = Depends(get_current_admin_user)):
     """Get person/dependent statistics."""
     total = Person.objects.count()
     
     # Count by relation
-    relations = ['spouse', 'child', 'parent', 'sibling', 'other']
-    by_relation = {}
-    for relation in relations:
-        by_relation[relation] = Person.objects.filter(relation=relation).count()
+    by_relation = count_by(Person.objects.all(), 'relation', PERSON_RELATIONS)
     
     # Average persons per user
     users_with_persons = User.objects.filter(persons__isnull=False).distinct().count()
     average_per_user = total / users_with_persons if users_with_persons > 0 else 0
     
     # Age distribution
-    today = datetime.now().date()
-    age_distribution = {
-        '0-10': 0,
-        '11-20': 0,
-        '21-30': 0,
-        '31-40': 0,
-        '41-50': 0,
-        '51+': 0
-    }
-    
-    persons = Person.objects.all()
-    for person in persons:
-        age = (today - person.birth_date).days // 365
-        if age <= 10:
-            age_distribution['0-10'] += 1
-        elif age <= 20:
-            age_distribution['11-20'] += 1
-        elif age <= 30:
-            age_distribution['21-30'] += 1
-        elif age <= 40:
-            age_distribution['31-40'] += 1
-        elif age <= 50:
-            age_distribution['41-50'] += 1
-        else:
-            age_distribution['51+'] += 1
+    age_distribution = count_by_age(Person.objects.all(), ADMIN_AGE_BUCKETS)
     
     return PersonStats(
         total=total,
@@ -235,23 +263,22 @@ def get_admin_person_stats(current_user: User = Depends(get_current_admin_user))
 
 
 @router.get("/admin/schools", response_model=SchoolStats)
-def get_admin_school_stats(current_user: User = Depends(get_current_admin_user)):
+def get_admin_school_stats(current_user: TokenUser = Depends(get_current_admin_user)):
     """Get school statistics."""
     total = School.objects.count()
     
     # Count by type
-    school_types = ['elementary', 'middle', 'high']
-    by_type = {}
-    for school_type in school_types:
-        by_type[school_type] = School.objects.filter(school_type=school_type).count()
+    by_type = count_by(School.objects.all(), 'school_type', ['elementary', 'middle', 'high'])
     
     # Count by state
     by_state = []
     states = State.objects.all()[:10]  # Top 10 states
+    state_counts = count_by(
+        School.objects.filter(district__region__county__city__state__in=[state.id for state in states]),
+        'district__region__county__city__state'
+    )
     for state in states:
-        count = School.objects.filter(
-            district__region__county__city__state=state
-        ).count()
+        count = state_counts.get(state.id, 0)
         if count > 0:
             by_state.append({
                 'state_id': str(state.id),
@@ -262,7 +289,7 @@ def get_admin_school_stats(current_user: User = Depends(get_current_admin_user))
     # Top schools by registrations
     top_schools = []
     schools = School.objects.annotate(
-        registration_count=Count('registrations')
+        registration_count=Count('insurance_registrations')
     ).order_by('-registration_count')[:10]
     
     for school in schools:
@@ -282,16 +309,13 @@ def get_admin_school_stats(current_user: User = Depends(get_current_admin_user))
 
 
 @router.get("/admin/plans", response_model=PlanStats)
-def get_admin_plan_stats(current_user: User = Depends(get_current_admin_user)):
+def get_admin_plan_stats(current_user: TokenUser = Depends(get_current_admin_user)):
     """Get insurance plan statistics."""
     total = InsurancePlan.objects.count()
     active = InsurancePlan.objects.filter(is_active=True).count()
     
     # Count by type
-    plan_types = ['basic', 'standard', 'premium']
-    by_type = {}
-    for plan_type in plan_types:
-        by_type[plan_type] = InsurancePlan.objects.filter(plan_type=plan_type).count()
+    by_type = count_by(InsurancePlan.objects.all(), 'plan_type', ['basic', 'standard', 'premium'])
     
     # Plan popularity (by registration count)
     popularity = []
@@ -322,13 +346,13 @@ def get_admin_plan_stats(current_user: User = Depends(get_current_admin_user)):
 
 
 @router.get("/admin/users", response_model=UserStats)
-def get_admin_user_stats(current_user: User = Depends(get_current_admin_user)):
+def get_admin_user_stats(current_user: TokenUser = Depends(get_current_admin_user)):
     """Get user statistics."""
     total = User.objects.count()
     admins = User.objects.filter(is_admin=True).count()
     
     # Users with/without registrations
-    with_registrations = User.objects.filter(registrations__isnull=False).distinct().count()
+    with_registrations = User.objects.filter(insurance_registrations__isnull=False).distinct().count()
     
     # Recent signups (last 30 days)
     thirty_days_ago = datetime.now() - timedelta(days=30)
@@ -345,16 +369,16 @@ def get_admin_user_stats(current_user: User = Depends(get_current_admin_user)):
 
 
 @router.get("/admin/dashboard", response_model=DashboardStats)
-def get_admin_dashboard_stats(current_user: User = Depends(get_current_admin_user)):
+def get_admin_dashboard_stats(current_user: TokenUser = Depends(get_current_admin_user)):
     """Get complete dashboard statistics (all stats in one call)."""
-    return DashboardStats(
+    return trusted_response(cache.get_or_set('stats', 'admin:dashboard', lambda: DashboardStats(
         overview=get_admin_overview_stats(current_user),
         registrations=get_admin_registration_stats(current_user),
         persons=get_admin_person_stats(current_user),
         schools=get_admin_school_stats(current_user),
         plans=get_admin_plan_stats(current_user),
         users=get_admin_user_stats(current_user)
-    )
+    ).model_dump()))
 
 
 # User Statistics Endpoints
@@ -381,16 +405,10 @@ def get_user_overview_stats(current_user: User = Depends(get_current_user)):
 @router.get("/user/registrations")
 def get_user_registration_stats(current_user: User = Depends(get_current_user)):
     """Get user's registration statistics."""
-    registrations = InsuranceRegistration.objects.filter(user=current_user)
+    registrations = InsuranceRegistration.objects.filter(user=current_user).select_related('plan')
     
     # Count by status
-    by_status = {
-        'pending': registrations.filter(status='pending').count(),
-        'approved': registrations.filter(status='approved').count(),
-        'rejected': registrations.filter(status='rejected').count(),
-        'active': registrations.filter(status='active').count(),
-        'expired': registrations.filter(status='expired').count(),
-    }
+    by_status = count_by(registrations, 'status', REGISTRATION_STATUSES)
     
     # By plan
     by_plan = []
@@ -404,7 +422,7 @@ def get_user_registration_stats(current_user: User = Depends(get_current_user)):
         })
     
     return {
-        'total': registrations.count(),
+        'total': len(by_plan),
         'by_status': by_status,
         'by_plan': by_plan
     }
@@ -416,29 +434,13 @@ def get_user_person_stats(current_user: User = Depends(get_current_user)):
     persons = Person.objects.filter(user=current_user)
     
     # Count by relation
-    by_relation = {}
-    for relation in ['spouse', 'child', 'parent', 'sibling', 'other']:
-        by_relation[relation] = persons.filter(relation=relation).count()
+    by_relation = count_by(persons, 'relation', PERSON_RELATIONS)
     
     # Age distribution
-    today = datetime.now().date()
-    age_groups = {
-        'children': 0,  # 0-18
-        'adults': 0,    # 19-60
-        'seniors': 0    # 61+
-    }
-    
-    for person in persons:
-        age = (today - person.birth_date).days // 365
-        if age <= 18:
-            age_groups['children'] += 1
-        elif age <= 60:
-            age_groups['adults'] += 1
-        else:
-            age_groups['seniors'] += 1
+    age_groups = count_by_age(persons, USER_AGE_BUCKETS)
     
     return {
-        'total': persons.count(),
+        'total': sum(age_groups.values()),
         'by_relation': by_relation,
         'age_groups': age_groups
     }
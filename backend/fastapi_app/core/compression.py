@@ -0,0 +1,142 @@
+"""
+Response compression (gzip, and brotli when the ``brotli`` package is installed).
+"""
+import gzip
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .config import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+
+def supported_encodings() -> list:
+    """Return the encodings this server can produce, best first."""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the best encoding the client accepts, or None for identity.
+
+    ``*`` accepts any encoding the header does not list; a listed
+    encoding with ``q=0`` is refused even when ``*`` is present.
+    """
+    qualities = {}
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        params = params.replace(' ', '')
+        try:
+            quality = float(params[2:]) if params.startswith('q=') else 1.0
+        except ValueError:
+            quality = 0.0
+        qualities[coding.strip()] = quality
+
+    for encoding in supported_encodings():
+        if qualities.get(encoding, qualities.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def add_vary_header(headers: MutableHeaders, value: str) -> None:
+    """Add ``value`` to the Vary header unless it is already listed there."""
+    vary = headers.get('Vary')
+    if vary is None:
+        headers['Vary'] = value
+        return
+    listed = {item.strip().lower() for item in vary.split(',')}
+    if value.lower() not in listed and '*' not in listed:
+        headers['Vary'] = f'{vary}, {value}'
+
+
+def compress(body: bytes, encoding: str, best: bool = False) -> bytes:
+    """
+    Compress ``body`` with ``encoding``.
+
+    ``best`` trades CPU for size; use it only for payloads that are
+    compressed once and served many times.
+    """
+    if encoding == 'br':
+        quality = 11 if best else settings.COMPRESSION_BROTLI_QUALITY
+        return brotli.compress(body, quality=quality)
+    level = 9 if best else settings.COMPRESSION_GZIP_LEVEL
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def is_compressible(content_type: str) -> bool:
+    """Check a Content-Type header against the compression allowlist."""
+    media_type = content_type.split(';', 1)[0].strip().lower()
+    for allowed in settings.COMPRESSION_CONTENT_TYPES:
+        if allowed.endswith('/*'):
+            if media_type.startswith(allowed[:-1]):
+                return True
+        elif media_type == allowed:
+            return True
+    return False
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware that compresses complete response bodies.
+
+    Responses are compressed only when the client accepts a supported
+    encoding, the Content-Type is allowlisted and the body is at least
+    ``minimum_size`` bytes. Streaming responses and responses that
+    already carry a Content-Encoding (precompressed payloads) pass
+    through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None) -> None:
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+
+            if message['type'] == 'http.response.start':
+                headers = Headers(raw=message['headers'])
+                if 'content-encoding' in headers or not is_compressible(headers.get('content-type', '')):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if passthrough or message['type'] != 'http.response.body':
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            if message.get('more_body', False):
+                # Streaming body: send it as-is
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message['headers'])
+            add_vary_header(headers, 'Accept-Encoding')
+            if len(body) >= self.minimum_size:
+                body = compress(body, encoding)
+                headers['Content-Encoding'] = encoding
+                headers['Content-Length'] = str(len(body))
+            await send(start_message)
+            await send({'type': 'http.response.body', 'body': body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -25,6 +25,55 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
     JWT_REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("JWT_REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+    # How stale the in-memory token version map may get, i.e. how long a revoked token still works
+    TOKEN_VERSION_REFRESH_SECONDS: float = float(os.getenv("TOKEN_VERSION_REFRESH_SECONDS", "5"))
+    REFRESH_TOKEN_PURGE_SECONDS: float = float(os.getenv("REFRESH_TOKEN_PURGE_SECONDS", "3600"))
+    
+    # In-process expiry sweep for registrations past their end date (0 disables; see expire_registrations)
+    REGISTRATION_EXPIRY_SWEEP_SECONDS: float = float(os.getenv("REGISTRATION_EXPIRY_SWEEP_SECONDS", "3600"))
+    
+    # Response compression
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 5
+    COMPRESSION_CONTENT_TYPES: list = [
+        "application/json",
+        "application/javascript",
+        "image/svg+xml",
+        "text/*",
+    ]
+    
+    # Instrumentation
+    SLOW_REQUEST_MS: int = int(os.getenv("SLOW_REQUEST_MS", "500"))
+    SLOW_REQUEST_QUERIES: int = int(os.getenv("SLOW_REQUEST_QUERIES", "20"))
+    # /metrics answers only "Authorization: Bearer <METRICS_TOKEN>"; empty turns the endpoint off
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+    # Job queue gauges are recomputed at most this often, however many scrapers there are
+    METRICS_JOB_STATS_SECONDS: int = int(os.getenv("METRICS_JOB_STATS_SECONDS", "30"))
+    
+    # N+1 query detection: off, log (sampled) or raise (tests)
+    NPLUSONE_MODE: str = os.getenv("NPLUSONE_MODE", "log")
+    NPLUSONE_SAMPLE_RATE: float = float(os.getenv("NPLUSONE_SAMPLE_RATE", "0.01"))
+    NPLUSONE_THRESHOLD: int = int(os.getenv("NPLUSONE_THRESHOLD", "5"))
+    
+    # Password hashing pool (login/register); keep workers below the CPU count
+    PASSWORD_POOL_WORKERS: int = int(os.getenv("PASSWORD_POOL_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+    PASSWORD_POOL_QUEUE_SIZE: int = int(os.getenv("PASSWORD_POOL_QUEUE_SIZE", "64"))
+    PASSWORD_POOL_RETRY_AFTER: int = int(os.getenv("PASSWORD_POOL_RETRY_AFTER", "1"))
+    
+    # Rate limits for password endpoints, per API process: "<count>/<second|minute|hour>"
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "True").lower() in ("true", "1", "yes")
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    RATE_LIMITS: dict = {
+        "login": {
+            "ip": os.getenv("RATE_LIMIT_LOGIN_IP", "60/minute"),
+            "national_id": os.getenv("RATE_LIMIT_LOGIN_NATIONAL_ID", "5/minute"),
+        },
+        "register": {
+            "ip": os.getenv("RATE_LIMIT_REGISTER_IP", "20/hour"),
+            "national_id": os.getenv("RATE_LIMIT_REGISTER_NATIONAL_ID", "3/hour"),
+        },
+    }
     
     # CORS
     CORS_ORIGINS: list = [
@@ -33,6 +82,8 @@ class Settings(BaseSettings):
         "http://frontend:3000",
         "*"
     ]
+    CORS_ALLOW_METHODS: list = ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"]
+    CORS_MAX_AGE: int = 3600
     
     class Config:
         case_sensitive = True
@@ -0,0 +1,133 @@
+"""
+Pure ASGI CORS middleware with precomputed headers.
+"""
+from typing import Dict, List, Sequence, Tuple
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+HeaderList = List[Tuple[bytes, bytes]]
+
+# Upper bound on distinct (origin, requested method, requested headers) preflight entries
+PREFLIGHT_CACHE_SIZE = 1024
+
+# Request headers browsers may always send without them being allowlisted
+SAFELISTED_HEADERS = frozenset({'accept', 'accept-language', 'content-language', 'content-type'})
+
+
+class CORSMiddleware:
+    """
+    CORS handling without a BaseHTTPMiddleware hop.
+
+    Every header that does not depend on the request is encoded once at
+    startup. A preflight is an ``OPTIONS`` request carrying both
+    ``Origin`` and ``Access-Control-Request-Method``; any other
+    ``OPTIONS`` request reaches the app. Preflight responses are answered
+    directly and their header lists are cached per (origin, requested
+    method, requested headers), so a repeated preflight costs one dict
+    lookup. A ``*`` entry in ``allow_origins`` allows any origin; the
+    request origin is echoed back so credentialed requests keep working.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        allow_origins: Sequence[str] = (),
+        allow_methods: Sequence[str] = ('GET',),
+        allow_headers: Sequence[str] = (),
+        allow_credentials: bool = False,
+        expose_headers: Sequence[str] = (),
+        max_age: int = 600,
+    ) -> None:
+        self.app = app
+        self.allow_all_origins = '*' in allow_origins
+        self.allowed_origins = frozenset(o.encode('latin-1') for o in allow_origins if o != '*')
+        self.allow_all_methods = '*' in allow_methods
+        self.allowed_methods = frozenset(m.upper().encode('latin-1') for m in allow_methods if m != '*')
+        self.allow_all_headers = '*' in allow_headers
+        self.allowed_headers = SAFELISTED_HEADERS | {h.lower() for h in allow_headers if h != '*'}
+
+        common: HeaderList = [(b'vary', b'Origin')]
+        if allow_credentials:
+            common.append((b'access-control-allow-credentials', b'true'))
+
+        self.simple_headers: HeaderList = list(common)
+        if expose_headers:
+            self.simple_headers.append(
+                (b'access-control-expose-headers', ', '.join(expose_headers).encode('latin-1'))
+            )
+
+        self.preflight_headers: HeaderList = common + [
+            (b'access-control-allow-methods', ', '.join(allow_methods).encode('latin-1')),
+            (b'access-control-max-age', str(max_age).encode('latin-1')),
+            (b'content-length', b'0'),
+        ]
+        self.preflight_cache: Dict[Tuple[bytes, bytes, bytes], HeaderList] = {}
+
+    def is_allowed_origin(self, origin: bytes) -> bool:
+        return self.allow_all_origins or origin in self.allowed_origins
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        origin = b''
+        requested_method = b''
+        requested_headers = b''
+        for name, value in scope['headers']:
+            if name == b'origin':
+                origin = value
+            elif name == b'access-control-request-method':
+                requested_method = value
+            elif name == b'access-control-request-headers':
+                requested_headers = value
+
+        if not origin:
+            await self.app(scope, receive, send)
+            return
+
+        if scope['method'] == 'OPTIONS' and requested_method:
+            await self.preflight_response(origin, requested_method, requested_headers, send)
+            return
+
+        if not self.is_allowed_origin(origin):
+            await self.app(scope, receive, send)
+            return
+
+        extra_headers = [(b'access-control-allow-origin', origin)] + self.simple_headers
+
+        async def send_with_cors(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                message['headers'] = list(message.get('headers', [])) + extra_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+    async def preflight_response(self, origin: bytes, requested_method: bytes, requested_headers: bytes,
+                                 send: Send) -> None:
+        key = (origin, requested_method, requested_headers)
+        headers = self.preflight_cache.get(key)
+        if headers is None:
+            headers = self.build_preflight_headers(origin, requested_method, requested_headers)
+            if len(self.preflight_cache) >= PREFLIGHT_CACHE_SIZE:
+                self.preflight_cache.clear()
+            self.preflight_cache[key] = headers
+
+        status = 200 if headers else 400
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers or [(b'content-length', b'0')]})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    def build_preflight_headers(self, origin: bytes, requested_method: bytes, requested_headers: bytes) -> HeaderList:
+        """Return the preflight header list, or an empty list if the request is not allowed."""
+        if not self.is_allowed_origin(origin):
+            return []
+        if not self.allow_all_methods and requested_method.strip().upper() not in self.allowed_methods:
+            return []
+
+        headers = [(b'access-control-allow-origin', origin)] + self.preflight_headers
+        if requested_headers:
+            if not self.allow_all_headers:
+                requested = {h.strip().lower() for h in requested_headers.decode('latin-1').split(',') if h.strip()}
+                if not requested <= self.allowed_headers:
+                    return []
+            headers.append((b'access-control-allow-headers', requested_headers))
+        return headers
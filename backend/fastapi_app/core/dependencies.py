@@ -1,6 +1,7 @@
 """
 FastAPI dependencies for authentication and authorization.
 """
+from dataclasses import dataclass
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -15,15 +16,25 @@ django.setup()
 
 from apps.users.models import User
 from .security import decode_token
+from .token_versions import token_versions
 
 # Security scheme
 security = HTTPBearer()
 
 
-def get_current_user(
+@dataclass(frozen=True)
+class TokenUser:
+    """The authenticated user as described by the access token claims."""
+    id: str
+    national_id: str
+    is_admin: bool
+    token_version: int
+
+
+def get_token_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> User:
-    """Get current authenticated user from JWT token."""
+) -> TokenUser:
+    """Authenticate from the JWT claims alone, without a database read."""
     token = credentials.credentials
     payload = decode_token(token)
     
@@ -42,15 +53,41 @@ def get_current_user(
         )
     
     national_id: str = payload.get("sub")
-    if national_id is None:
+    if national_id is None or "ver" not in payload:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="اطلاعات کاربر در توکن یافت نشد",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Password, role or active flag changed since the token was issued
+    if payload["ver"] < token_versions.current(national_id):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="توکن باطل شده است، لطفاً دوباره وارد شوید",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    if not payload.get("active"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="حساب کاربری غیرفعال است"
+        )
+    
+    return TokenUser(
+        id=payload.get("uid"),
+        national_id=national_id,
+        is_admin=payload.get("role") == "admin",
+        token_version=payload["ver"],
+    )
+
+
+def get_current_user(
+    token_user: TokenUser = Depends(get_token_user)
+) -> User:
+    """Get current authenticated user from JWT token."""
     try:
-        user = User.objects.get(national_id=national_id)
+        user = User.objects.get(national_id=token_user.national_id)
     except User.DoesNotExist:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -58,6 +95,14 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # The row is loaded anyway, so apply revocations not yet in the version map
+    if user.token_version > token_user.token_version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="توکن باطل شده است، لطفاً دوباره وارد شوید",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -80,15 +125,15 @@ def get_current_active_user(
 
 
 def get_current_admin_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
-    """Get current admin user."""
-    if not current_user.is_admin:
+    token_user: TokenUser = Depends(get_token_user)
+) -> TokenUser:
+    """Get current admin user from the token claims (no database read)."""
+    if not token_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="دسترسی مدیریتی لازم است"
         )
-    return current_user
+    return token_user
 
 
 def get_optional_current_user(
@@ -99,17 +144,6 @@ def get_optional_current_user(
         return None
     
     try:
-        token = credentials.credentials
-        payload = decode_token(token)
-        
-        if payload is None or payload.get("type") != "access":
-            return None
-        
-        national_id: str = payload.get("sub")
-        if national_id is None:
-            return None
-        
-        user = User.objects.get(national_id=national_id)
-        return user if user.is_active else None
-    except (User.DoesNotExist, Exception):
+        return get_current_user(get_token_user(credentials))
+    except (HTTPException, User.DoesNotExist):
         return None
\ No newline at end of file
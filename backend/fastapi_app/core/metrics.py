@@ -0,0 +1,294 @@
+"""
+Request instrumentation: latency, SQL query counts and response sizes.
+
+Metrics are kept in-process and rendered in the Prometheus text format
+on ``/metrics``. With several uvicorn workers each worker reports its
+own numbers; scrape them individually or aggregate by instance.
+"""
+import bisect
+import logging
+import secrets
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+from django.db.backends.signals import connection_created
+from fastapi import Header, HTTPException, status
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from apps.common import cache
+from apps.common.jobs import queue_stats
+from . import nplusone, passwords, ratelimit, refresh_tokens
+from .config import settings
+
+logger = logging.getLogger('health_insurance.slow_requests')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class RequestStats:
+    """Per-request counters filled in by the database execute wrapper."""
+
+    __slots__ = ('query_count', 'db_time', 'nplusone')
+
+    def __init__(self, tracker: Optional[nplusone.QueryShapeTracker] = None):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.nplusone = tracker
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar('current_request_stats', default=None)
+
+
+def query_counter(execute, sql, params, many, context):
+    """Django execute wrapper that charges each query to the current request."""
+    stats = current_request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_time += time.perf_counter() - start
+        stats.query_count += 1
+        if stats.nplusone is not None:
+            stats.nplusone.record(sql)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """Attach the query counter to every new database connection."""
+    if query_counter not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_counter)
+
+
+connection_created.connect(install_query_counter, dispatch_uid='core.metrics.install_query_counter')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str]):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                cumulative += series[len(self.buckets)]
+                label_str = _format_labels(self.labelnames, labels)
+                inf = _format_labels(self.labelnames, labels, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf} {cumulative}")
+                lines.append(f"{self.name}_sum{label_str} {series[-1]}")
+                lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+REQUESTS = Counter('http_requests_total', 'HTTP requests by route and status.', ('method', 'route', 'status'))
+LATENCY = Histogram('http_request_duration_seconds', 'Request latency.', ('method', 'route'), LATENCY_BUCKETS)
+RESPONSE_SIZE = Histogram('http_response_size_bytes', 'Response body size.', ('method', 'route'), SIZE_BUCKETS)
+QUERIES = Histogram('db_queries_per_request', 'SQL queries issued per request.', ('method', 'route'), QUERY_COUNT_BUCKETS)
+DB_TIME = Counter('db_query_seconds_total', 'Time spent in SQL queries.', ('method', 'route'))
+SLOW_REQUESTS = Counter('http_slow_requests_total', 'Requests over the latency or query thresholds.', ('method', 'route'))
+
+REGISTRY = [REQUESTS, LATENCY, RESPONSE_SIZE, QUERIES, DB_TIME, SLOW_REQUESTS]
+
+
+def require_metrics_token(authorization: Optional[str] = Header(None)) -> None:
+    """Allow only scrapers presenting ``METRICS_TOKEN``; without a token the endpoint does not exist."""
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    expected = f"Bearer {settings.METRICS_TOKEN}".encode()
+    if not secrets.compare_digest((authorization or '').encode(), expected):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="توکن نامعتبر است",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+def job_queue_stats() -> dict:
+    """``queue_stats()`` shared through the cache, so scrapes cost at most one GROUP BY per interval."""
+    return cache.get_or_set('metrics', 'job-queue', queue_stats, timeout=settings.METRICS_JOB_STATS_SECONDS)
+
+
+def render_metrics(job_stats: Optional[dict] = None) -> str:
+    """
+    Render all metrics in the Prometheus text exposition format.
+    
+    ``job_stats`` is ``apps.common.jobs.queue_stats()``; it needs a query,
+    so the caller runs it off the event loop.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+
+    lines.append("# HELP cache_requests_total Shared cache lookups by namespace and result.")
+    lines.append("# TYPE cache_requests_total counter")
+    for namespace, counters in sorted(cache.metrics.snapshot().items()):
+        for result in ('hits', 'misses', 'computes', 'coalesced'):
+            lines.append(f'cache_requests_total{{namespace="{namespace}",result="{result}"}} {counters[result]}')
+
+    pool = passwords.pool.snapshot()
+    for name, help_text in (('workers', 'Password hashing worker processes.'),
+                            ('in_flight', 'Password tasks running or queued.'),
+                            ('queued', 'Password tasks waiting for a worker.')):
+        lines.append(f"# HELP password_pool_{name} {help_text}")
+        lines.append(f"# TYPE password_pool_{name} gauge")
+        lines.append(f"password_pool_{name} {pool[name]}")
+    lines.append("# HELP password_pool_tasks_total Password hash/verify tasks by outcome.")
+    lines.append("# TYPE password_pool_tasks_total counter")
+    for operation, counters in pool['operations'].items():
+        for outcome in ('completed', 'failed', 'cancelled', 'rejected'):
+            lines.append(f'password_pool_tasks_total{{operation="{operation}",outcome="{outcome}"}} {counters[outcome]}')
+    for kind in ('wait', 'run'):
+        lines.append(f"# HELP password_pool_{kind}_seconds_total Seconds completed tasks spent {'queued' if kind == 'wait' else 'hashing'}.")
+        lines.append(f"# TYPE password_pool_{kind}_seconds_total counter")
+        for operation, counters in pool['operations'].items():
+            lines.append(f'password_pool_{kind}_seconds_total{{operation="{operation}"}} {counters[kind + "_seconds"]}')
+
+    lines.append("# HELP refresh_tokens_total Refresh tokens by outcome (reused = replay detected, family revoked).")
+    lines.append("# TYPE refresh_tokens_total counter")
+    for outcome, count in refresh_tokens.snapshot().items():
+        lines.append(f'refresh_tokens_total{{outcome="{outcome}"}} {count}')
+
+    limits = ratelimit.limiter.snapshot()
+    lines.append("# HELP rate_limit_keys Keys tracked by each rate limit.")
+    lines.append("# TYPE rate_limit_keys gauge")
+    for (route, scope), counters in limits.items():
+        lines.append(f'rate_limit_keys{{route="{route}",scope="{scope}"}} {counters["keys"]}')
+    lines.append("# HELP rate_limit_rejections_total Requests rejected by each rate limit.")
+    lines.append("# TYPE rate_limit_rejections_total counter")
+    for (route, scope), counters in limits.items():
+        lines.append(f'rate_limit_rejections_total{{route="{route}",scope="{scope}"}} {counters["rejected"]}')
+
+    if job_stats is not None:
+        lines.append("# HELP background_jobs Background jobs by name and status (done jobs until purged).")
+        lines.append("# TYPE background_jobs gauge")
+        for row in job_stats['jobs']:
+            lines.append(f'background_jobs{{name="{row["name"]}",status="{row["status"]}"}} {row["jobs"]}')
+        lines.append("# HELP background_job_attempts Attempts made by background jobs by name and status.")
+        lines.append("# TYPE background_job_attempts gauge")
+        for row in job_stats['jobs']:
+            lines.append(f'background_job_attempts{{name="{row["name"]}",status="{row["status"]}"}} {row["attempts"]}')
+        lines.append("# HELP background_job_lag_seconds How long the oldest ready job has been waiting.")
+        lines.append("# TYPE background_job_lag_seconds gauge")
+        lines.append(f"background_job_lag_seconds {job_stats['lag_seconds']}")
+    return '\n'.join(lines) + '\n'
+
+
+def route_label(scope: Scope) -> str:
+    """Return the matched route template, so path parameters do not explode cardinality."""
+    route = scope.get('route')
+    return getattr(route, 'path', None) or '<unmatched>'
+
+
+class InstrumentationMiddleware:
+    """
+    Pure ASGI middleware recording latency, SQL usage and response size.
+
+    Requests slower than ``SLOW_REQUEST_MS`` or issuing more than
+    ``SLOW_REQUEST_QUERIES`` queries are logged as slow-request samples,
+    and sampled requests are checked for N+1 query patterns.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.slow_seconds = settings.SLOW_REQUEST_MS / 1000
+        self.slow_queries = settings.SLOW_REQUEST_QUERIES
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(nplusone.start_tracking())
+        token = current_request_stats.set(stats)
+        status_code = 500
+        size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, size
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            elif message['type'] == 'http.response.body':
+                size += len(message.get('body', b''))
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            current_request_stats.reset(token)
+            self.record(scope, status_code, duration, size, stats)
+        nplusone.finish_tracking(stats.nplusone, scope['method'], scope['path'])
+
+    def record(self, scope: Scope, status_code: int, duration: float, size: int, stats: RequestStats) -> None:
+        labels = (scope['method'], route_label(scope))
+        REQUESTS.inc(labels + (str(status_code),))
+        LATENCY.observe(labels, duration)
+        RESPONSE_SIZE.observe(labels, size)
+        QUERIES.observe(labels, stats.query_count)
+        DB_TIME.inc(labels, stats.db_time)
+
+        if duration >= self.slow_seconds or stats.query_count > self.slow_queries:
+            SLOW_REQUESTS.inc(labels)
+            logger.warning(
+                "Slow request: %s %s route=%s status=%s duration_ms=%.1f queries=%d db_ms=%.1f bytes=%d",
+                scope['method'], scope['path'], labels[1], status_code,
+                duration * 1000, stats.query_count, stats.db_time * 1000, size,
+            )
@@ -0,0 +1,101 @@
+"""
+N+1 query detection.
+
+Every SELECT issued while handling a request is reduced to its shape
+(literals and ``IN`` lists collapsed). When one shape repeats
+``NPLUSONE_THRESHOLD`` times in a single request, the request is
+flagged and the stack that issued the repeating query is captured.
+
+``NPLUSONE_MODE`` controls what happens next:
+
+- ``raise``: raise ``NPlusOneError`` once the request finishes (tests)
+- ``log``: log a warning with the stack for a sampled fraction of
+  requests (``NPLUSONE_SAMPLE_RATE``, production)
+- ``off``: no tracking at all
+"""
+import logging
+import os
+import random
+import re
+import traceback
+from typing import Dict, List, Optional
+from .config import settings
+
+logger = logging.getLogger('health_insurance.nplusone')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\([^()]*\)', re.IGNORECASE)
+
+# Frames from these paths are library internals, not the code to fix
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_IGNORED_FRAGMENTS = ('site-packages', 'dist-packages', os.sep + 'core' + os.sep + 'nplusone.py',
+                      os.sep + 'core' + os.sep + 'metrics.py')
+
+
+class NPlusOneError(Exception):
+    """Raised in ``raise`` mode when a request repeats a query shape."""
+
+
+def query_shape(sql: str) -> str:
+    """Reduce a SQL statement to a shape that ignores parameter values."""
+    shape = _STRING_LITERAL.sub('?', sql)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    return _IN_LIST.sub('IN (...)', shape)
+
+
+def _caller_stack() -> List[str]:
+    frames = [
+        frame for frame in traceback.extract_stack()[:-1]
+        if frame.filename.startswith(_PROJECT_ROOT)
+        and not any(fragment in frame.filename for fragment in _IGNORED_FRAGMENTS)
+    ]
+    return traceback.format_list(frames)
+
+
+class QueryShapeTracker:
+    """Counts query shapes for one request and remembers where repeats came from."""
+
+    __slots__ = ('threshold', 'counts', 'offenders')
+
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.counts: Dict[str, int] = {}
+        # shape -> stack captured when the shape first crossed the threshold
+        self.offenders: Dict[str, List[str]] = {}
+
+    def record(self, sql: str) -> None:
+        if not sql.lstrip()[:6].upper() == 'SELECT':
+            return
+        shape = query_shape(sql)
+        count = self.counts.get(shape, 0) + 1
+        self.counts[shape] = count
+        if count == self.threshold:
+            self.offenders[shape] = _caller_stack()
+
+    def report(self, method: str, path: str) -> str:
+        lines = [f"N+1 queries detected in {method} {path}:"]
+        for shape, stack in self.offenders.items():
+            lines.append(f"  {self.counts[shape]}x {shape}")
+            lines.extend('    ' + line.rstrip().replace('\n', '\n    ') for line in stack)
+        return '\n'.join(lines)
+
+
+def start_tracking() -> Optional[QueryShapeTracker]:
+    """Return a tracker for this request, or None if it is not being sampled."""
+    mode = settings.NPLUSONE_MODE
+    if mode == 'off':
+        return None
+    if mode == 'log' and random.random() >= settings.NPLUSONE_SAMPLE_RATE:
+        return None
+    return QueryShapeTracker(settings.NPLUSONE_THRESHOLD)
+
+
+def finish_tracking(tracker: Optional[QueryShapeTracker], method: str, path: str) -> None:
+    """Log or raise for the repeated query shapes a tracker found."""
+    if tracker is None or not tracker.offenders:
+        return
+    report = tracker.report(method, path)
+    if settings.NPLUSONE_MODE == 'raise':
+        raise NPlusOneError(report)
+    logger.warning(report)
@@ -0,0 +1,195 @@
+"""
+Password hashing on a dedicated, bounded process pool.
+
+Hashing and verifying passwords is pure CPU work (hundreds of
+milliseconds with PBKDF2). Done inside a sync endpoint it holds one of
+FastAPI's shared threadpool threads for the whole computation, so a
+login storm starves every other sync endpoint. ``login`` and
+``register`` are async and await this pool instead:
+
+- the work runs in separate processes, so it never holds the API
+  process's threads or GIL;
+- at most ``PASSWORD_POOL_WORKERS`` tasks run at once, with up to
+  ``PASSWORD_POOL_QUEUE_SIZE`` more waiting. Past that, ``PasswordPoolBusy``
+  (a 503 with ``Retry-After``) is raised rather than queueing without
+  bound.
+
+Queue depth, wait and run times are exported on ``/metrics``.
+
+Algorithm and cost come from Django's ``PASSWORD_HASHERS`` (see
+``apps.users.hashers``). A login that verifies against an outdated hash
+schedules ``rehash_password`` as a background task, which stores a hash
+with the current settings when the pool has a spare worker.
+"""
+import asyncio
+import functools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from asgiref.sync import sync_to_async
+from fastapi import HTTPException, status
+from django.contrib.auth.hashers import get_hasher, identify_hasher, is_password_usable
+from apps.users import passwords
+from apps.users.models import User
+from .config import settings
+
+OPERATIONS = ('hash', 'verify')
+
+
+class PasswordPoolBusy(HTTPException):
+    """Raised when the pool and its queue are full."""
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="سرور در حال حاضر مشغول است، لطفاً چند لحظه دیگر دوباره تلاش کنید",
+            headers={"Retry-After": str(settings.PASSWORD_POOL_RETRY_AFTER)},
+        )
+
+
+class PasswordPool:
+    """Process pool with an admission limit and per-operation counters."""
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {
+            operation: {
+                'completed': 0, 'failed': 0, 'cancelled': 0, 'rejected': 0,
+                'wait_seconds': 0.0, 'run_seconds': 0.0,
+            }
+            for operation in OPERATIONS
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn rather than fork: the API process runs threads that may hold locks
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def start(self) -> None:
+        """Start the worker processes now instead of on the first login."""
+        executor = self._get_executor()
+        for future in [executor.submit(time.sleep, 0) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, operation: str, fn, *args):
+        """Run ``fn(*args)`` in a worker process; raise ``PasswordPoolBusy`` when full."""
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._stats[operation]['rejected'] += 1
+                raise PasswordPoolBusy()
+            self._in_flight += 1
+
+        submitted = time.perf_counter()
+        try:
+            future = self._submit(fn, args)
+        except BaseException:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        # Accounting runs when the worker finishes, even if the request was cancelled
+        future.add_done_callback(functools.partial(self._done, operation, submitted))
+        result, _ = await asyncio.wrap_future(future)
+        return result
+
+    def _submit(self, fn, args):
+        try:
+            return self._get_executor().submit(passwords.timed, fn, *args)
+        except BrokenProcessPool:
+            # A worker died and took the pool down; start a new one and retry once
+            with self._lock:
+                self._executor = None
+            return self._get_executor().submit(passwords.timed, fn, *args)
+
+    def _done(self, operation: str, submitted: float, future) -> None:
+        elapsed = time.perf_counter() - submitted
+        with self._lock:
+            self._in_flight -= 1
+            stats = self._stats[operation]
+            if future.cancelled():
+                stats['cancelled'] += 1
+                return
+            if future.exception() is not None:
+                stats['failed'] += 1
+                return
+            run_seconds = future.result()[1]
+            stats['completed'] += 1
+            stats['run_seconds'] += run_seconds
+            stats['wait_seconds'] += max(0.0, elapsed - run_seconds)
+
+    @property
+    def idle(self) -> bool:
+        """True when a worker is free, i.e. a new task would not wait."""
+        with self._lock:
+            return self._in_flight < self.workers
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'capacity': self.capacity,
+                'in_flight': self._in_flight,
+                'queued': max(0, self._in_flight - self.workers),
+                'operations': {operation: dict(stats) for operation, stats in self._stats.items()},
+            }
+
+
+pool = PasswordPool(settings.PASSWORD_POOL_WORKERS, settings.PASSWORD_POOL_QUEUE_SIZE)
+
+
+async def hash_password(password: str) -> str:
+    """Hash ``password`` with the default Django hasher."""
+    return await pool.run('hash', passwords.encode, get_hasher('default'), password)
+
+
+async def verify_password(password: str, encoded: str) -> bool:
+    """Async equivalent of Django's ``check_password``; see ``needs_rehash`` for upgrades."""
+    if password is None or not is_password_usable(encoded):
+        return False
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False
+    return await pool.run('verify', passwords.verify, hasher, password, encoded)
+
+
+def needs_rehash(encoded: str) -> bool:
+    """True when ``encoded`` uses another algorithm or cost than a new hash would."""
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False
+    preferred = get_hasher('default')
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+async def rehash_password(user_id, password: str, old_encoded: str) -> None:
+    """
+    Store a hash of ``password`` made with the current settings.
+    
+    Runs after the login response. It is skipped while logins are queueing
+    (the next login will try again), and it does not overwrite a password
+    that changed in the meantime.
+    """
+    if not pool.idle:
+        return
+    try:
+        encoded = await hash_password(password)
+    except PasswordPoolBusy:
+        return
+    await sync_to_async(User.objects.filter(pk=user_id, password=old_encoded).update)(password=encoded)
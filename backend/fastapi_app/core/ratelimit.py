@@ -0,0 +1,165 @@
+"""
+In-memory sliding-window rate limits for the authentication endpoints.
+
+Login and registration hash passwords, so unthrottled bursts (credential
+stuffing, scripted sign-ups) would fill the password pool. ``check`` runs
+at the top of those endpoints, before the user lookup and any hashing,
+and raises ``RateLimited`` (a 429 with ``Retry-After``) when the client
+IP or the submitted national ID is over its limit.
+
+Each key costs one small list: the current window number and the
+request counts of the current and previous fixed windows. The sliding
+count is the previous count weighted by how much of it still overlaps
+the window, plus the current count. Keys idle for two windows are
+dropped once per window, and ``RATE_LIMIT_MAX_KEYS`` bounds the table
+when many distinct IPs arrive at once.
+
+Limits are per API process; with several workers the effective limit is
+that many times higher. They are configured per route and key in
+``settings.RATE_LIMITS`` as ``"<count>/<second|minute|hour>"``.
+"""
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+from fastapi import HTTPException, Request, status
+
+from .config import settings
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600}
+
+
+def parse_rate(rate: str):
+    """Parse ``"5/minute"`` into ``(5, 60)``."""
+    count, _, period = rate.partition('/')
+    if period not in PERIODS:
+        raise ValueError(f"Invalid rate {rate!r}; expected '<count>/<second|minute|hour>'")
+    return int(count), PERIODS[period]
+
+
+def client_ip(request: Request) -> Optional[str]:
+    """Client address as seen by uvicorn (run it with ``--proxy-headers`` behind a proxy)."""
+    return request.client.host if request.client else None
+
+
+class RateLimited(HTTPException):
+    """Raised when a client is over a rate limit."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="تعداد درخواست‌ها بیش از حد مجاز است، لطفاً کمی بعد دوباره تلاش کنید",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class SlidingWindowLimiter:
+    """At most ``limit`` requests per key in any ``window`` seconds (approximately)."""
+
+    def __init__(self, limit: int, window: float, max_keys: int):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        # key -> [window number, previous window count, current window count]
+        self._windows: Dict[str, list] = {}
+        self._swept = 0
+
+    def _counts(self, key: str, now: float):
+        number, elapsed = divmod(now, self.window)
+        entry = self._windows.get(key)
+        if entry is None or entry[0] < number - 1:
+            return 0, 0, elapsed / self.window
+        if entry[0] == number - 1:
+            return entry[2], 0, elapsed / self.window
+        return entry[1], entry[2], elapsed / self.window
+
+    def retry_after(self, key: str, now: float) -> Optional[float]:
+        """Seconds until ``key`` may make another request, or None if it may now."""
+        previous, current, fraction = self._counts(key, now)
+        if previous * (1 - fraction) + current + 1 <= self.limit:
+            return None
+        if current + 1 <= self.limit and previous:
+            # Wait until enough of the previous window has slid out
+            needed = 1 - (self.limit - current - 1) / previous
+            return (needed - fraction) * self.window
+        # Only the next window can help: then this window becomes the previous one
+        needed = 1 - (self.limit - 1) / current if current else 0
+        return (1 - fraction + max(0.0, needed)) * self.window
+
+    def hit(self, key: str, now: float) -> None:
+        """Count a request for ``key``."""
+        number = now // self.window
+        if number > self._swept:
+            self._sweep(number)
+        entry = self._windows.get(key)
+        if entry is None or entry[0] < number - 1:
+            if entry is None and len(self._windows) >= self.max_keys:
+                # Drop the oldest key rather than grow without bound
+                del self._windows[next(iter(self._windows))]
+            self._windows[key] = [number, 0, 1]
+        elif entry[0] == number - 1:
+            entry[:] = [number, entry[2], 1]
+        else:
+            entry[2] += 1
+
+    def _sweep(self, number: float) -> None:
+        self._swept = number
+        stale = [key for key, entry in self._windows.items() if entry[0] < number - 1]
+        for key in stale:
+            del self._windows[key]
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+
+class RateLimiter:
+    """Per-route limiters keyed by client IP and national ID."""
+
+    def __init__(self, rules: Dict[str, Dict[str, str]], max_keys: int, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._limiters = {
+            (route, scope): SlidingWindowLimiter(*parse_rate(rate), max_keys=max_keys)
+            for route, scopes in rules.items()
+            for scope, rate in scopes.items()
+        }
+        self._rejected = {key: 0 for key in self._limiters}
+
+    def check(self, route: str, **keys: Optional[str]) -> None:
+        """
+        Count a request to ``route`` or raise ``RateLimited``.
+
+        ``keys`` maps a scope configured for the route (``ip``,
+        ``national_id``) to the request's value; scopes without a rule or
+        value are ignored. A rejected request is not counted.
+        """
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        limiters = [
+            ((route, scope), self._limiters[(route, scope)], value)
+            for scope, value in keys.items()
+            if value and (route, scope) in self._limiters
+        ]
+        with self._lock:
+            waits = []
+            for name, limiter, value in limiters:
+                wait = limiter.retry_after(value, now)
+                if wait is not None:
+                    self._rejected[name] += 1
+                    waits.append(wait)
+            if waits:
+                raise RateLimited(max(1, math.ceil(max(waits))))
+            for _, limiter, value in limiters:
+                limiter.hit(value, now)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                name: {'keys': len(limiter), 'rejected': self._rejected[name]}
+                for name, limiter in self._limiters.items()
+            }
+
+
+limiter = RateLimiter(settings.RATE_LIMITS, settings.RATE_LIMIT_MAX_KEYS, settings.RATE_LIMIT_ENABLED)
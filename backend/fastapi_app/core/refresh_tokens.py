@@ -0,0 +1,132 @@
+"""
+Refresh token rotation on top of ``apps.users.tokens.RefreshToken``.
+
+A refresh JWT carries a random ``jti`` and its family id (``fam``). Each
+refresh consumes the presented token with one conditional UPDATE and
+issues its successor in the same family. A token that was already used
+is a replay: the whole family is deleted, which logs out both the thief
+and the real client. Expired rows are purged in the background every
+``REFRESH_TOKEN_PURGE_SECONDS`` (see ``main.py``).
+"""
+import logging
+import secrets
+import threading
+import uuid
+from datetime import timedelta
+from typing import Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.users.models import RefreshToken, User
+from apps.users.tokens import hash_jti
+from .config import settings
+from .security import create_refresh_token
+
+logger = logging.getLogger('health_insurance.auth')
+
+OUTCOMES = ('issued', 'rotated', 'reused', 'revoked', 'invalid', 'purged')
+
+_lock = threading.Lock()
+_counters = {outcome: 0 for outcome in OUTCOMES}
+
+
+def _count(outcome: str, amount: int = 1) -> None:
+    with _lock:
+        _counters[outcome] += amount
+
+
+def snapshot() -> dict:
+    with _lock:
+        return dict(_counters)
+
+
+def issue_refresh_token(user: User, family: Optional[uuid.UUID] = None) -> str:
+    """Store and return a refresh token for ``user``; a new family unless ``family`` is given."""
+    jti = secrets.token_urlsafe(24)
+    family = family or uuid.uuid4()
+    RefreshToken.objects.create(
+        jti_hash=hash_jti(jti),
+        family=family,
+        user=user,
+        expires_at=timezone.now() + timedelta(days=settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    _count('issued')
+    return create_refresh_token(data={
+        "sub": user.national_id,
+        "ver": user.token_version,
+        "jti": jti,
+        "fam": str(family),
+    })
+
+
+def rotate_refresh_token(payload: dict) -> Optional[Tuple[User, str]]:
+    """
+    Consume a decoded refresh token and return ``(user, next_token)``.
+
+    Returns None for unknown, expired or already used tokens, and for
+    users whose token version moved on or who were deactivated. A used
+    token and a stale user also revoke the family.
+    """
+    jti, family = payload.get("jti"), payload.get("fam")
+    if not jti or not family:
+        _count('invalid')
+        return None
+    jti_hash = hash_jti(jti)
+    now = timezone.now()
+
+    with transaction.atomic():
+        claimed = RefreshToken.objects.filter(
+            jti_hash=jti_hash, used_at__isnull=True, expires_at__gt=now
+        ).update(used_at=now)
+        if not claimed:
+            if RefreshToken.objects.filter(jti_hash=jti_hash, used_at__isnull=False).exists():
+                revoked, _ = RefreshToken.objects.filter(family=family).delete()
+                _count('reused')
+                logger.warning(
+                    "Refresh token reuse for user %s; revoked family %s (%d tokens)",
+                    payload.get("sub"), family, revoked,
+                )
+            else:
+                _count('invalid')
+            return None
+
+        user = RefreshToken.objects.select_related('user').get(jti_hash=jti_hash).user
+        # Password, role or active flag changed since the family was issued
+        if payload.get("ver", 0) < user.token_version or not user.is_active:
+            RefreshToken.objects.filter(family=family).delete()
+            _count('revoked')
+            return None
+        token = issue_refresh_token(user, family)
+
+    _count('rotated')
+    return user, token
+
+
+def revoke_refresh_family(payload: dict) -> int:
+    """Delete every token in the family of a decoded refresh token (logout)."""
+    jti, family = payload.get("jti"), payload.get("fam")
+    if not jti or not family:
+        return 0
+    # Only a token that belongs to the family may revoke it
+    if not RefreshToken.objects.filter(jti_hash=hash_jti(jti), family=family).exists():
+        return 0
+    revoked, _ = RefreshToken.objects.filter(family=family).delete()
+    return revoked
+
+
+def purge_expired(batch_size: int = 10_000) -> int:
+    """Delete expired tokens in batches, so no single DELETE holds locks for long."""
+    purged = 0
+    now = timezone.now()
+    while True:
+        batch = list(
+            RefreshToken.objects.filter(expires_at__lte=now).values_list('jti_hash', flat=True)[:batch_size]
+        )
+        if not batch:
+            break
+        deleted, _ = RefreshToken.objects.filter(jti_hash__in=batch).delete()
+        purged += deleted
+    _count('purged', purged)
+    return purged
+
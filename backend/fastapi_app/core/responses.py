@@ -0,0 +1,60 @@
+"""
+Response helpers for fast JSON serialization.
+"""
+from typing import Any, Callable
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+from apps.common import cache
+from .compression import choose_encoding, compress, supported_encodings
+from .config import settings
+
+
+def trusted_response(content: Any, status_code: int = 200) -> ORJSONResponse:
+    """
+    Encode server-built content straight to JSON bytes with orjson.
+
+    Returning a ``Response`` makes FastAPI skip validating the payload
+    against the route's ``response_model`` again, so only pass plain
+    dicts/lists built from ORM rows, never raw client input. The route
+    should still declare ``response_model`` so the OpenAPI schema stays
+    accurate.
+    """
+    return ORJSONResponse(content, status_code=status_code)
+
+
+def _encode_variants(content: Any) -> dict:
+    """Encode content once as JSON plus one precompressed body per encoding."""
+    body = orjson.dumps(content)
+    variants = {'identity': body}
+    if len(body) >= settings.COMPRESSION_MIN_SIZE:
+        for encoding in supported_encodings():
+            variants[encoding] = compress(body, encoding, best=True)
+    return variants
+
+
+def cached_json_response(
+    request: Request,
+    namespace: str,
+    key: str,
+    compute: Callable[[], Any],
+) -> Response:
+    """
+    Serve a cached JSON payload, precompressed for the client's encoding.
+
+    The cache stores the encoded bytes and their gzip/brotli variants, so
+    a hit costs neither serialization nor compression. The response
+    carries Content-Encoding, which makes CompressionMiddleware pass it
+    through untouched.
+    """
+    variants = cache.get_or_set(namespace, f"{key}:json", lambda: _encode_variants(compute()))
+    
+    headers = {'Vary': 'Accept-Encoding'}
+    encoding = choose_encoding(request.headers.get('accept-encoding', ''))
+    if encoding in variants:
+        body = variants[encoding]
+        headers['Content-Encoding'] = encoding
+    else:
+        body = variants['identity']
+    
+    return Response(body, media_type='application/json', headers=headers)
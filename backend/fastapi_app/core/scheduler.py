@@ -0,0 +1,40 @@
+"""
+Periodic maintenance tasks run inside the API process.
+
+Each task is a blocking Django function run every ``interval`` seconds on
+a thread of its own, so a long run never blocks the ``sync_to_async``
+calls made by requests. Tasks must be safe to run concurrently from
+several API workers.
+
+Executor threads are reused across runs and requests, so each run closes
+stale or broken database connections before and after the task, as the
+job worker does between batches.
+"""
+import asyncio
+import logging
+from typing import Callable
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+logger = logging.getLogger('health_insurance.scheduler')
+
+
+async def run_periodically(func: Callable[[], int], interval: float, description: str) -> None:
+    """Call ``func`` every ``interval`` seconds until cancelled; log non-zero results."""
+    def run() -> int:
+        close_old_connections()
+        try:
+            return func()
+        finally:
+            close_old_connections()
+
+    call = sync_to_async(run, thread_sensitive=False)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            count = await call()
+            if count:
+                logger.info("%s: %d", description, count)
+        except Exception:
+            logger.exception("%s failed", description)
@@ -2,23 +2,30 @@
 Security utilities for authentication and authorization.
 """
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
 from .config import settings
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing lives in core.passwords (Django hashers on a process pool)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against a hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+@lru_cache(maxsize=8)
+def get_signing_key(secret: str, algorithm: str) -> Key:
+    """Parsed key object; python-jose would otherwise rebuild it on every encode and decode."""
+    return jwk.construct(secret, algorithm)
 
 
-def get_password_hash(password: str) -> str:
-    """Hash a password."""
-    return pwd_context.hash(password)
+def user_claims(user) -> dict:
+    """Claims that let requests authorize ``user`` without a database read."""
+    return {
+        "sub": user.national_id,
+        "uid": str(user.id),
+        "role": "admin" if user.is_admin else "user",
+        "active": user.is_active,
+        "ver": user.token_version,
+    }
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -30,7 +37,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire, "type": "access"})
-    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    key = get_signing_key(settings.JWT_SECRET_KEY, settings.JWT_ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, key, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
 
@@ -39,14 +47,16 @@ def create_refresh_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    key = get_signing_key(settings.JWT_SECRET_KEY, settings.JWT_ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, key, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
 
 def decode_token(token: str) -> Optional[dict]:
     """Decode and verify a JWT token."""
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        key = get_signing_key(settings.JWT_SECRET_KEY, settings.JWT_ALGORITHM)
+        payload = jwt.decode(token, key, algorithms=[settings.JWT_ALGORITHM])
         return payload
     except JWTError:
-        return None
\ No newline at end of file
+        return None
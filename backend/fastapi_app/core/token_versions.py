@@ -0,0 +1,84 @@
+"""
+In-memory map of user token versions for stateless access token checks.
+
+Access tokens carry the user's role, active flag and ``token_version``
+(``ver``) as claims, so admin authorization needs no database read.
+Changing a user's password, ``is_active`` or ``is_admin`` bumps
+``User.token_version`` (see ``User.save``); a token whose ``ver`` is
+below the current version is rejected.
+
+Each API process refreshes the map every ``TOKEN_VERSION_REFRESH_SECONDS``
+with one query over recently updated users, so a revocation takes effect
+within that interval. Requests never wait for a refresh another thread
+is running.
+
+A bump only matters while access tokens issued before it are still
+valid, so the map keeps only users updated within the access token
+lifetime (``JWT_ACCESS_TOKEN_EXPIRE_MINUTES``) and drops older entries on
+each refresh. Its size follows the revocation rate, not the user count.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from django.utils import timezone
+
+from apps.users.models import User
+from .config import settings
+
+
+class TokenVersionMap:
+    """national_id -> token_version for users whose tokens were revoked within ``lifetime``."""
+
+    def __init__(self, refresh_seconds: float, lifetime: timedelta):
+        self.refresh_seconds = refresh_seconds
+        self.lifetime = lifetime
+        # national_id -> (token_version, updated_at)
+        self._versions: Dict[str, Tuple[int, datetime]] = {}
+        self._lock = threading.Lock()
+        self._refreshed_at: Optional[float] = None
+        self._synced_until = None
+
+    def current(self, national_id: str) -> int:
+        """Current token version for ``national_id`` (0 if never revoked)."""
+        if self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self.refresh_seconds:
+            self._refresh()
+        entry = self._versions.get(national_id)
+        return entry[0] if entry else 0
+
+    def _refresh(self) -> None:
+        # Only the first load blocks; later refreshes are skipped if another thread is on it
+        if not self._lock.acquire(blocking=self._refreshed_at is None):
+            return
+        try:
+            if self._refreshed_at is not None and time.monotonic() - self._refreshed_at < self.refresh_seconds:
+                return
+            started = timezone.now()
+            slack = timedelta(seconds=self.refresh_seconds)
+            # Tokens issued before an older bump have expired; updated_at is never earlier than the bump
+            horizon = started - self.lifetime - slack
+            since = horizon
+            if self._synced_until is not None:
+                # Overlap the previous window to catch transactions that committed late
+                since = max(horizon, self._synced_until - slack)
+            users = User.objects.filter(token_version__gt=0, updated_at__gte=since)
+            for national_id, version, updated_at in (
+                users.values_list('national_id', 'token_version', 'updated_at').iterator()
+            ):
+                entry = self._versions.get(national_id)
+                if entry is not None:
+                    version, updated_at = max(version, entry[0]), max(updated_at, entry[1])
+                self._versions[national_id] = (version, updated_at)
+            for national_id in [key for key, (_, updated_at) in self._versions.items() if updated_at < horizon]:
+                del self._versions[national_id]
+            self._synced_until = started
+            self._refreshed_at = time.monotonic()
+        finally:
+            self._lock.release()
+
+
+token_versions = TokenVersionMap(
+    settings.TOKEN_VERSION_REFRESH_SECONDS,
+    timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES),
+)
@@ -1,19 +1,28 @@
 """
 Main FastAPI application.
 """
+import asyncio
 import os
 import sys
 import django
-from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from asgiref.sync import sync_to_async
+from fastapi import Depends, FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 
 # Setup Django
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../django_app'))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
+from apps.insurance.transitions import expire_registrations
+from apps.users.passwords import shutdown_shared_pool as shutdown_import_pool
 from core.config import settings
+from core.compression import CompressionMiddleware
+from core.cors import CORSMiddleware
+from core.metrics import InstrumentationMiddleware, job_queue_stats, render_metrics, require_metrics_token
+from core.passwords import pool as password_pool
+from core.refresh_tokens import purge_expired as purge_refresh_tokens
+from core.scheduler import run_periodically
 from api.v1 import auth, users, insurance, locations, admin, persons, statistics, documents
 
 # Create FastAPI app
@@ -23,41 +32,55 @@ app = FastAPI(
     description="سامانه مدیریت بیمه تکمیلی سلامت - وزارت آموزش و پرورش",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
 )
 
-# Configure CORS - Must be added before routes
+# Compress large JSON/text responses
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+
+# Record latency, SQL usage and response size per route (outside compression to see wire sizes)
+app.add_middleware(InstrumentationMiddleware)
+
+# Configure CORS - Must be added last so it wraps every other middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins in development
+    allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
+    allow_methods=settings.CORS_ALLOW_METHODS,
     allow_headers=["*"],
     expose_headers=["*"],
-    max_age=3600,
+    max_age=settings.CORS_MAX_AGE,
 )
 
-# Add middleware to handle OPTIONS requests
-@app.middleware("http")
-async def add_cors_headers(request: Request, call_next):
-    """Add CORS headers to all responses."""
-    if request.method == "OPTIONS":
-        return JSONResponse(
-            content={},
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS, PATCH",
-                "Access-Control-Allow-Headers": "*",
-                "Access-Control-Allow-Credentials": "true",
-                "Access-Control-Max-Age": "3600",
-            }
-        )
-    
-    response = await call_next(request)
-    response.headers["Access-Control-Allow-Origin"] = "*"
-    response.headers["Access-Control-Allow-Credentials"] = "true"
-    response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS, PATCH"
-    response.headers["Access-Control-Allow-Headers"] = "*"
-    return response
+# Start password hashing workers before the first login arrives
+@app.on_event("startup")
+def start_password_pool():
+    password_pool.start()
+
+
+@app.on_event("shutdown")
+def stop_password_pool():
+    password_pool.shutdown()
+    shutdown_import_pool()
+
+
+# Periodic maintenance: purge expired refresh tokens, expire ended registrations
+@app.on_event("startup")
+async def start_periodic_tasks():
+    app.state.periodic_tasks = [asyncio.create_task(
+        run_periodically(purge_refresh_tokens, settings.REFRESH_TOKEN_PURGE_SECONDS, "Purged expired refresh tokens")
+    )]
+    if settings.REGISTRATION_EXPIRY_SWEEP_SECONDS > 0:
+        app.state.periodic_tasks.append(asyncio.create_task(
+            run_periodically(expire_registrations, settings.REGISTRATION_EXPIRY_SWEEP_SECONDS, "Expired registrations")
+        ))
+
+
+@app.on_event("shutdown")
+async def stop_periodic_tasks():
+    for task in app.state.periodic_tasks:
+        task.cancel()
+
 
 # Include routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["احراز هویت"])
@@ -84,4 +107,11 @@ def root():
 @app.get("/health")
 def health_check():
     """Health check endpoint."""
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+async def metrics():
+    """Prometheus metrics endpoint (bearer ``METRICS_TOKEN``)."""
+    job_stats = await sync_to_async(job_queue_stats, thread_sensitive=False)()
+    return PlainTextResponse(render_metrics(job_stats), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,88 @@
+"""
+Shared fixtures.
+
+API tests call the FastAPI app through ``TestClient``. Sync endpoints run
+on worker threads with their own database connections, so any test that
+goes through the API needs committed data: use ``transactional_db`` (the
+``dataset`` fixture already does).
+"""
+from types import SimpleNamespace
+
+import pytest
+from django.core.cache import cache
+
+from tests import factories
+
+
+@pytest.fixture(autouse=True)
+def _reset_process_state():
+    """Clear state that outlives a test's database: the cache and the token version map."""
+    cache.clear()
+    yield
+    from core.token_versions import token_versions
+    token_versions._versions.clear()
+    token_versions._refreshed_at = None
+    token_versions._synced_until = None
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    from main import app
+    # Without the context manager: no startup hooks, so no password pool or periodic tasks
+    return TestClient(app)
+
+
+def auth_headers(user) -> dict:
+    from core.security import create_access_token, user_claims
+    return {'Authorization': f'Bearer {create_access_token(data=user_claims(user))}'}
+
+
+@pytest.fixture
+def dataset(transactional_db):
+    """
+    Enough rows of every kind that a per-row query would cross the N+1 threshold.
+
+    Six users in six schools across two states. Each user has six
+    dependents, six registrations covering all of them (alternately
+    active and pending, with both plans), and six documents. Each
+    dependent has an accepted claim on the user's first registration,
+    so usage lists six counters. There is one admin.
+    """
+    from apps.insurance.ledger import record_claims
+
+    schools = factories.make_location('1', schools=3) + factories.make_location('2', schools=3)
+    plans = [factories.make_plan('طرح پایه'), factories.make_plan('طرح ویژه', plan_type='premium')]
+    admin = factories.make_admin()
+    users, persons, registrations, documents = [], [], [], []
+    for index in range(6):
+        user = factories.make_user()
+        dependents = [factories.make_person(user, relation='spouse' if n == 0 else 'child') for n in range(6)]
+        owned = [
+            factories.make_registration(
+                user, plans[n % 2], schools[(index + n) % 6], dependents,
+                status=('active', 'pending')[n % 2],
+            )
+            for n in range(6)
+        ]
+        users.append(user)
+        persons.extend(dependents)
+        registrations.extend(owned)
+        documents.extend(
+            factories.make_document(user, registration=registration, person=person)
+            for registration, person in zip(owned, dependents)
+        )
+        record_claims(
+            {'registration_id': owned[0].id, 'person_id': person.id, 'coverage_type': 'outpatient',
+             'service_date': owned[0].start_date, 'amount': 1_000_000}
+            for person in dependents
+        )
+    return SimpleNamespace(
+        admin=admin,
+        users=users,
+        persons=persons,
+        registrations=registrations,
+        documents=documents,
+        plans=plans,
+        schools=schools,
+    )
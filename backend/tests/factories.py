@@ -0,0 +1,105 @@
+"""
+Small builders for test data.
+
+Each builder creates one row with valid defaults; keyword arguments
+override fields. National IDs come from a counter so every call gets a
+fresh, checksum-valid ID.
+"""
+import itertools
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.files.base import ContentFile
+
+from apps.common.national_id import from_base
+from apps.insurance.models import InsurancePlan, InsuranceRegistration, PlanCoverage
+from apps.locations.models import City, County, District, Region, School, State
+from apps.users.documents import Document
+from apps.users.models import Person, User
+
+PASSWORD = 'Test-pass-123'
+
+_sequence = itertools.count(1)
+
+
+def national_id() -> str:
+    return from_base(100_000_000 + next(_sequence))
+
+
+def make_user(**fields) -> User:
+    code = fields.pop('national_id', None) or national_id()
+    fields.setdefault('first_name', 'علی')
+    fields.setdefault('last_name', 'احمدی')
+    fields.setdefault('email', f'{code}@example.com')
+    return User.objects.create_user(code, password=fields.pop('password', PASSWORD), **fields)
+
+
+def make_admin(**fields) -> User:
+    fields.setdefault('is_admin', True)
+    fields.setdefault('is_staff', True)
+    return make_user(**fields)
+
+
+def make_person(user: User, **fields) -> Person:
+    fields.setdefault('first_name', 'زهرا')
+    fields.setdefault('last_name', user.last_name)
+    fields.setdefault('national_code', national_id())
+    fields.setdefault('birth_date', date(2012, 5, 1))
+    fields.setdefault('relation', 'child')
+    return Person.objects.create(user=user, **fields)
+
+
+def make_location(code: str = '1', schools: int = 1) -> list:
+    """A state with one branch down to a district, and ``schools`` schools in it."""
+    state = State.objects.create(name_fa=f'استان {code}', code=code)
+    city = City.objects.create(state=state, name_fa=f'شهر {code}', code=code)
+    county = County.objects.create(city=city, name_fa=f'شهرستان {code}', code=code)
+    region = Region.objects.create(county=county, name_fa=f'منطقه {code}', code=code)
+    district = District.objects.create(region=region, name_fa=f'ناحیه {code}', code=code)
+    return [
+        School.objects.create(district=district, name_fa=f'مدرسه {code}-{i}', code=f'S{code}-{i}')
+        for i in range(schools)
+    ]
+
+
+def make_plan(name: str = 'طرح پایه', coverages: dict = None, **fields) -> InsurancePlan:
+    """A plan with one coverage per ``coverages`` entry: ``{type: (amount, percentage, max_usage)}``."""
+    fields.setdefault('plan_type', 'basic')
+    fields.setdefault('description_fa', name)
+    fields.setdefault('monthly_premium', Decimal('500000'))
+    plan = InsurancePlan.objects.create(name_fa=name, **fields)
+    if coverages is None:
+        coverages = {'outpatient': (10_000_000, 70, 5), 'dental': (5_000_000, 50, None)}
+    for coverage_type, (amount, percentage, max_usage) in coverages.items():
+        PlanCoverage.objects.create(
+            plan=plan,
+            coverage_type=coverage_type,
+            title_fa=coverage_type,
+            description_fa=coverage_type,
+            coverage_amount=Decimal(amount),
+            coverage_percentage=percentage,
+            max_usage_count=max_usage,
+        )
+    return plan
+
+
+def make_registration(user: User, plan: InsurancePlan, school: School, persons=(), **fields) -> InsuranceRegistration:
+    start = fields.pop('start_date', date.today() - timedelta(days=30))
+    fields.setdefault('status', 'active')
+    if 'end_date' not in fields:
+        fields['end_date'] = start + timedelta(days=365) if start else None
+    registration = InsuranceRegistration.objects.create(
+        user=user, plan=plan, school=school, start_date=start, **fields
+    )
+    registration.persons.set(persons)
+    return registration
+
+
+def make_document(user: User, **fields) -> Document:
+    fields.setdefault('document_type', 'national_id')
+    fields.setdefault('title', 'کارت ملی')
+    content = fields.pop('content', b'%PDF-1.4 test')
+    document = Document(user=user, file_name='card.pdf', file_size=len(content), mime_type='application/pdf', **fields)
+    document.file.save('card.pdf', ContentFile(content), save=False)
+    document.save()
+    return document
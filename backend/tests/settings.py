@@ -0,0 +1,36 @@
+"""
+Settings for the test suite.
+
+Tests run on SQLite by default. Set ``TEST_DATABASE=postgres`` to use
+the PostgreSQL server from the regular settings (``POSTGRES_*``), which
+also runs the PostgreSQL-only tests (``COPY`` seeding).
+"""
+import os
+import tempfile
+
+from config.settings import *  # noqa: F401,F403
+from decouple import config
+
+os.environ.setdefault('NPLUSONE_MODE', 'raise')
+os.environ.setdefault('RATE_LIMIT_ENABLED', 'False')
+
+if config('TEST_DATABASE', default='sqlite') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }
+    }
+
+# Fast hashing; the production hashers are covered by their own settings
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher'] + PASSWORD_HASHERS  # noqa: F405
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'health-insurance-tests',
+    }
+}
+
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+MEDIA_ROOT = os.path.join(tempfile.gettempdir(), 'health-insurance-test-media')
@@ -0,0 +1,64 @@
+"""
+Admin password set/reset tests: hashing goes through the bounded password pool.
+"""
+import uuid
+
+import pytest
+from django.contrib.auth.hashers import check_password
+
+from core import passwords
+from tests.conftest import auth_headers
+from tests.factories import make_admin, make_user
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = passwords.PasswordPool(workers=1, queue_size=1)
+    monkeypatch.setattr(passwords, 'pool', pool)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def admin_headers(transactional_db):
+    return auth_headers(make_admin())
+
+
+def test_set_password(client, pool, admin_headers):
+    user = make_user()
+    response = client.put(f'/api/v1/admin/users/{user.id}/password', json={'new_password': 'fresh-secret'},
+                          headers=admin_headers)
+    assert response.status_code == 200, response.text
+    version = user.token_version
+    user.refresh_from_db()
+    assert check_password('fresh-secret', user.password)
+    assert user.token_version == version + 1
+    assert pool.snapshot()['operations']['hash']['completed'] == 1
+
+
+def test_reset_password(client, pool, admin_headers):
+    user = make_user()
+    response = client.post(f'/api/v1/admin/users/{user.id}/reset-password', json={}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    user.refresh_from_db()
+    assert check_password('user123', user.password)
+    assert pool.snapshot()['operations']['hash']['completed'] == 1
+
+
+def test_busy_pool_returns_503(client, pool, admin_headers):
+    user = make_user()
+    encoded = user.password
+    pool.capacity = 0
+    response = client.put(f'/api/v1/admin/users/{user.id}/password', json={'new_password': 'fresh-secret'},
+                          headers=admin_headers)
+    assert response.status_code == 503
+    assert response.headers['retry-after']
+    user.refresh_from_db()
+    assert user.password == encoded
+    assert pool.snapshot()['operations']['hash']['rejected'] == 1
+
+
+def test_unknown_user(client, pool, admin_headers):
+    response = client.post(f'/api/v1/admin/users/{uuid.uuid4()}/reset-password', json={}, headers=admin_headers)
+    assert response.status_code == 404
+    assert pool.snapshot()['operations']['hash']['completed'] == 0
@@ -0,0 +1,122 @@
+"""
+Registration time series tests: Jalali bucket boundaries, group folding and range validation.
+"""
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+import pytest
+from django.utils import timezone
+
+from apps.insurance.analytics import OTHER_LABEL, bucket_start, registration_timeseries
+from tests.conftest import auth_headers
+from tests.factories import make_admin, make_location, make_plan, make_registration, make_user
+
+
+def local(*args) -> datetime:
+    return timezone.make_aware(datetime(*args))
+
+
+@pytest.fixture
+def register(db):
+    user = make_user()
+    [school] = make_location()
+    plan = make_plan()
+
+    def register(registration_date, plan=plan, **fields):
+        return make_registration(user, plan, school, registration_date=registration_date, **fields)
+    return register
+
+
+@pytest.mark.parametrize('day, saturday', [
+    (date(2024, 3, 16), date(2024, 3, 16)),
+    (date(2024, 3, 20), date(2024, 3, 16)),
+    (date(2024, 3, 22), date(2024, 3, 16)),
+    (date(2024, 3, 23), date(2024, 3, 23)),
+])
+def test_week_starts_on_saturday(day, saturday):
+    assert bucket_start(day, 'week') == saturday
+
+
+def test_week_buckets(register):
+    register(local(2024, 3, 22, 23, 59))
+    register(local(2024, 3, 23, 0, 1))
+    result = registration_timeseries(date(2024, 3, 20), date(2024, 3, 24), granularity='week')
+    assert [(bucket['start'], bucket['end'], bucket['count']) for bucket in result['buckets']] == [
+        ('2024-03-16', '2024-03-22', 1),
+        ('2024-03-23', '2024-03-29', 1),
+    ]
+    assert result['buckets'][0]['key'] == '1402-12-26'
+
+
+def test_nowruz_splits_month_and_year(register):
+    # 1403 is a leap year: Esfand has 30 days and Nowruz 1404 is 21 March 2025
+    register(local(2025, 3, 20, 23, 59))
+    register(local(2025, 3, 21, 0, 0))
+    # 20 March 21:00 UTC is already 00:30 on 21 March in Tehran
+    register(datetime(2025, 3, 20, 21, 0, tzinfo=dt_timezone.utc))
+
+    months = registration_timeseries(date(2025, 3, 1), date(2025, 3, 31), granularity='month')
+    assert [(bucket['key'], bucket['label'], bucket['start'], bucket['end'], bucket['count'])
+            for bucket in months['buckets']] == [
+        ('1403-12', 'اسفند 1403', '2025-02-19', '2025-03-20', 1),
+        ('1404-01', 'فروردین 1404', '2025-03-21', '2025-04-20', 2),
+    ]
+    years = registration_timeseries(date(2025, 3, 20), date(2025, 3, 21), granularity='year')
+    assert [(bucket['key'], bucket['start'], bucket['end'], bucket['count']) for bucket in years['buckets']] == [
+        ('1403', '2024-03-20', '2025-03-20', 1),
+        ('1404', '2025-03-21', '2026-03-20', 2),
+    ]
+    assert years['total'] == 3
+
+
+def test_range_widened_to_whole_buckets(register):
+    register(local(2024, 3, 20, 12))
+    register(local(2024, 4, 19, 12))
+    register(local(2024, 4, 20, 12))
+    result = registration_timeseries(date(2024, 4, 1), date(2024, 4, 2), granularity='month')
+    assert (result['start'], result['end'], result['total']) == ('2024-03-20', '2024-04-19', 2)
+
+
+def test_groups_fold_into_other(register):
+    plans = [make_plan(f'طرح {index}') for index in range(4)]
+    day = local(2024, 5, 1, 12)
+    for plan, count in zip(plans, (3, 2, 1, 1)):
+        for _ in range(count):
+            register(day, plan=plan)
+    register(day + timedelta(days=31), plan=plans[3])
+
+    result = registration_timeseries(date(2024, 4, 20), date(2024, 6, 20), granularity='month',
+                                     group_by='plan', limit=2)
+    assert [(entry['id'], entry['name'], entry['counts'], entry['total']) for entry in result['series']] == [
+        (str(plans[0].id), 'طرح 0', [3, 0], 3),
+        (str(plans[1].id), 'طرح 1', [2, 0], 2),
+        (None, OTHER_LABEL, [2, 1], 3),
+    ]
+    assert [bucket['count'] for bucket in result['buckets']] == [7, 1]
+    # No folding when every group fits
+    assert len(registration_timeseries(date(2024, 4, 20), date(2024, 6, 20), group_by='plan')['series']) == 4
+
+
+@pytest.mark.parametrize('start, end', [
+    (date(1, 1, 1), date(1, 1, 2)),
+    (date(9999, 12, 30), date(9999, 12, 31)),
+    (None, date(1, 1, 2)),
+    (date(1721, 3, 20), date(1800, 1, 1)),
+    (date(2024, 1, 1), date(2321, 3, 21)),
+])
+def test_out_of_range(db, start, end):
+    with pytest.raises(ValueError):
+        registration_timeseries(start, end, granularity='day')
+
+
+def test_endpoint_rejects_out_of_range_dates(client, transactional_db):
+    headers = auth_headers(make_admin())
+    url = '/api/v1/statistics/admin/registrations/timeseries'
+    for params in ({'start': '0001-01-01', 'end': '0001-01-02', 'granularity': 'day'},
+                   {'start': '9999-12-30', 'end': '9999-12-31', 'granularity': 'month'},
+                   {'end': '0001-01-02', 'granularity': 'week'}):
+        response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 400, response.text
+    response = client.get(url, params={'start': '1721-03-21', 'end': '1721-03-22', 'granularity': 'year'},
+                          headers=headers)
+    assert response.status_code == 200
+    assert response.json()['buckets'][0]['key'] == '1100'
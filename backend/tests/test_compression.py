@@ -0,0 +1,84 @@
+"""
+Compression tests: encoding negotiation, the Vary header and cached precompressed responses.
+"""
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from starlette.datastructures import MutableHeaders
+
+from core import compression
+from core.compression import CompressionMiddleware, add_vary_header, choose_encoding
+from core.responses import cached_json_response
+
+
+@pytest.fixture(autouse=True)
+def both_encodings(monkeypatch):
+    monkeypatch.setattr(compression, 'supported_encodings', lambda: ['br', 'gzip'])
+
+
+@pytest.mark.parametrize('accept, expected', [
+    ('', None),
+    ('gzip', 'gzip'),
+    ('gzip, br', 'br'),
+    ('br;q=0, gzip', 'gzip'),
+    ('*', 'br'),
+    ('*, br;q=0', 'gzip'),
+    ('br;q=0, gzip;q=0, *', None),
+    ('gzip; q=0', None),
+    ('*;q=0', None),
+    ('identity', None),
+    ('gzip;q=bad', None),
+])
+def test_choose_encoding(accept, expected):
+    assert choose_encoding(accept) == expected
+
+
+@pytest.mark.parametrize('vary, expected', [
+    (None, 'Accept-Encoding'),
+    ('Accept-Encoding', 'Accept-Encoding'),
+    ('origin, accept-encoding', 'origin, accept-encoding'),
+    ('Origin', 'Origin, Accept-Encoding'),
+    ('*', '*'),
+])
+def test_add_vary_header(vary, expected):
+    headers = MutableHeaders(raw=[(b'vary', vary.encode())] if vary else [])
+    add_vary_header(headers, 'Accept-Encoding')
+    assert headers.getlist('vary') == [expected]
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+
+    @app.get('/plain')
+    def plain():
+        return {'items': ['x' * 40] * 50}
+
+    @app.get('/cached/{size}')
+    def cached(request: Request, size: int):
+        return cached_json_response(request, 'plans', f'compression-test:{size}', lambda: {'items': ['x'] * size})
+
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+    return TestClient(app)
+
+
+def test_middleware_compresses(client):
+    response = client.get('/plain', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers.get_list('vary') == ['Accept-Encoding']
+    response = client.get('/plain', headers={'Accept-Encoding': 'br;q=0, gzip;q=0, *'})
+    assert 'content-encoding' not in response.headers
+
+
+@pytest.mark.parametrize('size', [1, 1000])
+def test_cached_response_has_one_vary(client, size):
+    response = client.get(f'/cached/{size}', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers.get_list('vary') == ['Accept-Encoding']
+    assert len(response.json()['items']) == size
+
+
+def test_cached_response_precompressed(client):
+    response = client.get('/cached/1000', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['content-encoding'] == 'gzip'
+    assert int(response.headers['content-length']) < len(response.content)
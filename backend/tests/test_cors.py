@@ -0,0 +1,79 @@
+"""
+CORS middleware tests, on a bare app so the results do not depend on the API's routes.
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.cors import CORSMiddleware
+
+ORIGIN = 'http://localhost:3000'
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get('/items')
+    def items():
+        return ['a']
+
+    @app.options('/items')
+    def items_options():
+        return {'allow': 'GET, OPTIONS'}
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[ORIGIN],
+        allow_methods=['GET', 'POST'],
+        allow_headers=['Authorization'],
+        allow_credentials=True,
+        max_age=60,
+    )
+    return TestClient(app)
+
+
+def preflight(client, method='GET', headers=None, origin=ORIGIN):
+    request_headers = {'Origin': origin, 'Access-Control-Request-Method': method}
+    if headers:
+        request_headers['Access-Control-Request-Headers'] = headers
+    return client.options('/items', headers=request_headers)
+
+
+def test_preflight_allowed(client):
+    response = preflight(client, headers='authorization, content-type')
+    assert response.status_code == 200
+    assert response.headers['access-control-allow-origin'] == ORIGIN
+    assert response.headers['access-control-allow-methods'] == 'GET, POST'
+    assert response.headers['access-control-allow-headers'] == 'authorization, content-type'
+    assert response.headers['access-control-allow-credentials'] == 'true'
+    assert response.headers['access-control-max-age'] == '60'
+
+
+def test_preflight_rejects_method(client):
+    assert preflight(client, method='DELETE').status_code == 400
+    # A cached allowed entry for the same origin must not answer for another method
+    assert preflight(client, method='GET').status_code == 200
+    assert preflight(client, method='PUT').status_code == 400
+
+
+def test_preflight_rejects_origin_and_headers(client):
+    assert preflight(client, origin='http://evil.example').status_code == 400
+    assert preflight(client, headers='x-secret').status_code == 400
+
+
+def test_options_without_request_method_reaches_app(client):
+    response = client.options('/items', headers={'Origin': ORIGIN})
+    assert response.status_code == 200
+    assert response.json() == {'allow': 'GET, OPTIONS'}
+    assert response.headers['access-control-allow-origin'] == ORIGIN
+
+
+def test_simple_request(client):
+    response = client.get('/items', headers={'Origin': ORIGIN})
+    assert response.json() == ['a']
+    assert response.headers['access-control-allow-origin'] == ORIGIN
+    assert response.headers['vary'] == 'Origin'
+
+    response = client.get('/items', headers={'Origin': 'http://evil.example'})
+    assert 'access-control-allow-origin' not in response.headers
@@ -0,0 +1,110 @@
+"""
+Jalali calendar tests: the month-start table against the reference arithmetic.
+"""
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from apps.common import jalali
+
+
+def days(start: date, end: date):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+@pytest.mark.parametrize('jalali_date, gregorian', [
+    ((1403, 1, 1), date(2024, 3, 20)),
+    ((1403, 12, 30), date(2025, 3, 20)),
+    ((1404, 1, 1), date(2025, 3, 21)),
+    ((1403, 10, 1), date(2024, 12, 21)),
+    ((1399, 12, 30), date(2021, 3, 20)),
+    ((1357, 11, 22), date(1979, 2, 11)),
+])
+def test_known_dates(jalali_date, gregorian):
+    assert jalali.to_gregorian(*jalali_date) == gregorian
+    assert jalali.to_jalali(gregorian) == jalali_date
+
+
+def test_table_matches_arithmetic_for_every_month():
+    for jy in range(jalali.TABLE_FIRST_YEAR, jalali.TABLE_LAST_YEAR + 1):
+        for jm in range(1, 13):
+            first = jalali.arithmetic_to_gregorian(jy, jm, 1)
+            assert jalali.to_gregorian(jy, jm, 1) == first
+            assert jalali.month_length(jy, jm) == jalali._arithmetic_month_length(jy, jm)
+
+
+def test_table_matches_arithmetic_for_every_day():
+    for day in days(date(1921, 3, 21), date(2121, 3, 20)):
+        assert jalali.to_jalali(day) == jalali.arithmetic_to_jalali(day)
+
+
+def test_table_edges():
+    assert jalali.TABLE_FIRST_DAY == jalali.arithmetic_to_gregorian(jalali.TABLE_FIRST_YEAR, 1, 1)
+    assert jalali.to_jalali(jalali.TABLE_LAST_DAY)[0] == jalali.TABLE_LAST_YEAR
+    for day in (jalali.TABLE_FIRST_DAY - timedelta(days=1), jalali.TABLE_FIRST_DAY,
+                jalali.TABLE_LAST_DAY, jalali.TABLE_LAST_DAY + timedelta(days=1)):
+        assert jalali.to_jalali(day) == jalali.arithmetic_to_jalali(day)
+        assert jalali.to_gregorian(*jalali.to_jalali(day)) == day
+
+
+@pytest.mark.parametrize('jy', [1, 621, 1099, 1700, 2500, 3177])
+def test_fallback_outside_table(jy):
+    for jm, jd in ((1, 1), (6, 31), (12, jalali.month_length(jy, 12))):
+        day = jalali.to_gregorian(jy, jm, jd)
+        assert day == jalali.arithmetic_to_gregorian(jy, jm, jd)
+        assert jalali.to_jalali(day) == (jy, jm, jd)
+    assert jalali.nowruz(jy) == jalali.to_gregorian(jy, 1, 1)
+
+
+@pytest.mark.parametrize('jy, leap', [(1399, True), (1400, False), (1402, False), (1403, True), (1408, True)])
+def test_leap_years(jy, leap):
+    assert jalali.is_leap(jy) is leap
+    assert jalali.month_length(jy, 12) == (30 if leap else 29)
+
+
+@pytest.mark.parametrize('jalali_date', [(1402, 12, 30), (1403, 7, 31), (1403, 13, 1), (1403, 0, 1), (1403, 1, 0),
+                                         (1700, 12, 31), (3178, 1, 1), (0, 1, 1)])
+def test_invalid_dates(jalali_date):
+    with pytest.raises(ValueError):
+        jalali.to_gregorian(*jalali_date)
+    with pytest.raises(ValueError):
+        jalali.to_gregorian_many([(1403, 1, 1), jalali_date])
+
+
+def test_many_matches_single():
+    sorted_days = list(days(date(2023, 1, 1), date(2025, 12, 31)))
+    shuffled = sorted_days[:]
+    random.Random(1403).shuffle(shuffled)
+    # Sorted runs reuse the month bounds; shuffled input, and dates outside the table, do not
+    for sequence in (sorted_days, shuffled, [date(1500, 1, 1), date(2024, 3, 20), date(2400, 6, 1), date(2024, 3, 21)]):
+        expected = [jalali.to_jalali(day) for day in sequence]
+        assert jalali.to_jalali_many(sequence) == expected
+        assert jalali.to_gregorian_many(expected) == sequence
+    assert jalali.to_jalali_many([]) == [] and jalali.to_gregorian_many(iter([])) == []
+
+
+@pytest.mark.parametrize('start, end', [
+    (date(2024, 3, 20), date(2024, 3, 20)),
+    (date(2024, 3, 25), date(2025, 3, 21)),
+    (date(1721, 1, 1), date(1721, 6, 1)),
+    (date(2321, 1, 1), date(2322, 6, 1)),
+])
+def test_month_starts(start, end):
+    starts = jalali.month_starts(start, end)
+    assert starts[0] == jalali.month_start(start) and starts[0] <= start
+    assert starts[-2] <= end < starts[-1]
+    for first, following in zip(starts, starts[1:]):
+        jy, jm, jd = jalali.to_jalali(first)
+        assert jd == 1 and (following - first).days == jalali.month_length(jy, jm)
+
+
+def test_helpers():
+    assert jalali.add_months(1403, 12, 1) == (1404, 1)
+    assert jalali.add_months(1403, 1, -1) == (1402, 12)
+    assert jalali.year_start(date(2025, 3, 20)) == date(2024, 3, 20)
+    assert jalali.format_date(date(2024, 3, 24)) == '1403/01/05'
+    assert jalali.month_name(1403, 7) == 'مهر 1403'
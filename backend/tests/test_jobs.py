@@ -0,0 +1,145 @@
+"""
+Background job tests: retries with backoff, giving up, requeueing, lock expiry and the worker loop.
+"""
+import threading
+from datetime import timedelta
+
+import pytest
+from django.db import OperationalError
+from django.utils import timezone
+
+from apps.common import jobs, worker
+from apps.common.jobs import Job, claim, enqueue, requeue, retry_delay, run_job
+from apps.common.worker import JobWorker
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def calls(monkeypatch, settings):
+    settings.JOB_RETRY_BASE_SECONDS = 10
+    settings.JOB_RETRY_MAX_SECONDS = 60
+    settings.JOB_LOCK_TIMEOUT = 300
+    calls = []
+
+    def flaky(fail=True, **payload):
+        calls.append(payload)
+        if fail:
+            raise RuntimeError('boom')
+
+    monkeypatch.setitem(jobs.HANDLERS, 'test.flaky', flaky)
+    return calls
+
+
+def make_ready(job):
+    Job.objects.filter(id=job.id).update(run_at=timezone.now() - timedelta(seconds=1))
+
+
+def expire_lock(job):
+    Job.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(seconds=301))
+
+
+def test_retry_delay(monkeypatch, settings):
+    settings.JOB_RETRY_BASE_SECONDS = 10
+    settings.JOB_RETRY_MAX_SECONDS = 60
+    monkeypatch.setattr(jobs.random, 'uniform', lambda low, high: high)
+    assert [retry_delay(attempts) for attempts in (1, 2, 3, 4, 10)] == [10, 20, 40, 60, 60]
+    monkeypatch.setattr(jobs.random, 'uniform', lambda low, high: low)
+    assert retry_delay(2) == 10
+
+
+def test_retry_then_fail_then_requeue(calls):
+    job = enqueue('test.flaky', {'order': 1}, max_attempts=2)
+
+    [claimed] = claim('w1', 10)
+    before = timezone.now()
+    assert run_job(claimed) == 'retried'
+    job.refresh_from_db()
+    assert job.status == 'queued' and job.attempts == 1 and job.locked_by is None
+    assert job.last_error == 'RuntimeError: boom'
+    # Backoff of the first retry: base * [0.5, 1]
+    assert before + timedelta(seconds=5) <= job.run_at <= timezone.now() + timedelta(seconds=10)
+    assert claim('w1', 10) == []
+
+    make_ready(job)
+    [claimed] = claim('w1', 10)
+    assert run_job(claimed) == 'failed'
+    job.refresh_from_db()
+    assert job.status == 'failed' and job.attempts == 2 and job.finished_at is not None
+    assert len(calls) == 2
+    make_ready(job)
+    assert claim('w1', 10) == []
+
+    assert requeue(job.id) is True
+    assert requeue(job.id) is False
+    job.refresh_from_db()
+    assert job.status == 'queued' and job.attempts == 0 and job.finished_at is None
+    Job.objects.filter(id=job.id).update(payload={'fail': False})
+    [claimed] = claim('w1', 10)
+    assert run_job(claimed) == 'done'
+    job.refresh_from_db()
+    assert job.status == 'done' and job.last_error == '' and job.attempts == 1
+
+
+def test_unknown_handler_fails_without_retry(calls):
+    job = enqueue('test.flaky')
+    Job.objects.filter(id=job.id).update(name='test.removed')
+    [claimed] = claim('w1', 10)
+    assert run_job(claimed) == 'failed'
+    assert Job.objects.get(id=job.id).last_error == "No job handler registered for 'test.removed'"
+    with pytest.raises(ValueError):
+        enqueue('test.removed')
+
+
+def test_expired_lock_is_reclaimed(calls):
+    job = enqueue('test.flaky', {'fail': False})
+    [stale] = claim('w1', 10)
+    assert claim('w2', 10) == []
+
+    expire_lock(job)
+    [current] = claim('w2', 10)
+    assert current.attempts == 2 and current.locked_by != stale.locked_by
+
+    # The first worker finishes late: its outcome is not recorded over the new lock
+    assert jobs._finish(stale, status='failed') is False
+    job.refresh_from_db()
+    assert job.status == 'running' and job.locked_by == current.locked_by
+    assert run_job(current) == 'done'
+    assert Job.objects.get(id=job.id).status == 'done'
+
+
+def test_lock_expired_on_last_attempt(calls):
+    job = enqueue('test.flaky', {'fail': False}, max_attempts=1)
+    claim('w1', 10)
+    expire_lock(job)
+    [claimed] = claim('w2', 10)
+    assert run_job(claimed) == 'failed'
+    assert calls == []
+    assert Job.objects.get(id=job.id).last_error == "Lock expired on the last attempt"
+
+
+def test_worker_survives_run_job_errors(monkeypatch):
+    pool = JobWorker(workers=1, batch_size=10, poll_interval=0)
+    batches = [[Job(id=1, name='a'), Job(id=2, name='b')], [Job(id=3, name='c')]]
+    ran = []
+
+    def fake_claim(worker_id, limit):
+        if not batches:
+            pool.stop()
+            return []
+        return batches.pop(0)
+
+    def fake_run_job(job):
+        ran.append(job.id)
+        if job.id == 1:
+            raise OperationalError('server closed the connection unexpectedly')
+        return 'done'
+
+    monkeypatch.setattr(worker, 'claim', fake_claim)
+    monkeypatch.setattr(worker, 'run_job', fake_run_job)
+    thread = threading.Thread(target=pool._work, args=(0,))
+    thread.start()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert ran == [1, 2, 3]
+    assert pool.snapshot()['outcomes'] == {'error': 1, 'done': 2}
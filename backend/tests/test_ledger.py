@@ -0,0 +1,243 @@
+"""
+Claims ledger tests: claim evaluation, coverage-year counters, the rebuild and the CSV import.
+"""
+import csv
+import importlib
+import io
+from datetime import date
+
+import pytest
+
+from apps.insurance.claims import Claim, CoverageUsage
+from apps.insurance.importer import COLUMNS, import_claims
+from apps.insurance.ledger import (
+    check_eligibility, coverage_year, coverage_year_bounds, evaluate, rebuild_usage_counters, record_claims,
+    usage_summary,
+)
+from tests.conftest import auth_headers
+from tests.factories import make_location, make_person, make_plan, make_registration, make_user
+
+# outpatient: 10,000,000 a year at 70%, at most 3 uses; dental: 5,000,000 at 50%, no use limit
+COVERAGES = {'outpatient': (10_000_000, 70, 3), 'dental': (5_000_000, 50, None)}
+# A term starting in Mehr, so it spans 1 January
+START, END = date(2024, 10, 1), date(2025, 9, 30)
+
+ACTIVE = {'status': 'active', 'start_date': START, 'end_date': END}
+RULE = (70, 10_000_000, 3)
+
+
+@pytest.mark.parametrize('start, day, year', [
+    (date(2024, 10, 1), date(2024, 10, 1), 1),
+    (date(2024, 10, 1), date(2025, 1, 1), 1),
+    (date(2024, 10, 1), date(2025, 9, 30), 1),
+    (date(2024, 10, 1), date(2025, 10, 1), 2),
+    (date(2024, 2, 29), date(2025, 2, 28), 1),
+    (date(2024, 2, 29), date(2025, 3, 1), 2),
+    (date(2024, 10, 1), date(2024, 9, 1), 1),
+    (None, date(2025, 1, 1), 1),
+])
+def test_coverage_year(start, day, year):
+    assert coverage_year(start, day) == year
+
+
+def test_coverage_year_bounds():
+    assert coverage_year_bounds(START, 1) == (START, END)
+    assert coverage_year_bounds(START, 2) == (date(2025, 10, 1), date(2026, 9, 30))
+    assert coverage_year_bounds(date(2024, 2, 29), 1) == (date(2024, 2, 29), date(2025, 2, 28))
+    assert coverage_year_bounds(None, 1) == (None, None)
+
+
+@pytest.mark.parametrize('registration, rule, usage, service_date, is_member, expected', [
+    (ACTIVE, RULE, (0, 0), date(2025, 1, 5), True, (None, 700_000)),
+    (dict(ACTIVE, status='expired'), RULE, (0, 0), date(2025, 1, 5), True, (None, 700_000)),
+    (dict(ACTIVE, status='pending'), RULE, (0, 0), date(2025, 1, 5), True, ('inactive', 0)),
+    (ACTIVE, RULE, (0, 0), date(2024, 9, 30), True, ('out_of_term', 0)),
+    (ACTIVE, RULE, (0, 0), date(2025, 10, 1), True, ('out_of_term', 0)),
+    (dict(ACTIVE, start_date=None), RULE, (0, 0), date(2025, 1, 5), True, ('out_of_term', 0)),
+    (ACTIVE, RULE, (0, 0), date(2025, 1, 5), False, ('not_member', 0)),
+    (ACTIVE, None, (0, 0), date(2025, 1, 5), True, ('not_covered', 0)),
+    (ACTIVE, RULE, (3, 0), date(2025, 1, 5), True, ('usage_limit', 0)),
+    (ACTIVE, RULE, (1, 10_000_000), date(2025, 1, 5), True, ('amount_limit', 0)),
+    (ACTIVE, RULE, (1, 9_800_000), date(2025, 1, 5), True, (None, 200_000)),
+    (ACTIVE, (70, 10_000_000, None), (50, 0), date(2025, 1, 5), True, (None, 700_000)),
+])
+def test_evaluate(registration, rule, usage, service_date, is_member, expected):
+    assert evaluate(registration, rule, usage, service_date, 1_000_000, is_member) == expected
+
+
+@pytest.fixture
+def registration(transactional_db):
+    user = make_user()
+    person = make_person(user)
+    (school,) = make_location()
+    return make_registration(user, make_plan(coverages=COVERAGES), school, [person],
+                             start_date=START, end_date=END, status='expired')
+
+
+def claim(registration, service_date, amount=1_000_000, coverage_type='outpatient', person=None, ref=None):
+    return {
+        'registration_id': registration.id,
+        'person_id': person.id if person else None,
+        'coverage_type': coverage_type,
+        'service_date': service_date,
+        'amount': amount,
+        'external_ref': ref,
+    }
+
+
+def counters(registration) -> dict:
+    return {
+        (str(counter.member_id), counter.coverage_type, counter.year):
+            (counter.usage_count, int(counter.claimed_amount), int(counter.reimbursed_amount))
+        for counter in CoverageUsage.objects.filter(registration=registration)
+    }
+
+
+def test_limits_span_the_new_year(registration):
+    # Three uses before and after 1 January fill the one coverage year
+    results = record_claims([
+        claim(registration, date(2025, 1, 10)),
+        claim(registration, date(2024, 11, 2)),
+        claim(registration, date(2024, 12, 31)),
+        claim(registration, date(2025, 2, 1)),
+    ])
+    assert [result['status'] for result in results] == ['accepted'] * 3 + ['rejected']
+    assert results[3]['reason'] == 'usage_limit'
+    assert counters(registration) == {(str(registration.user_id), 'outpatient', 1): (3, 3_000_000, 2_100_000)}
+
+
+def test_amount_cap_per_coverage_year(registration):
+    registration.end_date = date(2026, 9, 30)
+    registration.save(update_fields=['end_date'])
+    results = record_claims([
+        claim(registration, date(2024, 12, 1), amount=12_000_000),
+        claim(registration, date(2025, 3, 1), amount=6_000_000),
+        claim(registration, date(2025, 9, 30), amount=1_000_000),
+        # The anniversary renews the cap
+        claim(registration, date(2025, 10, 1), amount=1_000_000),
+    ])
+    assert [(result['status'], result['reimbursed_amount']) for result in results] == [
+        ('accepted', 8_400_000), ('accepted', 1_600_000), ('rejected', 0), ('accepted', 700_000),
+    ]
+    assert results[2]['reason'] == 'amount_limit'
+    holder = str(registration.user_id)
+    assert counters(registration) == {
+        (holder, 'outpatient', 1): (2, 18_000_000, 10_000_000),
+        (holder, 'outpatient', 2): (1, 1_000_000, 700_000),
+    }
+
+
+def test_members_and_duplicates(registration):
+    person = registration.persons.get()
+    stranger = make_person(make_user())
+    first = record_claims([
+        claim(registration, date(2025, 1, 5), person=person, ref='INV-1'),
+        claim(registration, date(2025, 1, 5), ref='INV-2'),
+        claim(registration, date(2025, 1, 6), ref='INV-2'),
+        claim(registration, date(2025, 1, 6), person=stranger),
+        claim(registration, date(2025, 1, 6), coverage_type='surgery'),
+    ])
+    assert [result['status'] for result in first] == ['accepted', 'accepted', 'duplicate', 'failed', 'rejected']
+    assert first[4]['reason'] == 'not_covered'
+
+    again = record_claims([claim(registration, date(2025, 1, 5), person=person, ref='INV-1')])
+    assert again == [{'status': 'duplicate'}]
+    assert Claim.objects.count() == 3
+    assert counters(registration) == {
+        (str(person.id), 'outpatient', 1): (1, 1_000_000, 700_000),
+        (str(registration.user_id), 'outpatient', 1): (1, 1_000_000, 700_000),
+    }
+
+
+def test_rebuild_usage_counters(registration):
+    record_claims([claim(registration, date(2024, 12, 1)), claim(registration, date(2025, 1, 2)),
+                   claim(registration, date(2025, 1, 3), coverage_type='dental')])
+    holder = str(registration.user_id)
+    expected = counters(registration)
+    CoverageUsage.objects.filter(coverage_type='outpatient').update(usage_count=9)
+    CoverageUsage.objects.filter(coverage_type='dental').delete()
+    CoverageUsage.objects.create(registration=registration, member_id=holder, coverage_type='hospitalization',
+                                 year=2025, usage_count=1)
+
+    report = rebuild_usage_counters([registration.id])
+    assert report == {'registrations': 1, 'counters': 2, 'created': 1, 'updated': 1, 'deleted': 1}
+    assert counters(registration) == expected
+    assert rebuild_usage_counters() == {'registrations': 1, 'counters': 2, 'created': 0, 'updated': 0, 'deleted': 0}
+
+
+def test_check_eligibility_and_usage_summary(registration):
+    record_claims([claim(registration, date(2024, 12, 1)), claim(registration, date(2025, 1, 2))])
+    result = check_eligibility(registration, 'outpatient', service_date=date(2025, 3, 1), amount=2_000_000)
+    assert result['eligible'] and result['year'] == 1
+    assert (result['year_start'], result['year_end']) == (START, END)
+    assert (result['usage_count'], result['remaining_uses'], result['estimated_reimbursement']) == (2, 1, 1_400_000)
+    assert result['remaining_amount'] == 10_000_000 - 1_400_000
+
+    (summary,) = usage_summary(registration, 1)
+    assert (summary['usage_count'], summary['person_id']) == (2, None)
+    assert usage_summary(registration, 2) == []
+
+
+def test_usage_endpoint(client, registration):
+    record_claims([claim(registration, date(2025, 1, 2))])
+    url = f'/api/v1/insurance/registrations/{registration.id}/usage'
+    headers = auth_headers(registration.user)
+    body = client.get(url, params={'year': 1}, headers=headers).json()
+    assert (body['year'], body['year_start'], body['year_end']) == (1, '2024-10-01', '2025-09-30')
+    assert [coverage['usage_count'] for coverage in body['coverages']] == [1]
+    # Today is past the term, so the default is a later, empty year
+    body = client.get(url, headers=headers).json()
+    assert body['year'] > 1 and body['coverages'] == []
+
+
+def to_csv(rows) -> io.StringIO:
+    stream = io.StringIO()
+    writer = csv.writer(stream)
+    writer.writerow(COLUMNS)
+    writer.writerows(rows)
+    stream.seek(0)
+    return stream
+
+
+def test_import_claims(registration):
+    person = registration.persons.get()
+    registration_id = str(registration.id)
+    rows = [
+        (registration_id, person.national_code, 'outpatient', '1403/10/01', '1,000,000', 'A-1'),
+        (registration_id, '', 'dental', '2025-01-15', '400000', 'A-2'),
+        (registration_id, '', 'dental', '2025-01-15', '400000', 'A-2'),
+        (registration_id, '', 'outpatient', '1403/06/01', '100000', 'A-3'),
+        (registration_id, '1111111111', 'outpatient', '2025-01-15', '100000', ''),
+        ('not-a-uuid', '', 'massage', '1403/13/01', '-5', ''),
+    ]
+    report = import_claims(to_csv(rows), batch_size=4)
+    assert [result['status'] for result in report['results']] == [
+        'accepted', 'accepted', 'duplicate', 'rejected', 'failed', 'failed',
+    ]
+    assert report['results'][3]['reason'] == 'out_of_term'
+    assert len(report['results'][5]['errors']) == 4
+    assert report['reimbursed_amount'] == 700_000 + 200_000
+    assert Claim.objects.get(external_ref='A-1').service_date == date(2024, 12, 21)
+    assert counters(registration) == {
+        (str(person.id), 'outpatient', 1): (1, 1_000_000, 700_000),
+        (str(registration.user_id), 'dental', 1): (1, 400_000, 200_000),
+    }
+
+    report = import_claims(to_csv(rows[:2]))
+    assert report['duplicate'] == 2 and Claim.objects.count() == 3
+
+
+def test_migration_rekeys_counters(registration):
+    from django.apps import apps
+    migration = importlib.import_module('apps.insurance.migrations.0007_coverage_usage_term_year')
+    record_claims([claim(registration, date(2024, 12, 1)), claim(registration, date(2025, 1, 2))])
+    term_counters = counters(registration)
+    holder = str(registration.user_id)
+
+    migration.rekey_counters(migration.calendar_year)(apps, None)
+    assert counters(registration) == {
+        (holder, 'outpatient', 2024): (1, 1_000_000, 700_000),
+        (holder, 'outpatient', 2025): (1, 1_000_000, 700_000),
+    }
+    migration.rekey_counters(migration.term_year)(apps, None)
+    assert counters(registration) == term_counters
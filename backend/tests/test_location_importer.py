@@ -0,0 +1,119 @@
+"""
+Location CSV import tests.
+"""
+import csv
+import io
+
+import pytest
+from django.db import DatabaseError
+
+from apps.locations import importer
+from apps.locations.importer import COLUMNS, LocationImportError, LocationImporter, import_locations
+from apps.locations.models import City, District, School, State
+from tests.conftest import auth_headers
+from tests.factories import make_admin
+
+
+def row(school_code, state_code='11', state_name='تهران', district_code='1', **fields):
+    values = {
+        'state_code': state_code, 'state_name': state_name,
+        'city_code': '1', 'city_name': 'تهران',
+        'county_code': '1', 'county_name': 'تهران',
+        'region_code': '1', 'region_name': 'منطقه ۱',
+        'district_code': district_code, 'district_name': f'ناحیه {district_code}',
+        'school_code': school_code, 'school_name': f'مدرسه {school_code}',
+        'school_type': 'elementary', 'address': '', 'phone': '',
+    }
+    values.update(fields)
+    return values
+
+
+def to_csv(rows) -> io.StringIO:
+    stream = io.StringIO()
+    writer = csv.DictWriter(stream, fieldnames=COLUMNS)
+    writer.writeheader()
+    writer.writerows(rows)
+    stream.seek(0)
+    return stream
+
+
+@pytest.mark.django_db
+def test_import_builds_hierarchy():
+    report = import_locations(to_csv([row('A1'), row('A2', district_code='2'), row('B1', state_code='12', state_name='قم')]))
+    assert report['imported'] == 3 and report['failed'] == 0
+    assert State.objects.count() == 2
+    assert City.objects.count() == 2
+    assert District.objects.count() == 3
+    assert School.objects.get(code='A2').district.code == '2'
+
+
+@pytest.mark.django_db
+def test_reimport_is_idempotent_and_updates():
+    import_locations(to_csv([row('A1'), row('A2')]))
+    report = import_locations(to_csv([row('A1'), row('A2', school_name='نام جدید')]))
+    assert report['imported'] == 2
+    assert report['upserted']['school'] == 1
+    assert School.objects.count() == 2
+    assert School.objects.get(code='A2').name_fa == 'نام جدید'
+
+
+@pytest.mark.django_db
+def test_row_errors():
+    report = import_locations(to_csv([
+        row('A1'),
+        row('A1'),
+        row('A3', state_code='99'),
+        row('', phone='123'),
+    ]))
+    assert report['imported'] == 1
+    errors = {error['row']: error['errors'] for error in report['errors']}
+    assert errors[3] == ["کد مدرسه در فایل تکراری است"]
+    assert errors[4] == ["نام استان قبلاً با کد 11 ثبت شده است"]
+    assert len(errors[5]) == 2
+
+
+@pytest.mark.django_db
+def test_missing_columns():
+    with pytest.raises(LocationImportError):
+        import_locations(io.StringIO('state_code,state_name\n1,x\n'))
+
+
+@pytest.mark.django_db
+def test_failed_batch_does_not_block_later_rows(monkeypatch):
+    calls = []
+    upsert = LocationImporter._upsert_schools
+
+    def fail_first(self, valid, districts):
+        calls.append(len(valid))
+        if len(calls) == 1:
+            raise DatabaseError('connection lost')
+        return upsert(self, valid, districts)
+
+    monkeypatch.setattr(LocationImporter, '_upsert_schools', fail_first)
+    # The first batch fails in the database; the same codes come again in the next one
+    report = import_locations(to_csv([
+        row('A1'), row('A2', state_code='12', state_name='قم'),
+        row('A1'), row('A2', state_code='12', state_name='قم'),
+    ]), batch_size=2)
+    assert report['failed'] == 2 and report['imported'] == 2
+    assert all(error['errors'][0].startswith('خطای پایگاه داده') for error in report['errors'])
+    assert set(School.objects.values_list('code', flat=True)) == {'A1', 'A2'}
+
+
+def test_admin_endpoint(client, transactional_db):
+    stream = to_csv([row('A1'), row('A1')])
+    response = client.post(
+        '/api/v1/admin/locations/import',
+        files={'file': ('schools.csv', stream.getvalue().encode('utf-8'), 'text/csv')},
+        headers=auth_headers(make_admin()),
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()['imported'] == 1
+    assert response.json()['failed'] == 1
+
+
+def test_invalidates_locations_cache(transactional_db, monkeypatch):
+    invalidated = []
+    monkeypatch.setattr(importer.cache, 'invalidate', invalidated.append)
+    import_locations(to_csv([row('A1')]))
+    assert invalidated == ['locations']
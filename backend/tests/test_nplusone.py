@@ -0,0 +1,144 @@
+"""
+N+1 detector tests.
+
+``tests/settings.py`` sets ``NPLUSONE_MODE=raise``, so any route below
+that repeats a query shape ``NPLUSONE_THRESHOLD`` times fails with
+``NPlusOneError``. User routes run as the first user, who has six
+dependents, registrations, documents and usage counters; admin routes
+see all six users. Both are above the default threshold of five.
+"""
+import pytest
+from django.db import connection
+
+from core import nplusone
+from core.config import settings
+from tests.conftest import auth_headers
+
+# (path, who) for every list and detail route in api/v1; paths are formatted with the dataset
+USER_ROUTES = [
+    '/api/v1/auth/me',
+    '/api/v1/users/profile',
+    '/api/v1/persons/',
+    '/api/v1/persons/{person}',
+    '/api/v1/insurance/plans',
+    '/api/v1/insurance/plans/{plan}',
+    '/api/v1/insurance/registrations',
+    '/api/v1/insurance/registrations/{registration}',
+    '/api/v1/insurance/registrations/{registration}/full',
+    '/api/v1/insurance/registrations/{registration}/usage',
+    '/api/v1/insurance/registrations/{registration}/eligibility?coverage_type=outpatient&amount=100000',
+    '/api/v1/documents/',
+    '/api/v1/documents/{document}',
+    '/api/v1/documents/{document}/download',
+    '/api/v1/locations/states',
+    '/api/v1/locations/cities?state_id={state}',
+    '/api/v1/locations/counties?city_id={city}',
+    '/api/v1/locations/regions?county_id={county}',
+    '/api/v1/locations/districts?region_id={region}',
+    '/api/v1/locations/schools?district_id={district}',
+    '/api/v1/locations/tree',
+    '/api/v1/statistics/user/overview',
+    '/api/v1/statistics/user/registrations',
+    '/api/v1/statistics/user/persons',
+]
+
+ADMIN_ROUTES = [
+    '/api/v1/admin/plans',
+    '/api/v1/admin/coverages',
+    '/api/v1/admin/schools',
+    '/api/v1/admin/states',
+    '/api/v1/admin/cities',
+    '/api/v1/admin/counties',
+    '/api/v1/admin/regions',
+    '/api/v1/admin/districts',
+    '/api/v1/admin/stats',
+    '/api/v1/admin/cache',
+    '/api/v1/admin/jobs',
+    '/api/v1/admin/registrations',
+    '/api/v1/admin/registrations/{registration}',
+    '/api/v1/admin/registrations/{registration}/full',
+    '/api/v1/admin/persons',
+    '/api/v1/admin/persons/{person}',
+    '/api/v1/admin/users',
+    '/api/v1/admin/users/{user}',
+    '/api/v1/admin/users/{user}/persons',
+    '/api/v1/documents/admin/all',
+    '/api/v1/documents/admin/{document}/download',
+    '/api/v1/statistics/admin/overview',
+    '/api/v1/statistics/admin/registrations',
+    '/api/v1/statistics/admin/registrations/timeseries?granularity=day',
+    '/api/v1/statistics/admin/registrations/timeseries?granularity=month&group_by=state',
+    '/api/v1/statistics/admin/persons',
+    '/api/v1/statistics/admin/schools',
+    '/api/v1/statistics/admin/plans',
+    '/api/v1/statistics/admin/users',
+    '/api/v1/statistics/admin/dashboard',
+]
+
+
+def _ids(dataset, user):
+    registration = next(r for r in dataset.registrations if r.user_id == user.id)
+    district = registration.school.district
+    return {
+        'user': user.id,
+        'person': user.persons.first().id,
+        'plan': registration.plan_id,
+        'registration': registration.id,
+        'document': next(d for d in dataset.documents if d.user_id == user.id).id,
+        'district': district.id,
+        'region': district.region_id,
+        'county': district.region.county_id,
+        'city': district.region.county.city_id,
+        'state': district.region.county.city.state_id,
+    }
+
+
+def test_mode_is_raise():
+    assert settings.NPLUSONE_MODE == 'raise'
+
+
+def test_dataset_crosses_threshold(dataset):
+    from apps.insurance.claims import CoverageUsage
+
+    user = dataset.users[0]
+    registration = _ids(dataset, user)['registration']
+    counts = (
+        user.persons.count(),
+        user.insurance_registrations.count(),
+        user.documents.count(),
+        CoverageUsage.objects.filter(registration_id=registration).count(),
+    )
+    assert min(counts) > settings.NPLUSONE_THRESHOLD
+
+
+@pytest.mark.parametrize('path', USER_ROUTES)
+def test_user_routes(client, dataset, path):
+    user = dataset.users[0]
+    response = client.get(path.format(**_ids(dataset, user)), headers=auth_headers(user))
+    assert response.status_code == 200, response.text
+
+
+@pytest.mark.parametrize('path', ADMIN_ROUTES)
+def test_admin_routes(client, dataset, path):
+    response = client.get(path.format(**_ids(dataset, dataset.users[0])), headers=auth_headers(dataset.admin))
+    assert response.status_code == 200, response.text
+
+
+def test_query_shape_ignores_values():
+    first = nplusone.query_shape("SELECT * FROM t WHERE id = 'a' AND n = 1 AND x IN (1, 2)")
+    second = nplusone.query_shape("SELECT * FROM t WHERE id = 'b' AND n = 22 AND x IN (3)")
+    assert first == second
+
+
+def test_tracker_flags_repeated_shape(transactional_db):
+    from apps.locations.models import City
+
+    tracker = nplusone.QueryShapeTracker(threshold=3)
+    with connection.execute_wrapper(lambda execute, sql, params, many, context: (
+        tracker.record(sql), execute(sql, params, many, context)
+    )[1]):
+        for _ in range(3):
+            list(City.objects.filter(code='x'))
+    assert len(tracker.offenders) == 1
+    with pytest.raises(nplusone.NPlusOneError):
+        nplusone.finish_tracking(tracker, 'GET', '/test')
@@ -0,0 +1,136 @@
+"""
+POST /api/v1/persons/batch tests.
+"""
+import pytest
+
+from apps.users.models import Person
+from tests.conftest import auth_headers
+from tests.factories import make_person, make_user, national_id
+
+URL = '/api/v1/persons/batch'
+
+
+@pytest.fixture
+def user(transactional_db):
+    return make_user()
+
+
+def new_person(code, relation='child'):
+    return {'first_name': 'حسین', 'last_name': 'موسوی', 'national_code': code,
+            'birth_date': '2016-04-01', 'relation': relation}
+
+
+def batch(client, user, **body):
+    response = client.post(URL, json=body, headers=auth_headers(user))
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def errors(result):
+    return {(item['operation'], item['index']): item['error'] for item in result['results'] if not item['success']}
+
+
+def test_create_update_delete(client, user):
+    keep, drop = make_person(user), make_person(user)
+    result = batch(
+        client, user,
+        create=[new_person(national_id())],
+        update=[{'id': str(keep.id), 'first_name': 'نام تازه'}],
+        delete=[str(drop.id)],
+    )
+    assert (result['created'], result['updated'], result['deleted'], result['failed']) == (1, 1, 1, 0)
+    assert [item['operation'] for item in result['results']] == ['delete', 'update', 'create']
+    keep.refresh_from_db()
+    assert keep.first_name == 'نام تازه'
+    assert not Person.objects.filter(id=drop.id).exists()
+    assert user.persons.count() == 2
+
+
+def test_item_errors(client, user):
+    person = make_person(user)
+    other_user_person = make_person(make_user())
+    result = batch(
+        client, user,
+        create=[new_person(person.national_code)],
+        update=[{'id': str(other_user_person.id), 'first_name': 'نام'}, {'id': str(person.id), 'first_name': 'نام'},
+                {'id': str(person.id), 'last_name': 'نام'}],
+        delete=[str(other_user_person.id)],
+    )
+    assert errors(result) == {
+        ('delete', 0): "شخص یافت نشد",
+        ('update', 0): "شخص یافت نشد",
+        ('update', 2): "این شخص بیش از یک بار در درخواست آمده است",
+        ('create', 0): "شخص با این کد ملی قبلاً ثبت شده است",
+    }
+    assert result['updated'] == 1
+
+
+def test_code_freed_by_update_or_delete(client, user):
+    moving, leaving = make_person(user), make_person(user)
+    result = batch(
+        client, user,
+        create=[new_person(moving.national_code), new_person(leaving.national_code)],
+        update=[{'id': str(moving.id), 'national_code': national_id()}],
+        delete=[str(leaving.id)],
+    )
+    assert result['failed'] == 0 and result['created'] == 2
+
+
+def test_code_not_freed_when_releasing_update_fails(client, user):
+    # moving cannot take holder's code, so it keeps its own and the create must fail too
+    moving, holder = make_person(user), make_person(user)
+    result = batch(
+        client, user,
+        create=[new_person(moving.national_code)],
+        update=[{'id': str(moving.id), 'national_code': holder.national_code}],
+    )
+    assert errors(result) == {
+        ('update', 0): "شخص با این کد ملی قبلاً ثبت شده است",
+        ('create', 0): "شخص با این کد ملی قبلاً ثبت شده است",
+    }
+    assert user.persons.count() == 2
+
+
+def test_failed_release_cascades(client, user):
+    first, second, holder = make_person(user), make_person(user), make_person(user)
+    valid_code = national_id()
+    result = batch(
+        client, user,
+        create=[new_person(second.national_code), new_person(valid_code)],
+        update=[
+            # second would take first's code, which first only frees if it could take holder's
+            {'id': str(second.id), 'national_code': first.national_code},
+            {'id': str(first.id), 'national_code': holder.national_code},
+        ],
+    )
+    assert errors(result) == {
+        ('update', 0): "شخص با این کد ملی قبلاً ثبت شده است",
+        ('update', 1): "شخص با این کد ملی قبلاً ثبت شده است",
+        ('create', 0): "شخص با این کد ملی قبلاً ثبت شده است",
+    }
+    assert result['created'] == 1
+    assert set(user.persons.values_list('national_code', flat=True)) == {
+        first.national_code, second.national_code, holder.national_code, valid_code,
+    }
+
+
+def test_swap_and_chain_codes(client, user):
+    first, second = make_person(user), make_person(user)
+    a, b, c = make_person(user), make_person(user), make_person(user)
+    fresh = national_id()
+    result = batch(
+        client, user,
+        update=[
+            # first and second swap codes
+            {'id': str(first.id), 'national_code': second.national_code},
+            {'id': str(second.id), 'national_code': first.national_code},
+            # a takes b's code, b takes c's, c moves to a new one
+            {'id': str(a.id), 'national_code': b.national_code},
+            {'id': str(b.id), 'national_code': c.national_code},
+            {'id': str(c.id), 'national_code': fresh},
+        ],
+    )
+    assert result['failed'] == 0 and result['updated'] == 5
+    codes = dict(user.persons.values_list('id', 'national_code'))
+    assert (codes[first.id], codes[second.id]) == (second.national_code, first.national_code)
+    assert (codes[a.id], codes[b.id], codes[c.id]) == (b.national_code, c.national_code, fresh)
@@ -0,0 +1,142 @@
+"""
+Quote tests: coverage rules, household banding, a hand-computed quote and the quote endpoint.
+"""
+import uuid
+from datetime import date
+
+import pytest
+
+from apps.insurance.quotes import _benefit, age_band, compare_plans, compare_plans_batch, household_profile
+from apps.users.serializers import years_before
+from tests.conftest import auth_headers
+from tests.factories import make_person, make_plan, make_user
+
+# The default make_plan plan quoted for one adult and one child with DEFAULT_USAGE, worked by hand:
+#   outpatient  70%, 5 uses:  child 4 x 1.5M = 6M -> 4.2M,  adult 3 x 2M = 6M -> 4.2M
+#   dental      50%:          child 1 x 2M   = 2M -> 1M,    adult 1.5 x 4M = 6M -> 3M
+#   not covered:  hospitalization 3M + 6.4M, medication 2M + 4M, laboratory 0.8M + 2.4M,
+#                 imaging 0.6M + 2M, ophthalmology 0.75M + 1M, physiotherapy 0.15M + 1.5M = 24.6M
+#   premium 500,000 x 12 x 2 = 12M; cost 12M + 8M + 24.6M = 44.6M; benefit 8.4M + 4M = 12.4M
+BASIC_QUOTE = {
+    'members': 2,
+    'annual_premium': 12_000_000,
+    'expected_cost': 44_600_000,
+    'expected_benefit': 12_400_000,
+    'expected_out_of_pocket': 32_200_000,
+    'net_annual_cost': 44_200_000,
+}
+BASIC_COVERAGES = {
+    'outpatient': {'covered': True, 'coverage_percentage': 70, 'annual_cap': 20_000_000, 'max_usage_count': 5,
+                   'expected_cost': 12_000_000, 'expected_benefit': 8_400_000},
+    'dental': {'covered': True, 'coverage_percentage': 50, 'annual_cap': 10_000_000, 'max_usage_count': None,
+               'expected_cost': 8_000_000, 'expected_benefit': 4_000_000},
+    'hospitalization': {'covered': False, 'coverage_percentage': 0, 'annual_cap': 0, 'max_usage_count': None,
+                        'expected_cost': 9_400_000, 'expected_benefit': 0},
+}
+
+
+def check_basic_quote(quote):
+    assert {key: quote[key] for key in BASIC_QUOTE} == BASIC_QUOTE
+    coverages = {coverage['coverage_type']: coverage for coverage in quote['coverages']}
+    for coverage_type, expected in BASIC_COVERAGES.items():
+        assert {key: coverages[coverage_type][key] for key in expected} == expected
+
+
+@pytest.mark.parametrize('rule, uses, cost, expected', [
+    (None, 3, 100, 0),
+    ((0.7, 10_000, None), 3, 100, 210),
+    ((0.5, 10_000, 2), 5, 100, 100),
+    ((0.5, 10_000, 2), 0.5, 100, 25),
+    ((1.0, 150, None), 3, 100, 150),
+    ((0.8, 150, 1), 3, 100, 80),
+])
+def test_benefit(rule, uses, cost, expected):
+    assert _benefit(rule, uses, cost) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('age, band', [(0, 'child'), (17, 'child'), (18, 'adult'), (59, 'adult'),
+                                       (60, 'senior'), (None, 'adult')])
+def test_age_band(age, band):
+    assert age_band(age) == band
+
+
+def test_household_profile():
+    assert household_profile([5, 30, None, 70, 12]) == {'child': 2, 'adult': 2, 'senior': 1}
+    assert household_profile([]) == {'child': 0, 'adult': 0, 'senior': 0}
+
+
+@pytest.mark.django_db
+def test_hand_computed_quote():
+    plan = make_plan()
+    make_plan('طرح غیرفعال', is_active=False)
+    [quote] = compare_plans({'child': 1, 'adult': 1})
+    assert quote['plan_id'] == str(plan.id)
+    check_basic_quote(quote)
+
+
+@pytest.mark.django_db
+def test_cap_is_per_member():
+    make_plan(coverages={'outpatient': (1_000_000, 100, None)})
+    # A senior expects 6 x 2.5M of outpatient care; each member is reimbursed up to the cap
+    for seniors in (1, 3):
+        [quote] = compare_plans({'senior': seniors})
+        [outpatient] = [c for c in quote['coverages'] if c['coverage_type'] == 'outpatient']
+        assert outpatient['expected_cost'] == 15_000_000 * seniors
+        assert outpatient['expected_benefit'] == outpatient['annual_cap'] == 1_000_000 * seniors
+
+
+@pytest.mark.django_db
+def test_batch_sorts_and_shares_quotes():
+    cheap = make_plan('ارزان', monthly_premium=100_000)
+    rich = make_plan('کامل', monthly_premium=5_000_000, coverages={'hospitalization': (500_000_000, 100, None)})
+    first, second, third = compare_plans_batch([{'adult': 1}, {'senior': 2}, {'adult': 1}])
+    assert [quote['plan_id'] for quote in first] == [str(cheap.id), str(rich.id)]
+    assert first is third and first is not second
+    assert [quote['members'] for quote in second] == [2, 2]
+    # Overrides apply to every band; plan_ids narrows the plans quoted
+    [quote] = compare_plans({'adult': 1}, plan_ids=[rich.id], usage={'hospitalization': (1, 100_000_000)})
+    [hospitalization] = [c for c in quote['coverages'] if c['coverage_type'] == 'hospitalization']
+    assert hospitalization['expected_benefit'] == 100_000_000
+
+
+@pytest.fixture
+def household(transactional_db):
+    user = make_user()
+    child = make_person(user, birth_date=years_before(date.today(), 10))
+    return user, child
+
+
+def quote(client, user, **body):
+    return client.post('/api/v1/insurance/quote', json=body, headers=auth_headers(user))
+
+
+def test_quote_endpoint(client, household):
+    user, child = household
+    plan = make_plan()
+    response = quote(client, user)
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data['household'] == {'child': 1, 'adult': 1, 'senior': 0}
+    assert data['members'] == 2 and data['recommended_plan_id'] == str(plan.id)
+    check_basic_quote(data['quotes'][0])
+
+    data = quote(client, user, person_ids=[str(child.id)], include_self=False, plan_ids=[str(plan.id)]).json()
+    assert data['household'] == {'child': 1, 'adult': 0, 'senior': 0}
+    data = quote(client, user, person_ids=[], self_age=65).json()
+    assert data['household'] == {'child': 0, 'adult': 0, 'senior': 1}
+
+
+def test_quote_endpoint_errors(client, household):
+    user, child = household
+    make_plan()
+    stranger = make_person(make_user())
+    for body in ({'person_ids': [str(stranger.id)]}, {'person_ids': [str(child.id), str(uuid.uuid4())]}):
+        response = quote(client, user, **body)
+        assert response.status_code == 404 and response.json()['detail'] == "فرد یافت نشد"
+    response = quote(client, user, plan_ids=[str(uuid.uuid4())])
+    assert response.status_code == 404 and response.json()['detail'] == "طرح بیمه یافت نشد"
+    response = quote(client, user, usage={'massage': {'uses': 1, 'cost': 100}})
+    assert response.status_code == 400 and 'massage' in response.json()['detail']
+    response = quote(client, user, person_ids=[], include_self=False)
+    assert response.status_code == 400
+    assert quote(client, user, self_age=121).status_code == 422
@@ -0,0 +1,122 @@
+"""
+Rate limit tests: sliding-window arithmetic, Retry-After, key eviction and the login 429.
+"""
+import pytest
+
+from api.v1 import auth as auth_api
+from core import ratelimit
+from core.ratelimit import RateLimited, RateLimiter, SlidingWindowLimiter, parse_rate
+from tests.factories import national_id
+
+
+def hits(limiter, key, *times):
+    for now in times:
+        limiter.hit(key, now)
+
+
+def test_parse_rate():
+    assert parse_rate('5/minute') == (5, 60)
+    assert parse_rate('20/hour') == (20, 3600)
+    with pytest.raises(ValueError):
+        parse_rate('5/day')
+
+
+def test_limit_within_one_window():
+    limiter = SlidingWindowLimiter(limit=5, window=60, max_keys=10)
+    for now in range(5):
+        assert limiter.retry_after('a', now) is None
+        limiter.hit('a', now)
+    # Five requests in window 0; the sixth has to wait until 20% of window 1 has passed,
+    # when 80% of the previous five (4) plus this one fits the limit
+    assert limiter.retry_after('a', 5) == pytest.approx(67)
+    assert limiter.retry_after('a', 71) is not None
+    assert limiter.retry_after('a', 72) is None
+    assert limiter.retry_after('b', 5) is None
+
+
+def test_previous_window_slides_out():
+    limiter = SlidingWindowLimiter(limit=5, window=60, max_keys=10)
+    hits(limiter, 'a', 0, 1, 2, 3, 4, 72)
+    # Window 1 holds one request; 5 * (1 - 13/60) + 1 + 1 > 5 until 40% of window 1 has passed
+    assert limiter.retry_after('a', 73) == pytest.approx(11)
+    assert limiter.retry_after('a', 84) is None
+
+
+def test_full_current_window_waits_for_next():
+    limiter = SlidingWindowLimiter(limit=2, window=10, max_keys=10)
+    hits(limiter, 'a', 10, 11)
+    # Nothing in the previous window, but the current one is full
+    assert limiter.retry_after('a', 12) == pytest.approx(13)
+    assert limiter.retry_after('a', 25) is None
+
+
+def test_idle_keys_reset_and_are_swept():
+    limiter = SlidingWindowLimiter(limit=1, window=10, max_keys=10)
+    hits(limiter, 'a', 0)
+    hits(limiter, 'b', 15)
+    assert limiter.retry_after('a', 5) is not None
+    # Two windows later window 0 no longer counts
+    assert limiter.retry_after('a', 20) is None
+    hits(limiter, 'b', 25)
+    assert len(limiter) == 1
+
+
+def test_max_keys_evicts_oldest():
+    limiter = SlidingWindowLimiter(limit=1, window=10, max_keys=2)
+    hits(limiter, 'a', 0)
+    hits(limiter, 'b', 0)
+    hits(limiter, 'c', 0)
+    assert len(limiter) == 2
+    assert limiter.retry_after('a', 1) is None
+    assert limiter.retry_after('b', 1) is not None and limiter.retry_after('c', 1) is not None
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_rejected_requests_are_not_counted(clock):
+    limiter = RateLimiter({'login': {'ip': '3/minute', 'national_id': '2/minute'}}, max_keys=10)
+    for _ in range(2):
+        limiter.check('login', ip='10.0.0.1', national_id='1')
+    for _ in range(4):
+        with pytest.raises(RateLimited) as raised:
+            limiter.check('login', ip='10.0.0.1', national_id='1')
+    assert int(raised.value.headers['Retry-After']) >= 1
+    # The ID scope rejected; the IP scope was not charged for those attempts either
+    limiter.check('login', ip='10.0.0.1', national_id='2')
+    with pytest.raises(RateLimited):
+        limiter.check('login', ip='10.0.0.1', national_id='3')
+    assert limiter.snapshot() == {
+        ('login', 'ip'): {'keys': 1, 'rejected': 1},
+        ('login', 'national_id'): {'keys': 2, 'rejected': 4},
+    }
+    # Once the windows have slid past, the rejections have left nothing behind
+    clock[0] += 120
+    limiter.check('login', ip='10.0.0.1', national_id='1')
+
+
+def test_disabled_and_unconfigured(clock):
+    limiter = RateLimiter({'login': {'ip': '1/minute'}}, max_keys=10, enabled=False)
+    for _ in range(3):
+        limiter.check('login', ip='10.0.0.1')
+    limiter.enabled = True
+    for _ in range(3):
+        limiter.check('register', ip='10.0.0.1')
+        limiter.check('login', ip=None, national_id='1')
+
+
+def test_login_returns_429(client, transactional_db, monkeypatch):
+    monkeypatch.setattr(auth_api, 'limiter', RateLimiter({'login': {'national_id': '2/minute'}}, max_keys=10))
+    body = {'national_id': national_id(), 'password': 'wrong-password'}
+    for _ in range(2):
+        assert client.post('/api/v1/auth/login', json=body).status_code == 401
+    response = client.post('/api/v1/auth/login', json=body)
+    assert response.status_code == 429
+    # The full window must mostly slide out: between half a window and a window and a half
+    assert 30 <= int(response.headers['retry-after']) <= 90
+    body['national_id'] = national_id()
+    assert client.post('/api/v1/auth/login', json=body).status_code == 401
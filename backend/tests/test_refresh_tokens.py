@@ -0,0 +1,132 @@
+"""
+Refresh token rotation tests: reuse detection, revocation, logout and purging.
+"""
+import uuid
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from apps.users.models import RefreshToken
+from apps.users.tokens import hash_jti
+from core import refresh_tokens
+from core.refresh_tokens import issue_refresh_token, purge_expired, revoke_refresh_family, rotate_refresh_token
+from core.security import decode_token
+from tests.factories import make_user
+
+pytestmark = pytest.mark.django_db
+
+
+def rotate(token):
+    return rotate_refresh_token(decode_token(token))
+
+
+def test_rotation_chain():
+    user = make_user()
+    first = issue_refresh_token(user)
+    rotated_user, second = rotate(first)
+    assert rotated_user == user and second != first
+    third = rotate(second)[1]
+    family = {decode_token(token)['fam'] for token in (first, second, third)}
+    assert len(family) == 1
+    assert RefreshToken.objects.filter(family=family.pop(), used_at__isnull=True).count() == 1
+
+
+def test_reuse_revokes_family():
+    user = make_user()
+    other_login = issue_refresh_token(user)
+    first = issue_refresh_token(user)
+    second = rotate(first)[1]
+    before = refresh_tokens.snapshot()['reused']
+
+    assert rotate(first) is None
+    assert refresh_tokens.snapshot()['reused'] == before + 1
+    assert not RefreshToken.objects.filter(family=decode_token(first)['fam']).exists()
+    # The successor issued to the legitimate client is gone too; other logins survive
+    assert rotate(second) is None
+    assert rotate(other_login) is not None
+
+
+def test_stale_token_version_revokes_family():
+    user = make_user()
+    token = issue_refresh_token(user)
+    user.revoke_tokens()
+    before = refresh_tokens.snapshot()['revoked']
+    assert rotate(token) is None
+    assert refresh_tokens.snapshot()['revoked'] == before + 1
+    assert not RefreshToken.objects.filter(user=user).exists()
+    assert rotate(issue_refresh_token(user)) is not None
+
+
+def test_deactivated_user():
+    user = make_user()
+    token = issue_refresh_token(user)
+    # A queryset update leaves token_version alone, so only the active flag rejects the token
+    type(user).objects.filter(pk=user.pk).update(is_active=False)
+    assert rotate(token) is None
+    assert not RefreshToken.objects.filter(user=user).exists()
+
+
+@pytest.mark.parametrize('payload', [{}, {'jti': 'x'}, {'fam': str(uuid.uuid4())},
+                                     {'jti': 'unknown', 'fam': str(uuid.uuid4())}])
+def test_invalid_payloads(payload):
+    before = refresh_tokens.snapshot()['invalid']
+    assert rotate_refresh_token(payload) is None
+    assert revoke_refresh_family(payload) == 0
+    assert refresh_tokens.snapshot()['invalid'] == before + 1
+
+
+def test_expired_token_is_not_reuse():
+    user = make_user()
+    token = issue_refresh_token(user)
+    RefreshToken.objects.filter(user=user).update(expires_at=timezone.now() - timedelta(seconds=1))
+    assert rotate(token) is None
+    # Expiry does not revoke the family; the purge removes the row later
+    assert RefreshToken.objects.filter(user=user).count() == 1
+
+
+def test_logout_revokes_own_family_only():
+    user = make_user()
+    mine = issue_refresh_token(user)
+    successor = rotate(mine)[1]
+    theirs = issue_refresh_token(user)
+
+    forged = decode_token(theirs)
+    forged['fam'] = decode_token(mine)['fam']
+    assert revoke_refresh_family(forged) == 0
+    assert RefreshToken.objects.filter(family=decode_token(mine)['fam']).count() == 2
+
+    assert revoke_refresh_family(decode_token(successor)) == 2
+    assert rotate(successor) is None
+    assert rotate(theirs) is not None
+
+
+def test_purge_expired():
+    user = make_user()
+    now = timezone.now()
+    RefreshToken.objects.bulk_create([
+        RefreshToken(jti_hash=hash_jti(f'old-{index}'), family=uuid.uuid4(), user=user,
+                     expires_at=now - timedelta(days=index + 1))
+        for index in range(5)
+    ])
+    live = issue_refresh_token(user)
+    before = refresh_tokens.snapshot()['purged']
+    assert purge_expired(batch_size=2) == 5
+    assert refresh_tokens.snapshot()['purged'] == before + 5
+    assert list(RefreshToken.objects.values_list('jti_hash', flat=True)) == [hash_jti(decode_token(live)['jti'])]
+    assert purge_expired() == 0
+
+
+def test_endpoints(client, transactional_db):
+    user = make_user()
+    first = issue_refresh_token(user)
+    response = client.post('/api/v1/auth/refresh', params={'refresh_token': first})
+    assert response.status_code == 200, response.text
+    second = response.json()['refresh_token']
+
+    assert client.post('/api/v1/auth/refresh', params={'refresh_token': first}).status_code == 401
+    assert client.post('/api/v1/auth/refresh', params={'refresh_token': second}).status_code == 401
+
+    third = issue_refresh_token(user)
+    assert client.post('/api/v1/auth/logout', params={'refresh_token': third}).status_code == 204
+    assert client.post('/api/v1/auth/refresh', params={'refresh_token': third}).status_code == 401
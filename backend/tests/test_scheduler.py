@@ -0,0 +1,35 @@
+"""
+Periodic task runner tests.
+"""
+import asyncio
+import threading
+
+from core import scheduler
+
+
+def run_until(calls: list, runs: int, func) -> None:
+    async def main():
+        task = asyncio.create_task(scheduler.run_periodically(func, 0, 'test task'))
+        while sum(1 for call in calls if call[0] == 'func') < runs:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    asyncio.run(main())
+
+
+def test_connections_closed_around_each_run_on_its_thread(monkeypatch):
+    calls = []
+    monkeypatch.setattr(scheduler, 'close_old_connections',
+                        lambda: calls.append(('close', threading.get_ident())))
+
+    def func():
+        calls.append(('func', threading.get_ident()))
+        if len(calls) < 3:
+            raise RuntimeError('database went away')
+        return 1
+
+    run_until(calls, 2, func)
+    for index in (0, 3):
+        close_before, run, close_after = calls[index:index + 3]
+        assert [close_before[0], run[0], close_after[0]] == ['close', 'func', 'close']
+        assert close_before[1] == run[1] == close_after[1] != threading.get_ident()
@@ -0,0 +1,89 @@
+"""
+Bulk seeding engine tests. The COPY tests need PostgreSQL (``TEST_DATABASE=postgres``).
+"""
+from datetime import date
+
+import pytest
+from django.db import connection
+
+from apps.common import seeding
+from apps.insurance.models import InsuranceRegistration
+from apps.locations.models import School
+from apps.users.models import Person
+from tests import factories
+
+Through = InsuranceRegistration.persons.through
+
+postgres_only = pytest.mark.skipif(connection.vendor != 'postgresql', reason='COPY needs PostgreSQL')
+
+
+@pytest.fixture
+def registration(db):
+    user = factories.make_user()
+    school = factories.make_location()[0]
+    return factories.make_registration(user, factories.make_plan(), school)
+
+
+def make_links(registration, count):
+    persons = [
+        Person(user_id=registration.user_id, first_name='نام', last_name='خانوادگی',
+               national_code=factories.national_id(), birth_date=date(2010, 1, 1), relation='child')
+        for _ in range(count)
+    ]
+    seeding.bulk_insert(Person, persons)
+    return [Through(insuranceregistration_id=registration.id, person_id=person.id) for person in persons]
+
+
+def test_batched():
+    assert list(seeding.batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(seeding.batched([], 2)) == []
+
+
+def test_bulk_insert_without_copy(registration):
+    links = make_links(registration, 7)
+    assert seeding.bulk_insert(Through, iter(links), batch_size=3, use_copy=False) == 7
+    assert registration.persons.count() == 7
+
+
+def test_copy_leaves_out_unset_auto_pk(registration, monkeypatch):
+    copied = []
+    monkeypatch.setattr(seeding, '_copy_rows', lambda model, fields, objs: copied.append(
+        ([field.column for field in fields], len(objs))
+    ))
+    links = make_links(registration, 3)
+    links[0].id = 99
+    seeding.copy_insert(Through, links)
+    assert copied == [
+        (['insuranceregistration_id', 'person_id'], 2),
+        (['id', 'insuranceregistration_id', 'person_id'], 1),
+    ]
+
+
+def test_copy_value_escapes_text():
+    school = School(name_fa='مدرسه\tیک\nدو\\سه', code='X', address=None)
+    fields = {field.name: field for field in School._meta.concrete_fields}
+    assert seeding._copy_value(fields['name_fa'], school) == 'مدرسه\\tیک\\nدو\\\\سه'
+    assert seeding._copy_value(fields['address'], school) == '\\N'
+
+
+@postgres_only
+def test_copy_insert_through_rows(registration, monkeypatch):
+    monkeypatch.setattr(seeding, 'COPY_THRESHOLD', 10)
+    links = make_links(registration, 12)
+    assert seeding.bulk_insert(Through, links) == 12
+    ids = list(Through.objects.filter(insuranceregistration=registration).values_list('id', flat=True))
+    assert len(ids) == 12 and None not in ids
+
+
+@postgres_only
+def test_copy_insert_round_trips_values(registration):
+    district = registration.school.district
+    schools = [
+        School(district=district, name_fa=f'مدرسه\t{i}\n', code=f'COPY{i}', address=None if i else 'خیابان \\ اول')
+        for i in range(3)
+    ]
+    seeding.bulk_insert(School, schools, use_copy=True)
+    stored = {school.code: school for school in School.objects.filter(code__startswith='COPY')}
+    assert stored['COPY0'].name_fa == 'مدرسه\t0\n'
+    assert stored['COPY0'].address == 'خیابان \\ اول'
+    assert stored['COPY1'].address is None
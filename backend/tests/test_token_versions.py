@@ -0,0 +1,78 @@
+"""
+Token version map tests: revocations take effect, and the map only keeps bumps within the token lifetime.
+"""
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from apps.users.models import User
+from core import token_versions as token_versions_module
+from core.token_versions import TokenVersionMap, token_versions
+from tests.conftest import auth_headers
+from tests.factories import make_admin, make_user
+
+LIFETIME = timedelta(minutes=30)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [timezone.now()]
+    monkeypatch.setattr(token_versions_module.timezone, 'now', lambda: now[0])
+    return now
+
+
+@pytest.mark.django_db
+def test_only_recent_bumps_are_loaded():
+    recent, old, never = make_user(), make_user(), make_user()
+    recent.revoke_tokens()
+    old.revoke_tokens()
+    User.objects.filter(pk=old.pk).update(updated_at=timezone.now() - LIFETIME - timedelta(minutes=1))
+    versions = TokenVersionMap(refresh_seconds=5, lifetime=LIFETIME)
+    assert versions.current(recent.national_id) == 1
+    assert versions.current(old.national_id) == 0
+    assert versions.current(never.national_id) == 0
+    assert len(versions._versions) == 1
+
+
+@pytest.mark.django_db
+def test_entries_expire_with_the_tokens(clock):
+    user, later = make_user(), make_user()
+    user.revoke_tokens()
+    versions = TokenVersionMap(refresh_seconds=0, lifetime=LIFETIME)
+    assert versions.current(user.national_id) == 1
+
+    clock[0] += LIFETIME - timedelta(minutes=1)
+    later.revoke_tokens()
+    later.revoke_tokens()
+    assert versions.current(user.national_id) == 1
+    assert versions.current(later.national_id) == 2
+
+    # Every token issued before the first bump has expired by now
+    clock[0] += timedelta(minutes=2)
+    assert versions.current(user.national_id) == 0
+    assert versions.current(later.national_id) == 2
+    assert list(versions._versions) == [later.national_id]
+
+
+@pytest.mark.django_db
+def test_new_bump_after_eviction(clock):
+    user = make_user()
+    user.revoke_tokens()
+    versions = TokenVersionMap(refresh_seconds=0, lifetime=LIFETIME)
+    assert versions.current(user.national_id) == 1
+    clock[0] += LIFETIME + timedelta(minutes=1)
+    assert versions.current(user.national_id) == 0
+    User.objects.filter(pk=user.pk).update(token_version=2, updated_at=clock[0])
+    assert versions.current(user.national_id) == 2
+
+
+def test_revoked_admin_token_rejected(client, transactional_db):
+    admin = make_admin()
+    headers = auth_headers(admin)
+    assert client.get('/api/v1/admin/cache', headers=headers).status_code == 200
+    admin.revoke_tokens()
+    # Admin endpoints read no user row: the map alone rejects the token, after its next refresh
+    token_versions._refreshed_at = None
+    assert client.get('/api/v1/admin/cache', headers=headers).status_code == 401
+    assert client.get('/api/v1/admin/cache', headers=auth_headers(admin)).status_code == 200
@@ -0,0 +1,172 @@
+"""
+Registration status transition tests: ``bulk_transition``, the expiry sweep and the admin endpoints.
+"""
+import uuid
+from datetime import date, timedelta
+
+import pytest
+from django.utils import timezone
+
+from api.v1 import admin as admin_api
+from apps.common.jobs import Job
+from apps.insurance import tasks
+from apps.insurance.models import InsuranceRegistration
+from apps.insurance.transitions import bulk_transition, expire_registrations, years_after
+from tests.conftest import auth_headers
+from tests.factories import make_admin, make_location, make_plan, make_registration, make_user
+
+
+@pytest.fixture
+def register(transactional_db):
+    plan, (school,) = make_plan(), make_location()
+
+    def register(status, **fields):
+        return make_registration(make_user(), plan, school, status=status, **fields)
+    return register
+
+
+def status_of(registration) -> str:
+    return InsuranceRegistration.objects.values_list('status', flat=True).get(id=registration.id)
+
+
+def queued_changes() -> list:
+    return [(job.payload['registration_id'], job.payload['old_status'], job.payload['new_status'])
+            for job in Job.objects.filter(name=tasks.STATUS_CHANGED).order_by('id')]
+
+
+def test_bulk_transition_report(register):
+    pending, approved, expired = register('pending'), register('approved'), register('expired')
+    missing = str(uuid.uuid4())
+    report = bulk_transition([pending.id, approved.id, expired.id, missing, pending.id], 'approved')
+    assert report == {
+        'updated': 1,
+        'unchanged': 1,
+        'skipped': [{'id': str(expired.id), 'status': 'expired'}],
+        'not_found': [missing],
+    }
+    assert status_of(pending) == 'approved' and status_of(expired) == 'expired'
+    assert queued_changes() == [(str(pending.id), 'pending', 'approved')]
+
+
+def test_bulk_transition_rejects_unknown_status(register):
+    with pytest.raises(ValueError):
+        bulk_transition([register('pending').id], 'archived')
+
+
+def test_activation_fills_missing_dates_only(register):
+    undated = register('approved', start_date=None, end_date=None)
+    dated = register('approved')
+    bulk_transition([undated.id, dated.id], 'active')
+
+    today = timezone.localdate()
+    undated.refresh_from_db()
+    assert (undated.start_date, undated.end_date) == (today, years_after(today, 1))
+    start, end = dated.start_date, dated.end_date
+    dated.refresh_from_db()
+    assert (dated.start_date, dated.end_date) == (start, end)
+
+
+def test_years_after_leap_day():
+    assert years_after(date(2024, 2, 29), 1) == date(2025, 2, 28)
+
+
+def test_expire_registrations(register, monkeypatch):
+    invalidated = []
+    monkeypatch.setattr('apps.insurance.transitions.cache.invalidate', invalidated.append)
+    today = date.today()
+    lapsed = [register('active', start_date=today - timedelta(days=400), end_date=today - timedelta(days=day))
+              for day in (1, 2, 3)]
+    current = register('active')
+    ends_today = register('active', end_date=today)
+
+    assert expire_registrations(today, batch_size=2) == 3
+    assert [status_of(registration) for registration in lapsed] == ['expired'] * 3
+    assert status_of(current) == status_of(ends_today) == 'active'
+    assert invalidated == ['stats']
+    assert expire_registrations(today) == 0
+    assert invalidated == ['stats']
+
+
+def test_expire_registrations_limit(register):
+    today = date.today()
+    for day in (1, 2, 3):
+        register('active', start_date=today - timedelta(days=400), end_date=today - timedelta(days=day))
+    assert expire_registrations(today, batch_size=2, limit=1) == 1
+    assert InsuranceRegistration.objects.filter(status='expired').count() == 1
+
+
+@pytest.fixture
+def put_status(client, register, monkeypatch):
+    headers = auth_headers(make_admin())
+    invalidated = []
+    monkeypatch.setattr(admin_api.cache, 'invalidate', invalidated.append)
+
+    def put_status(registration_id, **body):
+        return client.put(f'/api/v1/admin/registrations/{registration_id}/status', json=body, headers=headers)
+    put_status.invalidated = invalidated
+    return put_status
+
+
+def test_status_endpoint_allowed_transition(put_status, register):
+    registration = register('pending')
+    response = put_status(registration.id, status='approved')
+    assert response.status_code == 200, response.text
+    assert response.json()['status'] == 'approved'
+    assert status_of(registration) == 'approved'
+    assert put_status.invalidated == ['stats']
+    assert [change[1:] for change in queued_changes()] == [('pending', 'approved')]
+
+
+@pytest.mark.parametrize('current, target', [('expired', 'pending'), ('rejected', 'active'), ('cancelled', 'active')])
+def test_status_endpoint_refuses_disallowed_transition(put_status, register, current, target):
+    registration = register(current)
+    response = put_status(registration.id, status=target)
+    assert response.status_code == 409, response.text
+    assert status_of(registration) == current
+    assert put_status.invalidated == [] and queued_changes() == []
+
+
+def test_status_endpoint_activation_fills_dates(put_status, register):
+    registration = register('approved', start_date=None, end_date=None)
+    response = put_status(registration.id, status='active', start_date='2025-03-21')
+    assert response.status_code == 200, response.text
+    registration.refresh_from_db()
+    assert (registration.start_date, registration.end_date) == (date(2025, 3, 21), date(2026, 3, 21))
+
+
+def test_status_endpoint_same_status_updates_dates(put_status, register):
+    registration = register('active')
+    response = put_status(registration.id, status='active', end_date='2030-01-01T00:00:00Z')
+    assert response.status_code == 200, response.text
+    registration.refresh_from_db()
+    assert registration.end_date == date(2030, 1, 1)
+    assert put_status.invalidated == ['stats'] and queued_changes() == []
+
+    assert put_status(registration.id, status='active').status_code == 200
+    assert put_status.invalidated == ['stats']
+
+
+def test_status_endpoint_errors(put_status, register):
+    registration = register('pending')
+    assert put_status(uuid.uuid4(), status='approved').status_code == 404
+    assert put_status(registration.id, status='archived').status_code == 400
+    assert put_status(registration.id, status='approved', start_date='21/03/2025').status_code == 400
+    assert put_status(registration.id, status='approved',
+                      start_date='2025-03-21', end_date='2025-03-20').status_code == 400
+    assert status_of(registration) == 'pending'
+
+
+def test_bulk_endpoint(client, register, monkeypatch):
+    invalidated = []
+    monkeypatch.setattr(admin_api.cache, 'invalidate', invalidated.append)
+    pending, rejected = register('pending'), register('rejected')
+    response = client.post(
+        '/api/v1/admin/registrations/status',
+        json={'ids': [str(pending.id), str(rejected.id)], 'status': 'cancelled'},
+        headers=auth_headers(make_admin()),
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body['updated'] == 1
+    assert body['skipped'] == [{'id': str(rejected.id), 'status': 'rejected'}]
+    assert invalidated == ['stats']
@@ -0,0 +1,223 @@
+"""
+Batch enrolment import tests.
+"""
+import csv
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from django.contrib.auth.hashers import check_password
+from django.db import DatabaseError
+
+from apps.users import passwords
+from apps.users.importer import CSV_COLUMNS, EnrollmentImportError, import_enrollments
+from apps.users.models import Person, User
+from tests.conftest import auth_headers
+from tests.factories import make_admin, make_user, national_id
+
+
+def user_row(code, email='', **fields):
+    values = dict.fromkeys(CSV_COLUMNS, '')
+    values.update(national_id=code, first_name='مریم', last_name='کریمی', email=email)
+    values.update(fields)
+    return values
+
+
+def person_fields(code, relation='child'):
+    return {
+        'person_first_name': 'سارا', 'person_last_name': 'کریمی', 'person_national_code': code,
+        'person_birth_date': '2015-02-03', 'person_relation': relation,
+    }
+
+
+def to_csv(rows) -> io.StringIO:
+    stream = io.StringIO()
+    writer = csv.DictWriter(stream, fieldnames=CSV_COLUMNS)
+    writer.writeheader()
+    writer.writerows(rows)
+    stream.seek(0)
+    return stream
+
+
+@pytest.mark.django_db
+def test_csv_groups_dependents():
+    code = national_id()
+    report = import_enrollments(to_csv([
+        user_row(code, email='Maryam@Example.com', password='long-enough', **person_fields(national_id())),
+        user_row(code, **person_fields(national_id(), 'spouse')),
+        user_row(national_id()),
+    ]), default_password='default-pass')
+    assert report['users_created'] == 2 and report['persons_created'] == 2 and report['failed'] == 0
+    user = User.objects.get(national_id=code)
+    assert user.email == 'Maryam@example.com'
+    assert check_password('long-enough', user.password)
+    assert sorted(user.persons.values_list('relation', flat=True)) == ['child', 'spouse']
+
+
+@pytest.mark.django_db
+def test_ndjson():
+    records = [
+        {'national_id': national_id(), 'first_name': 'رضا', 'last_name': 'رضایی', 'password': 'password-1',
+         'persons': [{'first_name': 'علی', 'last_name': 'رضایی', 'national_code': national_id(),
+                      'birth_date': '2018-01-01', 'relation': 'child'}]},
+        'not an object',
+    ]
+    stream = io.StringIO('\n'.join(json.dumps(record) for record in records) + '\n{broken\n')
+    report = import_enrollments(stream, file_format='ndjson')
+    assert report['users_created'] == 1 and report['persons_created'] == 1
+    assert [result['status'] for result in report['results']] == ['created', 'failed', 'failed']
+
+
+@pytest.mark.django_db
+def test_record_errors():
+    existing = make_user(email='taken@example.com')
+    report = import_enrollments(to_csv([
+        user_row(existing.national_id),
+        user_row(national_id(), email='taken@example.com'),
+        user_row(national_id()),
+        user_row('1234567890'),
+        user_row(national_id(), password='short'),
+    ]), default_password='default-pass')
+    report_rows = {result['row']: result for result in report['results']}
+    assert report_rows[2]['errors'] == ["کاربر با این کد ملی قبلاً ثبت‌نام کرده است"]
+    assert report_rows[3]['errors'] == ["کاربر با این ایمیل قبلاً ثبت‌نام کرده است"]
+    assert report_rows[4]['status'] == 'created'
+    assert report_rows[5]['errors'] == ["کد ملی نامعتبر است"]
+    assert report_rows[6]['errors'] == ["رمز عبور باید حداقل 8 کاراکتر باشد"]
+
+
+@pytest.mark.django_db
+def test_duplicate_in_file_and_missing_password():
+    code = national_id()
+    report = import_enrollments(to_csv([user_row(code), user_row(national_id()), user_row(code)]))
+    assert [result['errors'] for result in report['results']] == [["رمز عبور الزامی است"]] * 3
+
+    report = import_enrollments(to_csv([user_row(code), user_row(national_id()), user_row(code)]),
+                                default_password='default-pass')
+    assert report['results'][2]['errors'] == ["کد ملی در فایل تکراری است"]
+
+
+def test_bad_format_and_header():
+    with pytest.raises(EnrollmentImportError):
+        import_enrollments(io.StringIO(''), file_format='xml')
+    with pytest.raises(EnrollmentImportError):
+        import_enrollments(io.StringIO('first_name\nx\n'))
+
+
+@pytest.mark.django_db
+def test_failed_batch_does_not_block_corrected_rows(monkeypatch):
+    bulk_create = User.objects.bulk_create
+    calls = []
+
+    def fail_first(objs, *args, **kwargs):
+        calls.append(len(objs))
+        if len(calls) == 1:
+            raise DatabaseError('deadlock detected')
+        return bulk_create(objs, *args, **kwargs)
+
+    monkeypatch.setattr(User.objects, 'bulk_create', fail_first)
+    first, second = national_id(), national_id()
+    # Batch 1 fails in the database; batch 2 sends the same users again
+    report = import_enrollments(to_csv([
+        user_row(first, email='a@example.com'), user_row(second),
+        user_row(first, email='a@example.com'), user_row(second),
+    ]), default_password='default-pass', batch_size=2)
+    statuses = [result['status'] for result in report['results']]
+    assert statuses == ['failed', 'failed', 'created', 'created']
+    assert report['results'][0]['errors'][0].startswith('خطای پایگاه داده')
+    assert User.objects.filter(national_id__in=[first, second]).count() == 2
+
+
+class CountingPool(ProcessPoolExecutor):
+    """Records pools and map calls; hashes in this process."""
+    pools, maps = [], []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pools.append(self)
+
+    def map(self, fn, *iterables, **kwargs):
+        self.maps.append(self)
+        return map(fn, *iterables)
+
+
+@pytest.fixture
+def counting_pool(monkeypatch, settings):
+    settings.IMPORT_HASH_WORKERS = 2
+    monkeypatch.setattr(passwords, 'ProcessPoolExecutor', CountingPool)
+    monkeypatch.setattr(passwords, 'PARALLEL_THRESHOLD', 2)
+    monkeypatch.setattr(passwords, '_shared_pool', None)
+    monkeypatch.setattr(CountingPool, 'pools', [])
+    monkeypatch.setattr(CountingPool, 'maps', [])
+    yield CountingPool
+    passwords.shutdown_shared_pool()
+
+
+@pytest.mark.django_db
+def test_one_pool_for_the_whole_import(counting_pool):
+    rows = [user_row(national_id()) for _ in range(6)]
+    report = import_enrollments(to_csv(rows), default_password='default-pass', batch_size=2, workers=2)
+    assert report['users_created'] == 6
+    assert len(counting_pool.pools) == 1 and len(counting_pool.maps) == 3
+
+
+@pytest.mark.django_db
+def test_imports_share_the_process_pool(counting_pool):
+    for _ in range(2):
+        rows = [user_row(national_id()) for _ in range(4)]
+        assert import_enrollments(to_csv(rows), default_password='default-pass', batch_size=2)['users_created'] == 4
+    assert len(counting_pool.pools) == 1 and len(counting_pool.maps) == 4
+    assert counting_pool.pools[0]._max_workers == 2
+
+
+@pytest.mark.django_db
+def test_shared_pool_replaced_when_broken(counting_pool, monkeypatch):
+    def broken_map(self, fn, *iterables, **kwargs):
+        raise BrokenProcessPool('worker died')
+
+    first = passwords.shared_pool()
+    monkeypatch.setattr(first, 'map', broken_map.__get__(first))
+    hashes = passwords.hash_passwords(['password-1', 'password-2', 'password-3'])
+    assert len(hashes) == 3
+    assert passwords.shared_pool() is not first and len(counting_pool.pools) == 2
+
+
+@pytest.mark.django_db
+def test_person_national_code_checksum():
+    valid = national_id()
+    invalid = valid[:-1] + str((int(valid[-1]) + 1) % 10)
+    report = import_enrollments(to_csv([
+        user_row(national_id(), **person_fields(valid)),
+        user_row(national_id(), **person_fields(invalid)),
+    ]), default_password='default-pass')
+    assert [result['errors'] for result in report['results']] == [[], ["فرد 1: کد ملی نامعتبر است"]]
+
+
+def test_hash_passwords_serial_for_small_inputs():
+    hashes = passwords.hash_passwords(['one-password', 'two-password'], workers=4)
+    assert len(hashes) == 2 and hashes[0] != hashes[1]
+
+
+def test_hash_passwords_on_shared_pool():
+    secrets = [f'password-{i}' for i in range(passwords.PARALLEL_THRESHOLD)]
+    with passwords.hashing_pool(2) as pool:
+        first = passwords.hash_passwords(secrets, workers=2, pool=pool)
+        second = passwords.hash_passwords(secrets[:1] * 8, workers=2, pool=pool)
+    assert all(check_password(secret, encoded) for secret, encoded in zip(secrets, first))
+    assert len(set(second)) == 8
+
+
+def test_admin_endpoint(client, transactional_db):
+    code = national_id()
+    stream = to_csv([user_row(code, **person_fields(national_id()))])
+    response = client.post(
+        '/api/v1/admin/users/import',
+        files={'file': ('users.csv', stream.getvalue().encode('utf-8'), 'text/csv')},
+        data={'default_password': 'default-pass'},
+        headers=auth_headers(make_admin()),
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()['users_created'] == 1
+    assert Person.objects.filter(user__national_id=code).count() == 1
@@ -49,6 +49,13 @@ export default function DashboardPage() {
   };
 
   const handleLogout = () => {
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken) {
+      // Revoke the refresh token server-side; logging out locally does not wait for it
+      fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/v1/auth/logout?refresh_token=${encodeURIComponent(refreshToken)}`, {
+        method: 'POST',
+      }).catch(() => {});
+    }
     localStorage.removeItem('access_token');
     localStorage.removeItem('refresh_token');
     router.push('/login');
@@ -2,28 +2,6 @@
 
 import { useEffect, useState } from 'react';
 
-// Helper function to convert Gregorian month to Jalali
-const getJalaliMonthName = (gregorianDate: string) => {
-  const months = [
-    'فروردین', 'اردیبهشت', 'خرداد', 'تیر', 'مرداد', 'شهریور',
-    'مهر', 'آبان', 'آذر', 'دی', 'بهمن', 'اسفند'
-  ];
-  
-  const [year, month] = gregorianDate.split('-').map(Number);
-  const date = new Date(year, month - 1, 1);
-  
-  // Simple Gregorian to Jalali conversion (approximate)
-  // For accurate conversion, you'd use a library like moment-jalaali
-  const jalaliYear = year - 621;
-  let jalaliMonth = month - 3;
-  
-  if (jalaliMonth <= 0) {
-    jalaliMonth += 12;
-  }
-  
-  return `${months[jalaliMonth - 1]} ${jalaliYear}`;
-};
-
 interface RegistrationStats {
   total: number;
   pending: number;
@@ -32,7 +10,7 @@ interface RegistrationStats {
   active: number;
   expired: number;
   by_plan: Array<{ plan_name: string; count: number }>;
-  by_month: Array<{ month_name: string; count: number }>;
+  by_month: Array<{ month: string; month_name: string; count: number }>;
 }
 
 interface PersonStats {
@@ -192,7 +170,7 @@ export default function AdminCharts() {
                     </div>
                   </div>
                   <div className="mt-2 text-xs text-gray-600 text-center">
-                    {getJalaliMonthName(item.month)}
+                    {item.month_name}
                   </div>
                 </div>
               );